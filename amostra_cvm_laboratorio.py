@@ -0,0 +1,257 @@
+"""
+Amostra Sintética dos Dados Abertos da CVM
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Grava num diretório local um conjunto pequeno de arquivos no formato dos
+dados abertos da CVM, para exercitar a ingestão (cvm_laboratorio) sem os
+downloads reais e sem acesso à rede:
+- dfp_cia_aberta_2022.zip e dfp_cia_aberta_2023.zip: quatro companhias,
+  com demonstrações consolidadas ou só individuais, escala em R$ mil ou
+  em reais, um banco (descartado na ingestão) e o exercício comparativo
+  (PENÚLTIMO), que a ingestão ignora
+- Uma reapresentação: o DFP 2023 da EMPRESA DELTA vem nas versões 1 e 2;
+  com `reapresentar`, o mesmo zip ganha a versão 3, como quando a CVM
+  republica o arquivo anual
+- itr_cia_aberta_2023.zip: 1º e 2º trimestres, com fluxos trimestrais e
+  acumulados no ano
+- cad_cia_aberta.csv: setores do cadastro (com um registro cancelado)
+
+Os valores são múltiplos de um balanço, uma DRE e uma DFC de referência
+(R$ mil) com subtotais consistentes, então o resultado esperado da
+ingestão pode ser calculado com `valor_esperado`.
+
+Uso:
+    python amostra_cvm_laboratorio.py --destino dados_amostra/
+    python cvm_laboratorio.py --origem dados_amostra/ --destino armazem_amostra/
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import zipfile
+
+# Demonstrações de referência (R$ mil): (código, descrição, valor)
+BALANCO_ATIVO = (
+    ("1", "Ativo Total", 1000.0),
+    ("1.01", "Ativo Circulante", 450.0),
+    ("1.01.01", "Caixa e Equivalentes de Caixa", 100.0),
+    ("1.01.03", "Contas a Receber", 200.0),
+    ("1.01.04", "Estoques", 150.0),
+    ("1.02", "Ativo Não Circulante", 550.0),
+    ("1.02.03", "Imobilizado", 550.0),
+)
+BALANCO_PASSIVO = (
+    ("2", "Passivo Total", 1000.0),
+    ("2.01", "Passivo Circulante", 200.0),
+    ("2.01.02", "Fornecedores", 120.0),
+    ("2.01.04", "Empréstimos e Financiamentos", 80.0),
+    ("2.02", "Passivo Não Circulante", 300.0),
+    ("2.02.01", "Empréstimos e Financiamentos", 300.0),
+    ("2.03", "Patrimônio Líquido Consolidado", 500.0),
+    ("2.03.01", "Capital Social Realizado", 400.0),
+    ("2.03.04", "Reservas de Lucros", 100.0),
+)
+DRE = (
+    ("3.01", "Receita de Venda de Bens e/ou Serviços", 1200.0),
+    ("3.02", "Custo dos Bens e/ou Serviços Vendidos", -720.0),
+    ("3.03", "Resultado Bruto", 480.0),
+    ("3.04", "Despesas/Receitas Operacionais", -220.0),
+    ("3.04.01", "Despesas com Vendas", -120.0),
+    ("3.04.02", "Despesas Gerais e Administrativas", -100.0),
+    ("3.05", "Resultado Antes do Resultado Financeiro e dos Tributos", 260.0),
+    ("3.06", "Resultado Financeiro", -60.0),
+    ("3.06.01", "Receitas Financeiras", 20.0),
+    ("3.06.02", "Despesas Financeiras", -80.0),
+    ("3.07", "Resultado Antes dos Tributos sobre o Lucro", 200.0),
+    ("3.08", "Imposto de Renda e Contribuição Social sobre o Lucro", -68.0),
+    ("3.11", "Lucro/Prejuízo Consolidado do Período", 132.0),
+)
+DFC = (
+    ("6.01", "Caixa Líquido Atividades Operacionais", 180.0),
+    ("6.01.01", "Caixa Gerado nas Operações", 180.0),
+    ("6.01.01.01", "Lucro Líquido do Exercício", 132.0),
+    ("6.01.01.02", "Depreciação e Amortização", 50.0),
+    ("6.02", "Caixa Líquido Atividades de Investimento", -90.0),
+    ("6.03", "Caixa Líquido Atividades de Financiamento", -40.0),
+    ("6.05", "Aumento (Redução) de Caixa e Equivalentes", 50.0),
+)
+DEMONSTRACOES = {"BPA": BALANCO_ATIVO, "BPP": BALANCO_PASSIVO, "DRE": DRE, "DFC_MI": DFC}
+FLUXOS = ("DRE", "DFC_MI")
+
+# Companhias da amostra: dados do cadastro e como cada uma publica
+EMPRESAS = {
+    "11.111.111/0001-11": {
+        "nome": "EMPRESA ALFA S.A.", "cd_cvm": 1001, "setor": "Comércio (Atacado e Varejo)",
+        "fator": 1.0, "consolidado": True, "escala": "MIL", "banco": False,
+    },
+    "22.222.222/0001-22": {
+        "nome": "EMPRESA BETA S.A.", "cd_cvm": 1002, "setor": "Energia Elétrica",
+        "fator": 2.0, "consolidado": False, "escala": "UNIDADE", "banco": False,
+    },
+    "33.333.333/0001-33": {
+        "nome": "BANCO GAMA S.A.", "cd_cvm": 1003, "setor": "Bancos",
+        "fator": 5.0, "consolidado": True, "escala": "MIL", "banco": True,
+    },
+    "44.444.444/0001-44": {
+        "nome": "EMPRESA DELTA S.A.", "cd_cvm": 1004, "setor": "Comércio (Atacado e Varejo)",
+        "fator": 3.0, "consolidado": True, "escala": "MIL", "banco": False,
+    },
+}
+ALFA, BETA, GAMA, DELTA = EMPRESAS
+
+# Crescimento de cada ano sobre as demonstrações de referência
+ANOS = {2022: 1.0, 2023: 1.1}
+
+# Reapresentações do DFP 2023 da DELTA: versão → fator sobre a versão 1
+VERSOES_DELTA = {1: 1.0, 2: 1.25}
+VERSAO_REAPRESENTADA = (3, 1.5)
+
+# Trimestres do ITR: (data de referência, meses acumulados no ano)
+TRIMESTRES_ITR = (("2023-03-31", 3), ("2023-06-30", 6))
+EMPRESAS_ITR = (ALFA, DELTA)
+
+COLUNAS_BALANCO = (
+    "CNPJ_CIA", "DT_REFER", "VERSAO", "DENOM_CIA", "CD_CVM", "GRUPO_DFP", "MOEDA", "ESCALA_MOEDA",
+    "ORDEM_EXERC", "DT_FIM_EXERC", "CD_CONTA", "DS_CONTA", "VL_CONTA", "ST_CONTA_FIXA",
+)
+COLUNAS_FLUXO = COLUNAS_BALANCO[:9] + ("DT_INI_EXERC",) + COLUNAS_BALANCO[9:]
+
+ARQUIVO_CADASTRO = "cad_cia_aberta.csv"
+
+# Data fixa dos membros do zip: a mesma amostra gera sempre os mesmos bytes
+# (e o mesmo checksum no manifesto da ingestão)
+DATA_MEMBROS = (2024, 1, 1, 0, 0, 0)
+
+
+def versoes(cnpj, ano, reapresentar=False):
+    """Versões do DFP de (companhia, ano) na amostra: versão → fator."""
+    if cnpj != DELTA or ano != 2023:
+        return {1: 1.0}
+    todas = dict(VERSOES_DELTA)
+    if reapresentar:
+        todas[VERSAO_REAPRESENTADA[0]] = VERSAO_REAPRESENTADA[1]
+    return todas
+
+
+def valor_esperado(cnpj, ano, codigo, versao=1, meses=12):
+    """
+    Valor em R$ mil que a ingestão deve produzir para uma conta da amostra
+    (fluxos proporcionais aos meses acumulados no ano).
+    """
+    empresa = EMPRESAS[cnpj]
+    fator = empresa["fator"] * ANOS[ano] * versoes(cnpj, ano, reapresentar=True)[versao]
+    for demonstracao, contas in DEMONSTRACOES.items():
+        for codigo_conta, _, valor in contas:
+            if codigo_conta == codigo:
+                return valor * fator * (meses / 12 if demonstracao in FLUXOS else 1)
+    raise KeyError(codigo)
+
+
+def linhas_demonstracao(demonstracao, cnpj, data, versao, fator, meses):
+    """Linhas de uma demonstração de uma companhia, com o exercício comparativo."""
+    empresa = EMPRESAS[cnpj]
+    multiplicador = 1000 if empresa["escala"] == "UNIDADE" else 1
+    ano, fluxo = int(data[:4]), demonstracao in FLUXOS
+    grupo = "DF Consolidado" if empresa["consolidado"] else "DF Individual"
+    linhas = []
+    # Trimestre isolado (só nos fluxos do ITR a partir do 2º trimestre) e acumulado no ano
+    periodos = [(f"{ano}-01-01", meses)]
+    if fluxo and meses < 12 and meses > 3:
+        periodos.append((f"{ano}-{meses - 2:02d}-01", 3))
+    for ordem, fator_ordem in (("ÚLTIMO", 1.0), ("PENÚLTIMO", 0.5)):
+        for inicio, meses_periodo in periodos:
+            for codigo, descricao, valor in DEMONSTRACOES[demonstracao]:
+                if empresa["banco"] and codigo == "1.01":
+                    descricao = "Caixa e Equivalentes de Caixa"
+                valor = valor * fator * fator_ordem * multiplicador * (meses_periodo / 12 if fluxo else 1)
+                linha = [
+                    cnpj, data, versao, empresa["nome"], empresa["cd_cvm"], f"{grupo} - {demonstracao}",
+                    "REAL", empresa["escala"], ordem,
+                ]
+                if fluxo:
+                    linha.append(inicio)
+                linhas.append(linha + [data, codigo, descricao, f"{valor:.10f}", "S"])
+    return linhas
+
+
+def gravar_zip(caminho, tipo, ano, formularios):
+    """
+    Grava um zip anual com um CSV por demonstração e consolidação.
+
+    `formularios` é uma lista de (cnpj, data, versão, fator, meses).
+    """
+    membros = {}
+    for demonstracao in DEMONSTRACOES:
+        for consolidacao in ("con", "ind"):
+            saida = io.StringIO()
+            escritor = csv.writer(saida, delimiter=";", lineterminator="\n")
+            escritor.writerow(COLUNAS_FLUXO if demonstracao in FLUXOS else COLUNAS_BALANCO)
+            for cnpj, data, versao, fator, meses in formularios:
+                if EMPRESAS[cnpj]["consolidado"] == (consolidacao == "con"):
+                    escritor.writerows(linhas_demonstracao(demonstracao, cnpj, data, versao, fator, meses))
+            membros[f"{tipo}_cia_aberta_{demonstracao}_{consolidacao}_{ano}.csv"] = saida.getvalue()
+
+    membros = {f"{tipo}_cia_aberta_{ano}.csv": "CNPJ_CIA;DT_REFER;VERSAO;DENOM_CIA;CD_CVM\n", **membros}
+    with zipfile.ZipFile(caminho, "w") as zf:
+        for nome, texto in membros.items():
+            zf.writestr(zipfile.ZipInfo(nome, DATA_MEMBROS), texto.encode("latin-1"), zipfile.ZIP_DEFLATED)
+
+
+def gravar_cadastro(caminho):
+    """Cadastro de companhias abertas; a ALFA tem também um registro cancelado."""
+    with open(caminho, "w", encoding="latin-1", newline="") as f:
+        escritor = csv.writer(f, delimiter=";", lineterminator="\n")
+        escritor.writerow(("CNPJ_CIA", "DENOM_SOCIAL", "CD_CVM", "SIT", "SETOR_ATIV"))
+        escritor.writerow((ALFA, EMPRESAS[ALFA]["nome"], EMPRESAS[ALFA]["cd_cvm"], "CANCELADA", "Energia Elétrica"))
+        for cnpj, empresa in EMPRESAS.items():
+            escritor.writerow((cnpj, empresa["nome"], empresa["cd_cvm"], "ATIVO", empresa["setor"]))
+
+
+def gerar_amostra(destino, reapresentar=False):
+    """
+    Grava a amostra em `destino` (criado se preciso) e retorna a lista de
+    arquivos gravados. Com `reapresentar`, o DFP 2023 inclui a versão 3 da
+    DELTA.
+    """
+    os.makedirs(destino, exist_ok=True)
+    gravados = []
+    for ano, fator_ano in ANOS.items():
+        formularios = [
+            (cnpj, f"{ano}-12-31", versao, empresa["fator"] * fator_ano * fator_versao, 12)
+            for cnpj, empresa in EMPRESAS.items()
+            for versao, fator_versao in versoes(cnpj, ano, reapresentar).items()
+        ]
+        caminho = os.path.join(destino, f"dfp_cia_aberta_{ano}.zip")
+        gravar_zip(caminho, "dfp", ano, formularios)
+        gravados.append(caminho)
+
+    formularios = [
+        (cnpj, data, 1, EMPRESAS[cnpj]["fator"] * ANOS[2023], meses)
+        for cnpj in EMPRESAS_ITR for data, meses in TRIMESTRES_ITR
+    ]
+    caminho = os.path.join(destino, "itr_cia_aberta_2023.zip")
+    gravar_zip(caminho, "itr", 2023, formularios)
+    gravados.append(caminho)
+
+    caminho = os.path.join(destino, ARQUIVO_CADASTRO)
+    gravar_cadastro(caminho)
+    gravados.append(caminho)
+    return gravados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Amostra sintética dos dados abertos DFP/ITR da CVM")
+    parser.add_argument("--destino", required=True, help="diretório onde gravar os arquivos")
+    parser.add_argument("--reapresentar", action="store_true",
+                        help="inclui a versão 3 do DFP 2023 da EMPRESA DELTA")
+    args = parser.parse_args(argv)
+
+    for caminho in gerar_amostra(args.destino, args.reapresentar):
+        print(f"→ {caminho}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
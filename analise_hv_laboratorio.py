@@ -0,0 +1,347 @@
+"""
+Motor de Análise Horizontal e Vertical
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Análise vertical (AV) e horizontal (AH) de um plano de contas em árvore,
+de qualquer profundidade, em N períodos:
+- Árvore de contas por vetor de pais (-1 = conta raiz), montada a partir
+  de dicionários aninhados (como as bases dos módulos) ou de códigos
+  hierárquicos ("1", "1.01", "1.01.02", ...)
+- Subtotais consolidados a partir das folhas, nível a nível, com somas
+  vetorizadas sobre o array contas × períodos (um passo por nível da
+  árvore, não por conta)
+- AV: participação de cada conta no total da sua raiz, no subtotal
+  imediatamente acima ou em qualquer conta-base (ex.: Receita Líquida)
+- AH: número-índice sobre o período-base, variação contra o período
+  anterior (ou contra `defasagem` períodos atrás, ex.: 4 trimestres) e
+  CAGR entre o primeiro e o último período
+
+Percentuais em %, como no motor de indicadores. Divisão por zero (ou
+base ausente) dá NaN; o CAGR só existe com o primeiro e o último valor
+positivos (NaN nos demais casos, inclusive com os dois negativos).
+"""
+
+import numpy as np
+import pandas as pd
+
+from perfil_laboratorio import instrumentar
+
+
+def razao(numerador, denominador):
+    """numerador / denominador, NaN onde o denominador é zero ou ausente."""
+    numerador, denominador = np.broadcast_arrays(
+        np.asarray(numerador, dtype=np.float64), np.asarray(denominador, dtype=np.float64)
+    )
+    resultado = np.full(numerador.shape, np.nan)
+    np.divide(numerador, denominador, out=resultado, where=(denominador != 0) & ~np.isnan(denominador))
+    return resultado
+
+
+# =============================================================================
+# 1. ÁRVORE DE CONTAS
+# =============================================================================
+class ArvoreContas:
+    """
+    Plano de contas hierárquico.
+
+    `contas` são identificadores únicos e `pais`, a posição da conta-mãe de
+    cada uma (-1 nas raízes). `rotulos` são os nomes exibidos (padrão: o
+    próprio identificador). A ordem de exibição é a pré-ordem (subtotal
+    antes das contas que o compõem), com os filhos na ordem de entrada.
+    """
+
+    def __init__(self, contas, pais, rotulos=None):
+        self.contas = tuple(contas)
+        self.pais = np.asarray(pais, dtype=np.int64)
+        n = len(self.contas)
+        if self.pais.shape != (n,):
+            raise ValueError(f"Esperado um pai por conta ({n}); recebidos {self.pais.shape}")
+        if len(set(self.contas)) != n:
+            raise ValueError("Contas repetidas no plano")
+        if ((self.pais < -1) | (self.pais >= n)).any():
+            raise ValueError("Pai fora do plano de contas")
+        self.rotulos = tuple(rotulos) if rotulos is not None else tuple(str(conta) for conta in self.contas)
+        self._posicao = {conta: i for i, conta in enumerate(self.contas)}
+
+        # Nível e raiz de cada conta subindo todas juntas, um nível por passo
+        self.nivel = np.zeros(n, dtype=np.int64)
+        self.raiz = np.arange(n)
+        for _ in range(n + 1):
+            acima = self.pais[self.raiz]
+            subiu = acima >= 0
+            if not subiu.any():
+                break
+            self.nivel += subiu
+            self.raiz = np.where(subiu, acima, self.raiz)
+        else:
+            raise ValueError("O plano de contas tem um ciclo")
+
+        self.folha = np.bincount(self.pais[self.pais >= 0], minlength=n) == 0
+        self.profundidade = int(self.nivel.max()) + 1 if n else 0
+        self.niveis = [np.flatnonzero(self.nivel == k) for k in range(self.profundidade)]
+        # Pai de cada conta, com as raízes apontando para si mesmas
+        self.pai_ou_raiz = np.where(self.pais >= 0, self.pais, np.arange(n))
+
+        filhos = [[] for _ in range(n)]
+        for i, pai in enumerate(self.pais.tolist()):
+            if pai >= 0:
+                filhos[pai].append(i)
+        self._filhos = filhos
+        pre, pos = [], []
+        pilha = [(i, False) for i in reversed(np.flatnonzero(self.pais < 0).tolist())]
+        while pilha:
+            i, visitado = pilha.pop()
+            if visitado:
+                pos.append(i)
+                continue
+            pre.append(i)
+            pilha.append((i, True))
+            pilha.extend((filho, False) for filho in reversed(filhos[i]))
+        self.preordem = np.array(pre, dtype=np.int64)
+        self.posordem = np.array(pos, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.contas)
+
+    def posicao(self, conta):
+        """Posição de uma conta pelo identificador."""
+        try:
+            return self._posicao[conta]
+        except KeyError:
+            raise ValueError(f"Conta fora do plano: {conta!r}") from None
+
+    def filhos(self, i):
+        """Posições das contas que compõem o subtotal `i`, na ordem de entrada."""
+        return np.array(self._filhos[i], dtype=np.int64)
+
+    @classmethod
+    def de_estrutura(cls, estrutura):
+        """
+        Árvore a partir de dicionários aninhados: chaves com dicionário são
+        subtotais e as demais, folhas. O identificador de cada conta é o
+        caminho (tupla de chaves) e o rótulo, a última chave.
+        """
+        contas, pais, rotulos = [], [], []
+
+        def visitar(nivel, caminho, pai):
+            for nome, valor in nivel.items():
+                contas.append(caminho + (nome,))
+                pais.append(pai)
+                rotulos.append(nome)
+                if hasattr(valor, "items"):
+                    visitar(valor, caminho + (nome,), len(contas) - 1)
+
+        visitar(estrutura, (), -1)
+        return cls(contas, pais, rotulos)
+
+    @classmethod
+    def de_codigos(cls, codigos, rotulos=None):
+        """Árvore de códigos hierárquicos: o pai é o maior prefixo presente ("1.01.02" → "1.01")."""
+        codigos = list(codigos)
+        indice = {codigo: i for i, codigo in enumerate(codigos)}
+        pais = []
+        for codigo in codigos:
+            partes = codigo.split(".")
+            prefixos = (".".join(partes[:k]) for k in range(len(partes) - 1, 0, -1))
+            pais.append(next((indice[prefixo] for prefixo in prefixos if prefixo in indice), -1))
+        return cls(codigos, pais, rotulos)
+
+    def folhas_de_registros(self, registros):
+        """
+        Array contas × períodos com os valores das folhas de cada registro
+        (dicionários aninhados no formato de `de_estrutura`); subtotais e
+        contas ausentes ficam NaN.
+        """
+        folhas = np.full((len(self), len(registros)), np.nan)
+        for j, registro in enumerate(registros):
+            for i in np.flatnonzero(self.folha):
+                valor = registro
+                for chave in self.contas[i]:
+                    valor = valor.get(chave) if hasattr(valor, "get") else None
+                    if valor is None:
+                        break
+                if valor is not None:
+                    folhas[i, j] = valor
+        return folhas
+
+    def valores_por_rotulo(self, registros):
+        """
+        Array contas × períodos de registros planos {rótulo: valor} (ex.: uma
+        DRE com os subtotais intercalados); contas ausentes ficam NaN.
+        """
+        return np.array(
+            [[registro.get(rotulo, np.nan) for registro in registros] for rotulo in self.rotulos],
+            dtype=np.float64,
+        ).reshape(len(self), len(registros))
+
+
+def consolidar(arvore, folhas):
+    """
+    Valores de todas as contas (contas × períodos) a partir das folhas.
+
+    Os subtotais são somados do nível mais profundo para as raízes, um
+    passo vetorizado por nível. Um subtotal é NaN só se nenhuma conta que
+    o compõe for conhecida.
+    """
+    folhas = np.asarray(folhas, dtype=np.float64)
+    conhecidas = arvore.folha[:, np.newaxis] & ~np.isnan(folhas)
+    valores = np.where(conhecidas, folhas, 0.0)
+    for nivel in reversed(arvore.niveis[1:]):
+        np.add.at(valores, arvore.pais[nivel], valores[nivel])
+        np.logical_or.at(conhecidas, arvore.pais[nivel], conhecidas[nivel])
+    valores[~conhecidas] = np.nan
+    return valores
+
+
+def divergencias_subtotais(arvore, valores, informados):
+    """
+    Diferença entre os subtotais informados pela fonte e os consolidados
+    (contas × períodos; NaN nas folhas e onde a fonte não informa o subtotal).
+    """
+    diferenca = np.asarray(informados, dtype=np.float64) - valores
+    diferenca[arvore.folha] = np.nan
+    return diferenca
+
+
+# =============================================================================
+# 2. ANÁLISE VERTICAL E HORIZONTAL
+# =============================================================================
+class AnaliseHV:
+    """
+    AV e AH de todas as contas em todos os períodos (arrays contas × períodos).
+
+    - `av_total`: % do total da raiz (ex.: Ativo Total)
+    - `av_subtotal`: % do subtotal imediatamente acima (100 nas raízes)
+    - `indice`: número-índice, período-base = 100
+    - `ah`: variação % contra `defasagem` períodos antes (NaN nos primeiros)
+    - `variacao_absoluta`: diferença contra o mesmo período de comparação
+    - `cagr`: taxa composta anual (%) entre o primeiro e o último período
+    """
+
+    def __init__(self, arvore, periodos, valores, av_total, av_subtotal, indice, ah,
+                 variacao_absoluta, cagr, defasagem, periodo_base):
+        self.arvore = arvore
+        self.periodos = list(periodos)
+        self.valores = valores
+        self.av_total = av_total
+        self.av_subtotal = av_subtotal
+        self.indice = indice
+        self.ah = ah
+        self.variacao_absoluta = variacao_absoluta
+        self.cagr = cagr
+        self.defasagem = defasagem
+        self.periodo_base = periodo_base
+
+    def av(self, base):
+        """% de uma conta-base em todos os períodos (ex.: DRE sobre a Receita Líquida)."""
+        return 100 * razao(self.valores, self.valores[self.arvore.posicao(base)])
+
+    def valor(self, conta, periodo):
+        """Valor consolidado de uma conta num período."""
+        return float(self.valores[self.arvore.posicao(conta), self.periodos.index(periodo)])
+
+    def tabela(self, linhas=None, vertical="total", rotulos=None):
+        """
+        DataFrame numérico de exibição: a conta e, por período, o valor, a
+        AV e a AH. `linhas` são as posições das contas (padrão: pré-ordem,
+        com o rótulo recuado pelo nível); `vertical` é "total", "subtotal"
+        ou uma conta-base.
+        """
+        arvore = self.arvore
+        linhas = arvore.preordem if linhas is None else np.asarray(linhas, dtype=np.int64)
+        if rotulos is None:
+            rotulos = ["  " * arvore.nivel[i] + arvore.rotulos[i] for i in linhas.tolist()]
+        if vertical == "total":
+            av = self.av_total
+        elif vertical == "subtotal":
+            av = self.av_subtotal
+        else:
+            av = self.av(vertical)
+        tabela = {"Conta": list(rotulos)}
+        for j, periodo in enumerate(self.periodos):
+            tabela[str(periodo)] = self.valores[linhas, j]
+            tabela[f"AV {periodo}"] = av[linhas, j]
+            if j >= self.defasagem:
+                tabela[f"AH {periodo}"] = self.ah[linhas, j]
+        return pd.DataFrame(tabela)
+
+
+@instrumentar("calculo")
+def analisar(arvore, folhas, periodos, defasagem=1, periodos_por_ano=1, periodo_base=0):
+    """
+    Consolida os subtotais e calcula AV e AH num único passe.
+
+    `folhas` é contas × períodos (valores das folhas; as linhas de subtotal
+    são ignoradas). `defasagem` é quantos períodos atrás a AH compara
+    (4 = mesmo trimestre do ano anterior) e `periodos_por_ano` converte o
+    intervalo entre o primeiro e o último período em anos para o CAGR.
+    """
+    folhas = np.asarray(folhas, dtype=np.float64)
+    periodos = list(periodos)
+    if folhas.shape != (len(arvore), len(periodos)):
+        raise ValueError(
+            f"Valores com formato {folhas.shape}; esperado {len(arvore)} contas × {len(periodos)} períodos"
+        )
+    if not 1 <= defasagem:
+        raise ValueError("A defasagem da análise horizontal deve ser de ao menos 1 período")
+    if not 0 <= periodo_base < len(periodos):
+        raise ValueError(f"Período-base fora do intervalo: {periodo_base}")
+
+    valores = consolidar(arvore, folhas)
+    av_total = 100 * razao(valores, valores[arvore.raiz])
+    av_subtotal = 100 * razao(valores, valores[arvore.pai_ou_raiz])
+    indice = 100 * razao(valores, valores[:, [periodo_base]])
+
+    ah = np.full(valores.shape, np.nan)
+    variacao_absoluta = np.full(valores.shape, np.nan)
+    ah[:, defasagem:] = 100 * (razao(valores[:, defasagem:], valores[:, :-defasagem]) - 1)
+    variacao_absoluta[:, defasagem:] = valores[:, defasagem:] - valores[:, :-defasagem]
+
+    cagr = np.full(len(arvore), np.nan)
+    if len(periodos) > 1:
+        crescimento = razao(valores[:, -1], valores[:, 0])
+        positivo = (valores[:, 0] > 0) & (valores[:, -1] > 0)
+        anos = (len(periodos) - 1) / periodos_por_ano
+        cagr[positivo] = 100 * (crescimento[positivo] ** (1 / anos) - 1)
+
+    return AnaliseHV(arvore, periodos, valores, av_total, av_subtotal, indice, ah,
+                     variacao_absoluta, cagr, defasagem, periodo_base)
+
+
+# =============================================================================
+# 3. PLANO DE CONTAS SINTÉTICO
+# =============================================================================
+def plano_exemplo(n_contas=2000, n_periodos=20, profundidade=6, semente=0):
+    """
+    Plano de contas sintético com códigos hierárquicos ("1", "1.03",
+    "1.03.02", ...) e valores trimestrais das folhas com tendência e
+    sazonalidade — para exercitar o motor num plano do tamanho real.
+
+    Retorna (árvore, folhas contas × períodos, rótulos dos trimestres).
+    """
+    rng = np.random.default_rng(semente)
+    codigos = ["1", "2"]
+    nivel = [0, 0]
+    quantidade_filhos = [0, 0]
+    abertas = [0, 1]  # contas que ainda podem receber filhos
+    while len(codigos) < n_contas:
+        # Favorece as contas mais recentes para que a árvore ganhe profundidade
+        recuo = min(int(rng.exponential(len(abertas) / 8)), len(abertas) - 1)
+        pai = abertas[-1 - recuo]
+        quantidade_filhos[pai] += 1
+        codigos.append(f"{codigos[pai]}.{quantidade_filhos[pai]:02d}")
+        nivel.append(nivel[pai] + 1)
+        quantidade_filhos.append(0)
+        if nivel[-1] < profundidade - 1:
+            abertas.append(len(codigos) - 1)
+
+    arvore = ArvoreContas.de_codigos(codigos, [f"Conta {codigo}" for codigo in codigos])
+    trimestres = np.arange(n_periodos)
+    base = rng.lognormal(mean=11, sigma=1.5, size=(len(codigos), 1))
+    tendencia = (1 + rng.normal(0.02, 0.03, size=(len(codigos), 1))) ** trimestres
+    sazonalidade = 1 + rng.uniform(0, 0.15, size=(len(codigos), 1)) * np.sin(np.pi / 2 * trimestres)
+    ruido = rng.normal(1, 0.05, size=(len(codigos), n_periodos))
+    folhas = np.where(arvore.folha[:, np.newaxis], np.round(base * tendencia * sazonalidade * ruido), np.nan)
+    ano_inicial = 2020
+    periodos = [f"{t % 4 + 1}T{(ano_inicial + t // 4) % 100:02d}" for t in trimestres.tolist()]
+    return arvore, folhas, periodos
@@ -0,0 +1,367 @@
+"""
+Benchmark Headless do Laboratório
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Renderiza cada módulo do hub N vezes, sem navegador, via AppTest:
+- Latência "a frio" (caches do Streamlit limpos) e "a quente" (reruns)
+- Alocações (tracemalloc: pico e memória retida) e pico de RSS do processo;
+  as alocações são medidas numa sessão que renderiza só o módulo, sem o hub
+- Estados representativos: cada aba de cada módulo, a volta a cada aba
+  depois de abrir outra (ida e volta) e entradas alteradas dos simuladores
+  numéricos
+- Um estado falha se o rerun levantar exceção ou exibir um st.error de
+  falha (o hub converte exceções dos módulos em "❌ Erro ao carregar módulo")
+- Resultados salvos em JSON para servir de baseline entre versões
+
+Uso:
+    python benchmark_laboratorio.py --repeticoes 5 --saida baseline.json
+    python benchmark_laboratorio.py --comparar baseline.json
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Sem o aquecimento em segundo plano, a medição "a frio" de um módulo não
+# concorre com a compilação dos demais
+os.environ.setdefault("LAB_AQUECIMENTO", "0")
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+HUB = os.path.join(DIRETORIO, "financial_analysis_lab.py")
+
+# Tempo máximo de um rerun no AppTest (segundos)
+TIMEOUT_RERUN = 60
+
+# Métricas comparadas com a baseline (maior = pior)
+METRICAS_COMPARADAS = ("frio_ms", "quente_p50_ms", "quente_p95_ms", "alocacao_quente_kb")
+
+# Métricas resumidas por módulo (pior caso entre os estados)
+METRICAS_RESUMO = METRICAS_COMPARADAS + ("alocacao_frio_kb", "retido_frio_kb", "retido_quente_kb")
+
+# Mensagens de st.error que indicam falha: a exceção de um módulo capturada
+# pelo hub e os erros de cálculo dos módulos. Os demais st.error fazem parte
+# do conteúdo das aulas (diagnósticos, respostas incorretas etc.)
+MARCAS_FALHA = ("Erro ao carregar módulo", "Não foi possível")
+
+# Entradas alteradas dos simuladores numéricos: (aba, {chave: valor})
+ESTADOS_WIDGETS = {
+    "modulo3": [
+        ("📊 Estudo de Caso: Depreciação", {"vida_util": 10, "valor_ativo": 900000}),
+    ],
+    "modulo8": [
+        ("📊 Índices de Liquidez", {"liq_caixa": 5000, "liq_emp_cp": 300000}),
+        ("🔄 Ciclo Financeiro", {"cf_est": 1500000, "cf_rec": 2400000}),
+    ],
+    "modulo9": [
+        ("📊 Cálculo de Alavancagem", {"div_b": 95, "juros_b": 28.0, "roa_sim": 6.0}),
+    ],
+    "modulo10": [
+        ("📊 Exercícios Numéricos", {"dp_ll": -200000, "dp_pl": 300000}),
+    ],
+}
+
+
+# =============================================================================
+# 1. DESCOBERTA DOS MÓDULOS E ESTADOS
+# =============================================================================
+def ler_modulos():
+    """Lê o dicionário MODULOS do hub sem executá-lo."""
+    with open(HUB, encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    for no in arvore.body:
+        if isinstance(no, ast.Assign) and any(
+            isinstance(alvo, ast.Name) and alvo.id == "MODULOS" for alvo in no.targets
+        ):
+            return ast.literal_eval(no.value)
+    raise RuntimeError("MODULOS não encontrado no hub")
+
+
+def ler_abas(arquivo):
+    """Retorna (chave, rótulos) da chamada `renderizar_abas` do módulo, se houver."""
+    path = os.path.join(DIRETORIO, f"{arquivo}.py")
+    if not os.path.exists(path):
+        return None, []
+    with open(path, encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    for no in ast.walk(arvore):
+        if (
+            isinstance(no, ast.Call)
+            and isinstance(no.func, ast.Name)
+            and no.func.id == "renderizar_abas"
+        ):
+            chave = ast.literal_eval(no.args[0])
+            rotulos = [ast.literal_eval(item.elts[0]) for item in no.args[1].elts]
+            return chave, rotulos
+    return None, []
+
+
+def estados_representativos(modulo_key, info):
+    """
+    Lista de (nome do estado, session_state medido, trajeto) para um módulo.
+
+    O trajeto é a sequência de session_states (um rerun cada) pela qual a
+    sessão passa antes do rerun medido; na ida e volta, a sessão abre a
+    aba, abre a seguinte e o rerun medido é a volta à primeira.
+    """
+    base = {"modulo_selecionado": info["nome"]}
+    chave, rotulos = ler_abas(info["arquivo"])
+    if chave is None:
+        return [("padrao", base, ())]
+
+    estados = [(f"aba: {rotulo}", {**base, chave: rotulo}, ()) for rotulo in rotulos]
+    for i, rotulo in enumerate(rotulos if len(rotulos) > 1 else ()):
+        outra = rotulos[(i + 1) % len(rotulos)]
+        estados.append((
+            f"ida e volta: {rotulo} → {outra} → {rotulo}",
+            {**base, chave: rotulo},
+            ({**base, chave: rotulo}, {**base, chave: outra}),
+        ))
+    for rotulo, valores in ESTADOS_WIDGETS.get(modulo_key, []):
+        if rotulo not in rotulos:
+            raise ValueError(f"{modulo_key}: aba inexistente '{rotulo}'")
+        nome = ", ".join(f"{k}={v}" for k, v in valores.items())
+        estados.append((f"entradas: {nome}", {**base, chave: rotulo, **valores}, ()))
+    return estados
+
+
+# =============================================================================
+# 2. MEDIÇÃO
+# =============================================================================
+def rss_pico_mb():
+    """Pico de RSS do processo em MB (None se indisponível na plataforma)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é reportado em bytes no macOS e em KB no Linux
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+
+def limpar_caches():
+    """Zera os caches do Streamlit (módulos compilados, fixtures e figuras)."""
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def renderizar_modulo(diretorio, arquivo):
+    """Script do AppTest que renderiza só um módulo, sem o hub."""
+    import importlib
+    import sys
+    sys.path.insert(0, diretorio)
+    importlib.import_module(arquivo).run()
+
+
+def nova_sessao(estado, trajeto=(), arquivo=None):
+    """
+    Cria uma sessão do AppTest (do hub ou, com `arquivo`, só do módulo), a
+    passa pelos session_states do `trajeto` e deixa o `estado` informado
+    para o próximo rerun.
+    """
+    if arquivo is None:
+        at = AppTest.from_file(HUB, default_timeout=TIMEOUT_RERUN)
+    else:
+        at = AppTest.from_function(
+            renderizar_modulo, args=(DIRETORIO, arquivo), default_timeout=TIMEOUT_RERUN
+        )
+    for passo in trajeto:
+        for chave, valor in passo.items():
+            at.session_state[chave] = valor
+        rerun(at)
+    for chave, valor in estado.items():
+        at.session_state[chave] = valor
+    return at
+
+
+def rerun(at, rastrear_memoria=False):
+    """
+    Executa um rerun e retorna (ms, memória), onde memória é a tupla
+    (KB retidos ao final, KB no pico) medida pelo tracemalloc, ou None.
+    """
+    if rastrear_memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        at.run()
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        memoria = None
+        if rastrear_memoria:
+            retido, pico = tracemalloc.get_traced_memory()
+            memoria = (retido / 1024, pico / 1024)
+            tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    erros = [erro.value for erro in at.error if any(marca in erro.value for marca in MARCAS_FALHA)]
+    if erros:
+        raise RuntimeError(erros[0])
+    return ms, memoria
+
+
+def medir_estado(estado, repeticoes, arquivo, trajeto=()):
+    """Mede um estado: rerun a frio, `repeticoes` reruns a quente e alocações."""
+    at = nova_sessao(estado, trajeto)
+    limpar_caches()
+    frio_ms, _ = rerun(at)
+    quentes = [rerun(at)[0] for _ in range(repeticoes)]
+
+    return {
+        "frio_ms": frio_ms,
+        "quente_p50_ms": float(np.percentile(quentes, 50)),
+        "quente_p95_ms": float(np.percentile(quentes, 95)),
+        "quente_media_ms": statistics.fmean(quentes),
+        **medir_alocacoes(estado, arquivo, trajeto),
+    }
+
+
+def medir_alocacoes(estado, arquivo, trajeto=()):
+    """
+    Alocações (KB no pico e retidos) do rerun a frio e de um rerun a quente,
+    numa sessão que renderiza só o módulo: no hub, o pico é o da análise
+    do script do próprio hub, igual para todos os módulos. As páginas
+    internas do hub (sem arquivo de módulo) ficam sem medição.
+    """
+    if not os.path.exists(os.path.join(DIRETORIO, f"{arquivo}.py")):
+        return dict.fromkeys(("alocacao_frio_kb", "alocacao_quente_kb", "retido_frio_kb", "retido_quente_kb"))
+
+    at = nova_sessao(estado, trajeto, arquivo)
+    limpar_caches()
+    _, (retido_frio_kb, alocacao_frio_kb) = rerun(at, rastrear_memoria=True)
+    rerun(at)
+    _, (retido_quente_kb, alocacao_quente_kb) = rerun(at, rastrear_memoria=True)
+    return {
+        "alocacao_frio_kb": alocacao_frio_kb,
+        "alocacao_quente_kb": alocacao_quente_kb,
+        "retido_frio_kb": retido_frio_kb,
+        "retido_quente_kb": retido_quente_kb,
+    }
+
+
+def medir_modulo(modulo_key, info, repeticoes):
+    """Mede todos os estados representativos de um módulo."""
+    estados = {
+        nome: medir_estado(estado, repeticoes, info["arquivo"], trajeto)
+        for nome, estado, trajeto in estados_representativos(modulo_key, info)
+    }
+    resumo = {
+        metrica: max((valores[metrica] for valores in estados.values() if valores[metrica] is not None), default=None)
+        for metrica in METRICAS_RESUMO
+    }
+    resumo["rss_pico_mb"] = rss_pico_mb()
+    resumo["estados"] = estados
+    return resumo
+
+
+def executar_benchmark(repeticoes, selecao=None):
+    """Mede os módulos selecionados (todos, por padrão) e monta o relatório."""
+    modulos = ler_modulos()
+    if selecao:
+        desconhecidos = set(selecao) - set(modulos)
+        if desconhecidos:
+            raise ValueError(f"Módulos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        modulos = {k: v for k, v in modulos.items() if k in selecao}
+
+    resultados = {}
+    for modulo_key, info in modulos.items():
+        print(f"→ {modulo_key}: {info['nome']}", file=sys.stderr, flush=True)
+        resultados[modulo_key] = medir_modulo(modulo_key, info, repeticoes)
+
+    return {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "plataforma": platform.platform(),
+        },
+        "repeticoes": repeticoes,
+        "modulos": resultados,
+    }
+
+
+# =============================================================================
+# 3. RELATÓRIO E COMPARAÇÃO
+# =============================================================================
+def formatar(valor, casas=1):
+    """Formata um número para a tabela (— quando ausente)."""
+    return "—" if valor is None else f"{valor:,.{casas}f}"
+
+
+def imprimir_relatorio(relatorio):
+    """Imprime a tabela resumo por módulo."""
+    cabecalho = f"{'Módulo':<10} {'Frio (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'Aloc. (KB)':>11} {'Retido (KB)':>12} {'RSS (MB)':>9}"
+    print(cabecalho)
+    print("-" * len(cabecalho))
+    for modulo_key, r in relatorio["modulos"].items():
+        print(
+            f"{modulo_key:<10} {formatar(r['frio_ms']):>10} {formatar(r['quente_p50_ms']):>10} "
+            f"{formatar(r['quente_p95_ms']):>10} {formatar(r['alocacao_quente_kb'], 0):>11} "
+            f"{formatar(r['retido_quente_kb'], 0):>12} "
+            f"{formatar(r['rss_pico_mb']):>9}"
+        )
+
+
+def comparar(relatorio, baseline, tolerancia):
+    """
+    Compara o relatório com uma baseline.
+
+    Retorna a lista de regressões (módulo, métrica, antes, depois) em que a
+    métrica piorou mais que `tolerancia` (fração, ex.: 0.25 = 25%).
+    """
+    regressoes = []
+    for modulo_key, atual in relatorio["modulos"].items():
+        anterior = baseline.get("modulos", {}).get(modulo_key)
+        if anterior is None:
+            continue
+        for metrica in METRICAS_COMPARADAS:
+            antes, depois = anterior.get(metrica), atual.get(metrica)
+            if antes and depois is not None and depois > antes * (1 + tolerancia):
+                regressoes.append((modulo_key, metrica, antes, depois))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless dos módulos do laboratório")
+    parser.add_argument("--repeticoes", type=int, default=5, help="reruns a quente por estado")
+    parser.add_argument("--modulos", nargs="*", help="chaves de MODULOS (padrão: todos)")
+    parser.add_argument("--saida", help="salva o resultado em JSON (nova baseline)")
+    parser.add_argument("--comparar", help="baseline JSON para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora tolerada (fração)")
+    args = parser.parse_args(argv)
+
+    relatorio = executar_benchmark(args.repeticoes, args.modulos)
+    imprimir_relatorio(relatorio)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"\nResultado salvo em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressoes = comparar(relatorio, baseline, args.tolerancia)
+        if regressoes:
+            print(f"\n⚠️ {len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}:")
+            for modulo_key, metrica, antes, depois in regressoes:
+                print(f"  {modulo_key} {metrica}: {antes:,.1f} → {depois:,.1f}")
+            return 1
+        print(f"\n✅ Sem regressões acima de {args.tolerancia:.0%} em relação à baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
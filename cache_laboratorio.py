@@ -0,0 +1,149 @@
+"""
+Cache Compartilhado do Laboratório
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Utilitários de cache usados pelos módulos de aula:
+- Fixtures estáticas imutáveis, construídas uma única vez por processo
+  e compartilhadas (sem cópias) entre todas as sessões
+- Figuras Plotly memorizadas por (módulo, gráfico, hash das entradas)
+- Cálculos pesados memorizados pelo hash do conteúdo das entradas (arrays
+  NumPy byte a byte)
+- Universo de empresas da CVM mapeado em memória, aberto uma vez por processo
+"""
+
+import functools
+import hashlib
+import os
+from types import MappingProxyType
+
+import numpy as np
+import streamlit as st
+
+from cvm_laboratorio import DIRETORIO_UNIVERSO, UniversoEmpresas
+from perfil_laboratorio import medir
+
+# Armazém da ingestão CVM (cvm_laboratorio.py) com o universo de empresas;
+# sem ele, os módulos mostram apenas os casos de aula
+VARIAVEL_ARMAZEM = "LAB_ARMAZEM_CVM"
+
+
+def congelar(objeto):
+    """
+    Converte recursivamente uma estrutura de dados em uma versão somente leitura.
+    
+    Dicionários viram `MappingProxyType`, listas viram tuplas e arrays NumPy
+    passam a ser somente leitura; valores escalares são mantidos. O
+    resultado pode ser compartilhado com segurança entre sessões, pois
+    nenhuma sessão consegue alterá-lo.
+    """
+    if isinstance(objeto, np.ndarray):
+        objeto.setflags(write=False)
+        return objeto
+    if isinstance(objeto, dict):
+        return MappingProxyType({chave: congelar(valor) for chave, valor in objeto.items()})
+    if isinstance(objeto, (list, tuple)):
+        return tuple(congelar(valor) for valor in objeto)
+    return objeto
+
+
+def fixture_compartilhada(funcao):
+    """
+    Decorador para as funções `get_*` que constroem os dados fixos de cada aula.
+    
+    A fixture é construída na primeira chamada do processo, congelada e
+    mantida no cache de recursos do Streamlit; as chamadas seguintes (de
+    qualquer sessão) recebem o mesmo objeto somente leitura.
+    """
+    @st.cache_resource(show_spinner=False)
+    @functools.wraps(funcao)
+    def fixture():
+        with medir(f"{funcao.__module__}.{funcao.__name__}", "fixture"):
+            return congelar(funcao())
+    
+    return fixture
+
+
+def figura_em_cache(modulo, grafico, construtor, *entradas):
+    """
+    Retorna a figura Plotly de um gráfico, construindo-a apenas uma vez por processo.
+    
+    A chave do cache é (módulo, identificador do gráfico, hash das entradas);
+    gráficos de dados fixos são chamados sem entradas e ocupam uma única
+    posição, enquanto gráficos que dependem de widgets ocupam uma posição por
+    combinação de parâmetros, com descarte LRU acima de `max_entries`.
+    
+    A figura devolvida é compartilhada entre sessões e não deve ser alterada
+    (ex.: `update_layout`) depois de obtida.
+    """
+    return construir_figura(modulo, grafico, entradas, construtor)
+
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def construir_figura(modulo, grafico, entradas, _construtor):
+    """Executa o construtor da figura (o argumento `_construtor` não entra no hash)."""
+    return _construtor(*entradas)
+
+
+def hash_entradas(entradas):
+    """
+    SHA-1 do conteúdo das entradas: arrays NumPy pelo tipo, formato e bytes
+    (o hash do Streamlit só amostra arrays grandes); demais valores pelo repr.
+    """
+    soma = hashlib.sha1()
+    for entrada in entradas:
+        if isinstance(entrada, np.ndarray):
+            if entrada.dtype == object:
+                entrada = entrada.astype(str)
+            soma.update(f"{entrada.dtype}{entrada.shape}".encode())
+            soma.update(np.ascontiguousarray(entrada).tobytes())
+        else:
+            soma.update(repr(entrada).encode())
+        soma.update(b"|")
+    return soma.hexdigest()
+
+
+def calculo_em_cache(modulo, calculo, funcao, *entradas):
+    """
+    Retorna `funcao(*entradas)`, calculado uma única vez por processo para
+    cada conteúdo das entradas.
+    
+    A chave é (módulo, identificador do cálculo, hash do conteúdo das
+    entradas), então widgets que voltam a valores já vistos não recalculam.
+    O resultado é congelado e compartilhado entre sessões.
+    """
+    return executar_calculo(modulo, calculo, hash_entradas(entradas), funcao, entradas)
+
+
+@st.cache_resource(show_spinner=False, max_entries=128)
+def executar_calculo(modulo, calculo, assinatura, _funcao, _entradas):
+    """Executa o cálculo (só a `assinatura` das entradas entra na chave)."""
+    with medir(f"{modulo}.{calculo}", "calculo"):
+        return congelar(_funcao(*_entradas))
+
+
+def universo_compartilhado():
+    """
+    Retorna o universo de empresas do armazém indicado em LAB_ARMAZEM_CVM
+    (ou None, se a variável não estiver definida ou o universo não existir).
+    
+    Os arrays são mapeados em memória uma única vez por processo e o objeto
+    é compartilhado por todas as sessões; as páginas lidas ficam no cache
+    do sistema operacional. A assinatura de universo.json (mtime + tamanho)
+    faz parte da chave, então uma nova ingestão é vista sem reiniciar o app.
+    """
+    diretorio = os.environ.get(VARIAVEL_ARMAZEM)
+    if not diretorio:
+        return None
+    caminho = os.path.join(diretorio, DIRETORIO_UNIVERSO)
+    try:
+        estado = os.stat(os.path.join(caminho, "universo.json"))
+    except FileNotFoundError:
+        return None
+    return abrir_universo(caminho, (estado.st_mtime_ns, estado.st_size))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def abrir_universo(caminho, assinatura):
+    """Mapeia os arrays do universo (a `assinatura` só diferencia versões)."""
+    with medir("cache_laboratorio.abrir_universo", "fixture"):
+        return UniversoEmpresas(caminho)
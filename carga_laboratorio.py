@@ -0,0 +1,426 @@
+"""
+Teste de Carga do Laboratório (Turma Simultânea)
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Simula uma turma inteira abrindo o mesmo módulo ao mesmo tempo:
+- Sobe o hub localmente (`streamlit run`, só em 127.0.0.1, sem rede externa)
+- Cada sessão simulada fala o protocolo do navegador (WebSocket + protobuf):
+  abre o hub, navega até o módulo (define `modulo_selecionado` pelos botões
+  de acesso rápido), troca de aba e altera entradas dos simuladores
+- Relatório: vazão (reruns/s), latência p50/p95/p99 por etapa, CPU e memória
+  do servidor (total e por sessão)
+
+Uso:
+    python carga_laboratorio.py --sessoes 150 --modulo modulo8 --rampa 60
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+from benchmark_laboratorio import HUB, ler_modulos
+
+# Tempo máximo de espera por um rerun (segundos)
+TIMEOUT_RERUN = 120
+
+# Tempo máximo para o hub responder ao health check (segundos)
+TIMEOUT_INICIALIZACAO = 60
+
+# Intervalo de amostragem de CPU/memória do servidor (segundos)
+INTERVALO_AMOSTRAGEM = 0.5
+
+# Elementos cuja entrada a sessão simulada sabe alterar
+WIDGETS_NUMERICOS = ("number_input", "slider")
+
+_FINALIZADO_PARA_RERUN = ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN
+
+
+# =============================================================================
+# 1. SERVIDOR LOCAL
+# =============================================================================
+def porta_livre():
+    """Retorna uma porta TCP livre em 127.0.0.1."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_hub(porta, aquecimento=True):
+    """Sobe o hub com `streamlit run` e espera o health check responder."""
+    env = {**os.environ, "LAB_AQUECIMENTO": "1" if aquecimento else "0"}
+    processo = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", HUB,
+            "--server.headless", "true",
+            "--server.address", "127.0.0.1",
+            "--server.port", str(porta),
+            "--browser.gatherUsageStats", "false",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + TIMEOUT_INICIALIZACAO
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"O hub encerrou na inicialização (código {processo.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{porta}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("O hub não respondeu ao health check a tempo")
+
+
+class MonitorServidor:
+    """
+    Amostra CPU (%) e RSS (MB) de um processo em segundo plano via /proc.
+
+    Fora do Linux as amostras ficam vazias e o relatório mostra "—".
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.amostras = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def ler(self):
+        """Retorna (segundos de CPU, RSS em MB) do processo, ou None."""
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{self.pid}/status") as f:
+                rss_kb = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            return None
+        # utime e stime são os campos 14 e 15 de /proc/<pid>/stat
+        cpu = (int(campos[11]) + int(campos[12])) / self._ticks
+        return cpu, rss_kb / 1024
+
+    def _executar(self):
+        anterior = self.ler()
+        t_anterior = time.monotonic()
+        while anterior is not None and not self._parar.wait(INTERVALO_AMOSTRAGEM):
+            atual, t_atual = self.ler(), time.monotonic()
+            if atual is None:
+                break
+            cpu_pct = 100 * (atual[0] - anterior[0]) / (t_atual - t_anterior)
+            self.amostras.append((cpu_pct, atual[1]))
+            anterior, t_anterior = atual, t_atual
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+
+# =============================================================================
+# 2. SESSÃO SIMULADA
+# =============================================================================
+class SessaoSimulada:
+    """
+    Um aluno: uma conexão WebSocket com o hub, como a do navegador.
+
+    A cada rerun a sessão envia o estado dos widgets montados (como o
+    frontend faz) e lê as mensagens até o `script_finished` final, guardando
+    os widgets da página para as próximas interações.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.ws = None
+        self.widgets = {}
+        self.abas = {}
+        self.estados = {}
+        self.latencias = []
+        self.erros_script = []
+
+    def rerun(self, etapa, gatilhos=(), fragmento=""):
+        """Dispara um rerun e registra (etapa, ms) ao receber o fim do script."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.fragment_id = fragmento
+        msg.rerun_script.widget_states.widgets.extend(self.estados.values())
+        msg.rerun_script.widget_states.widgets.extend(gatilhos)
+
+        inicio = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        widgets, abas, caminhos_abas = {}, {}, {}
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(self.ws.recv(timeout=TIMEOUT_RERUN))
+            tipo = fwd.WhichOneof("type")
+            if tipo == "delta":
+                self._registrar_delta(fwd, widgets, abas, caminhos_abas)
+            elif tipo == "script_finished" and fwd.script_finished != _FINALIZADO_PARA_RERUN:
+                break
+        self.latencias.append((etapa, (time.perf_counter() - inicio) * 1000))
+
+        # Num rerun de fragmento só os widgets do fragmento são reenviados
+        if fragmento:
+            self.widgets.update(widgets)
+        else:
+            self.widgets, self.abas = widgets, abas
+            self.estados = {k: v for k, v in self.estados.items() if k in widgets or k in abas}
+
+    def _registrar_delta(self, fwd, widgets, abas, caminhos_abas):
+        delta = fwd.delta
+        caminho = tuple(fwd.metadata.delta_path)
+        if delta.WhichOneof("type") == "new_element":
+            elemento = delta.new_element
+            tipo = elemento.WhichOneof("type")
+            if tipo == "exception":
+                self.erros_script.append(f"{elemento.exception.type}: {elemento.exception.message}")
+            dados = getattr(elemento, tipo)
+            if getattr(dados, "id", ""):
+                widgets[dados.id] = (tipo, dados, delta.fragment_id)
+        elif delta.WhichOneof("type") == "add_block":
+            bloco = delta.add_block
+            if bloco.WhichOneof("type") == "tab_container" and bloco.id:
+                caminhos_abas[caminho] = bloco.id
+                abas[bloco.id] = []
+            elif bloco.WhichOneof("type") == "tab" and caminho[:-1] in caminhos_abas:
+                abas[caminhos_abas[caminho[:-1]]].append(bloco.tab.label)
+
+    def buscar_widget(self, sufixo):
+        """Id do widget cuja chave (`key=`) termina o id gerado pelo Streamlit."""
+        for widget_id in self.widgets:
+            if widget_id.endswith(f"-{sufixo}"):
+                return widget_id
+        raise LookupError(f"Widget '{sufixo}' não encontrado na página")
+
+    def clicar(self, etapa, widget_id):
+        """Clica num botão."""
+        self.rerun(etapa, [WidgetState(id=widget_id, trigger_value=True)])
+
+    def trocar_aba(self):
+        """Abre uma aba diferente da atual num dos conjuntos de abas com chave."""
+        if not self.abas:
+            return False
+        aba_id, rotulos = self.rng.choice(sorted(self.abas.items()))
+        if len(rotulos) < 2:
+            return False
+        atual = self.estados.get(aba_id)
+        opcoes = [r for r in rotulos if atual is None or r != atual.string_value]
+        self.estados[aba_id] = WidgetState(id=aba_id, string_value=self.rng.choice(opcoes))
+        self.rerun("aba")
+        return True
+
+    def alterar_entrada(self):
+        """Sorteia um number_input/slider da página e muda seu valor."""
+        candidatos = sorted(
+            widget_id for widget_id, (tipo, _, _) in self.widgets.items()
+            if tipo in WIDGETS_NUMERICOS
+        )
+        if not candidatos:
+            return False
+        widget_id = self.rng.choice(candidatos)
+        tipo, dados, fragmento = self.widgets[widget_id]
+        self.estados[widget_id] = self._novo_valor(widget_id, tipo, dados)
+
+        # Entrada dentro de formulário só vale com o botão de envio
+        gatilhos = []
+        if dados.form_id:
+            gatilhos = [
+                WidgetState(id=outro_id, trigger_value=True)
+                for outro_id, (outro_tipo, outro, _) in self.widgets.items()
+                if outro_tipo == "button" and outro.is_form_submitter and outro.form_id == dados.form_id
+            ]
+        self.rerun("entrada", gatilhos, fragmento)
+        return True
+
+    def _novo_valor(self, widget_id, tipo, dados):
+        if tipo == "slider":
+            baixo, alto, passo = dados.min, dados.max, dados.step or 1
+            valor = baixo + passo * self.rng.randint(0, int((alto - baixo) / passo))
+            return WidgetState(id=widget_id, double_array_value={"data": [valor]})
+
+        baixo = dados.min if dados.has_min else 0
+        alto = dados.max if dados.has_max else max(dados.default * 2, baixo + 100)
+        passo = dados.step or 1
+        valor = baixo + passo * self.rng.randint(0, max(int((alto - baixo) / passo), 1))
+        if dados.data_type == dados.INT:
+            return WidgetState(id=widget_id, int_value=int(valor))
+        return WidgetState(id=widget_id, double_value=float(valor))
+
+
+def simular_aluno(url, numero_modulo, atraso, interacoes, pausa, semente):
+    """Roteiro de um aluno; retorna (latências, erros de script, falha ou None)."""
+    rng = random.Random(semente)
+    time.sleep(atraso)
+    sessao = SessaoSimulada(rng)
+    try:
+        with connect(url, subprotocols=["streamlit"], max_size=None) as sessao.ws:
+            sessao.rerun("abertura")
+            sessao.clicar("navegacao", sessao.buscar_widget(f"btn_mod_{numero_modulo}"))
+            for _ in range(interacoes):
+                time.sleep(rng.uniform(0, 2 * pausa))
+                if rng.random() < 0.3 and sessao.trocar_aba():
+                    continue
+                if not sessao.alterar_entrada():
+                    sessao.trocar_aba()
+    except Exception as e:
+        return sessao.latencias, sessao.erros_script, f"{type(e).__name__}: {e}"
+    return sessao.latencias, sessao.erros_script, None
+
+
+# =============================================================================
+# 3. EXECUÇÃO E RELATÓRIO
+# =============================================================================
+def percentis(valores):
+    """Resumo de latências em ms."""
+    if not valores:
+        return None
+    arr = np.asarray(valores)
+    return {
+        "n": int(arr.size),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+def executar_carga(sessoes, modulo_key, interacoes, rampa, pausa, porta=None, aquecimento=True, semente=0):
+    """Sobe o hub, roda as sessões simultâneas e monta o relatório."""
+    if modulo_key not in ler_modulos() or not modulo_key.startswith("modulo"):
+        raise ValueError(f"Módulo inválido: {modulo_key}")
+    numero_modulo = int(modulo_key.removeprefix("modulo"))
+
+    porta = porta or porta_livre()
+    url = f"ws://127.0.0.1:{porta}/_stcore/stream"
+    hub = iniciar_hub(porta, aquecimento)
+    try:
+        monitor = MonitorServidor(hub.pid)
+        linha_base = monitor.ler()
+        monitor.iniciar()
+        rng = random.Random(semente)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessoes, thread_name_prefix="aluno") as executor:
+            futuros = [
+                executor.submit(
+                    simular_aluno, url, numero_modulo, rng.uniform(0, rampa),
+                    interacoes, pausa, rng.random(),
+                )
+                for _ in range(sessoes)
+            ]
+            resultados = [f.result() for f in futuros]
+        duracao = time.perf_counter() - inicio
+        monitor.parar()
+    finally:
+        hub.terminate()
+        hub.wait()
+
+    latencias = [item for lat, _, _ in resultados for item in lat]
+    etapas = sorted({etapa for etapa, _ in latencias})
+    falhas = [falha for _, _, falha in resultados if falha]
+    cpu = [c for c, _ in monitor.amostras]
+    rss = [m for _, m in monitor.amostras]
+    rss_base = linha_base[1] if linha_base else None
+    rss_pico = max(rss) if rss else None
+
+    return {
+        "modulo": modulo_key,
+        "sessoes": sessoes,
+        "interacoes": interacoes,
+        "rampa_s": rampa,
+        "duracao_s": duracao,
+        "reruns": len(latencias),
+        "vazao_reruns_s": len(latencias) / duracao if duracao else 0.0,
+        "sessoes_com_falha": len(falhas),
+        "falhas": sorted(set(falhas)),
+        "erros_script": sum(len(erros) for _, erros, _ in resultados),
+        "excecoes": sorted({erro for _, erros, _ in resultados for erro in erros}),
+        "latencia": percentis([ms for _, ms in latencias]),
+        "latencia_por_etapa": {
+            etapa: percentis([ms for e, ms in latencias if e == etapa]) for etapa in etapas
+        },
+        "servidor": {
+            "cpu_media_pct": float(np.mean(cpu)) if cpu else None,
+            "cpu_pico_pct": max(cpu) if cpu else None,
+            "rss_inicial_mb": rss_base,
+            "rss_pico_mb": rss_pico,
+            "rss_por_sessao_mb": (rss_pico - rss_base) / sessoes if rss and rss_base else None,
+        },
+    }
+
+
+def formatar(valor, casas=1):
+    """Formata um número para o relatório (— quando ausente)."""
+    return "—" if valor is None else f"{valor:,.{casas}f}"
+
+
+def imprimir_relatorio(r):
+    """Imprime o resumo do teste de carga."""
+    print(f"Módulo {r['modulo']} — {r['sessoes']} sessões, {r['interacoes']} interações cada, rampa de {r['rampa_s']:.0f}s")
+    print(f"Duração: {r['duracao_s']:.1f}s | Reruns: {r['reruns']} | Vazão: {r['vazao_reruns_s']:.1f} reruns/s")
+    print(f"Sessões com falha: {r['sessoes_com_falha']} | Exceções nos scripts: {r['erros_script']}")
+    for falha in r["falhas"][:5] + r["excecoes"][:5]:
+        print(f"  ⚠️ {falha}")
+
+    cabecalho = f"\n{'Etapa':<12} {'n':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'máx (ms)':>10}"
+    print(cabecalho)
+    print("-" * (len(cabecalho) - 1))
+    linhas = list(r["latencia_por_etapa"].items()) + [("total", r["latencia"])]
+    for etapa, p in linhas:
+        if p:
+            print(
+                f"{etapa:<12} {p['n']:>6} {formatar(p['p50_ms']):>10} {formatar(p['p95_ms']):>10} "
+                f"{formatar(p['p99_ms']):>10} {formatar(p['max_ms']):>10}"
+            )
+
+    s = r["servidor"]
+    print(f"\nServidor: CPU média {formatar(s['cpu_media_pct'])}% (pico {formatar(s['cpu_pico_pct'])}%)")
+    print(
+        f"RSS: {formatar(s['rss_inicial_mb'])} MB → pico {formatar(s['rss_pico_mb'])} MB "
+        f"({formatar(s['rss_por_sessao_mb'], 2)} MB por sessão)"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga: turma simultânea no laboratório")
+    parser.add_argument("--sessoes", type=int, default=30, help="alunos simultâneos")
+    parser.add_argument("--modulo", default="modulo8", help="chave do módulo em MODULOS")
+    parser.add_argument("--interacoes", type=int, default=5, help="interações por aluno após abrir o módulo")
+    parser.add_argument("--rampa", type=float, default=10.0, help="janela (s) em que os alunos chegam")
+    parser.add_argument("--pausa", type=float, default=1.0, help="tempo médio (s) entre interações")
+    parser.add_argument("--porta", type=int, help="porta local do hub (padrão: livre)")
+    parser.add_argument("--sem-aquecimento", action="store_true", help="desliga o aquecimento dos módulos")
+    parser.add_argument("--semente", type=int, default=0, help="semente do roteiro aleatório")
+    parser.add_argument("--saida", help="salva o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    relatorio = executar_carga(
+        args.sessoes, args.modulo, args.interacoes, args.rampa, args.pausa,
+        porta=args.porta, aquecimento=not args.sem_aquecimento, semente=args.semente,
+    )
+    imprimir_relatorio(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"\nRelatório salvo em {args.saida}")
+    return 1 if relatorio["sessoes_com_falha"] or relatorio["erros_script"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
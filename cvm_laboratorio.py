@@ -0,0 +1,984 @@
+"""
+Ingestão dos Dados Abertos da CVM (DFP/ITR)
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Lê os arquivos anuais de dados abertos da CVM já baixados num diretório
+local (dfp_cia_aberta_AAAA.zip, itr_cia_aberta_AAAA.zip), sem acesso à
+rede, e grava um armazém colunar em disco:
+- Leitura em fluxo: cada CSV é lido linha a linha de dentro do zip, sem
+  descompactar nem carregar o arquivo inteiro
+- Contas mapeadas no plano de contas do laboratório (demonstracoes_laboratorio),
+  com subtotais conciliados e D&A extraída da DFC
+- Uma partição por arquivo de origem (arrays .npy por coluna)
+- Reingestão incremental: um manifesto guarda o checksum de cada arquivo
+  e as versões vistas de cada formulário (CNPJ, data, versão); só arquivos
+  alterados são relidos e só formulários novos ou reapresentados são
+  processados. Vale sempre a última versão de cada período.
+- Ingestão paralela: cada arquivo é lido e mapeado num processo do
+  ProcessPoolExecutor; só o processo principal grava partições e
+  manifesto, com no máximo um resultado por trabalhador em memória
+- Universo de empresas: os DFPs vigentes consolidados num painel
+  empresa × ano (arrays .npy mapeados em memória), com índice
+  (CNPJ, ano) → linha para busca O(1) e históricos sem cópia
+- Índice setorial: percentis (p10/p25/p50/p75/p90) de cada indicador por
+  setor e ano, pré-calculados na ingestão (setor do cadastro
+  cad_cia_aberta.csv, se presente na origem); só os anos com DFPs
+  alterados são recalculados
+
+Uso:
+    python cvm_laboratorio.py --origem dados_abertos/ --destino armazem_cvm/
+    python cvm_laboratorio.py --origem dados_abertos/ --destino armazem_cvm/ --trabalhadores 4
+    python cvm_laboratorio.py --origem dados_abertos/ --destino armazem_cvm/ --forcar
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import unicodedata
+import warnings
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+
+from demonstracoes_laboratorio import (
+    CODIGOS, COLUNAS_INDICADORES, SINAIS_INDICADORES, Demonstracoes, conciliar, resolver_subtotais,
+)
+from indicadores_laboratorio import CONTAS, calcular_indicadores
+
+# Arquivos anuais de dados abertos (ex.: dfp_cia_aberta_2023.zip)
+PADRAO_ARQUIVO = re.compile(r"^(dfp|itr)_cia_aberta_(\d{4})\.zip$", re.IGNORECASE)
+
+# Demonstrações lidas de dentro do zip (ex.: dfp_cia_aberta_DRE_con_2023.csv)
+PADRAO_MEMBRO = re.compile(r"_(BPA|BPP|DRE|DFC_MI|DFC_MD)_(con|ind)_\d{4}\.csv$", re.IGNORECASE)
+
+# Contas do plano do laboratório com o mesmo código e significado na CVM
+# (as aberturas do imobilizado e da receita e a memória de cálculo não existem
+# como contas fixas nos formulários)
+CODIGOS_CVM = frozenset(CODIGOS) - {"1.02.03.01", "1.02.03.02", "3.01.01", "3.01.02"} - {
+    codigo for codigo in CODIGOS if codigo.startswith("M.")
+}
+
+# Linhas da DFC (ajustes do lucro) somadas em "Depreciação e Amortização"
+PREFIXO_AJUSTES_DFC = "6.01.01."
+TERMOS_DEPRECIACAO = ("deprecia", "amortiza", "exaust")
+
+# Exercício corrente (o anterior, PENÚLTIMO, é só comparativo)
+ORDEM_CORRENTE = "ÚLTIMO"
+
+# Valores do armazém em R$ mil, como nas bases dos módulos
+ESCALAS = {"MIL": 1.0, "UNIDADE": 0.001}
+
+# Versão do formato do armazém (muda se as colunas mudarem)
+FORMATO_ARMAZEM = 1
+
+# Bloco de leitura do checksum (bytes)
+BLOCO_CHECKSUM = 1024 * 1024
+
+# Subdiretório do armazém com o universo de empresas (painel empresa × ano)
+DIRETORIO_UNIVERSO = "universo"
+
+# Versão do formato do universo (muda se os arrays do universo mudarem)
+FORMATO_UNIVERSO = 2
+
+# Cadastro de companhias abertas da CVM (opcional, no diretório de origem)
+ARQUIVO_CADASTRO = "cad_cia_aberta.csv"
+SETOR_NAO_CLASSIFICADO = "Não classificado"
+
+# Primeira posição do índice setorial: o universo inteiro
+TODOS_SETORES = "Todas as empresas"
+
+# Percentis do índice setorial e indicadores pré-calculados no universo
+PERCENTIS = (10, 25, 50, 75, 90)
+INDICADORES_UNIVERSO = tuple(calcular_indicadores(np.empty((0, len(CONTAS)))))
+
+
+def normalizar(texto):
+    """Minúsculas sem acentos, para comparar descrições de contas."""
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower().strip()
+
+
+# =============================================================================
+# 1. LEITURA EM FLUXO
+# =============================================================================
+def checksum(caminho):
+    """SHA-256 do arquivo, lido em blocos."""
+    soma = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_CHECKSUM), b""):
+            soma.update(bloco)
+    return soma.hexdigest()
+
+
+def ler_cadastro(origem):
+    """
+    Setor de atividade (SETOR_ATIV) por CNPJ, do cadastro da CVM na origem.
+
+    Retorna ({cnpj: setor}, sha256 do arquivo), ou ({}, None) se o cadastro
+    não foi baixado. Com mais de um registro por CNPJ vale o ativo.
+    """
+    caminho = os.path.join(origem, ARQUIVO_CADASTRO)
+    if not os.path.exists(caminho):
+        return {}, None
+    setores = {}
+    with open(caminho, encoding="latin-1", newline="") as f:
+        linhas = csv.reader(f, delimiter=";")
+        col = {nome: i for i, nome in enumerate(next(linhas, []))}
+        i_cnpj, i_setor, i_situacao = col["CNPJ_CIA"], col["SETOR_ATIV"], col.get("SIT")
+        for linha in linhas:
+            ativo = i_situacao is None or linha[i_situacao].upper() == "ATIVO"
+            if ativo or linha[i_cnpj] not in setores:
+                setores[linha[i_cnpj]] = linha[i_setor].strip() or SETOR_NAO_CLASSIFICADO
+    return setores, checksum(caminho)
+
+
+def arquivos_cvm(origem):
+    """Lista (caminho, tipo, ano) dos zips de dados abertos de um diretório."""
+    arquivos = []
+    for nome in sorted(os.listdir(origem)):
+        casamento = PADRAO_ARQUIVO.match(nome)
+        if casamento:
+            arquivos.append((os.path.join(origem, nome), casamento.group(1).upper(), int(casamento.group(2))))
+    return arquivos
+
+
+def ler_membro(zf, membro):
+    """Itera as linhas (listas de texto) de um CSV do zip; a primeira é o cabeçalho."""
+    with zf.open(membro) as bruto:
+        texto = io.TextIOWrapper(bruto, encoding="latin-1", newline="")
+        yield from csv.reader(texto, delimiter=";")
+
+
+def membros_por_consolidacao(zf):
+    """Membros de interesse do zip: consolidados primeiro, depois individuais."""
+    membros = []
+    for membro in zf.namelist():
+        casamento = PADRAO_MEMBRO.search(membro)
+        if casamento:
+            demonstracao = casamento.group(1).upper()
+            grupo = "DFC" if demonstracao.startswith("DFC") else demonstracao
+            membros.append((casamento.group(2).lower() != "con", membro, grupo))
+    return [(membro, grupo, not individual) for individual, membro, grupo in sorted(membros)]
+
+
+# =============================================================================
+# 2. MAPEAMENTO DAS CONTAS
+# =============================================================================
+def ler_arquivo(caminho, conhecidos=frozenset()):
+    """
+    Lê um zip de dados abertos e agrupa as contas por formulário.
+
+    Linhas de formulários em `conhecidos` (chaves já ingeridas) são
+    descartadas logo na leitura, sem mapeamento.
+
+    Retorna (formularios, estatisticas), com formularios no formato
+    {(cnpj, data de referência, versão): {"nome", "cd_cvm", "contas", "instituicao_financeira"}}.
+    Só o exercício corrente (ORDEM_EXERC = ÚLTIMO) é lido. Demonstrações
+    individuais só entram quando a companhia não publicou a consolidada.
+    Nos fluxos (DRE/DFC) do ITR fica o período mais longo — o acumulado no
+    ano —, para que DRE e DFC cubram o mesmo intervalo.
+    """
+    formularios = {}
+    consolidados = set()
+    estatisticas = {"linhas_csv": 0, "linhas_usadas": 0}
+
+    with zipfile.ZipFile(caminho) as zf:
+        for membro, grupo, consolidado in membros_por_consolidacao(zf):
+            linhas = ler_membro(zf, membro)
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                continue
+            col = {nome: i for i, nome in enumerate(cabecalho)}
+            i_ordem, i_codigo, i_descricao = col["ORDEM_EXERC"], col["CD_CONTA"], col["DS_CONTA"]
+            i_cnpj, i_data, i_versao = col["CNPJ_CIA"], col["DT_REFER"], col["VERSAO"]
+            i_valor, i_escala, i_inicio = col["VL_CONTA"], col["ESCALA_MOEDA"], col.get("DT_INI_EXERC")
+
+            for linha in linhas:
+                estatisticas["linhas_csv"] += 1
+                if linha[i_ordem] != ORDEM_CORRENTE:
+                    continue
+                codigo = linha[i_codigo]
+                depreciacao = codigo.startswith(PREFIXO_AJUSTES_DFC) and any(
+                    termo in normalizar(linha[i_descricao]) for termo in TERMOS_DEPRECIACAO
+                )
+                if codigo not in CODIGOS_CVM and not depreciacao:
+                    continue
+
+                chave = (linha[i_cnpj], linha[i_data], int(linha[i_versao]))
+                if chave in conhecidos:
+                    continue
+                if consolidado:
+                    consolidados.add((chave, grupo))
+                elif (chave, grupo) in consolidados:
+                    continue
+
+                formulario = formularios.get(chave)
+                if formulario is None:
+                    formulario = formularios[chave] = {
+                        "nome": linha[col["DENOM_CIA"]], "cd_cvm": int(linha[col["CD_CVM"]] or 0),
+                        "contas": {}, "depreciacao": {}, "instituicao_financeira": False,
+                    }
+                if codigo == "1.01" and not normalizar(linha[i_descricao]).startswith("ativo circulante"):
+                    # Bancos e seguradoras usam outro plano de contas
+                    formulario["instituicao_financeira"] = True
+
+                valor = float(linha[i_valor] or 0) * ESCALAS.get(linha[i_escala].upper(), 1.0)
+                inicio = linha[i_inicio] if i_inicio is not None else ""
+                destino = formulario["depreciacao"] if depreciacao else formulario["contas"]
+                anterior = destino.get(codigo)
+                if anterior is None or inicio < anterior[0]:
+                    destino[codigo] = (inicio, valor)
+                estatisticas["linhas_usadas"] += 1
+
+    return formularios, estatisticas
+
+
+def registro_do_formulario(formulario):
+    """Dicionário código → valor de um formulário, pronto para `conciliar`."""
+    registro = {codigo: valor for codigo, (_, valor) in formulario["contas"].items()}
+    if formulario["depreciacao"]:
+        # Na DFC indireta a D&A é somada de volta ao lucro: já vem positiva
+        registro["M.01"] = sum(valor for _, valor in formulario["depreciacao"].values())
+    return registro
+
+
+def ingerir_arquivo(caminho, conhecidos=frozenset()):
+    """
+    Converte um zip de dados abertos nas colunas de uma partição do armazém.
+
+    Fica só a última versão de cada (CNPJ, data de referência) ainda não
+    conhecida; bancos e seguradoras são descartados. Retorna (colunas,
+    empresas, info, vistos), onde `vistos` são todas as chaves novas lidas.
+    """
+    formularios, estatisticas = ler_arquivo(caminho, conhecidos)
+
+    ultimas = {}
+    for cnpj, data, versao in formularios:
+        ultimas[(cnpj, data)] = max(versao, ultimas.get((cnpj, data), versao))
+    chaves = sorted(
+        chave for chave in formularios
+        if ultimas[chave[:2]] == chave[2] and not formularios[chave]["instituicao_financeira"]
+    )
+
+    folhas = np.full((len(chaves), len(CODIGOS)), np.nan)
+    divergencias = 0
+    empresas = {}
+    for i, chave in enumerate(chaves):
+        formulario = formularios[chave]
+        folhas[i], divergentes, _ = conciliar(registro_do_formulario(formulario))
+        divergencias += len(divergentes)
+        empresas[chave[0]] = {"nome": formulario["nome"], "cd_cvm": formulario["cd_cvm"]}
+
+    colunas = {
+        "cnpj": np.array([cnpj for cnpj, _, _ in chaves], dtype=str),
+        "data": np.array([data for _, data, _ in chaves], dtype="datetime64[D]"),
+        "versao": np.array([versao for _, _, versao in chaves], dtype=np.int16),
+        "cd_cvm": np.array([formularios[chave]["cd_cvm"] for chave in chaves], dtype=np.int32),
+        "valores": resolver_subtotais(folhas),
+    }
+    info = {
+        **estatisticas,
+        "formularios": len(chaves),
+        "instituicoes_financeiras": sum(f["instituicao_financeira"] for f in formularios.values()),
+        "divergencias": divergencias,
+    }
+    return colunas, empresas, info, set(formularios)
+
+
+# =============================================================================
+# 3. ARMAZÉM COLUNAR
+# =============================================================================
+class ArmazemCVM:
+    """
+    Armazém colunar em disco: uma partição por arquivo de origem.
+
+    Cada partição é um diretório com um .npy por coluna (cnpj, data,
+    versao, cd_cvm e valores — linhas × contas do plano), mais
+    empresas.json e parte.json. As partições são gravadas num diretório
+    temporário e trocadas por renomeação, para que um leitor nunca veja
+    uma partição pela metade.
+    """
+
+    COLUNAS = ("cnpj", "data", "versao", "cd_cvm", "valores")
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.dir_partes = os.path.join(diretorio, "partes")
+        os.makedirs(self.dir_partes, exist_ok=True)
+
+        caminho_meta = os.path.join(diretorio, "meta.json")
+        meta = {"formato": FORMATO_ARMAZEM, "contas": list(CODIGOS)}
+        if os.path.exists(caminho_meta):
+            with open(caminho_meta, encoding="utf-8") as f:
+                existente = json.load(f)
+            if existente != meta:
+                raise ValueError(
+                    f"Armazém em {diretorio} foi gravado com outro formato ou plano de contas; "
+                    "apague-o e refaça a ingestão"
+                )
+        else:
+            with open(caminho_meta, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def partes(self):
+        """Nomes das partições gravadas."""
+        return sorted(
+            nome for nome in os.listdir(self.dir_partes)
+            if not nome.startswith(".") and os.path.isdir(os.path.join(self.dir_partes, nome))
+        )
+
+    def gravar_parte(self, nome, colunas, empresas, info):
+        """Grava (ou substitui) uma partição de forma atômica."""
+        destino = os.path.join(self.dir_partes, nome)
+        temporario = os.path.join(self.dir_partes, f".{nome}.tmp")
+        shutil.rmtree(temporario, ignore_errors=True)
+        os.makedirs(temporario)
+        for coluna in self.COLUNAS:
+            np.save(os.path.join(temporario, f"{coluna}.npy"), colunas[coluna])
+        with open(os.path.join(temporario, "empresas.json"), "w", encoding="utf-8") as f:
+            json.dump(empresas, f, ensure_ascii=False)
+        with open(os.path.join(temporario, "parte.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+
+        substituir_diretorio(temporario, destino)
+
+    def ler_parte(self, nome, mmap_mode=None):
+        """Colunas de uma partição (`mmap_mode="r"` mapeia sem copiar)."""
+        pasta = os.path.join(self.dir_partes, nome)
+        return {
+            coluna: np.load(os.path.join(pasta, f"{coluna}.npy"), mmap_mode=mmap_mode)
+            for coluna in self.COLUNAS
+        }
+
+    def empresas_parte(self, nome):
+        """Cadastro das empresas de uma partição."""
+        with open(os.path.join(self.dir_partes, nome, "empresas.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def info_parte(self, nome):
+        """Metadados de uma partição (tipo, ano, contagens da ingestão)."""
+        with open(os.path.join(self.dir_partes, nome, "parte.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def empresas(self):
+        """Cadastro mínimo das empresas: CNPJ → {nome, cd_cvm}."""
+        empresas = {}
+        for nome in self.partes():
+            empresas.update(self.empresas_parte(nome))
+        return empresas
+
+    def ler_manifesto(self):
+        """
+        Manifesto da ingestão:
+        - "arquivos": nome do zip → {sha256, bytes, parte, ingerido_em}
+        - "formularios": "cnpj|data" → {parte, versoes vistas, vigente}
+          (vigente é None para formulários descartados, ex.: bancos)
+        - "cadastro": sha256 do cadastro de setores usado no índice setorial
+        """
+        caminho = os.path.join(self.diretorio, "manifesto.json")
+        if not os.path.exists(caminho):
+            return {"arquivos": {}, "formularios": {}, "cadastro": None}
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+
+    def gravar_manifesto(self, manifesto):
+        """Grava o manifesto de forma atômica."""
+        caminho = os.path.join(self.diretorio, "manifesto.json")
+        with open(f"{caminho}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False)
+        os.replace(f"{caminho}.tmp", caminho)
+
+    def ler(self, tipo=None):
+        """Concatena as partições (opcionalmente só DFP ou só ITR)."""
+        partes = [
+            self.ler_parte(nome) for nome in self.partes()
+            if tipo is None or self.info_parte(nome)["tipo"] == tipo.upper()
+        ]
+        if not partes:
+            return {
+                "cnpj": np.array([], dtype=str), "data": np.array([], dtype="datetime64[D]"),
+                "versao": np.array([], dtype=np.int16), "cd_cvm": np.array([], dtype=np.int32),
+                "valores": np.empty((0, len(CODIGOS))),
+            }
+        colunas = {coluna: np.concatenate([p[coluna] for p in partes]) for coluna in self.COLUNAS}
+        return filtrar(colunas, vigentes(colunas))
+
+    def demonstracoes(self, tipo="DFP"):
+        """Painel denso empresas × datas de referência, como `Demonstracoes`."""
+        colunas = self.ler(tipo)
+        entidades, pos_e = np.unique(colunas["cnpj"], return_inverse=True)
+        periodos, pos_p = np.unique(colunas["data"], return_inverse=True)
+        valores = np.full((len(entidades), len(periodos), len(CODIGOS)), np.nan)
+        valores[pos_e, pos_p] = colunas["valores"]
+        return Demonstracoes(entidades.tolist(), periodos.tolist(), valores)
+
+    def universo(self):
+        """Universo de empresas mapeado em memória (ver `UniversoEmpresas`)."""
+        return UniversoEmpresas(os.path.join(self.diretorio, DIRETORIO_UNIVERSO))
+
+
+def substituir_diretorio(temporario, destino):
+    """Troca `destino` pelo diretório `temporario` já gravado, por renomeação."""
+    pai, nome = os.path.split(destino)
+    antigo = os.path.join(pai, f".{nome}.old")
+    shutil.rmtree(antigo, ignore_errors=True)
+    if os.path.exists(destino):
+        os.replace(destino, antigo)
+    os.replace(temporario, destino)
+    # Leitores com o diretório antigo mapeado em memória continuam válidos:
+    # o sistema só libera os arquivos quando o último mapeamento é fechado
+    shutil.rmtree(antigo, ignore_errors=True)
+
+
+def vigentes(colunas):
+    """Máscara das linhas com a última versão de cada (CNPJ, data)."""
+    ordem = np.lexsort((colunas["versao"], colunas["data"], colunas["cnpj"]))
+    ultima = np.ones(len(ordem), dtype=bool)
+    ultima[:-1] = (colunas["cnpj"][ordem][1:] != colunas["cnpj"][ordem][:-1]) | (
+        colunas["data"][ordem][1:] != colunas["data"][ordem][:-1]
+    )
+    mascara = np.zeros(len(ordem), dtype=bool)
+    mascara[ordem[ultima]] = True
+    return mascara
+
+
+def filtrar(colunas, mascara):
+    """Aplica uma máscara (ou índices) a todas as colunas."""
+    return {coluna: valores[mascara] for coluna, valores in colunas.items()}
+
+
+def mesclar(existentes, novas):
+    """
+    Junta linhas novas a uma partição: uma linha nova substitui a existente
+    do mesmo (CNPJ, data) apenas se tiver versão maior.
+    """
+    if existentes is None:
+        return novas
+    colunas = {coluna: np.concatenate([existentes[coluna], novas[coluna]]) for coluna in ArmazemCVM.COLUNAS}
+    colunas = filtrar(colunas, vigentes(colunas))
+    return filtrar(colunas, np.lexsort((colunas["data"], colunas["cnpj"])))
+
+
+def planejar_arquivo(armazem, manifesto, caminho, tipo, ano, forcar=False):
+    """
+    Decide o que reler de um zip: None se o checksum bate com o manifesto;
+    senão a tarefa de ingestão, com as chaves (CNPJ, data, versão) já vistas.
+    """
+    nome_arquivo = os.path.basename(caminho)
+    parte = f"{tipo.lower()}_{ano}"
+    soma = checksum(caminho)
+    anterior = manifesto["arquivos"].get(nome_arquivo)
+    existe = parte in armazem.partes()
+    if not forcar and existe and anterior and anterior["sha256"] == soma:
+        return None
+
+    # Formulários já vistos (em qualquer versão) não são reprocessados
+    da_parte = [chave for chave, estado in manifesto["formularios"].items() if estado["parte"] == parte]
+    if forcar or not existe:
+        for chave in da_parte:
+            del manifesto["formularios"][chave]
+        da_parte = []
+    conhecidos = {
+        (*chave.split("|"), versao)
+        for chave in da_parte for versao in manifesto["formularios"][chave]["versoes"]
+    }
+    return {
+        "caminho": caminho, "arquivo": nome_arquivo, "tipo": tipo, "ano": ano,
+        "parte": parte, "sha256": soma, "incremental": bool(da_parte), "conhecidos": conhecidos,
+    }
+
+
+def executar_tarefa(tarefa):
+    """Lê e mapeia um zip (roda num processo trabalhador)."""
+    inicio = time.perf_counter()
+    resultado = ingerir_arquivo(tarefa["caminho"], tarefa["conhecidos"])
+    return resultado, time.perf_counter() - inicio
+
+
+def registrar_arquivo(armazem, manifesto, tarefa, resultado):
+    """Mescla o resultado de uma tarefa na partição e atualiza o manifesto."""
+    colunas, empresas, info, vistos = resultado
+    parte = tarefa["parte"]
+    existentes = armazem.ler_parte(parte) if tarefa["incremental"] else None
+    mescladas = mesclar(existentes, colunas)
+    if existentes is not None:
+        empresas = {**armazem.empresas_parte(parte), **empresas}
+
+    reapresentados = 0
+    for cnpj, data, versao in vistos:
+        estado = manifesto["formularios"].setdefault(
+            f"{cnpj}|{data}", {"parte": parte, "versoes": [], "vigente": None}
+        )
+        reapresentados += bool(estado["versoes"]) and versao > max(estado["versoes"])
+        estado["versoes"] = sorted(set(estado["versoes"]) | {versao})
+    for cnpj, data, versao in zip(
+        mescladas["cnpj"].tolist(), mescladas["data"].astype(str).tolist(), mescladas["versao"].tolist()
+    ):
+        manifesto["formularios"][f"{cnpj}|{data}"]["vigente"] = versao
+
+    info = {
+        "arquivo": tarefa["arquivo"], "tipo": tarefa["tipo"], "ano": tarefa["ano"],
+        "situacao": "atualizado" if existentes is not None else "novo",
+        **info,
+        "reapresentados": reapresentados,
+        "linhas_particao": len(mescladas["cnpj"]),
+    }
+    armazem.gravar_parte(parte, mescladas, empresas, info)
+    manifesto["arquivos"][tarefa["arquivo"]] = {
+        "sha256": tarefa["sha256"], "bytes": os.path.getsize(tarefa["caminho"]), "parte": parte,
+        "ingerido_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    # Partição primeiro, manifesto depois: se o processo cair no meio, o
+    # arquivo é relido na próxima execução e a mescla não duplica linhas
+    armazem.gravar_manifesto(manifesto)
+    return info
+
+
+def executar_tarefas(tarefas, trabalhadores):
+    """
+    Executa as tarefas e entrega (tarefa, resultado, segundos) à medida que
+    terminam. Com mais de um trabalhador usa um ProcessPoolExecutor com
+    janela deslizante: nunca há mais tarefas submetidas que trabalhadores,
+    então a memória do processo principal fica limitada.
+    """
+    if trabalhadores <= 1 or len(tarefas) <= 1:
+        for tarefa in tarefas:
+            resultado, segundos = executar_tarefa(tarefa)
+            yield tarefa, resultado, segundos
+        return
+
+    pendentes = list(reversed(tarefas))
+    with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+        em_andamento = {}
+        while pendentes or em_andamento:
+            while pendentes and len(em_andamento) < trabalhadores:
+                tarefa = pendentes.pop()
+                em_andamento[executor.submit(executar_tarefa, tarefa)] = tarefa
+            prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                tarefa = em_andamento.pop(futuro)
+                resultado, segundos = futuro.result()
+                yield tarefa, resultado, segundos
+
+
+# =============================================================================
+# 4. UNIVERSO DE EMPRESAS E ÍNDICE SETORIAL (MAPEADOS EM MEMÓRIA)
+# =============================================================================
+def calcular_percentis(setor, ano, indicadores, n_setores, n_anos, anteriores=None):
+    """
+    Percentis PERCENTIS de cada indicador por (setor, ano).
+
+    `setor` e `ano` são as posições de cada linha nos eixos do índice (o
+    setor 0 é o universo inteiro, e as linhas de cada setor também entram
+    nele); `indicadores` é linhas × indicadores. Os anos presentes em
+    `anteriores` ({posição do ano: (percentis, contagem)}) são copiados sem
+    recálculo. Retorna (percentis: setores × anos × indicadores × percentis,
+    contagem de valores válidos: setores × anos × indicadores).
+    """
+    anteriores = anteriores or {}
+    percentis = np.full((n_setores, n_anos, indicadores.shape[1], len(PERCENTIS)), np.nan)
+    contagem = np.zeros((n_setores, n_anos, indicadores.shape[1]), dtype=np.int32)
+
+    ordem = np.lexsort((setor, ano))
+    limites_ano = np.searchsorted(ano[ordem], np.arange(n_anos + 1))
+    for j in range(n_anos):
+        if j in anteriores:
+            percentis[:, j], contagem[:, j] = anteriores[j]
+            continue
+        linhas = ordem[limites_ano[j]:limites_ano[j + 1]]
+        limites_setor = np.searchsorted(setor[linhas], np.arange(n_setores + 1))
+        grupos = [(0, linhas)] + [
+            (s, linhas[limites_setor[s]:limites_setor[s + 1]]) for s in range(1, n_setores)
+        ]
+        for s, grupo in grupos:
+            if not len(grupo):
+                continue
+            valores = indicadores[grupo]
+            contagem[s, j] = np.count_nonzero(~np.isnan(valores), axis=0)
+            with warnings.catch_warnings():
+                # Indicador sem nenhum valor no grupo: percentis ficam NaN
+                warnings.simplefilter("ignore", RuntimeWarning)
+                percentis[s, j] = np.nanpercentile(valores, PERCENTIS, axis=0).T
+    return percentis, contagem
+
+
+def percentis_reaproveitaveis(destino, setores, anos, anos_alterados):
+    """
+    Percentis do universo gravado em `destino` que continuam válidos:
+    {posição do ano: (percentis, contagem)} para os anos não alterados,
+    desde que os eixos de setores e indicadores sejam os mesmos.
+    """
+    caminho = os.path.join(destino, "universo.json")
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        meta = json.load(f)
+    if (
+        meta.get("formato") != FORMATO_UNIVERSO or meta["contas"] != list(CODIGOS)
+        or meta["setores"] != setores or meta["indicadores"] != list(INDICADORES_UNIVERSO)
+    ):
+        return {}
+    percentis = np.load(os.path.join(destino, "percentis.npy"))
+    contagem = np.load(os.path.join(destino, "contagem.npy"))
+    return {
+        anos.index(ano): (percentis[:, j], contagem[:, j])
+        for j, ano in enumerate(range(meta["ano_inicial"], meta["ano_inicial"] + percentis.shape[1]))
+        if ano in anos and ano not in anos_alterados
+    }
+
+
+def construir_universo(armazem, setores=None, anos_alterados=None):
+    """
+    Consolida os DFPs vigentes do armazém no painel empresa × ano do
+    universo, gravado em arrays .npy prontos para mapeamento em memória.
+
+    As linhas ficam ordenadas por (CNPJ, ano), de modo que o histórico de
+    uma empresa é uma faixa contígua; se houver dois DFPs no mesmo ano
+    (mudança de exercício social), fica o de data mais recente. Além das
+    colunas, grava o índice de deslocamentos: `inicio` (faixa de cada
+    empresa) e `grade` (empresa × ano → linha, -1 se ausente), os
+    indicadores de cada linha e o índice setorial de percentis.
+
+    `setores` é o cadastro {cnpj: setor} (ver `ler_cadastro`). Com
+    `anos_alterados`, os percentis dos demais anos são reaproveitados do
+    universo anterior; None recalcula todos.
+    Retorna (empresas-ano gravadas, anos do índice recalculados).
+    """
+    colunas = armazem.ler("DFP")
+    colunas["ano"] = colunas["data"].astype("datetime64[Y]").astype(np.int64) + 1970
+    colunas = filtrar(colunas, np.lexsort((colunas["data"], colunas["ano"], colunas["cnpj"])))
+    ultima = np.ones(len(colunas["cnpj"]), dtype=bool)
+    ultima[:-1] = (colunas["cnpj"][1:] != colunas["cnpj"][:-1]) | (colunas["ano"][1:] != colunas["ano"][:-1])
+    colunas = filtrar(colunas, ultima)
+
+    linhas = len(colunas["cnpj"])
+    empresas, inicio, pos_empresa = np.unique(colunas["cnpj"], return_index=True, return_inverse=True)
+    ano_inicial = int(colunas["ano"].min()) if linhas else 0
+    n_anos = int(colunas["ano"].max()) - ano_inicial + 1 if linhas else 0
+    grade = np.full((len(empresas), n_anos), -1, dtype=np.int64)
+    grade[pos_empresa, colunas["ano"] - ano_inicial] = np.arange(linhas)
+
+    setores = setores or {}
+    setor_empresa = [setores.get(cnpj, SETOR_NAO_CLASSIFICADO) for cnpj in empresas.tolist()]
+    nomes_setores = [TODOS_SETORES] + sorted(set(setor_empresa))
+    posicao_setor = {setor: s for s, setor in enumerate(nomes_setores)}
+    setor = np.array([posicao_setor[nome] for nome in setor_empresa], dtype=np.int16)
+
+    ind = calcular_indicadores(colunas["valores"][:, COLUNAS_INDICADORES] * SINAIS_INDICADORES)
+    indicadores = np.empty((linhas, len(INDICADORES_UNIVERSO)))
+    for i, nome in enumerate(INDICADORES_UNIVERSO):
+        indicadores[:, i] = ind[nome]
+
+    destino = os.path.join(armazem.diretorio, DIRETORIO_UNIVERSO)
+    anos = list(range(ano_inicial, ano_inicial + n_anos))
+    anteriores = {}
+    if anos_alterados is not None:
+        anteriores = percentis_reaproveitaveis(destino, nomes_setores, anos, anos_alterados)
+    percentis, contagem = calcular_percentis(
+        setor[pos_empresa], colunas["ano"] - ano_inicial, indicadores,
+        len(nomes_setores), n_anos, anteriores,
+    )
+
+    arrays = {
+        "empresas": empresas,
+        "inicio": np.append(inicio, linhas).astype(np.int64),
+        "grade": grade,
+        "setor": setor,
+        "ano": colunas["ano"].astype(np.int16),
+        "data": colunas["data"],
+        "cd_cvm": colunas["cd_cvm"],
+        "valores": np.ascontiguousarray(colunas["valores"]),
+        # Coluna a coluna (ordem Fortran): cada indicador de um filtro é uma
+        # leitura contígua do arquivo mapeado
+        "indicadores": np.asfortranarray(indicadores),
+        "percentis": percentis,
+        "contagem": contagem,
+    }
+    cadastro = armazem.empresas()
+    meta = {
+        "formato": FORMATO_UNIVERSO,
+        "contas": list(CODIGOS),
+        "ano_inicial": ano_inicial,
+        "linhas": linhas,
+        "nomes": {cnpj: cadastro.get(cnpj, {}).get("nome", cnpj) for cnpj in empresas.tolist()},
+        "setores": nomes_setores,
+        "indicadores": list(INDICADORES_UNIVERSO),
+        "percentis": list(PERCENTIS),
+        "construido_em": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    temporario = os.path.join(armazem.diretorio, f".{DIRETORIO_UNIVERSO}.tmp")
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    for nome, valores in arrays.items():
+        np.save(os.path.join(temporario, f"{nome}.npy"), valores)
+    # universo.json por último: sua assinatura identifica a versão gravada
+    with open(os.path.join(temporario, "universo.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    substituir_diretorio(temporario, destino)
+    return linhas, n_anos - len(anteriores)
+
+
+def universo_atualizado(diretorio):
+    """Indica se o armazém tem um universo gravado no formato atual."""
+    caminho = os.path.join(diretorio, DIRETORIO_UNIVERSO, "universo.json")
+    if not os.path.exists(caminho):
+        return False
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f).get("formato") == FORMATO_UNIVERSO
+
+
+def rotulo_faixa(valor, quantis):
+    """Faixa de um valor entre os percentis do setor (ex.: "p25–p50")."""
+    if valor is None or np.isnan(valor) or quantis is None or np.isnan(quantis).all():
+        return "—"
+    posicao = int(np.searchsorted(quantis, valor, side="right"))
+    if posicao == 0:
+        return f"< p{PERCENTIS[0]}"
+    if posicao == len(PERCENTIS):
+        return f"> p{PERCENTIS[-1]}"
+    return f"p{PERCENTIS[posicao - 1]}–p{PERCENTIS[posicao]}"
+
+
+class UniversoEmpresas:
+    """
+    Painel empresa × ano (DFPs) aberto com `np.load(mmap_mode="r")`.
+
+    Nada é lido para a memória do processo na abertura: as páginas dos
+    arrays vêm do cache do sistema operacional e são compartilhadas por
+    todos os processos e sessões que mapeiam o mesmo universo. A busca de
+    (CNPJ, ano) é O(1) — um dicionário CNPJ → empresa e uma consulta à
+    `grade` — e o histórico de uma empresa é uma fatia contígua dos
+    arrays mapeados, sem cópia. Os percentis setoriais também são
+    consultados em O(1), por posição (setor, ano, indicador).
+    """
+
+    ARRAYS = (
+        "empresas", "inicio", "grade", "setor", "ano", "data", "cd_cvm", "valores",
+        "indicadores", "percentis", "contagem",
+    )
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        with open(os.path.join(diretorio, "universo.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta["formato"] != FORMATO_UNIVERSO or self.meta["contas"] != list(CODIGOS):
+            raise ValueError(
+                f"Universo em {diretorio} foi gravado com outro formato ou plano de contas; "
+                "refaça a ingestão"
+            )
+        for nome in self.ARRAYS:
+            setattr(self, nome, np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode="r"))
+        self.ano_inicial = self.meta["ano_inicial"]
+        self.nomes = self.meta["nomes"]
+        self.setores = self.meta["setores"]
+        self._posicao = {cnpj: e for e, cnpj in enumerate(self.empresas.tolist())}
+        self._posicao_setor = {setor: s for s, setor in enumerate(self.setores)}
+        self._posicao_indicador = {nome: i for i, nome in enumerate(self.meta["indicadores"])}
+        self._empresa_linha = None
+
+    def __len__(self):
+        return self.meta["linhas"]
+
+    def __contains__(self, cnpj):
+        return cnpj in self._posicao
+
+    def anos(self):
+        """Anos cobertos pela grade."""
+        return list(range(self.ano_inicial, self.ano_inicial + self.grade.shape[1]))
+
+    def posicao(self, cnpj):
+        """Posição de uma empresa em `empresas` (None se o CNPJ não estiver no universo)."""
+        return self._posicao.get(cnpj)
+
+    def linha(self, cnpj, ano):
+        """Deslocamento da linha de (CNPJ, ano), ou None se não houver DFP."""
+        e = self._posicao.get(cnpj)
+        coluna = ano - self.ano_inicial
+        if e is None or not 0 <= coluna < self.grade.shape[1]:
+            return None
+        deslocamento = int(self.grade[e, coluna])
+        return deslocamento if deslocamento >= 0 else None
+
+    def registro(self, cnpj, ano):
+        """Dicionário código → valor de (CNPJ, ano), ou None se não houver DFP."""
+        linha = self.linha(cnpj, ano)
+        if linha is None:
+            return None
+        return dict(zip(CODIGOS, self.valores[linha].tolist()))
+
+    def faixa(self, cnpj):
+        """Fatia das linhas de uma empresa (vazia se o CNPJ não estiver no universo)."""
+        e = self._posicao.get(cnpj)
+        if e is None:
+            return slice(0, 0)
+        return slice(int(self.inicio[e]), int(self.inicio[e + 1]))
+
+    def historico(self, cnpj):
+        """
+        Histórico de uma empresa como `Demonstracoes` (1 × anos × contas).
+
+        Os valores são uma visão dos arrays mapeados em memória, sem cópia.
+        """
+        faixa = self.faixa(cnpj)
+        return Demonstracoes((cnpj,), self.ano[faixa].tolist(), self.valores[faixa][np.newaxis])
+
+    def empresa_linha(self):
+        """Posição da empresa de cada linha (calculada uma vez por processo)."""
+        if self._empresa_linha is None:
+            self._empresa_linha = np.repeat(
+                np.arange(len(self.empresas), dtype=np.int32), np.diff(self.inicio)
+            )
+        return self._empresa_linha
+
+    def coluna(self, nome):
+        """
+        Coluna por linha do universo: um indicador de INDICADORES_UNIVERSO,
+        "ano" ou "setor" (posição em `setores`).
+        """
+        if nome == "ano":
+            return self.ano
+        if nome == "setor":
+            return self.setor[self.empresa_linha()]
+        i = self._posicao_indicador.get(nome)
+        if i is None:
+            raise KeyError(nome)
+        return self.indicadores[:, i]
+
+    def codigo_setor(self, setor):
+        """Posição de um setor no índice (-1 se não existir)."""
+        return self._posicao_setor.get(setor, -1)
+
+    def setor_de(self, cnpj):
+        """Setor de atividade de uma empresa do universo."""
+        return self.setores[int(self.setor[self._posicao[cnpj]])]
+
+    def anos_setor(self, setor):
+        """Anos em que o setor tem ao menos uma empresa no índice."""
+        s = self._posicao_setor[setor]
+        return [ano for j, ano in enumerate(self.anos()) if self.contagem[s, j].any()]
+
+    def quantis(self, setor, ano, indicador):
+        """
+        Percentis PERCENTIS de um indicador no setor e ano (array, sem cópia),
+        ou None se o setor, o ano ou o indicador não estiverem no índice.
+        """
+        s = self._posicao_setor.get(setor)
+        i = self._posicao_indicador.get(indicador)
+        j = ano - self.ano_inicial
+        if s is None or i is None or not 0 <= j < self.percentis.shape[1]:
+            return None
+        return self.percentis[s, j, i]
+
+    def posicao_setorial(self, setor, ano, indicador, valor):
+        """Faixa de percentis em que `valor` cai no setor e ano (ex.: "p25–p50")."""
+        return rotulo_faixa(valor, self.quantis(setor, ano, indicador))
+
+
+# =============================================================================
+# 5. INGESTÃO DE UM DIRETÓRIO
+# =============================================================================
+def ingerir_diretorio(origem, destino, forcar=False, trabalhadores=None):
+    """
+    Ingere (incrementalmente) todos os zips de dados abertos de `origem`,
+    com `trabalhadores` processos (padrão: número de CPUs).
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    armazem = ArmazemCVM(destino)
+    manifesto = armazem.ler_manifesto()
+    inicio = time.perf_counter()
+
+    resumo, tarefas = [], []
+    for caminho, tipo, ano in arquivos_cvm(origem):
+        tarefa = planejar_arquivo(armazem, manifesto, caminho, tipo, ano, forcar)
+        if tarefa is None:
+            resumo.append({"arquivo": os.path.basename(caminho), "tipo": tipo, "ano": ano, "situacao": "inalterado"})
+            print(f"→ {os.path.basename(caminho)}: inalterado (checksum)", file=sys.stderr, flush=True)
+        else:
+            tarefas.append(tarefa)
+
+    # Arquivos maiores primeiro, para equilibrar a carga entre os processos
+    tarefas.sort(key=lambda tarefa: os.path.getsize(tarefa["caminho"]), reverse=True)
+    anos_alterados = set()
+    for tarefa, resultado, segundos in executar_tarefas(tarefas, trabalhadores):
+        if tarefa["tipo"] == "DFP":
+            datas = resultado[0]["data"]
+            anos_alterados.update((datas.astype("datetime64[Y]").astype(np.int64) + 1970).tolist())
+        info = registrar_arquivo(armazem, manifesto, tarefa, resultado)
+        info["segundos"] = segundos
+        resumo.append(info)
+        print(
+            f"→ {info['arquivo']}: {info['situacao']}: {info['formularios']:,} formulários processados "
+            f"({info['reapresentados']:,} reapresentações), {info['linhas_csv']:,} linhas lidas "
+            f"em {segundos:.1f}s ({info['linhas_csv'] / max(segundos, 1e-9):,.0f} linhas/s)",
+            file=sys.stderr, flush=True,
+        )
+
+    # O universo é refeito sempre que algum DFP muda; o índice setorial só
+    # recalcula os anos desses DFPs, salvo se o cadastro de setores mudou
+    setores, soma_cadastro = ler_cadastro(origem)
+    recalcular_tudo = soma_cadastro != manifesto.get("cadastro") or not universo_atualizado(destino)
+    if anos_alterados or recalcular_tudo:
+        linhas, recalculados = construir_universo(
+            armazem, setores, None if recalcular_tudo else anos_alterados
+        )
+        manifesto["cadastro"] = soma_cadastro
+        armazem.gravar_manifesto(manifesto)
+        print(
+            f"→ universo: {linhas:,} empresas-ano gravadas; índice setorial com "
+            f"{recalculados} ano(s) recalculado(s)",
+            file=sys.stderr, flush=True,
+        )
+
+    vazao = {
+        "trabalhadores": trabalhadores,
+        "segundos": time.perf_counter() - inicio,
+        "linhas_csv": sum(info.get("linhas_csv", 0) for info in resumo),
+        "formularios": sum(info.get("formularios", 0) for info in resumo),
+    }
+    vazao["linhas_por_segundo"] = vazao["linhas_csv"] / max(vazao["segundos"], 1e-9)
+    return armazem, resumo, vazao
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestão offline dos dados abertos DFP/ITR da CVM")
+    parser.add_argument("--origem", required=True, help="diretório com os zips baixados da CVM")
+    parser.add_argument("--destino", required=True, help="diretório do armazém colunar")
+    parser.add_argument("--forcar", action="store_true", help="ignora o manifesto e reingere tudo")
+    parser.add_argument("--trabalhadores", type=int, help="processos de ingestão (padrão: número de CPUs)")
+    args = parser.parse_args(argv)
+
+    if not arquivos_cvm(args.origem):
+        print(f"Nenhum arquivo dfp/itr_cia_aberta_AAAA.zip em {args.origem}", file=sys.stderr)
+        return 1
+
+    armazem, resumo, vazao = ingerir_diretorio(args.origem, args.destino, args.forcar, args.trabalhadores)
+    processados = vazao["formularios"]
+    inalterados = sum(info["situacao"] == "inalterado" for info in resumo)
+    print(
+        f"\n{processados:,} formulários processados, {inalterados} de {len(resumo)} arquivos inalterados; "
+        f"{len(armazem.ler()['cnpj']):,} formulários vigentes de {len(armazem.empresas()):,} empresas em {args.destino}"
+    )
+    if universo_atualizado(args.destino):
+        universo = armazem.universo()
+        print(
+            f"Universo: {len(universo):,} empresas-ano de {len(universo.nomes):,} empresas (DFP), "
+            f"{len(universo.setores) - 1} setor(es) no índice setorial"
+        )
+    print(
+        f"Vazão: {vazao['linhas_csv']:,} linhas em {vazao['segundos']:.1f}s = "
+        f"{vazao['linhas_por_segundo']:,.0f} linhas/s com {vazao['trabalhadores']} trabalhador(es)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Deflação por Índices de Preços
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Converte valores nominais em valores reais (moeda de uma data-base) com
+uma série de índices de preços guardada localmente, sem acesso à rede:
+- Série em indices_precos.csv (ou no arquivo indicado em
+  LAB_INDICES_PRECOS): uma linha por mês ("AAAA-MM") e uma coluna por
+  índice, com a variação % acumulada desde a linha anterior; a primeira
+  linha é a base. A série distribuída é anual (dez/dez); uma série
+  mensal no mesmo formato a substitui sem mudança de código
+- Níveis dos índices interpolados geometricamente entre as datas da
+  série (inflação constante dentro de cada intervalo)
+- Fator de deflação por (índice, data de origem, data de destino) em
+  cache, então alternar entre valores nominais e reais não relê a série
+  nem refaz as interpolações
+- Deflação vetorizada de um painel contas × períodos: cada coluna é
+  multiplicada pelo fator do seu período (estoques na data de
+  encerramento, fluxos no meio do período)
+
+Como o mesmo fator multiplica todas as contas de um período, a AV não
+muda com a deflação; a AH passa a medir o crescimento real.
+"""
+
+import functools
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Série local de índices de preços; a variável de ambiente aponta outro arquivo
+VARIAVEL_INDICES = "LAB_INDICES_PRECOS"
+ARQUIVO_INDICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indices_precos.csv")
+
+# Índices reconhecidos (coluna do arquivo → nome de exibição)
+INDICES = {
+    "ipca": "IPCA (IBGE)",
+    "igpm": "IGP-M (FGV)",
+}
+
+MESES = ("jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez")
+
+
+# =============================================================================
+# 1. SÉRIE DE ÍNDICES
+# =============================================================================
+class SerieIndices:
+    """
+    Níveis dos índices de preços nas datas da série.
+
+    As datas são meses corridos (ano * 12 + mês - 1) e os níveis ficam em
+    logaritmo, para que a interpolação linear entre duas datas equivalha
+    a uma inflação mensal constante no intervalo.
+    """
+
+    def __init__(self, meses, niveis):
+        self.meses = np.asarray(meses, dtype=np.float64)
+        self.log_niveis = {indice: np.log(nivel) for indice, nivel in niveis.items()}
+        self.indices = tuple(niveis)
+
+    def log_nivel(self, indice, mes):
+        """Logaritmo do nível do índice em um mês corrido (fracionário ou não)."""
+        if indice not in self.log_niveis:
+            raise ValueError(
+                f"Índice desconhecido: {indice!r}. Disponíveis: {', '.join(self.indices)}"
+            )
+        if not self.meses[0] <= mes <= self.meses[-1]:
+            raise ValueError(
+                f"{indice.upper()} sem dados para {rotulo_mes(mes)}: a série vai de "
+                f"{rotulo_mes(self.meses[0])} a {rotulo_mes(self.meses[-1])}"
+            )
+        return float(np.interp(mes, self.meses, self.log_niveis[indice]))
+
+
+def mes_corrido(texto):
+    """"AAAA-MM" → meses corridos (ano * 12 + mês - 1)."""
+    ano, mes = str(texto).strip().split("-")
+    return int(ano) * 12 + int(mes) - 1
+
+
+def rotulo_mes(mes):
+    """Meses corridos → "dez/2023" (frações de mês arredondadas para baixo)."""
+    ano, mes = divmod(int(np.floor(mes)), 12)
+    return f"{MESES[mes]}/{ano}"
+
+
+def caminho_indices():
+    """Arquivo da série de índices em uso (LAB_INDICES_PRECOS ou o arquivo do laboratório)."""
+    return os.environ.get(VARIAVEL_INDICES) or ARQUIVO_INDICES
+
+
+def versao_indices():
+    """(arquivo, mtime, tamanho) da série em uso: identifica a versão lida nos caches."""
+    caminho = caminho_indices()
+    try:
+        estado = os.stat(caminho)
+    except FileNotFoundError:
+        raise ValueError(f"Série de índices de preços não encontrada: {caminho}") from None
+    return caminho, estado.st_mtime_ns, estado.st_size
+
+
+def serie_indices():
+    """Série de índices do arquivo em uso, lida uma vez por versão do arquivo."""
+    return carregar_serie(*versao_indices())
+
+
+@functools.lru_cache(maxsize=4)
+def carregar_serie(caminho, mtime, tamanho):
+    """Lê o arquivo e acumula as variações % em níveis (base = 1 na primeira linha)."""
+    tabela = pd.read_csv(caminho, dtype={"mes": str})
+    if "mes" not in tabela.columns:
+        raise ValueError("A série de índices precisa de uma coluna 'mes' (AAAA-MM)")
+    meses = np.array([mes_corrido(mes) for mes in tabela["mes"]])
+    ordem = np.argsort(meses, kind="stable")
+    if len(meses) < 2 or (np.diff(meses[ordem]) <= 0).any():
+        raise ValueError("A série de índices precisa de ao menos dois meses distintos, sem repetições")
+
+    niveis = {}
+    for indice in tabela.columns.drop("mes"):
+        variacoes = tabela[indice].to_numpy(dtype=np.float64)[ordem]
+        if np.isnan(variacoes[1:]).any():
+            raise ValueError(f"Série de {indice.upper()} incompleta: há meses sem variação informada")
+        niveis[indice] = np.cumprod(np.concatenate(([1.0], 1 + variacoes[1:] / 100)))
+    return SerieIndices(meses[ordem], niveis)
+
+
+# =============================================================================
+# 2. DATAS DOS PERÍODOS
+# =============================================================================
+def data_do_periodo(periodo, fluxo=False):
+    """
+    Mês corrido que representa um período das demonstrações.
+
+    Aceita anos (2023 ou "2023"), trimestres ("1T20", "3T2023") e meses
+    ("2023-06"). Estoques (balanço) valem no último mês do período; fluxos
+    (DRE, DFC) se acumulam ao longo dele e são tratados pelo ponto médio.
+    """
+    texto = str(periodo).strip()
+    if re.fullmatch(r"\d{4}", texto):
+        inicio, duracao = int(texto) * 12, 12
+    elif re.fullmatch(r"[1-4]T\d{2}(\d{2})?", texto):
+        ano = int(texto[2:])
+        inicio, duracao = (ano + 2000 if ano < 100 else ano) * 12 + (int(texto[0]) - 1) * 3, 3
+    elif re.fullmatch(r"\d{4}-\d{2}", texto):
+        inicio, duracao = mes_corrido(texto), 1
+    else:
+        raise ValueError(f"Período não reconhecido para deflação: {periodo!r}")
+    fim = inicio + duracao - 1
+    return fim - (duracao - 1) / 2 if fluxo else float(fim)
+
+
+# =============================================================================
+# 3. FATORES E DEFLAÇÃO
+# =============================================================================
+def fator(indice, origem, destino):
+    """
+    Fator que leva valores da data `origem` para a moeda da data `destino`
+    (nível no destino / nível na origem), ambas em meses corridos.
+    """
+    return _fator(indice, float(origem), float(destino), versao_indices())
+
+
+@functools.lru_cache(maxsize=4096)
+def _fator(indice, origem, destino, versao):
+    """Fator em cache por (índice, origem, destino) e versão da série."""
+    serie = carregar_serie(*versao)
+    return float(np.exp(serie.log_nivel(indice, destino) - serie.log_nivel(indice, origem)))
+
+
+def fatores(indice, periodos, destino=None, fluxo=False):
+    """
+    Fatores de deflação de cada período para a moeda de `destino` (mês
+    corrido; padrão: encerramento do último período).
+    """
+    if destino is None:
+        destino = data_do_periodo(periodos[-1])
+    versao = versao_indices()
+    return np.array([
+        _fator(indice, data_do_periodo(p, fluxo), float(destino), versao) for p in periodos
+    ])
+
+
+def deflacionar(valores, periodos, indice, destino=None, fluxo=False):
+    """
+    Painel (… × períodos) em moeda de `destino`: a última dimensão é a dos
+    períodos e cada coluna é multiplicada pelo fator do seu período. NaN
+    continua NaN.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if valores.shape[-1] != len(periodos):
+        raise ValueError(
+            f"O painel tem {valores.shape[-1]} períodos, mas foram informadas {len(periodos)} datas"
+        )
+    return valores * fatores(indice, periodos, destino, fluxo)
+
+
+def inflacao_acumulada(indice, origem, destino):
+    """Inflação acumulada (%) entre duas datas em meses corridos."""
+    return (fator(indice, origem, destino) - 1) * 100
+
+
+def descrever(indice, destino):
+    """Legenda da moeda dos valores reais, ex.: "R$ de dez/2023 (IPCA)"."""
+    nome = INDICES.get(indice, indice.upper()).split(" (")[0]
+    return f"R$ de {rotulo_mes(destino)} ({nome})"
@@ -0,0 +1,475 @@
+"""
+Modelo Colunar de Demonstrações Financeiras
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Representação compacta de balanço, DRE e DFC:
+- Plano de contas fixo (códigos no padrão CVM/DFP), com índice por código
+- Um array float64 contíguo por entidade × período × conta
+- Subtotais resolvidos por uma matriz de agregação pré-calculada
+  (valores = folhas @ MATRIZ_AGREGACAO.T), sem dicionários por linha
+- Carga das bases dos módulos (dicionários aninhados com rótulos em
+  português) via tabela de rótulos → conta
+
+Convenção de sinais (como na DFP): despesas e custos são negativos; a
+memória "Depreciação e Amortização" é positiva (soma-se ao EBIT no EBITDA).
+
+Contas não informadas ficam NaN. Um subtotal é definido se alguma conta
+que o compõe for conhecida (as ausentes contam como zero), exceto os
+subtotais estritos (ex.: EBITDA), que exigem todos os componentes.
+"""
+
+import numpy as np
+
+from indicadores_laboratorio import CONTAS, calcular_indicadores
+
+# Diferença (em R$) tolerada entre um subtotal informado e a soma das contas
+TOLERANCIA = 0.5
+
+# =============================================================================
+# 1. PLANO DE CONTAS
+# =============================================================================
+# (código, nome, componentes do subtotal, conta que absorve a diferença)
+# Contas sem componentes são folhas. A conta de resíduo recebe a diferença
+# entre o subtotal informado pela fonte e a soma das contas abertas.
+PLANO_CONTAS = (
+    # Ativo
+    ("1", "Ativo Total", ("1.01", "1.02"), "1.02.09"),
+    ("1.01", "Ativo Circulante", (
+        "1.01.01", "1.01.02", "1.01.03", "1.01.04", "1.01.05", "1.01.06", "1.01.07", "1.01.08",
+    ), "1.01.08"),
+    ("1.01.01", "Caixa e Equivalentes de Caixa", (), None),
+    ("1.01.02", "Aplicações Financeiras", (), None),
+    ("1.01.03", "Contas a Receber", (), None),
+    ("1.01.04", "Estoques", (), None),
+    ("1.01.05", "Ativos Biológicos", (), None),
+    ("1.01.06", "Tributos a Recuperar", (), None),
+    ("1.01.07", "Despesas Antecipadas", (), None),
+    ("1.01.08", "Outros Ativos Circulantes", (), None),
+    ("1.02", "Ativo Não Circulante", ("1.02.01", "1.02.02", "1.02.03", "1.02.04", "1.02.09"), "1.02.09"),
+    ("1.02.01", "Ativo Realizável a Longo Prazo", (), None),
+    ("1.02.02", "Investimentos", (), None),
+    ("1.02.03", "Imobilizado", ("1.02.03.01", "1.02.03.02"), "1.02.03.01"),
+    ("1.02.03.01", "Imobilizado Bruto", (), None),
+    ("1.02.03.02", "(-) Depreciação Acumulada", (), None),
+    ("1.02.04", "Intangível", (), None),
+    ("1.02.09", "Outros Ativos Não Circulantes", (), None),
+
+    # Passivo e PL
+    ("2", "Passivo Total", ("2.01", "2.02", "2.03"), None),
+    ("2.01", "Passivo Circulante", (
+        "2.01.01", "2.01.02", "2.01.03", "2.01.04", "2.01.05", "2.01.06",
+    ), "2.01.05"),
+    ("2.01.01", "Obrigações Sociais e Trabalhistas", (), None),
+    ("2.01.02", "Fornecedores", (), None),
+    ("2.01.03", "Obrigações Fiscais", (), None),
+    ("2.01.04", "Empréstimos e Financiamentos CP", (), None),
+    ("2.01.05", "Outras Obrigações CP", (), None),
+    ("2.01.06", "Provisões CP", (), None),
+    ("2.02", "Passivo Não Circulante", ("2.02.01", "2.02.02", "2.02.03", "2.02.04"), "2.02.02"),
+    ("2.02.01", "Empréstimos e Financiamentos LP", (), None),
+    ("2.02.02", "Outras Obrigações LP", (), None),
+    ("2.02.03", "Tributos Diferidos", (), None),
+    ("2.02.04", "Provisões LP", (), None),
+    ("2.03", "Patrimônio Líquido", (
+        "2.03.01", "2.03.02", "2.03.04", "2.03.05", "2.03.06", "2.03.08",
+    ), "2.03.08"),
+    ("2.03.01", "Capital Social Realizado", (), None),
+    ("2.03.02", "Reservas de Capital", (), None),
+    ("2.03.04", "Reservas de Lucros", (), None),
+    ("2.03.05", "Lucros/Prejuízos Acumulados", (), None),
+    ("2.03.06", "Ajustes de Avaliação Patrimonial", (), None),
+    ("2.03.08", "Outros Resultados Abrangentes", (), None),
+
+    # DRE
+    ("3.01", "Receita Líquida", ("3.01.01", "3.01.02"), "3.01.01"),
+    ("3.01.01", "Receita Bruta", (), None),
+    ("3.01.02", "(-) Deduções da Receita", (), None),
+    ("3.02", "(-) Custo dos Bens e/ou Serviços Vendidos", (), None),
+    ("3.03", "Resultado Bruto", ("3.01", "3.02"), "3.02"),
+    ("3.04", "Despesas/Receitas Operacionais", (
+        "3.04.01", "3.04.02", "3.04.04", "3.04.05", "3.04.06",
+    ), "3.04.05"),
+    ("3.04.01", "(-) Despesas com Vendas", (), None),
+    ("3.04.02", "(-) Despesas Gerais e Administrativas", (), None),
+    ("3.04.04", "Outras Receitas Operacionais", (), None),
+    ("3.04.05", "(-) Outras Despesas Operacionais", (), None),
+    ("3.04.06", "Resultado de Equivalência Patrimonial", (), None),
+    ("3.05", "Resultado Antes do Resultado Financeiro e dos Tributos (EBIT)", ("3.03", "3.04"), "3.04.05"),
+    ("3.06", "Resultado Financeiro", ("3.06.01", "3.06.02"), "3.06.01"),
+    ("3.06.01", "Receitas Financeiras", (), None),
+    ("3.06.02", "(-) Despesas Financeiras", (), None),
+    ("3.07", "Resultado Antes dos Tributos sobre o Lucro (LAIR)", ("3.05", "3.06"), "3.06.01"),
+    ("3.08", "(-) IR/CS sobre o Lucro", (), None),
+    ("3.10", "Resultado de Operações Descontinuadas", (), None),
+    ("3.11", "Lucro/Prejuízo do Período", ("3.07", "3.08", "3.10"), "3.08"),
+
+    # DFC
+    ("6.01", "Caixa Líquido das Atividades Operacionais", (), None),
+    ("6.02", "Caixa Líquido das Atividades de Investimento", (), None),
+    ("6.03", "Caixa Líquido das Atividades de Financiamento", (), None),
+    ("6.05", "Aumento (Redução) de Caixa e Equivalentes", ("6.01", "6.02", "6.03"), None),
+
+    # Memória de cálculo (fora da DFP padronizada)
+    ("M.01", "Depreciação e Amortização", (), None),
+    ("M.02", "EBITDA", ("3.05", "M.01"), "M.01"),
+)
+
+# Subtotais que só existem se todos os componentes forem conhecidos
+SUBTOTAIS_ESTRITOS = ("6.05", "M.02")
+
+CODIGOS = tuple(codigo for codigo, _, _, _ in PLANO_CONTAS)
+NOMES = {codigo: nome for codigo, nome, _, _ in PLANO_CONTAS}
+INDICE = {codigo: i for i, codigo in enumerate(CODIGOS)}
+COMPONENTES = {codigo: componentes for codigo, _, componentes, _ in PLANO_CONTAS}
+RESIDUOS = {codigo: residuo for codigo, _, _, residuo in PLANO_CONTAS if residuo}
+FOLHAS = tuple(codigo for codigo in CODIGOS if not COMPONENTES[codigo])
+SUBTOTAIS = tuple(codigo for codigo in CODIGOS if COMPONENTES[codigo])
+
+
+def _expandir(codigo):
+    """Folhas (com multiplicidade) que compõem uma conta."""
+    if not COMPONENTES[codigo]:
+        return [codigo]
+    return [folha for componente in COMPONENTES[codigo] for folha in _expandir(componente)]
+
+
+def _montar_matriz_agregacao():
+    """Matriz (contas × contas): linha i = coeficientes das folhas que somam na conta i."""
+    matriz = np.zeros((len(CODIGOS), len(CODIGOS)))
+    for codigo in CODIGOS:
+        for folha in _expandir(codigo):
+            matriz[INDICE[codigo], INDICE[folha]] += 1.0
+    return matriz
+
+
+def _ordem_topologica():
+    """Subtotais ordenados de forma que componentes venham antes do total."""
+    ordem = []
+
+    def visitar(codigo):
+        for componente in COMPONENTES[codigo]:
+            visitar(componente)
+        if COMPONENTES[codigo] and codigo not in ordem:
+            ordem.append(codigo)
+
+    for codigo in SUBTOTAIS:
+        visitar(codigo)
+    return tuple(ordem)
+
+
+def _cadeia_residuo(codigo):
+    """Subtotais intermediários entre um subtotal e sua conta de resíduo."""
+    def caminho(atual, alvo):
+        if atual == alvo:
+            return []
+        for componente in COMPONENTES[atual]:
+            resto = caminho(componente, alvo)
+            if resto is not None:
+                return [componente] + resto
+        return None
+
+    return tuple(caminho(codigo, RESIDUOS[codigo])[:-1])
+
+
+MATRIZ_AGREGACAO = _montar_matriz_agregacao()
+USO_FOLHAS = (MATRIZ_AGREGACAO != 0).astype(np.float64)
+ORDEM_SUBTOTAIS = _ordem_topologica()
+CADEIAS_RESIDUO = {codigo: _cadeia_residuo(codigo) for codigo in RESIDUOS}
+
+# Projeção do plano de contas nas contas do motor de indicadores
+# (custos e despesas financeiras entram no motor com sinal positivo)
+CONTAS_INDICADORES = {
+    "receita": ("3.01", 1), "cmv": ("3.02", -1), "lucro_bruto": ("3.03", 1),
+    "ebitda": ("M.02", 1), "ebit": ("3.05", 1), "desp_financeiras": ("3.06.02", -1),
+    "lair": ("3.07", 1), "lucro_liquido": ("3.11", 1), "fco": ("6.01", 1),
+    "caixa": ("1.01.01", 1), "clientes": ("1.01.03", 1), "estoques": ("1.01.04", 1),
+    "ativo_circulante": ("1.01", 1), "imobilizado": ("1.02.03", 1), "ativo_total": ("1", 1),
+    "fornecedores": ("2.01.02", 1), "emprestimos_cp": ("2.01.04", 1),
+    "passivo_circulante": ("2.01", 1), "emprestimos_lp": ("2.02.01", 1),
+    "passivo_nao_circ": ("2.02", 1), "pl": ("2.03", 1),
+}
+COLUNAS_INDICADORES = np.array([INDICE[CONTAS_INDICADORES[conta][0]] for conta in CONTAS])
+SINAIS_INDICADORES = np.array([CONTAS_INDICADORES[conta][1] for conta in CONTAS], dtype=np.float64)
+
+# =============================================================================
+# 2. RÓTULOS DAS BASES DOS MÓDULOS
+# =============================================================================
+# Rótulo (ou chave) → lista de (código, sinal). Bases que já trazem despesas
+# negativas usam sinal 1; as que trazem valores absolutos usam -1.
+ROTULOS = {
+    # Chaves planas (módulos 11, 12, 14 e 15)
+    "receita": [("3.01", 1)],
+    "cmv": [("3.02", -1)],
+    "lucro_bruto": [("3.03", 1)],
+    "desp_operacionais": [("3.04", -1)],
+    "desp_comerciais": [("3.04.01", -1)],
+    "desp_vendas": [("3.04.01", -1)],
+    "desp_administrativas": [("3.04.02", -1)],
+    "desp_admin": [("3.04.02", -1)],
+    "ebitda": [("M.02", 1)],
+    "depreciacao": [("M.01", 1)],
+    "ebit": [("3.05", 1)],
+    "desp_financeiras": [("3.06.02", -1)],
+    "desp_fin": [("3.06.02", -1)],
+    "receitas_fin": [("3.06.01", 1)],
+    "lair": [("3.07", 1)],
+    "ir": [("3.08", -1)],
+    "lucro_liquido": [("3.11", 1)],
+    "ll": [("3.11", 1)],
+    "fco": [("6.01", 1)],
+    "fci": [("6.02", 1)],
+    "fcf": [("6.03", 1)],
+    "caixa": [("1.01.01", 1)],
+    "clientes": [("1.01.03", 1)],
+    "estoques": [("1.01.04", 1)],
+    "ativo_circulante": [("1.01", 1)],
+    "imobilizado": [("1.02.03", 1)],
+    "ativo_total": [("1", 1)],
+    "ativo": [("1", 1)],
+    "fornecedores": [("2.01.02", 1)],
+    "emprestimos_cp": [("2.01.04", 1)],
+    "adiantamentos": [("2.01.05", 1)],
+    "passivo_circulante": [("2.01", 1)],
+    "emprestimos_lp": [("2.02.01", 1)],
+    "passivo_nao_circ": [("2.02", 1)],
+    "pl": [("2.03", 1)],
+    "patrimonio_liquido": [("2.03", 1)],
+
+    # Balanços com rótulos (módulos 4, 6 e 7)
+    "Caixa": [("1.01.01", 1)],
+    "Caixa e Equivalentes": [("1.01.01", 1)],
+    "Aplicações Financeiras": [("1.01.02", 1)],
+    "Contas a Receber": [("1.01.03", 1)],
+    "Clientes": [("1.01.03", 1)],
+    "(-) PCLD": [("1.01.03", 1)],
+    "Estoques": [("1.01.04", 1)],
+    "Impostos a Recuperar": [("1.01.06", 1)],
+    "Despesas Antecipadas": [("1.01.07", 1)],
+    "Outros Ativos Circulantes": [("1.01.08", 1)],
+    "Realizável LP": [("1.02.01", 1)],
+    "Créditos com Partes Relacionadas": [("1.02.01", 1)],
+    "Depósitos Judiciais": [("1.02.01", 1)],
+    "Investimentos": [("1.02.02", 1)],
+    "Participações Societárias": [("1.02.02", 1)],
+    "Imobilizado Líquido": [("1.02.03", 1)],
+    "Imobilizado Bruto": [("1.02.03.01", 1)],
+    "Terrenos": [("1.02.03.01", 1)],
+    "Edificações": [("1.02.03.01", 1)],
+    "Máquinas e Equipamentos": [("1.02.03.01", 1)],
+    "Depreciação Acumulada": [("1.02.03.02", 1)],
+    "(-) Depreciação Acumulada": [("1.02.03.02", 1)],
+    "Intangível": [("1.02.04", 1)],
+    "Marcas e Patentes": [("1.02.04", 1)],
+    "Softwares": [("1.02.04", 1)],
+    "(-) Amortização Acumulada": [("1.02.04", 1)],
+    "Total Ativo": [("1", 1)],
+    "Salários a Pagar": [("2.01.01", 1)],
+    "Salários e Encargos": [("2.01.01", 1)],
+    "Fornecedores": [("2.01.02", 1)],
+    "Impostos a Pagar": [("2.01.03", 1)],
+    "Empréstimos CP": [("2.01.04", 1)],
+    "Dividendos a Pagar": [("2.01.05", 1)],
+    "Outras Obrigações CP": [("2.01.05", 1)],
+    "Provisões CP": [("2.01.06", 1)],
+    "Empréstimos LP": [("2.02.01", 1)],
+    "Debêntures": [("2.02.01", 1)],
+    "Impostos Diferidos": [("2.02.03", 1)],
+    "Provisões LP": [("2.02.04", 1)],
+    "Capital Social": [("2.03.01", 1)],
+    "Reservas de Capital": [("2.03.02", 1)],
+    "Reservas de Lucros": [("2.03.04", 1)],
+    "Lucros Acumulados": [("2.03.05", 1)],
+    "Ajustes de Avaliação": [("2.03.06", 1)],
+    "Total Passivo + PL": [("2", 1)],
+
+    # DREs com rótulos (módulos 5, 6 e 7) — despesas já negativas
+    "Receita Bruta": [("3.01.01", 1)],
+    "(-) Deduções": [("3.01.02", 1)],
+    "Receita Líquida": [("3.01", 1)],
+    "CMV": [("3.02", 1)],
+    "(-) CMV": [("3.02", 1)],
+    "Lucro Bruto": [("3.03", 1)],
+    "(-) Despesas Operacionais": [("3.04", 1)],
+    "Vendas": [("3.04.01", 1)],
+    "(-) Despesas com Vendas": [("3.04.01", 1)],
+    "Administrativas": [("3.04.02", 1)],
+    "(-) Despesas Administrativas": [("3.04.02", 1)],
+    "Outras": [("3.04.05", 1)],
+    "(-) Outras Despesas Operacionais": [("3.04.05", 1)],
+    "Despesas Operacionais": [("3.04.05", 1)],
+    "Depreciação": [("3.04.05", 1), ("M.01", -1)],
+    "Resultado Operacional (EBIT)": [("3.05", 1)],
+    "EBIT": [("3.05", 1)],
+    "(+) Receitas Financeiras": [("3.06.01", 1)],
+    "Despesas Financeiras": [("3.06.02", 1)],
+    "(-) Despesas Financeiras": [("3.06.02", 1)],
+    "Resultado Antes IR/CS": [("3.07", 1)],
+    "LAIR": [("3.07", 1)],
+    "IR/CS": [("3.08", 1)],
+    "(-) IR/CS": [("3.08", 1)],
+    "Lucro Líquido": [("3.11", 1)],
+}
+
+
+def resolver_subtotais(folhas):
+    """
+    Valores de todas as contas a partir das folhas (NaN = não informada).
+
+    Os subtotais saem de uma única multiplicação pela matriz de agregação;
+    a máscara de contas conhecidas segue o mesmo caminho.
+    """
+    conhecidas = ~np.isnan(folhas)
+    valores = np.where(conhecidas, folhas, 0.0) @ MATRIZ_AGREGACAO.T
+    definidas = (conhecidas @ USO_FOLHAS.T) > 0
+    for codigo in SUBTOTAIS_ESTRITOS:
+        componentes = [INDICE[c] for c in COMPONENTES[codigo]]
+        definidas[..., INDICE[codigo]] = definidas[..., componentes].all(axis=-1)
+    valores[~definidas] = np.nan
+    return valores
+
+
+def achatar(registro):
+    """Itera (rótulo, valor) das folhas numéricas de um dicionário aninhado."""
+    for rotulo, valor in registro.items():
+        if isinstance(valor, dict) or hasattr(valor, "items"):
+            yield from achatar(valor)
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            yield str(rotulo).strip(), valor
+
+
+# =============================================================================
+# 3. DEMONSTRAÇÕES
+# =============================================================================
+class Demonstracoes:
+    """
+    Tabela colunar de demonstrações: entidades × períodos × contas.
+
+    `valores` é um único array float64 C-contíguo (somente leitura); as
+    linhas de subtotal já vêm resolvidas pela matriz de agregação.
+    Contas não informadas (e combinações entidade/período sem dados)
+    ficam com NaN.
+    """
+
+    def __init__(self, entidades, periodos, valores, divergencias=(), ignorados=()):
+        self.entidades = tuple(entidades)
+        self.periodos = tuple(periodos)
+        self.valores = np.ascontiguousarray(valores, dtype=np.float64)
+        self.valores.flags.writeable = False
+        self.divergencias = tuple(divergencias)
+        self.ignorados = frozenset(ignorados)
+        self._pos_entidade = {e: i for i, e in enumerate(self.entidades)}
+        self._pos_periodo = {p: i for i, p in enumerate(self.periodos)}
+
+    @classmethod
+    def de_folhas(cls, entidades, periodos, folhas):
+        """
+        Cria a tabela a partir das contas folha (entidades × períodos ×
+        len(CODIGOS); posições de subtotal e contas ausentes com NaN).
+
+        Caminho em massa: os subtotais saem de uma única multiplicação
+        matricial, sem laço por empresa-período.
+        """
+        return cls(entidades, periodos, resolver_subtotais(np.asarray(folhas, dtype=np.float64)))
+
+    def conta(self, codigo):
+        """Valores de uma conta (entidades × períodos)."""
+        return self.valores[..., INDICE[codigo]]
+
+    def registro(self, entidade, periodo):
+        """Dicionário código → valor de uma entidade em um período."""
+        linha = self.valores[self._pos_entidade[entidade], self._pos_periodo[periodo]]
+        return dict(zip(CODIGOS, linha.tolist()))
+
+    def tabela_indicadores(self):
+        """Projeção nas contas do motor de indicadores (... × len(CONTAS))."""
+        return self.valores[..., COLUNAS_INDICADORES] * SINAIS_INDICADORES
+
+    def indicadores(self):
+        """Todos os indicadores, cada um como array entidades × períodos."""
+        return calcular_indicadores(self.tabela_indicadores())
+
+    def indicadores_por_periodo(self, entidade):
+        """Indicadores de uma entidade: {período: {indicador: valor}}."""
+        i = self._pos_entidade[entidade]
+        ind = self.indicadores()
+        return {
+            periodo: {nome: float(valores[i, j]) for nome, valores in ind.items()}
+            for j, periodo in enumerate(self.periodos)
+        }
+
+
+def conciliar(registro):
+    """
+    Converte um registro (dicionário, possivelmente aninhado) nas contas folha.
+
+    As chaves podem ser rótulos de ROTULOS ou códigos do plano de contas.
+    Subtotais informados são conferidos com a soma das contas abertas: a
+    diferença vai para a conta de resíduo do subtotal (ex.: "Outros Ativos
+    Circulantes") se nenhum subtotal intermediário também foi informado;
+    caso contrário é devolvida como divergência.
+
+    Retorna (folhas, divergências, rótulos ignorados), onde divergências é
+    uma lista de (código, valor informado, soma das contas).
+    """
+    folhas, informados, divergencias, ignorados = {}, {}, [], []
+    for rotulo, valor in achatar(registro):
+        destinos = ROTULOS.get(rotulo) or ([(rotulo, 1)] if rotulo in INDICE else None)
+        if destinos is None:
+            ignorados.append(rotulo)
+            continue
+        for codigo, sinal in destinos:
+            if COMPONENTES[codigo]:
+                informados[codigo] = informados.get(codigo, 0.0) + sinal * valor
+            else:
+                folhas[codigo] = folhas.get(codigo, 0.0) + sinal * valor
+
+    linha = np.full(len(CODIGOS), np.nan)
+    for codigo, valor in folhas.items():
+        linha[INDICE[codigo]] = valor
+
+    for codigo in ORDEM_SUBTOTAIS:
+        if codigo not in informados:
+            continue
+        i = INDICE[codigo]
+        conhecidas = ~np.isnan(linha)
+        diferenca = informados[codigo] - MATRIZ_AGREGACAO[i] @ np.where(conhecidas, linha, 0.0)
+        # Subtotal informado sem nenhuma conta aberta também vai ao resíduo
+        aberto = (USO_FOLHAS[i] @ conhecidas) > 0
+        if abs(diferenca) <= TOLERANCIA and aberto:
+            continue
+        residuo = RESIDUOS.get(codigo)
+        if residuo and not any(c in informados for c in CADEIAS_RESIDUO[codigo]):
+            j = INDICE[residuo]
+            linha[j] = (0.0 if np.isnan(linha[j]) else linha[j]) + diferenca
+        elif abs(diferenca) > TOLERANCIA:
+            divergencias.append((codigo, informados[codigo], informados[codigo] - diferenca))
+
+    return linha, divergencias, ignorados
+
+
+def carregar_demonstracoes(registros):
+    """
+    Carrega registros {(entidade, período): dicionário de contas} no modelo.
+
+    Cada registro passa por `conciliar`; as divergências ficam em
+    `divergencias` como (entidade, período, código, valor informado, soma
+    das contas).
+    """
+    entidades = list(dict.fromkeys(entidade for entidade, _ in registros))
+    periodos = list(dict.fromkeys(periodo for _, periodo in registros))
+    pos_e = {e: i for i, e in enumerate(entidades)}
+    pos_p = {p: i for i, p in enumerate(periodos)}
+
+    folhas = np.full((len(entidades), len(periodos), len(CODIGOS)), np.nan)
+    divergencias, ignorados = [], set()
+
+    for (entidade, periodo), registro in registros.items():
+        linha, divergentes, desconhecidos = conciliar(registro)
+        folhas[pos_e[entidade], pos_p[periodo]] = linha
+        divergencias.extend((entidade, periodo) + d for d in divergentes)
+        ignorados.update(desconhecidos)
+
+    return Demonstracoes(
+        entidades, periodos, resolver_subtotais(folhas),
+        divergencias=divergencias, ignorados=ignorados,
+    )
@@ -0,0 +1,344 @@
+"""
+Motor de Depreciação
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Cronogramas de depreciação de registros inteiros de ativos imobilizados,
+num único passe vetorizado (NumPy):
+- Métodos linear, soma dos dígitos, saldo decrescente (com troca para o
+  linear quando este passa a depreciar mais) e unidades produzidas
+- Convenções de ano cheio e de meio ano (o ativo entra em uso no meio do
+  primeiro ano e termina de depreciar no meio do ano seguinte ao fim da
+  vida útil)
+- Leitura de registros de ativos em CSV e consolidação por ano-calendário
+- Depreciação contábil vs. fiscal de uma carteira de ativos: diferenças
+  temporárias, saldo de IR/CS diferido e alíquota efetiva ano a ano
+
+Cada ativo é uma linha e cada ano de uso uma coluna: as despesas saem numa
+matriz ativos × anos e o valor contábil líquido da soma acumulada das
+despesas, limitada ao valor depreciável (custo − valor residual).
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from indicadores_laboratorio import ALIQUOTA_IR_CS, dividir
+from perfil_laboratorio import instrumentar
+
+# Métodos aceitos (código → rótulo exibido nos módulos)
+METODOS = {
+    "linear": "Linear",
+    "soma_digitos": "Acelerada (Soma dos Dígitos)",
+    "saldo_decrescente": "Saldo Decrescente",
+    "unidades": "Unidades Produzidas",
+}
+
+# Convenções do primeiro ano de uso
+CONVENCOES = {"ano_cheio": "Ano cheio", "meio_ano": "Meio ano"}
+
+# Múltiplo da taxa linear no saldo decrescente (2 = saldo duplamente decrescente)
+FATOR_SALDO = 2.0
+
+# Colunas obrigatórias de um registro em CSV; as produções anuais do método
+# de unidades vêm em colunas producao_1, producao_2, ...
+COLUNAS_REGISTRO = ("custo", "vida_util")
+
+
+# =============================================================================
+# 1. CRONOGRAMA
+# =============================================================================
+@instrumentar("calculo")
+def calcular_cronograma(custo, residual, vida_util, metodo="linear", producao=None,
+                        convencao="ano_cheio", fator_saldo=FATOR_SALDO):
+    """
+    Depreciação e valor contábil líquido de cada ativo em cada ano de uso.
+
+    `custo`, `residual`, `vida_util` (anos inteiros) e `metodo` (código de
+    METODOS) são escalares ou arrays com um valor por ativo. `producao` é a
+    produção de cada ano (ativos × anos, ou um único perfil para todos) e só
+    é exigida pelos ativos do método de unidades, que seguem a produção
+    informada em qualquer convenção.
+
+    Retorna (depreciacao, valor_contabil), matrizes ativos × anos; o valor
+    contábil é o do fim de cada ano.
+    """
+    custo, residual, vida_util, metodo = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(custo, dtype=np.float64)),
+        np.atleast_1d(np.asarray(residual, dtype=np.float64)),
+        np.atleast_1d(np.asarray(vida_util, dtype=np.float64)),
+        np.atleast_1d(np.asarray(metodo)),
+    )
+    desconhecidos = sorted(set(np.unique(metodo).tolist()) - set(METODOS))
+    if desconhecidos:
+        raise ValueError(f"Método(s) de depreciação desconhecido(s): {', '.join(desconhecidos)}")
+    if convencao not in CONVENCOES:
+        raise ValueError(f"Convenção desconhecida: {convencao}")
+    if (vida_util < 1).any() or (vida_util != np.round(vida_util)).any():
+        raise ValueError("A vida útil deve ser um número inteiro de anos, a partir de 1")
+    if (residual < 0).any() or (residual > custo).any():
+        raise ValueError("O valor residual deve estar entre zero e o custo do ativo")
+
+    unidades = metodo == "unidades"
+    if unidades.any():
+        if producao is None:
+            raise ValueError("O método de unidades produzidas exige a produção de cada ano")
+        producao = np.atleast_2d(np.asarray(producao, dtype=np.float64))
+        producao = np.broadcast_to(producao, (len(custo), producao.shape[1]))
+
+    meio_ano = convencao == "meio_ano"
+    horizonte = int(vida_util.max()) + meio_ano if len(custo) else 0
+    if unidades.any():
+        horizonte = max(horizonte, producao.shape[1])
+
+    ano = np.arange(1, horizonte + 1)
+    base = (custo - residual)[:, np.newaxis]
+    vida = vida_util[:, np.newaxis]
+    em_uso = ano <= vida
+    depreciacao = np.zeros((len(custo), horizonte))
+
+    linear = metodo == "linear"
+    depreciacao[linear] = np.where(em_uso[linear], base[linear] / vida[linear], 0.0)
+
+    digitos = metodo == "soma_digitos"
+    v = vida[digitos]
+    depreciacao[digitos] = np.where(em_uso[digitos], base[digitos] * (v - ano + 1) / (v * (v + 1) / 2), 0.0)
+
+    saldo = metodo == "saldo_decrescente"
+    if saldo.any():
+        depreciacao[saldo] = saldo_decrescente(
+            custo[saldo], residual[saldo], vida[saldo], ano, fator_saldo
+        )
+
+    if unidades.any():
+        perfil = producao[unidades]
+        total = perfil.sum(axis=1, keepdims=True)
+        if (total <= 0).any():
+            raise ValueError("A produção total de cada ativo do método de unidades deve ser positiva")
+        depreciacao[unidades, :perfil.shape[1]] = base[unidades] * perfil / total
+
+    if meio_ano:
+        # O ano-calendário t reúne a segunda metade do ano de uso t − 1 e a primeira do ano t
+        por_tempo = ~unidades
+        anterior = np.zeros_like(depreciacao[por_tempo])
+        anterior[:, 1:] = depreciacao[por_tempo, :-1]
+        depreciacao[por_tempo] = (depreciacao[por_tempo] + anterior) / 2
+
+    # Soma acumulada limitada ao valor depreciável: nenhum método passa do residual
+    acumulada = np.minimum(np.cumsum(depreciacao, axis=1), base)
+    depreciacao = np.diff(acumulada, axis=1, prepend=0.0)
+    return depreciacao, custo[:, np.newaxis] - acumulada
+
+
+def saldo_decrescente(custo, residual, vida, ano, fator_saldo):
+    """
+    Saldo decrescente com troca para o linear (ativos × anos de uso).
+
+    A cada ano, deprecia-se `fator_saldo / vida` do saldo; quando o linear
+    sobre o saldo restante passa a ser maior, o método troca para ele até o
+    fim da vida útil.
+    """
+    taxa = np.minimum(fator_saldo / vida, 1.0)
+    saldo_inicial = custo[:, np.newaxis] * (1 - taxa) ** (ano - 1)
+    declinante = saldo_inicial * taxa
+    restantes = np.maximum(vida - ano + 1, 1)
+    linear = (saldo_inicial - residual[:, np.newaxis]) / restantes
+
+    trocou = np.logical_or.accumulate(linear >= declinante, axis=1)
+    primeira = np.argmax(trocou, axis=1)
+    parcela_linear = linear[np.arange(len(custo)), primeira][:, np.newaxis]
+    depreciacao = np.where(trocou, parcela_linear, declinante)
+    return np.where(ano <= vida, depreciacao, 0.0)
+
+
+def consolidar_por_ano(depreciacao, custo, ano_aquisicao=None):
+    """
+    Totais de um registro por ano-calendário.
+
+    Cada ativo começa a depreciar no seu `ano_aquisicao` (sem ele, todos no
+    ano 1). Retorna (anos, despesa de depreciação, valor contábil líquido
+    do registro no fim de cada ano).
+    """
+    custo = np.asarray(custo, dtype=np.float64)
+    if ano_aquisicao is None:
+        ano_aquisicao = np.ones(len(custo), dtype=np.int64)
+    ano_aquisicao = np.asarray(ano_aquisicao, dtype=np.int64)
+    inicio = int(ano_aquisicao.min())
+    deslocamento = ano_aquisicao - inicio
+    n_anos = int(deslocamento.max()) + depreciacao.shape[1]
+
+    coluna = deslocamento[:, np.newaxis] + np.arange(depreciacao.shape[1])
+    despesa = np.bincount(coluna.ravel(), weights=depreciacao.ravel(), minlength=n_anos)
+    adquirido = np.cumsum(np.bincount(deslocamento, weights=custo, minlength=n_anos))
+    return np.arange(inicio, inicio + n_anos), despesa, adquirido - np.cumsum(despesa)
+
+
+# =============================================================================
+# 2. REGISTROS DE ATIVOS
+# =============================================================================
+def ler_registro(arquivo):
+    """
+    Lê um registro de ativos em CSV (caminho ou arquivo enviado).
+
+    Colunas: custo e vida_util (obrigatórias); residual, metodo (código de
+    METODOS; padrão linear), descricao, ano_aquisicao e producao_1,
+    producao_2, ... (opcionais). Aceita vírgula ou ponto e vírgula como
+    separador; com ponto e vírgula, a vírgula é o separador decimal.
+    Retorna o registro colunar (dicionário coluna → array).
+    """
+    if hasattr(arquivo, "getvalue"):
+        conteudo = arquivo.getvalue()
+    else:
+        with open(arquivo, "rb") as f:
+            conteudo = f.read()
+    try:
+        texto = conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = conteudo.decode("latin-1")
+    cabecalho = texto.split("\n", 1)[0]
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    tabela = pd.read_csv(io.StringIO(texto), sep=separador, decimal="," if separador == ";" else ".")
+    tabela.columns = [str(coluna).strip().lower() for coluna in tabela.columns]
+
+    faltantes = [coluna for coluna in COLUNAS_REGISTRO if coluna not in tabela.columns]
+    if faltantes:
+        raise ValueError(f"Coluna(s) obrigatória(s) ausente(s) no registro: {', '.join(faltantes)}")
+    if tabela.empty:
+        raise ValueError("O registro de ativos está vazio")
+
+    def numerica(coluna, padrao=None):
+        if coluna not in tabela.columns:
+            return None if padrao is None else np.full(len(tabela), padrao, dtype=np.float64)
+        valores = pd.to_numeric(tabela[coluna], errors="coerce").to_numpy(dtype=np.float64)
+        if np.isnan(valores).any():
+            linha = int(np.flatnonzero(np.isnan(valores))[0]) + 2
+            raise ValueError(f"Valor inválido na coluna {coluna}, linha {linha} do arquivo")
+        return valores
+
+    colunas_producao = sorted(
+        (coluna for coluna in tabela.columns if coluna.startswith("producao_")),
+        key=lambda coluna: int(coluna.rsplit("_", 1)[1]) if coluna.rsplit("_", 1)[1].isdigit() else 0,
+    )
+    registro = {
+        "descricao": (tabela["descricao"].astype(str).to_numpy() if "descricao" in tabela.columns
+                      else np.array([f"Ativo {i + 1}" for i in range(len(tabela))])),
+        "custo": numerica("custo"),
+        "residual": numerica("residual", 0.0),
+        "vida_util": numerica("vida_util"),
+        "metodo": (tabela["metodo"].astype(str).str.strip().str.lower().to_numpy() if "metodo" in tabela.columns
+                   else np.full(len(tabela), "linear")),
+        "ano_aquisicao": numerica("ano_aquisicao"),
+        "producao": (tabela[colunas_producao].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+                     if colunas_producao else None),
+    }
+    return registro
+
+
+def registro_exemplo(n_ativos=100_000, semente=0):
+    """Registro sintético (máquinas, veículos, equipamentos e edificações) para demonstrações."""
+    gerador = np.random.default_rng(semente)
+    classes = np.array(["Máquina", "Veículo", "Equipamento de TI", "Edificação"])
+    vidas = np.array([10, 5, 5, 25])
+    classe = gerador.integers(0, len(classes), n_ativos)
+    custo = np.round(gerador.lognormal(11, 1.2, n_ativos), 2)
+    metodo = gerador.choice(list(METODOS), n_ativos, p=[0.55, 0.15, 0.2, 0.1])
+    vida_util = vidas[classe]
+    # Produção anual decrescente com ruído, suficiente para a vida útil mais longa
+    producao = np.maximum(
+        gerador.normal(1000, 150, (n_ativos, vidas.max())) * np.linspace(1.2, 0.6, vidas.max()), 1.0
+    )
+    producao[np.arange(vidas.max()) >= vida_util[:, np.newaxis]] = 0.0
+    return {
+        "descricao": np.char.add(classes[classe], np.char.mod(" #%06d", np.arange(1, n_ativos + 1))),
+        "custo": custo,
+        "residual": np.round(custo * gerador.uniform(0, 0.2, n_ativos), 2),
+        "vida_util": vida_util.astype(np.float64),
+        "metodo": metodo,
+        "ano_aquisicao": gerador.integers(2015, 2025, n_ativos).astype(np.float64),
+        "producao": producao,
+    }
+
+
+# =============================================================================
+# 3. DEPRECIAÇÃO FISCAL E TRIBUTOS DIFERIDOS
+# =============================================================================
+def acumulada_por_ano(custo, valor_contabil, ano_aquisicao, n_anos):
+    """
+    Depreciação acumulada de cada ativo no fim dos anos 1..n_anos (ativos × anos).
+
+    O cronograma de cada ativo (em anos de uso) é deslocado para o seu ano
+    de aquisição; antes dele o acumulado é zero e, depois do fim do
+    cronograma, fica no último valor.
+    """
+    acumulada = custo[:, np.newaxis] - valor_contabil
+    uso = np.arange(n_anos) - (ano_aquisicao[:, np.newaxis] - 1)
+    indice = np.clip(uso, 0, acumulada.shape[1] - 1)
+    return np.where(uso >= 0, np.take_along_axis(acumulada, indice, axis=1), 0.0)
+
+
+@instrumentar("calculo")
+def simular_tributos_diferidos(custo, residual, vida_contabil, metodo_contabil, vida_fiscal,
+                               resultado_antes_depreciacao, ano_aquisicao=1, n_anos=None,
+                               aliquota=ALIQUOTA_IR_CS, convencao="ano_cheio", producao=None):
+    """
+    Depreciação contábil e fiscal de uma carteira de ativos, lado a lado.
+
+    Cada ativo (arrays ou escalares, um valor por ativo) deprecia no
+    balanço pelo seu método e vida útil contábil, e no fisco pelo linear
+    sobre o custo integral, na vida útil fiscal (taxas da Receita). A
+    diferença entre as depreciações acumuladas é temporária: gera um ativo
+    fiscal diferido quando o balanço deprecia mais rápido que o fisco e um
+    passivo no caso contrário, revertido ao longo da vida (o que resta
+    sobre o valor residual se realiza na baixa do ativo).
+
+    `resultado_antes_depreciacao` é o resultado anual (escalar ou um valor
+    por ano) antes de toda a depreciação da carteira. Retorna um dicionário
+    de arrays por ano (1..n_anos): depreciações, LAIR, lucro tributável,
+    IR/CS corrente, diferido e total, diferença temporária acumulada, saldo
+    diferido (positivo = ativo, negativo = passivo) e as alíquotas efetivas
+    (%) só com o corrente e com o diferido.
+    """
+    custo, residual, vida_contabil, vida_fiscal, ano_aquisicao = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(custo, dtype=np.float64)),
+        np.atleast_1d(np.asarray(residual, dtype=np.float64)),
+        np.atleast_1d(np.asarray(vida_contabil, dtype=np.float64)),
+        np.atleast_1d(np.asarray(vida_fiscal, dtype=np.float64)),
+        np.atleast_1d(np.asarray(ano_aquisicao, dtype=np.int64)),
+    )
+    if (ano_aquisicao < 1).any():
+        raise ValueError("O ano de aquisição deve ser a partir do ano 1")
+
+    _, contabil = calcular_cronograma(custo, residual, vida_contabil, metodo_contabil, producao, convencao)
+    _, fiscal = calcular_cronograma(custo, 0.0, vida_fiscal, "linear", convencao=convencao)
+    if n_anos is None:
+        n_anos = int(ano_aquisicao.max()) - 1 + max(contabil.shape[1], fiscal.shape[1])
+
+    acumulada_contabil = acumulada_por_ano(custo, contabil, ano_aquisicao, n_anos)
+    acumulada_fiscal = acumulada_por_ano(custo, fiscal, ano_aquisicao, n_anos)
+    dep_contabil = np.diff(acumulada_contabil.sum(axis=0), prepend=0.0)
+    dep_fiscal = np.diff(acumulada_fiscal.sum(axis=0), prepend=0.0)
+    # Base fiscal − base contábil = depreciação contábil acumulada − fiscal acumulada
+    diferenca = (acumulada_contabil - acumulada_fiscal).sum(axis=0)
+
+    resultado = np.broadcast_to(np.asarray(resultado_antes_depreciacao, dtype=np.float64), (n_anos,))
+    lair = resultado - dep_contabil
+    lucro_tributavel = resultado - dep_fiscal
+    saldo_diferido = aliquota * diferenca
+    ir_corrente = aliquota * lucro_tributavel
+    # Aumento do ativo diferido reduz a despesa; aumento do passivo a eleva
+    ir_diferido = -np.diff(saldo_diferido, prepend=0.0)
+    ir_total = ir_corrente + ir_diferido
+    return {
+        "ano": np.arange(1, n_anos + 1),
+        "dep_contabil": dep_contabil,
+        "dep_fiscal": dep_fiscal,
+        "lair": lair,
+        "lucro_tributavel": lucro_tributavel,
+        "ir_corrente": ir_corrente,
+        "ir_diferido": ir_diferido,
+        "ir_total": ir_total,
+        "diferenca_temporaria": diferenca,
+        "saldo_diferido": saldo_diferido,
+        "aliquota_corrente": dividir(ir_corrente, lair) * 100,
+        "aliquota_efetiva": dividir(ir_total, lair) * 100,
+    }
@@ -0,0 +1,349 @@
+"""
+Motor da DFC pelo Método Indireto
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Reconstrução da Demonstração dos Fluxos de Caixa a partir de dois
+balanços e da DRE do período:
+- Plano declarativo: cada conta do balanço é ativo ou passivo/PL e
+  pertence a uma atividade (caixa, operacional, investimento,
+  financiamento, resultado ou total)
+- Efeito de caixa de uma conta = variação com sinal (↑ ativo consome
+  caixa, ↑ passivo/PL gera caixa), calculado para todos os pares
+  (empresa, período) num único passe sobre arrays pares × contas
+- A depreciação da DRE é somada de volta no FCO e abatida da conta de
+  contrapartida (depreciação acumulada ou imobilizado líquido), de modo
+  que o FCI mostre as aquisições
+- As contas de resultado (reservas, lucros acumulados) dão o lucro retido;
+  a diferença para o lucro do período são os dividendos e outras
+  destinações, lançados no financiamento
+- Verificações de conciliação por par: balanços fechando, totais
+  conferindo com as contas e FCO + FCI + FCF = variação do caixa
+
+Contas ausentes (NaN) contam como zero nos dois balanços.
+"""
+
+import numpy as np
+import pandas as pd
+
+from demonstracoes_laboratorio import FOLHAS, INDICE, NOMES, TOLERANCIA
+from perfil_laboratorio import instrumentar
+
+# Atividades aceitas no plano e sinal do efeito de caixa de cada natureza
+ATIVIDADES = ("caixa", "operacional", "investimento", "financiamento", "resultado", "total")
+NATUREZAS = {"ativo": -1.0, "passivo": 1.0}
+
+# Atividades cujas variações entram como linhas da DFC
+FLUXOS = ("operacional", "investimento", "financiamento")
+
+SECOES = {
+    "operacional": "Atividades Operacionais",
+    "investimento": "Atividades de Investimento",
+    "financiamento": "Atividades de Financiamento",
+}
+
+VERIFICACOES = (
+    "Balanço inicial fecha (Ativo = Passivo + PL)",
+    "Balanço final fecha (Ativo = Passivo + PL)",
+    "Totais informados conferem com as contas",
+    "FCO + FCI + FCF = variação do caixa no balanço",
+    "Lucro retido não excede o lucro do período",
+)
+
+
+# =============================================================================
+# 1. PLANO DA DFC
+# =============================================================================
+class PlanoDFC:
+    """
+    Classificação das contas do balanço para o método indireto.
+
+    `contas` é {conta: (natureza, atividade)}, com natureza "ativo" ou
+    "passivo" (passivo e PL) e atividade de ATIVIDADES; a ordem do
+    dicionário é a ordem das linhas. `lucro_liquido` e `depreciacao` são
+    as linhas da DRE usadas (a depreciação em valor absoluto) e
+    `contrapartida`, a conta que a depreciação reduz. `rotulos` traduz
+    contas em nomes de exibição (ex.: códigos CVM → nomes).
+    """
+
+    def __init__(self, contas, lucro_liquido, depreciacao=None, contrapartida=None, rotulos=None):
+        for conta, (natureza, atividade) in contas.items():
+            if natureza not in NATUREZAS:
+                raise ValueError(f"{conta}: natureza inválida: {natureza!r}")
+            if atividade not in ATIVIDADES:
+                raise ValueError(f"{conta}: atividade inválida: {atividade!r}")
+        if not any(atividade == "caixa" for _, atividade in contas.values()):
+            raise ValueError("O plano precisa de ao menos uma conta de caixa")
+        if (depreciacao is None) != (contrapartida is None):
+            raise ValueError("Depreciação e contrapartida devem ser informadas juntas")
+        if contrapartida is not None and contas.get(contrapartida, (None, None))[1] not in FLUXOS:
+            raise ValueError(f"Contrapartida da depreciação fora das atividades de fluxo: {contrapartida!r}")
+
+        self.contas = tuple(contas)
+        self.lucro_liquido = lucro_liquido
+        self.depreciacao = depreciacao
+        self.contrapartida = None if contrapartida is None else self.contas.index(contrapartida)
+        self.rotulos = dict(rotulos or {})
+        naturezas = np.array([contas[conta][0] for conta in self.contas])
+        self.atividades = np.array([contas[conta][1] for conta in self.contas])
+        self.sinais = np.array([NATUREZAS[natureza] for natureza in naturezas])
+        self.ativo = naturezas == "ativo"
+        self.folha = self.atividades != "total"
+        # Somas por atividade como produtos matriz × vetor (sem copiar colunas)
+        self.pesos = {atividade: self.mascara(atividade).astype(np.float64) for atividade in ATIVIDADES}
+        self.pesos_ativo = (self.folha & self.ativo).astype(np.float64)
+        self.pesos_passivo = (self.folha & ~self.ativo).astype(np.float64)
+        self.pesos_total_ativo = (self.mascara("total") & self.ativo).astype(np.float64)
+        self.pesos_total_passivo = (self.mascara("total") & ~self.ativo).astype(np.float64)
+
+    def __len__(self):
+        return len(self.contas)
+
+    def mascara(self, atividade):
+        """Contas de uma atividade."""
+        return self.atividades == atividade
+
+    def rotulo(self, conta):
+        return self.rotulos.get(conta, conta)
+
+    def vetor(self, balanco):
+        """Valores de um balanço {conta: valor} na ordem do plano (ausentes = NaN)."""
+        return np.array([balanco.get(conta, np.nan) for conta in self.contas], dtype=np.float64)
+
+
+# =============================================================================
+# 2. CONSTRUÇÃO EM LOTE
+# =============================================================================
+class DFCIndireta:
+    """
+    DFC reconstruída de um lote de pares (balanço inicial, balanço final).
+
+    `efeitos` é pares × contas: o efeito de caixa de cada conta (zero nas
+    de caixa, resultado e total). Os fluxos e saldos são arrays por par;
+    `verificacoes` é {verificação: diferença por par}, e uma verificação
+    passa quando |diferença| ≤ TOLERANCIA.
+    """
+
+    def __init__(self, plano, efeitos, lucro_liquido, depreciacao, distribuicao,
+                 caixa_inicial, caixa_final, verificacoes):
+        self.plano = plano
+        self.efeitos = efeitos
+        self.lucro_liquido = lucro_liquido
+        self.depreciacao = depreciacao
+        self.distribuicao = distribuicao
+        self.caixa_inicial = caixa_inicial
+        self.caixa_final = caixa_final
+        self.verificacoes = verificacoes
+        self.fco = lucro_liquido + depreciacao + efeitos @ plano.pesos["operacional"]
+        self.fci = efeitos @ plano.pesos["investimento"]
+        self.fcf = efeitos @ plano.pesos["financiamento"] - distribuicao
+        self.variacao_caixa = self.fco + self.fci + self.fcf
+        self._aprovados = None
+
+    def __len__(self):
+        return len(self.fco)
+
+    def aprovados(self):
+        """Pares × verificações: True quando a verificação passa (calculado uma vez)."""
+        if self._aprovados is None:
+            diferencas = np.column_stack([self.verificacoes[nome] for nome in VERIFICACOES])
+            self._aprovados = np.abs(diferencas) <= TOLERANCIA
+        return self._aprovados
+
+    def conciliados(self):
+        """Pares em que todas as verificações passam."""
+        return self.aprovados().all(axis=1)
+
+    def linhas(self, i=0):
+        """
+        Linhas da DFC do par `i`: lista de (atividade, descrição, valor).
+
+        Contas sem movimento no período são omitidas.
+        """
+        plano = self.plano
+        linhas = [("operacional", "Lucro Líquido do Período", self.lucro_liquido[i])]
+        if plano.depreciacao is not None:
+            linhas.append(("operacional", "(+) Depreciação e Amortização", self.depreciacao[i]))
+        for atividade in FLUXOS:
+            for j in np.flatnonzero(plano.mascara(atividade)):
+                valor = self.efeitos[i, j]
+                if abs(valor) <= TOLERANCIA:
+                    continue
+                rotulo = plano.rotulo(plano.contas[j])
+                if j == plano.contrapartida:
+                    descricao = f"Baixas e outras variações em {rotulo}"
+                elif plano.ativo[j]:
+                    descricao = f"(Aumento) Redução em {rotulo}"
+                else:
+                    descricao = f"Aumento (Redução) em {rotulo}"
+                linhas.append((atividade, descricao, valor))
+            if atividade == "financiamento" and abs(self.distribuicao[i]) > TOLERANCIA:
+                linhas.append(("financiamento", "(-) Dividendos e Outras Destinações do Lucro", -self.distribuicao[i]))
+        return linhas
+
+    def demonstracao(self, i=0):
+        """DataFrame da DFC do par `i`, com o total de cada seção e a conciliação do caixa."""
+        registros = []
+        totais = {"operacional": self.fco[i], "investimento": self.fci[i], "financiamento": self.fcf[i]}
+        linhas = self.linhas(i)
+        for atividade in FLUXOS:
+            registros.append((SECOES[atividade], None))
+            registros.extend((f"   {descricao}", valor) for a, descricao, valor in linhas if a == atividade)
+            registros.append((f"= Caixa Líquido das {SECOES[atividade]}", totais[atividade]))
+        registros += [
+            ("= Variação Líquida do Caixa", self.variacao_caixa[i]),
+            ("Caixa Inicial", self.caixa_inicial[i]),
+            ("= Caixa Final", self.caixa_inicial[i] + self.variacao_caixa[i]),
+        ]
+        return pd.DataFrame(registros, columns=["Linha", "Valor"])
+
+    def tabela_verificacoes(self, i=0):
+        """DataFrame das verificações de conciliação do par `i`."""
+        return pd.DataFrame({
+            "Verificação": list(VERIFICACOES),
+            "Diferença": [self.verificacoes[nome][i] for nome in VERIFICACOES],
+            "Status": ["✅" if ok else "❌" for ok in self.aprovados()[i]],
+        })
+
+
+@instrumentar("calculo")
+def construir_dfc(plano, inicial, final, lucro_liquido, depreciacao=None):
+    """
+    DFC pelo método indireto de todos os pares num único passe.
+
+    `inicial` e `final` são arrays pares × contas (ou uma linha de contas,
+    para um único par) na ordem do plano; `lucro_liquido` e `depreciacao`
+    têm um valor por par. Sem depreciação no plano, o argumento é ignorado.
+    """
+    inicial = np.atleast_2d(np.asarray(inicial, dtype=np.float64))
+    final = np.atleast_2d(np.asarray(final, dtype=np.float64))
+    if inicial.shape != final.shape or inicial.shape[1] != len(plano):
+        raise ValueError(
+            f"Balanços com formatos {inicial.shape} e {final.shape}; esperado pares × {len(plano)} contas"
+        )
+    pares = inicial.shape[0]
+    lucro_liquido = np.broadcast_to(np.asarray(lucro_liquido, dtype=np.float64), (pares,))
+    if plano.depreciacao is None or depreciacao is None:
+        depreciacao = np.zeros(pares)
+    else:
+        depreciacao = np.abs(np.broadcast_to(np.asarray(depreciacao, dtype=np.float64), (pares,)))
+    lucro_liquido = np.where(np.isnan(lucro_liquido), 0.0, lucro_liquido)
+    depreciacao = np.where(np.isnan(depreciacao), 0.0, depreciacao)
+    inicial = np.where(np.isnan(inicial), 0.0, inicial)
+    final = np.where(np.isnan(final), 0.0, final)
+
+    variacao = final - inicial
+    efeitos = variacao * np.where(np.isin(plano.atividades, FLUXOS), plano.sinais, 0.0)
+    if plano.contrapartida is not None:
+        efeitos[:, plano.contrapartida] -= depreciacao
+    distribuicao = lucro_liquido - variacao @ plano.pesos["resultado"]
+    caixa_inicial = inicial @ plano.pesos["caixa"]
+    caixa_final = final @ plano.pesos["caixa"]
+
+    def maior(*diferencas):
+        """A diferença de maior valor absoluto, par a par."""
+        diferencas = np.column_stack(diferencas)
+        return diferencas[np.arange(pares), np.abs(diferencas).argmax(axis=1)]
+
+    def conferencia(balanco, ativos, passivos):
+        diferencas = [np.zeros(pares)]
+        if plano.pesos_total_ativo.any():
+            diferencas.append(balanco @ plano.pesos_total_ativo - ativos)
+        if plano.pesos_total_passivo.any():
+            diferencas.append(balanco @ plano.pesos_total_passivo - passivos)
+        return maior(*diferencas)
+
+    ativos = [balanco @ plano.pesos_ativo for balanco in (inicial, final)]
+    passivos = [balanco @ plano.pesos_passivo for balanco in (inicial, final)]
+    # Os efeitos fora das atividades de fluxo são zero: a soma é FCO + FCI + FCF
+    gerado = lucro_liquido + depreciacao + efeitos.sum(axis=1) - distribuicao
+    verificacoes = {
+        VERIFICACOES[0]: ativos[0] - passivos[0],
+        VERIFICACOES[1]: ativos[1] - passivos[1],
+        VERIFICACOES[2]: maior(
+            conferencia(inicial, ativos[0], passivos[0]), conferencia(final, ativos[1], passivos[1])
+        ),
+        VERIFICACOES[3]: gerado - (caixa_final - caixa_inicial),
+        VERIFICACOES[4]: np.minimum(distribuicao, 0.0),
+    }
+    return DFCIndireta(plano, efeitos, lucro_liquido, depreciacao, distribuicao,
+                       caixa_inicial, caixa_final, verificacoes)
+
+
+def dfc_de_dicionarios(plano, balanco_inicial, balanco_final, dre):
+    """DFC de um único par a partir de dicionários {conta: valor} e da DRE {linha: valor}."""
+    faltantes = [conta for conta in plano.contas if conta not in balanco_inicial or conta not in balanco_final]
+    if faltantes:
+        raise ValueError(f"Conta(s) do plano ausente(s) nos balanços: {', '.join(faltantes)}")
+    if plano.lucro_liquido not in dre:
+        raise ValueError(f"Linha da DRE ausente: {plano.lucro_liquido}")
+    return construir_dfc(
+        plano, plano.vetor(balanco_inicial), plano.vetor(balanco_final),
+        dre[plano.lucro_liquido], dre.get(plano.depreciacao) if plano.depreciacao else None,
+    )
+
+
+# =============================================================================
+# 3. COMPANHIAS ABERTAS (UNIVERSO CVM)
+# =============================================================================
+# Folhas do balanço padronizado (demonstracoes_laboratorio) por atividade
+ATIVIDADES_CVM = {
+    "1.01.01": "caixa",
+    "1.01.02": "investimento",
+    "1.02.02": "investimento",
+    "1.02.03.01": "investimento",
+    "1.02.03.02": "investimento",
+    "1.02.04": "investimento",
+    "1.02.09": "investimento",
+    "2.01.04": "financiamento",
+    "2.02.01": "financiamento",
+    "2.03.01": "financiamento",
+    "2.03.02": "financiamento",
+    "2.03.04": "resultado",
+    "2.03.05": "resultado",
+}
+
+PLANO_DFC_CVM = PlanoDFC(
+    {
+        **{
+            codigo: ("ativo" if codigo.startswith("1") else "passivo", ATIVIDADES_CVM.get(codigo, "operacional"))
+            for codigo in FOLHAS if codigo[0] in "12"
+        },
+        "1": ("ativo", "total"),
+        "2": ("passivo", "total"),
+    },
+    lucro_liquido="3.11", depreciacao="M.01", contrapartida="1.02.03.02",
+    rotulos=NOMES,
+)
+
+
+def pares_do_universo(universo):
+    """
+    Pares de DFPs consecutivos do universo: (empresa, ano final, linha do
+    balanço inicial, linha do balanço final), um elemento por par,
+    ordenados por empresa e ano.
+    """
+    grade = np.asarray(universo.grade)
+    empresas, colunas = np.nonzero((grade[:, :-1] >= 0) & (grade[:, 1:] >= 0))
+    return (
+        empresas, universo.ano_inicial + colunas + 1,
+        grade[empresas, colunas], grade[empresas, colunas + 1],
+    )
+
+
+@instrumentar("calculo")
+def dfc_do_universo(universo, plano=PLANO_DFC_CVM):
+    """
+    DFC reconstruída de todos os pares de anos consecutivos do universo.
+
+    Retorna (DFCIndireta, empresas, anos, FCO divulgado), um elemento por
+    par; o FCO divulgado (6.01) permite comparar a reconstrução com a DFC
+    publicada pela companhia.
+    """
+    empresas, anos, anteriores, atuais = pares_do_universo(universo)
+    valores = np.asarray(universo.valores)
+    colunas = np.array([INDICE[conta] for conta in plano.contas])
+    dfc = construir_dfc(
+        plano, valores[np.ix_(anteriores, colunas)], valores[np.ix_(atuais, colunas)],
+        valores[atuais, INDICE[plano.lucro_liquido]], valores[atuais, INDICE[plano.depreciacao]],
+    )
+    return dfc, empresas, anos, valores[atuais, INDICE["6.01"]]
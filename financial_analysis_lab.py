@@ -9,6 +9,12 @@ COPPEAD/UFRJ - Prof. José Américo
 import streamlit as st
 import importlib.util
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from perfil_laboratorio import (
+    captura, estatisticas, exportar_json, instrumentar, medir
+)
 
 # =============================================================================
 # 1. CONFIGURAÇÃO DA PÁGINA
@@ -326,8 +332,100 @@ MODULOS = {
 if 'modulo_selecionado' not in st.session_state:
     st.session_state['modulo_selecionado'] = "Página Inicial"
 
+# Captura de trace solicitada pelo painel de diagnóstico (vale para um único
+# rerun; cobre o módulo e o rodapé, ver a execução principal)
+capturando_trace = st.session_state.get('capturar_trace', False)
+st.session_state['capturar_trace'] = False
+
 # =============================================================================
-# 4. SIDEBAR - NAVEGAÇÃO
+# 4. REGISTRO E AQUECIMENTO DOS MÓDULOS
+# =============================================================================
+# O aquecimento em segundo plano pode ser desligado com LAB_AQUECIMENTO=0
+# (ex.: no benchmark, para que as medições "a frio" não concorram com ele)
+AQUECIMENTO_ATIVO = os.environ.get("LAB_AQUECIMENTO", "1") != "0"
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def compilar_modulo(nome_arquivo, path, assinatura):
+    """
+    Compila e importa um módulo de aula uma única vez por processo.
+    
+    O objeto de módulo fica no cache compartilhado entre todas as sessões.
+    A `assinatura` (mtime + tamanho do arquivo) faz parte da chave, de modo
+    que uma edição no arquivo gera uma nova compilação automaticamente.
+    """
+    with medir(f"{nome_arquivo}.compilar", "carga"):
+        spec = importlib.util.spec_from_file_location(nome_arquivo, path)
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+    return modulo
+
+
+@instrumentar("carga")
+def obter_modulo(nome_arquivo):
+    """Retorna o módulo de aula já compilado, recompilando se o arquivo mudou."""
+    path = f"{nome_arquivo}.py"
+    estado = os.stat(path)
+    return compilar_modulo(nome_arquivo, path, (estado.st_mtime_ns, estado.st_size))
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_aquecimento():
+    """
+    Pré-carrega todos os módulos de aula em segundo plano (uma vez por processo).
+    
+    Cada módulo listado em MODULOS é compilado pelo registro e tem suas
+    fixtures estáticas (funções `get_*`) construídas, para que o primeiro
+    aluno a abrir cada aula não pague o custo de importação. As threads
+    rodam sem contexto de sessão: as fixtures ficam em caches globais.
+    Retorna o dicionário de estado consultado pela sidebar.
+    """
+    arquivos = [
+        info["arquivo"] for info in MODULOS.values()
+        if os.path.exists(f"{info['arquivo']}.py")
+    ]
+    estado = {
+        "total": len(arquivos),
+        "prontos": [],
+        "erros": {},
+        "lock": threading.Lock(),
+    }
+    
+    def aquecer(nome_arquivo):
+        try:
+            modulo = obter_modulo(nome_arquivo)
+            for nome, funcao in list(vars(modulo).items()):
+                if nome.startswith("get_") and callable(funcao):
+                    funcao()
+        except Exception as e:
+            with estado["lock"]:
+                estado["erros"][nome_arquivo] = str(e)
+        else:
+            with estado["lock"]:
+                estado["prontos"].append(nome_arquivo)
+    
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="aquecimento")
+    for nome_arquivo in arquivos:
+        executor.submit(aquecer, nome_arquivo)
+    executor.shutdown(wait=False)
+    return estado
+
+
+def status_aquecimento():
+    """Retorna (módulos processados, total, lista de erros) do aquecimento."""
+    if not AQUECIMENTO_ATIVO:
+        return 0, 0, []
+    estado = iniciar_aquecimento()
+    with estado["lock"]:
+        processados = len(estado["prontos"]) + len(estado["erros"])
+        return processados, estado["total"], list(estado["erros"])
+
+
+# Dispara o aquecimento na primeira execução do processo
+if AQUECIMENTO_ATIVO:
+    iniciar_aquecimento()
+
+# =============================================================================
+# 5. SIDEBAR - NAVEGAÇÃO
 # =============================================================================
 with st.sidebar:
     # Logo e título
@@ -381,9 +479,17 @@ with st.sidebar:
     st.markdown("---")
     
     # Status
-    st.markdown("""
+    processados, total, erros = status_aquecimento()
+    if erros:
+        status_sistema = f"⚠️ {len(erros)} módulo(s) com erro no carregamento"
+    elif processados < total:
+        status_sistema = f"⏳ Preparando módulos ({processados}/{total})"
+    else:
+        status_sistema = "✅ Sistema Ativo"
+    
+    st.markdown(f"""
         <div style='font-size: 0.8rem;'>
-            <p style='margin: 5px 0;'>✅ Sistema Ativo</p>
+            <p style='margin: 5px 0;'>{status_sistema}</p>
             <p style='margin: 5px 0;'>📚 15 Módulos Disponíveis</p>
             <p style='margin: 5px 0;'>🎯 Exercícios Interativos</p>
         </div>
@@ -391,13 +497,50 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # Diagnóstico de desempenho (opt-in: acessar com ?diagnostico=1 na URL)
+    if st.query_params.get("diagnostico") == "1":
+        with st.expander("🩺 Diagnóstico de Desempenho"):
+            estatisticas_perfil = estatisticas()
+            if estatisticas_perfil:
+                st.dataframe(
+                    [{"Função": nome, **valores} for nome, valores in estatisticas_perfil.items()],
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.caption("Nenhuma medição registrada ainda.")
+            
+            st.download_button(
+                "⬇️ Exportar JSON",
+                data=exportar_json(),
+                file_name="perfil_laboratorio.json",
+                mime="application/json",
+                use_container_width=True
+            )
+            
+            st.button(
+                "⏺️ Capturar Trace do Próximo Rerun",
+                key="btn_capturar_trace",
+                on_click=lambda: st.session_state.update(capturar_trace=True),
+                use_container_width=True
+            )
+            if 'trace_rerun' in st.session_state:
+                st.download_button(
+                    "⬇️ Baixar Trace (Chrome/Perfetto)",
+                    data=st.session_state['trace_rerun'],
+                    file_name="trace_rerun.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+    
 
 # =============================================================================
-# 5. FUNÇÕES DE RENDERIZAÇÃO
+# 6. FUNÇÕES DE RENDERIZAÇÃO
 # =============================================================================
 
+@instrumentar("modulo")
 def carregar_modulo(nome_arquivo):
-    """Carrega e executa um módulo Python dinamicamente."""
+    """Carrega (do registro de módulos) e executa um módulo de aula."""
     if nome_arquivo == "home":
         renderizar_home()
     elif nome_arquivo == "contato_professor":
@@ -406,12 +549,11 @@ def carregar_modulo(nome_arquivo):
         path = f"{nome_arquivo}.py"
         if os.path.exists(path):
             try:
-                spec = importlib.util.spec_from_file_location(nome_arquivo, path)
-                modulo = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(modulo)
+                modulo = obter_modulo(nome_arquivo)
                 
                 if hasattr(modulo, 'run'):
-                    modulo.run()
+                    with medir(f"{nome_arquivo}.run"):
+                        modulo.run()
                 else:
                     st.error(f"⚠️ O arquivo `{path}` não contém a função `run()`.")
             except Exception as e:
@@ -854,28 +996,35 @@ def renderizar_em_desenvolvimento(selecao):
 
 
 # =============================================================================
-# 6. EXECUÇÃO PRINCIPAL
+# 7. EXECUÇÃO PRINCIPAL
 # =============================================================================
 if __name__ == "__main__":
     # Identificar módulo selecionado
     escolha = st.session_state['modulo_selecionado']
     
-    # Verificar se é a página de contato (não está no dicionário MODULOS)
-    if escolha == "Contato com o Professor":
-        renderizar_contato()
-    else:
-        # Buscar no dicionário MODULOS
-        modulo_key = [k for k, v in MODULOS.items() if v["nome"] == escolha]
-        if modulo_key:
-            arquivo = MODULOS[modulo_key[0]]["arquivo"]
-            carregar_modulo(arquivo)
+    # A captura é sempre encerrada, mesmo se o rerun for interrompido (clique
+    # durante a execução, st.rerun() de um módulo)
+    with captura(f"rerun - {escolha}", ativa=capturando_trace) as trace:
+        # Verificar se é a página de contato (não está no dicionário MODULOS)
+        if escolha == "Contato com o Professor":
+            renderizar_contato()
         else:
-            renderizar_home()
-    
-    # Footer
-    st.markdown("""
-        <div class='footer'>
-            📊 <strong>Laboratório de Análise de Demonstrações Financeiras</strong> | 
-            © 2026 - COPPEAD/UFRJ-FGV-UCAM | Prof. José Américo 
-        </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+            # Buscar no dicionário MODULOS
+            modulo_key = [k for k, v in MODULOS.items() if v["nome"] == escolha]
+            if modulo_key:
+                arquivo = MODULOS[modulo_key[0]]["arquivo"]
+                carregar_modulo(arquivo)
+            else:
+                renderizar_home()
+        
+        # Footer
+        st.markdown("""
+            <div class='footer'>
+                📊 <strong>Laboratório de Análise de Demonstrações Financeiras</strong> | 
+                © 2026 - COPPEAD/UFRJ-FGV-UCAM | Prof. José Américo 
+            </div>
+        """, unsafe_allow_html=True)
+    # Rerun capturado até o fim: reexecutar para exibir o download no painel
+    if "trace" in trace:
+        st.session_state['trace_rerun'] = trace["trace"]
+        st.rerun()
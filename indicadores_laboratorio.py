@@ -0,0 +1,147 @@
+"""
+Motor de Indicadores Financeiros
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Cálculo vetorizado (NumPy) de todos os indicadores usados nas aulas:
+- Margens, rentabilidade (ROE, ROA, ROIC) e DuPont de 5 fatores
+- Liquidez, endividamento e cobertura
+- Giros, prazos médios e ciclos operacional/financeiro
+
+A entrada é uma tabela colunar de demonstrações: um array float64 cujo
+último eixo são as contas de CONTAS (os eixos anteriores são livres, ex.:
+empresas × períodos). Cada indicador sai com o mesmo formato, num único
+passe vetorizado, sem montar um dicionário por empresa-ano.
+
+Divisão por zero: um indicador só é definido quando seu denominador é
+positivo (receita, ativo, PL, EBITDA, despesa financeira, ...). Caso
+contrário — ou se faltar alguma conta — o resultado é NaN.
+"""
+
+import numpy as np
+
+from perfil_laboratorio import instrumentar
+
+# Contas da tabela colunar (ordem do último eixo)
+CONTAS = (
+    # DRE
+    "receita", "cmv", "lucro_bruto", "ebitda", "ebit", "desp_financeiras",
+    "lair", "lucro_liquido",
+    # DFC
+    "fco",
+    # Balanço
+    "caixa", "clientes", "estoques", "ativo_circulante", "imobilizado",
+    "ativo_total", "fornecedores", "emprestimos_cp", "passivo_circulante",
+    "emprestimos_lp", "passivo_nao_circ", "pl",
+)
+INDICE_CONTA = {conta: i for i, conta in enumerate(CONTAS)}
+
+# Nomes alternativos usados pelas bases dos módulos
+SINONIMOS = {
+    "patrimonio_liquido": "pl",
+    "desp_fin": "desp_financeiras",
+}
+
+# Alíquota de IR/CS usada no NOPAT do ROIC
+ALIQUOTA_IR_CS = 0.34
+
+# Base de dias dos prazos médios
+DIAS_ANO = 360
+
+
+def dividir(numerador, denominador):
+    """Divisão elemento a elemento; NaN onde o denominador não é positivo."""
+    numerador, denominador = np.broadcast_arrays(
+        np.asarray(numerador, dtype=np.float64), np.asarray(denominador, dtype=np.float64)
+    )
+    resultado = np.full(numerador.shape, np.nan)
+    valido = denominador > 0
+    np.divide(numerador, denominador, out=resultado, where=valido)
+    return resultado
+
+
+def montar_tabela(registros, mapeamento=None):
+    """
+    Monta a tabela colunar (n_registros × n_contas) a partir de dicionários.
+
+    `mapeamento` traduz conta → chave do registro, para bases com rótulos
+    próprios (ex.: {"receita": "Receita Líquida"}). Contas ausentes viram NaN.
+    """
+    mapeamento = mapeamento or {}
+    tabela = np.full((len(registros), len(CONTAS)), np.nan)
+    for i, registro in enumerate(registros):
+        for chave, valor in registro.items():
+            conta = SINONIMOS.get(chave, chave)
+            if conta in INDICE_CONTA:
+                tabela[i, INDICE_CONTA[conta]] = valor
+        for conta, chave in mapeamento.items():
+            if chave in registro:
+                tabela[i, INDICE_CONTA[conta]] = registro[chave]
+    return tabela
+
+
+@instrumentar("calculo")
+def calcular_indicadores(tabela):
+    """
+    Calcula todos os indicadores de uma tabela colunar de demonstrações.
+
+    Retorna um dicionário indicador → array com o formato da tabela sem o
+    eixo das contas. Percentuais já vêm multiplicados por 100; múltiplos
+    (x) e fatores DuPont vêm como razão; prazos e ciclos em dias.
+    """
+    tabela = np.asarray(tabela, dtype=np.float64)
+    c = {conta: tabela[..., i] for i, conta in enumerate(CONTAS)}
+
+    divida_bruta = c["emprestimos_cp"] + c["emprestimos_lp"]
+    passivo_exigivel = c["passivo_circulante"] + c["passivo_nao_circ"]
+
+    ind = {
+        # Margens
+        "margem_bruta": dividir(c["lucro_bruto"], c["receita"]) * 100,
+        "margem_ebitda": dividir(c["ebitda"], c["receita"]) * 100,
+        "margem_ebit": dividir(c["ebit"], c["receita"]) * 100,
+        "margem_liquida": dividir(c["lucro_liquido"], c["receita"]) * 100,
+
+        # Rentabilidade
+        "roe": dividir(c["lucro_liquido"], c["pl"]) * 100,
+        "roa": dividir(c["lucro_liquido"], c["ativo_total"]) * 100,
+        "roic": dividir(c["ebit"] * (1 - ALIQUOTA_IR_CS), c["pl"] + divida_bruta) * 100,
+
+        # Liquidez
+        "liquidez_corrente": dividir(c["ativo_circulante"], c["passivo_circulante"]),
+        "liquidez_seca": dividir(c["ativo_circulante"] - c["estoques"], c["passivo_circulante"]),
+
+        # Estrutura e endividamento
+        "endividamento": dividir(passivo_exigivel, c["ativo_total"]) * 100,
+        "composicao_endividamento": dividir(c["passivo_circulante"], passivo_exigivel) * 100,
+        "imobilizacao_pl": dividir(c["imobilizado"], c["pl"]) * 100,
+        "divida_bruta": divida_bruta,
+        "divida_liquida": divida_bruta - c["caixa"],
+        "divida_ebitda": dividir(divida_bruta, c["ebitda"]),
+        "divida_pl": dividir(divida_bruta, c["pl"]),
+        "cobertura_juros": dividir(c["ebit"], c["desp_financeiras"]),
+
+        # Eficiência e ciclos
+        "giro_ativo": dividir(c["receita"], c["ativo_total"]),
+        "giro_estoque": dividir(c["cmv"], c["estoques"]),
+        "pme": dividir(c["estoques"], c["cmv"]) * DIAS_ANO,
+        "pmr": dividir(c["clientes"], c["receita"]) * DIAS_ANO,
+        "pmp": dividir(c["fornecedores"], c["cmv"]) * DIAS_ANO,
+
+        # Qualidade do lucro
+        "fco_ll": dividir(c["fco"], c["lucro_liquido"]),
+
+        # DuPont (5 fatores): ROE = carga tributária × carga de juros ×
+        # margem EBIT × giro do ativo × multiplicador
+        "carga_tributaria": dividir(c["lucro_liquido"], c["lair"]),
+        "carga_juros": dividir(c["lair"], c["ebit"]),
+        "multiplicador": dividir(c["ativo_total"], c["pl"]),
+    }
+    ind["ciclo_operacional"] = ind["pme"] + ind["pmr"]
+    ind["ciclo_financeiro"] = ind["ciclo_operacional"] - ind["pmp"]
+    return ind
+
+
+def indicadores_de(registro, mapeamento=None):
+    """Indicadores de um único registro (dicionário de contas), como floats."""
+    ind = calcular_indicadores(montar_tabela([registro], mapeamento))
+    return {nome: float(valores[0]) for nome, valores in ind.items()}
@@ -0,0 +1,330 @@
+"""
+Interface Compartilhada dos Módulos
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Componentes de página reutilizados pelos módulos de aula:
+- Abas com execução sob demanda (só a aba ativa é renderizada)
+- Edição em lote das entradas dos simuladores (recalcula só ao aplicar)
+- Comparação com companhias abertas do universo CVM (quando configurado)
+- Referência setorial: médias estáticas da aula ou percentis do universo CVM
+- Triagem do universo CVM e busca de empresas parecidas com o caso da aula
+- Varredura de red flags do caso da aula junto com as companhias do universo
+- DFC reconstruída pelo método indireto para todos os pares de anos do universo
+"""
+
+import time
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cache_laboratorio import universo_compartilhado
+from cvm_laboratorio import TODOS_SETORES, rotulo_faixa
+from dfc_laboratorio import dfc_do_universo
+from perfil_laboratorio import medir
+from red_flags_laboratorio import Painel, avaliar_regras
+from triagem_laboratorio import semelhantes, tabela_resultados, triar
+
+# Com o modo sob demanda ativo, apenas o renderizador da aba selecionada é
+# executado em cada rerun; desativado, todas as abas são renderizadas.
+ABAS_SOB_DEMANDA = True
+
+# Com a edição em lote ativa, as entradas dos simuladores multi-campo são
+# agrupadas em formulários e só disparam o recálculo ao serem aplicadas.
+EDICAO_EM_LOTE = True
+
+
+def renderizar_abas(chave, abas):
+    """
+    Cria as abas de um módulo a partir de uma lista de (rótulo, renderizador,
+    chaves dos widgets da aba).
+    
+    No modo sob demanda, a troca de aba dispara um rerun e somente o
+    renderizador da aba aberta é executado. Como o Streamlit descarta o
+    estado dos widgets que não são renderizados, os valores dos widgets
+    declarados pelas abas fechadas são regravados na sessão a cada rerun e
+    readotados quando o aluno volta a elas. As chaves aceitam curingas do
+    fnmatch (ex.: "quiz_q*") e só podem ser de widgets cujo valor o
+    Streamlit aceita atribuir: botões, envios de formulário, data_editor e
+    file_uploader são somente leitura e ficam de fora (a aba guarda o que
+    precisar deles numa chave própria).
+    """
+    rotulos = [rotulo for rotulo, _, _ in abas]
+    
+    if not ABAS_SOB_DEMANDA:
+        for container, (_, renderizador, _) in zip(st.tabs(rotulos), abas):
+            with container:
+                executar_renderizador(renderizador)
+        return
+    
+    containers = st.tabs(rotulos, key=chave, on_change="rerun")
+    for container, (_, renderizador, chaves) in zip(containers, abas):
+        if container.open:
+            with container:
+                executar_renderizador(renderizador)
+        else:
+            manter_estado(chaves)
+
+
+def manter_estado(padroes):
+    """
+    Regrava na sessão os valores dos widgets de uma aba fechada.
+    
+    Gravado num rerun em que o widget não é renderizado, o valor sobrevive
+    à limpeza dos widgets descartados e é adotado pelo widget quando a aba
+    volta a ser aberta, como se nunca tivesse saído da tela.
+    """
+    for chave_widget in list(st.session_state.keys()):
+        if any(fnmatchcase(str(chave_widget), padrao) for padrao in padroes):
+            st.session_state[chave_widget] = st.session_state[chave_widget]
+
+
+def executar_renderizador(renderizador):
+    """Executa o renderizador de uma aba registrando seu tempo no perfil de desempenho."""
+    with medir(f"{renderizador.__module__}.{renderizador.__name__}"):
+        renderizador()
+
+
+@contextmanager
+def edicao_em_lote(chave, rotulo_botao="✅ Aplicar alterações"):
+    """
+    Agrupa os widgets de entrada de um simulador para edição em lote.
+    
+    Com EDICAO_EM_LOTE ativo, os widgets ficam dentro de um `st.form`: o
+    aluno edita todos os campos e os cálculos rodam uma única vez, ao
+    clicar no botão de aplicar. Desativado, cada widget dispara seu
+    próprio rerun, como um container comum.
+    """
+    if not EDICAO_EM_LOTE:
+        with st.container():
+            yield
+        return
+    
+    with st.form(key=chave, border=False):
+        yield
+        st.form_submit_button(rotulo_botao)
+
+
+def renderizar_comparacao_cvm(chave, indicadores, titulo="#### 🔎 Compare com uma Companhia Aberta (CVM)"):
+    """
+    Mostra o histórico de indicadores de uma companhia aberta escolhida pelo aluno.
+    
+    `indicadores` é uma lista de (indicador do motor, rótulo, formato), ex.:
+    ("roe", "ROE (%)", "{:.1f}"). O histórico vem do universo de empresas
+    mapeado em memória (busca O(1), sem cópia); sem universo configurado
+    (LAB_ARMAZEM_CVM), nada é exibido.
+    """
+    universo = universo_compartilhado()
+    if universo is None or not len(universo):
+        return
+    
+    st.markdown("---")
+    st.markdown(titulo)
+    nomes = universo.nomes
+    cnpj = st.selectbox(
+        "Companhia aberta", sorted(nomes, key=nomes.get),
+        format_func=lambda cnpj: f"{nomes[cnpj]} ({cnpj})", key=chave,
+    )
+    historico = universo.historico(cnpj)
+    ind = historico.indicadores()
+    tabela = {"Indicador": [rotulo for _, rotulo, _ in indicadores]}
+    for j, ano in enumerate(historico.periodos):
+        tabela[str(ano)] = [
+            "—" if np.isnan(ind[nome][0, j]) else formato.format(ind[nome][0, j])
+            for nome, _, formato in indicadores
+        ]
+    st.dataframe(pd.DataFrame(tabela), use_container_width=True, hide_index=True)
+    st.caption("Fonte: DFPs dos dados abertos da CVM (R$ mil), última versão de cada exercício.")
+
+
+class ReferenciaSetorial:
+    """
+    Referência do setor nas tabelas de indicadores dos casos.
+    
+    Sem universo CVM, vale a média estática da aula (`medias`). Com ele,
+    a referência é a mediana do setor/ano escolhido no índice setorial de
+    percentis e cada valor do caso pode ser posicionado entre os percentis
+    — consultas O(1), sem varrer as empresas do setor.
+    """
+    
+    def __init__(self, medias, universo=None, setor=None, ano=None):
+        self.medias = medias
+        self.universo = universo
+        self.setor = setor
+        self.ano = ano
+    
+    @property
+    def com_percentis(self):
+        return self.universo is not None
+    
+    def rotulo(self, padrao="Média Setor"):
+        """Cabeçalho da coluna de referência."""
+        return f"Mediana Setor ({self.ano})" if self.com_percentis else padrao
+    
+    def quantis(self, indicador):
+        """Percentis do indicador no setor/ano (None sem universo)."""
+        if not self.com_percentis:
+            return None
+        return self.universo.quantis(self.setor, self.ano, indicador)
+    
+    def valor(self, indicador, padrao=None):
+        """Valor de referência: mediana do setor ou média estática da aula."""
+        if not self.com_percentis:
+            return self.medias.get(indicador, padrao)
+        quantis = self.quantis(indicador)
+        return None if quantis is None or np.isnan(quantis[2]) else float(quantis[2])
+    
+    def formatar(self, indicador, formato, padrao="—"):
+        """
+        Valor de referência formatado. Sem universo, `padrao` é o valor da
+        aula para indicadores fora de `medias`; com universo, mediana
+        ausente aparece como "n/d", nunca como um número fixo da aula.
+        """
+        valor = self.valor(indicador)
+        if valor is None or np.isnan(valor):
+            return "n/d" if self.com_percentis else padrao
+        return formato.format(valor)
+    
+    def faixa(self, indicador, valor):
+        """Faixa de percentis do setor em que o valor do caso cai (ex.: "p25–p50")."""
+        return rotulo_faixa(valor, self.quantis(indicador))
+
+
+def selecionar_referencia_setorial(chave, medias, setor_sugerido=None, ano_sugerido=None):
+    """
+    Cria a `ReferenciaSetorial` de uma tabela de indicadores.
+    
+    Com o universo CVM configurado (LAB_ARMAZEM_CVM), o aluno escolhe o
+    setor e o ano de comparação — o padrão é `setor_sugerido` e o ano mais
+    próximo de `ano_sugerido`; sem universo, nada é exibido e valem as
+    médias estáticas.
+    """
+    universo = universo_compartilhado()
+    if universo is None or not len(universo):
+        return ReferenciaSetorial(medias)
+    
+    col1, col2 = st.columns([3, 1])
+    setores = universo.setores
+    with col1:
+        setor = st.selectbox(
+            "Setor de referência (CVM)", setores,
+            index=setores.index(setor_sugerido) if setor_sugerido in setores else setores.index(TODOS_SETORES),
+            key=f"{chave}_setor",
+        )
+    anos = universo.anos_setor(setor) or universo.anos()
+    with col2:
+        padrao = min(anos, key=lambda ano: abs(ano - (ano_sugerido or anos[-1])))
+        ano = st.selectbox("Ano", anos, index=anos.index(padrao), key=f"{chave}_ano")
+    return ReferenciaSetorial(medias, universo, setor, ano)
+
+
+def renderizar_triagem_cvm(chave, caso, predicado_padrao, indicadores):
+    """
+    Busca no universo CVM empresas parecidas com o caso da aula.
+    
+    Mostra (1) as companhias cujos indicadores mais se aproximam de `caso`
+    ({indicador: valor}) e (2) uma triagem livre por predicado, com
+    `predicado_padrao` como ponto de partida. `indicadores` são as colunas
+    exibidas nas tabelas. Sem universo configurado, explica como ativá-lo.
+    """
+    universo = universo_compartilhado()
+    if universo is None or not len(universo):
+        st.info(
+            "💡 Esta atividade usa as demonstrações reais das companhias abertas: ingira os dados "
+            "abertos da CVM com `cvm_laboratorio.py` e inicie o laboratório com a variável "
+            "`LAB_ARMAZEM_CVM` apontando para o armazém."
+        )
+        return
+    
+    st.markdown("#### 🧭 Companhias Mais Parecidas com o Caso")
+    st.caption(
+        "Distância média entre os indicadores do caso e os de cada empresa-ano, em intervalos "
+        "interquartis do universo (0 = idêntico). Cada empresa aparece no seu ano mais parecido."
+    )
+    linhas, distancias = buscar_semelhantes(universo, tuple(caso.items()))
+    if len(linhas):
+        st.dataframe(tabela_resultados(universo, linhas, indicadores, distancias),
+                     use_container_width=True, hide_index=True)
+    else:
+        st.warning("O caso não tem indicadores suficientes para a comparação.")
+    
+    st.markdown("---")
+    st.markdown("#### 🔎 Triagem do Universo")
+    st.caption(
+        "Combine indicadores com and/or/not e comparações, ex.: "
+        "`divida_ebitda > 3 and cobertura_juros < 2`. Também aceita `ano` e `setor == \"Nome do setor\"`."
+    )
+    predicado = st.text_input("Predicado", value=predicado_padrao, key=f"{chave}_predicado")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        ordenar_por = st.selectbox("Ordenar por", indicadores, key=f"{chave}_ordem")
+    with col2:
+        decrescente = st.checkbox("Decrescente", value=True, key=f"{chave}_decrescente")
+    
+    try:
+        inicio = time.perf_counter()
+        linhas, total = triar(universo, predicado, ordenar_por, decrescente)
+        ms = (time.perf_counter() - inicio) * 1000
+    except ValueError as erro:
+        st.error(f"Não foi possível avaliar o predicado: {erro}")
+        return
+    st.markdown(f"**{total:,}** empresas-ano de {len(universo):,} atendem ao predicado ({ms:.0f} ms).")
+    if total:
+        st.dataframe(tabela_resultados(universo, linhas, indicadores), use_container_width=True, hide_index=True)
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _semelhantes_em_cache(diretorio, construido_em, caso, _universo):
+    """Busca de semelhantes memorizada por (versão do universo, caso)."""
+    return semelhantes(_universo, dict(caso))
+
+
+def buscar_semelhantes(universo, caso):
+    """Semelhantes a um caso, calculados uma vez por versão do universo."""
+    return _semelhantes_em_cache(universo.diretorio, universo.meta["construido_em"], caso, universo)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _red_flags_em_cache(diretorio, construido_em, regras, chave_caso, _caso, _universo):
+    """Varredura memorizada por (versão do universo, regras, caso)."""
+    paineis = [_caso] if _universo is None else [_caso, Painel.do_universo(_universo)]
+    return avaliar_regras(Painel.empilhar(paineis), regras)
+
+
+def varrer_red_flags(regras, caso, chave_caso):
+    """
+    Avalia as regras sobre o painel do caso e, com universo CVM configurado,
+    sobre todas as companhias abertas no mesmo passe (o caso é a entidade 0).
+    
+    `chave_caso` identifica o painel `caso` no cache. Retorna
+    (MatrizRedFlags, universo ou None).
+    """
+    universo = universo_compartilhado()
+    if universo is None or not len(universo):
+        return _red_flags_em_cache(None, None, regras, chave_caso, caso, None), None
+    matriz = _red_flags_em_cache(
+        universo.diretorio, universo.meta["construido_em"], regras, chave_caso, caso, universo
+    )
+    return matriz, universo
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _dfc_universo_em_cache(diretorio, construido_em, _universo):
+    """DFCs do universo memorizadas por versão do universo."""
+    return dfc_do_universo(_universo)
+
+
+def reconstruir_dfc_universo():
+    """
+    DFC pelo método indireto de todos os pares de DFPs consecutivos do
+    universo CVM, calculada uma vez por versão do universo.
+    
+    Retorna ((DFCIndireta, empresas, anos, FCO divulgado), universo), ou
+    (None, None) sem universo configurado.
+    """
+    universo = universo_compartilhado()
+    if universo is None or not len(universo):
+        return None, None
+    return _dfc_universo_em_cache(universo.diretorio, universo.meta["construido_em"], universo), universo
@@ -15,6 +15,8 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 
+from interface_laboratorio import renderizar_abas
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -34,22 +36,14 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Exercícios Numéricos",
-        "🔄 Comparativo de Empresas",
-        "💡 Interpretação Econômica"
+    renderizar_abas("abas_modulo10", [
+        ("📊 Exercícios Numéricos", renderizar_exercicios_numericos, ("dp_*", "ex_marg", "ex_giro", "ex_roe")),
+        ("🔄 Comparativo de Empresas", renderizar_comparativo_empresas, ("comp_q*",)),
+        ("💡 Interpretação Econômica", renderizar_interpretacao_economica, ("quiz_m10", "interp_*"))
     ])
-    
-    with tab1:
-        renderizar_exercicios_numericos()
-    
-    with tab2:
-        renderizar_comparativo_empresas()
-    
-    with tab3:
-        renderizar_interpretacao_economica()
 
 
+@st.fragment
 def renderizar_exercicios_numericos():
     """Exercícios numéricos completos de rentabilidade."""
     
@@ -15,6 +15,13 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 
+from indicadores_laboratorio import calcular_indicadores, montar_tabela
+from interface_laboratorio import renderizar_abas
+from perfil_laboratorio import instrumentar
+
+# Rótulos das bases DuPont deste módulo que diferem das contas do motor
+CONTAS_DUPONT = {"lucro_liquido": "ll", "ativo_total": "ativo"}
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -34,20 +41,15 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "🔬 DuPont Expandido",
-        "📊 Diagnóstico Comparativo",
-        "✍️ Exercício Interpretativo"
+    renderizar_abas("abas_modulo11", [
+        ("🔬 DuPont Expandido", renderizar_dupont_expandido, ("exp_*",)),
+        ("📊 Diagnóstico Comparativo", renderizar_diagnostico_comparativo, (
+            "escolha_empresa", "justif_escolha"
+        )),
+        ("✍️ Exercício Interpretativo", renderizar_exercicio_interpretativo, (
+            "diag1", "diag2", "interp1", "interp2", "recom", "conclusao"
+        ))
     ])
-    
-    with tab1:
-        renderizar_dupont_expandido()
-    
-    with tab2:
-        renderizar_diagnostico_comparativo()
-    
-    with tab3:
-        renderizar_exercicio_interpretativo()
 
 
 def renderizar_dupont_expandido():
@@ -283,6 +285,26 @@ def renderizar_dupont_expandido():
         """, unsafe_allow_html=True)
 
 
+@instrumentar("calculo")
+def calcular_dupont(empresas):
+    """Decompõe o ROE (5 fatores) de várias empresas/anos num único cálculo vetorizado."""
+    chaves = list(empresas)
+    ind = calcular_indicadores(montar_tabela([empresas[k] for k in chaves], CONTAS_DUPONT))
+    
+    return {
+        chave: {
+            'carga_trib': ind['carga_tributaria'][i],
+            'carga_juros': ind['carga_juros'][i],
+            'margem_ebit': ind['margem_ebit'][i] / 100,
+            'giro_ativo': ind['giro_ativo'][i],
+            'multiplicador': ind['multiplicador'][i],
+            'roe': ind['roe'][i],
+            'roa': ind['roa'][i]
+        }
+        for i, chave in enumerate(chaves)
+    }
+
+
 def renderizar_diagnostico_comparativo():
     """Diagnóstico comparativo entre múltiplas empresas."""
     
@@ -328,27 +350,8 @@ def renderizar_diagnostico_comparativo():
     df_dados = pd.DataFrame(dados_tabela)
     st.dataframe(df_dados, use_container_width=True, hide_index=True)
     
-    # Calcular indicadores para cada empresa
-    def calcular_dupont(dados):
-        carga_trib = dados['ll'] / dados['lair'] if dados['lair'] > 0 else 0
-        carga_juros = dados['lair'] / dados['ebit'] if dados['ebit'] > 0 else 0
-        margem_ebit = dados['ebit'] / dados['receita'] if dados['receita'] > 0 else 0
-        giro_ativo = dados['receita'] / dados['ativo'] if dados['ativo'] > 0 else 0
-        multiplicador = dados['ativo'] / dados['pl'] if dados['pl'] > 0 else 0
-        roe = dados['ll'] / dados['pl'] * 100 if dados['pl'] > 0 else 0
-        roa = dados['ll'] / dados['ativo'] * 100 if dados['ativo'] > 0 else 0
-        
-        return {
-            'carga_trib': carga_trib,
-            'carga_juros': carga_juros,
-            'margem_ebit': margem_ebit,
-            'giro_ativo': giro_ativo,
-            'multiplicador': multiplicador,
-            'roe': roe,
-            'roa': roa
-        }
-    
-    indicadores = {nome: calcular_dupont(dados) for nome, dados in empresas_data.items()}
+    # Calcular indicadores para todas as empresas
+    indicadores = calcular_dupont(empresas_data)
     
     st.markdown("---")
     st.markdown("#### 📈 Análise DuPont Comparativa (5 Fatores)")
@@ -616,21 +619,13 @@ def renderizar_exercicio_interpretativo():
     df_hist = pd.DataFrame(dados_historico)
     st.dataframe(df_hist, use_container_width=True, hide_index=True)
     
-    # Calcular indicadores para cada ano
-    def calc_ano(rec, ebit, fin, lair, ll, ativo, pl):
-        return {
-            'carga_trib': ll/lair if lair > 0 else 0,
-            'carga_juros': lair/ebit if ebit > 0 else 0,
-            'margem_ebit': ebit/rec if rec > 0 else 0,
-            'giro_ativo': rec/ativo if ativo > 0 else 0,
-            'multiplicador': ativo/pl if pl > 0 else 0,
-            'roe': ll/pl*100 if pl > 0 else 0,
-            'roa': ll/ativo*100 if ativo > 0 else 0
-        }
-    
-    ind_2021 = calc_ano(3500, 525, 120, 430, 284, 2800, 1400)
-    ind_2022 = calc_ano(4200, 546, 180, 400, 264, 3500, 1500)
-    ind_2023 = calc_ano(5040, 504, 270, 280, 185, 4200, 1550)
+    # Calcular indicadores para todos os anos
+    ind_anos = calcular_dupont({
+        2021: {'receita': 3500, 'ebit': 525, 'desp_fin': 120, 'lair': 430, 'll': 284, 'ativo': 2800, 'pl': 1400},
+        2022: {'receita': 4200, 'ebit': 546, 'desp_fin': 180, 'lair': 400, 'll': 264, 'ativo': 3500, 'pl': 1500},
+        2023: {'receita': 5040, 'ebit': 504, 'desp_fin': 270, 'lair': 280, 'll': 185, 'ativo': 4200, 'pl': 1550}
+    })
+    ind_2021, ind_2022, ind_2023 = ind_anos[2021], ind_anos[2022], ind_anos[2023]
     
     # Tabela de indicadores calculados
     st.markdown("#### 📈 Evolução dos Indicadores DuPont")
@@ -15,6 +15,11 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 
+from cache_laboratorio import fixture_compartilhada
+from demonstracoes_laboratorio import carregar_demonstracoes
+from interface_laboratorio import renderizar_abas, renderizar_comparacao_cvm, selecionar_referencia_setorial
+from perfil_laboratorio import instrumentar
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -34,22 +39,17 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Análise Comparativa",
-        "🤔 Indicadores em Contexto",
-        "👥 Trabalho em Grupo"
+    renderizar_abas("abas_modulo12", [
+        ("📊 Análise Comparativa", renderizar_analise_comparativa, ("m12_referencia_*", "m12_par_cvm")),
+        ("🤔 Indicadores em Contexto", renderizar_indicadores_contexto, ("setor_x", "setor_y", "setor_z")),
+        ("👥 Trabalho em Grupo", renderizar_trabalho_grupo, (
+            "grupo_nome", "ind_escolhidos", "justif_ind", "recomendacao_grupo", "justif_recom",
+            "aurora_*", "digital_*", "riscos_aurora", "riscos_digital"
+        ))
     ])
-    
-    with tab1:
-        renderizar_analise_comparativa()
-    
-    with tab2:
-        renderizar_indicadores_contexto()
-    
-    with tab3:
-        renderizar_trabalho_grupo()
 
 
+@fixture_compartilhada
 def get_dados_setor_varejo():
     """Retorna dados de duas empresas do setor de varejo para comparação."""
     
@@ -114,6 +114,7 @@ def get_dados_setor_varejo():
                 "patrimonio_liquido": 2100
             }
         },
+        "setor_cvm": "Comércio (Atacado e Varejo)",
         "medias_setor": {
             "margem_bruta": 28.0,
             "margem_ebit": 8.0,
@@ -128,43 +129,16 @@ def get_dados_setor_varejo():
     return dados
 
 
+@instrumentar("calculo")
 def calcular_indicadores(dados):
     """Calcula todos os indicadores financeiros."""
     d = dados
     
-    indicadores = {
-        # Rentabilidade
-        "margem_bruta": d['lucro_bruto'] / d['receita'] * 100,
-        "margem_ebit": d['ebit'] / d['receita'] * 100,
-        "margem_liquida": d['lucro_liquido'] / d['receita'] * 100,
-        "roe": d['lucro_liquido'] / d['patrimonio_liquido'] * 100,
-        "roa": d['lucro_liquido'] / d['ativo_total'] * 100,
-        
-        # Liquidez
-        "liquidez_corrente": d['ativo_circulante'] / d['passivo_circulante'],
-        "liquidez_seca": (d['ativo_circulante'] - d['estoques']) / d['passivo_circulante'],
-        
-        # Estrutura
-        "endividamento": (d['passivo_circulante'] + d['passivo_nao_circ']) / d['ativo_total'] * 100,
-        "divida_pl": (d['emprestimos_cp'] + d['emprestimos_lp']) / d['patrimonio_liquido'],
-        "imobilizacao_pl": d['imobilizado'] / d['patrimonio_liquido'] * 100,
-        
-        # Eficiência
-        "giro_ativo": d['receita'] / d['ativo_total'],
-        "giro_estoque": d['cmv'] / d['estoques'],
-        "pme": d['estoques'] / d['cmv'] * 360,
-        "pmr": d['clientes'] / d['receita'] * 360,
-        "pmp": d['fornecedores'] / d['cmv'] * 360,
-        
-        # DuPont
-        "multiplicador": d['ativo_total'] / d['patrimonio_liquido'],
-        
-        # Produtividade
-        "receita_func": d['receita'] / (d.get('funcionarios', 1) / 1000) if 'funcionarios' in d else 0,
-    }
+    demonstracoes = carregar_demonstracoes({("empresa", "exercicio"): d})
+    indicadores = demonstracoes.indicadores_por_periodo("empresa")["exercicio"]
     
-    # Ciclo financeiro
-    indicadores['ciclo_financeiro'] = indicadores['pme'] + indicadores['pmr'] - indicadores['pmp']
+    # Produtividade (fora do motor: depende do quadro de funcionários)
+    indicadores['receita_func'] = d['receita'] / (d['funcionarios'] / 1000) if 'funcionarios' in d else 0
     
     return indicadores
 
@@ -232,11 +206,13 @@ def renderizar_analise_comparativa():
     # Calcular indicadores
     ind_aurora = calcular_indicadores(dados["Magazine Aurora S.A."]['dados'])
     ind_digital = calcular_indicadores(dados["Digital Store Ltda."]["dados"])
-    medias = dados["medias_setor"]
     
     st.markdown("---")
     st.markdown("#### 📈 Comparativo de Indicadores")
     
+    # Média estática da aula ou percentis do setor no universo CVM
+    referencia = selecionar_referencia_setorial("m12_referencia", dados["medias_setor"], dados["setor_cvm"])
+    
     # Tabela de indicadores
     ind_tabela = {
         "Indicador": ["Margem Bruta (%)", "Margem EBIT (%)", "Margem Líquida (%)", 
@@ -256,18 +232,33 @@ def renderizar_analise_comparativa():
             f"{ind_digital['giro_ativo']:.2f}", f"{ind_digital['endividamento']:.1f}",
             f"{ind_digital['pme']:.0f}", f"{ind_digital['ciclo_financeiro']:.0f}"
         ],
-        "Média Setor": [
-            f"{medias['margem_bruta']:.1f}", f"{medias['margem_ebit']:.1f}",
-            f"{medias['margem_liquida']:.1f}", f"{medias['roe']:.1f}",
-            f"{medias['roa']:.1f}", f"{medias['liquidez_corrente']:.2f}",
-            f"{medias['giro_ativo']:.2f}", f"{medias['endividamento']:.1f}",
-            "45", "30"
+        referencia.rotulo("Média Setor"): [
+            referencia.formatar("margem_bruta", "{:.1f}"), referencia.formatar("margem_ebit", "{:.1f}"),
+            referencia.formatar("margem_liquida", "{:.1f}"), referencia.formatar("roe", "{:.1f}"),
+            referencia.formatar("roa", "{:.1f}"), referencia.formatar("liquidez_corrente", "{:.2f}"),
+            referencia.formatar("giro_ativo", "{:.2f}"), referencia.formatar("endividamento", "{:.1f}"),
+            referencia.formatar("pme", "{:.0f}", "45"), referencia.formatar("ciclo_financeiro", "{:.0f}", "30")
         ]
     }
     
+    if referencia.com_percentis:
+        comparados = ["margem_bruta", "margem_ebit", "margem_liquida", "roe", "roa",
+                      "liquidez_corrente", "giro_ativo", "endividamento", "pme", "ciclo_financeiro"]
+        ind_tabela["Faixa Aurora"] = [referencia.faixa(nome, ind_aurora[nome]) for nome in comparados]
+        ind_tabela["Faixa Digital"] = [referencia.faixa(nome, ind_digital[nome]) for nome in comparados]
+    
     df_ind = pd.DataFrame(ind_tabela)
     st.dataframe(df_ind, use_container_width=True, hide_index=True)
     
+    # Par real do universo CVM (só aparece com LAB_ARMAZEM_CVM configurado)
+    renderizar_comparacao_cvm("m12_par_cvm", [
+        ("margem_bruta", "Margem Bruta (%)", "{:.1f}"), ("margem_ebit", "Margem EBIT (%)", "{:.1f}"),
+        ("margem_liquida", "Margem Líquida (%)", "{:.1f}"), ("roe", "ROE (%)", "{:.1f}"),
+        ("roa", "ROA (%)", "{:.1f}"), ("liquidez_corrente", "Liquidez Corrente", "{:.2f}"),
+        ("giro_ativo", "Giro do Ativo", "{:.2f}"), ("endividamento", "Endividamento (%)", "{:.1f}"),
+        ("pme", "PME (dias)", "{:.0f}"), ("ciclo_financeiro", "Ciclo Financeiro (dias)", "{:.0f}"),
+    ])
+    
     # Destaque: indicadores muito semelhantes
     st.markdown("---")
     st.markdown("#### 🎯 Destaque: Indicadores Surpreendentemente Semelhantes")
@@ -15,6 +15,109 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 
+from cache_laboratorio import figura_em_cache, fixture_compartilhada
+from demonstracoes_laboratorio import carregar_demonstracoes
+from interface_laboratorio import renderizar_abas, renderizar_triagem_cvm, varrer_red_flags
+from perfil_laboratorio import instrumentar
+from red_flags_laboratorio import Painel, descrever_regra
+
+# Checklist de red flags por categoria. Os sinais que se medem nas
+# demonstrações têm uma regra automática (condição, anos consecutivos) no
+# formato do motor de red flags; os demais dependem de notas e governança.
+CHECKLIST_RED_FLAGS = {
+    "🔴 Qualidade dos Lucros": {
+        "cor": "#fee2e2",
+        "flags": [
+            {"flag": "FCO significativamente menor que Lucro Líquido", "gravidade": "Alta", 
+             "como_detectar": "FCO/LL < 0,8 por mais de 2 anos consecutivos",
+             "regra": ("fco_ll < 0.8", 3)},
+            {"flag": "Lucro cresce mas caixa não acompanha", "gravidade": "Alta",
+             "como_detectar": "Comparar crescimento de LL vs crescimento de FCO",
+             "regra": ("diferenca(lucro_liquido) > 0 and diferenca(fco) < 0", 2)},
+            {"flag": "Muitas receitas não-recorrentes ou extraordinárias", "gravidade": "Média",
+             "como_detectar": "Analisar composição do resultado, notas explicativas"},
+            {"flag": "Mudanças frequentes de políticas contábeis", "gravidade": "Alta",
+             "como_detectar": "Verificar notas explicativas ano a ano"},
+            {"flag": "Resultados sempre no limite das expectativas", "gravidade": "Média",
+             "como_detectar": "Comparar com consenso de mercado, padrão suspeito"}
+        ]
+    },
+    "🟠 Capital de Giro": {
+        "cor": "#fef3c7",
+        "flags": [
+            {"flag": "Contas a Receber crescendo mais que Receita", "gravidade": "Alta",
+             "como_detectar": "Calcular % crescimento de cada, comparar por 3+ anos",
+             "regra": ("variacao(clientes) > variacao(receita)", 3)},
+            {"flag": "Estoques crescendo mais que CMV", "gravidade": "Alta",
+             "como_detectar": "Verificar giro do estoque, comparar com setor",
+             "regra": ("variacao(estoques) > variacao(cmv)", 2)},
+            {"flag": "PMR aumentando consistentemente", "gravidade": "Média",
+             "como_detectar": "Calcular PMR ano a ano, tendência de alta é ruim",
+             "regra": ("diferenca(pmr) > 0", 2)},
+            {"flag": "PCLD não acompanha crescimento de recebíveis", "gravidade": "Alta",
+             "como_detectar": "PCLD/Clientes deve se manter ou aumentar"},
+            {"flag": "Ciclo financeiro deteriorando", "gravidade": "Média",
+             "como_detectar": "PME + PMR - PMP aumentando",
+             "regra": ("diferenca(ciclo_financeiro) > 0", 2)}
+        ]
+    },
+    "🟡 Estrutura e Endividamento": {
+        "cor": "#fef9c3",
+        "flags": [
+            {"flag": "Cobertura de juros em queda consistente", "gravidade": "Alta",
+             "como_detectar": "EBIT/Despesas Financeiras caindo por 2+ anos",
+             "regra": ("diferenca(cobertura_juros) < 0", 2)},
+            {"flag": "Dívida/EBITDA acima de covenants", "gravidade": "Alta",
+             "como_detectar": "Verificar nas notas explicativas os limites",
+             "regra": ("divida_ebitda > 3", 1)},
+            {"flag": "Vencimentos concentrados no curto prazo", "gravidade": "Alta",
+             "como_detectar": "Analisar perfil de vencimento da dívida"},
+            {"flag": "Refinanciamentos frequentes e cada vez mais caros", "gravidade": "Média",
+             "como_detectar": "Comparar taxas de novas dívidas com anteriores"},
+            {"flag": "Patrimônio Líquido negativo ou próximo", "gravidade": "Crítica",
+             "como_detectar": "Verificar BP - passivo a descoberto",
+             "regra": ("pl < 0.05 * ativo_total", 1)}
+        ]
+    },
+    "🟢 Governança e Transparência": {
+        "cor": "#dcfce7",
+        "flags": [
+            {"flag": "Troca de auditor sem explicação clara", "gravidade": "Alta",
+             "como_detectar": "Verificar histórico de auditores, ler parecer"},
+            {"flag": "Ressalvas ou ênfases no parecer do auditor", "gravidade": "Alta",
+             "como_detectar": "Ler parecer de auditoria com atenção"},
+            {"flag": "Transações com partes relacionadas significativas", "gravidade": "Média",
+             "como_detectar": "Nota explicativa de partes relacionadas"},
+            {"flag": "Atrasos na divulgação de resultados", "gravidade": "Média",
+             "como_detectar": "Comparar datas com trimestres anteriores"},
+            {"flag": "Executivos vendendo ações da empresa", "gravidade": "Média",
+             "como_detectar": "Verificar movimentações de insiders na CVM"}
+        ]
+    },
+    "🔵 Operacionais e Setoriais": {
+        "cor": "#dbeafe",
+        "flags": [
+            {"flag": "Margens muito acima dos concorrentes", "gravidade": "Média",
+             "como_detectar": "Benchmarking setorial - outlier positivo é suspeito"},
+            {"flag": "Crescimento muito acima do mercado sem explicação", "gravidade": "Média",
+             "como_detectar": "Comparar com crescimento do setor"},
+            {"flag": "Market share implausível", "gravidade": "Média",
+             "como_detectar": "Cruzar receita reportada com tamanho do mercado"},
+            {"flag": "Capex muito baixo para o crescimento reportado", "gravidade": "Alta",
+             "como_detectar": "Crescer sem investir é difícil na maioria dos setores"},
+            {"flag": "Funcionários ou lojas não crescem com receita", "gravidade": "Média",
+             "como_detectar": "Receita/funcionário implausível"}
+        ]
+    }
+}
+
+
+# Regras automáticas (flag, gravidade, condição, anos) extraídas do checklist
+REGRAS_RED_FLAGS = tuple(
+    (flag["flag"], flag["gravidade"], *flag["regra"])
+    for dados in CHECKLIST_RED_FLAGS.values() for flag in dados["flags"] if "regra" in flag
+)
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -34,20 +137,47 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📉 Caso: Lucro Artificial",
-        "🚩 Checklist de Red Flags",
-        "✍️ Questões Analíticas"
+    renderizar_abas("abas_modulo13", [
+        ("📉 Caso: Lucro Artificial", renderizar_caso_lucro_artificial, ("caso13_q*",)),
+        ("🚩 Checklist de Red Flags", renderizar_checklist_red_flags, ("rf[0-9]*",)),
+        ("🤖 Varredura de Red Flags", renderizar_varredura_red_flags, ("m13_red_flags_ano",)),
+        ("🔎 Casos Reais Parecidos", renderizar_casos_parecidos, ("m13_triagem_*",)),
+        ("✍️ Questões Analíticas", renderizar_questoes_analiticas, ("quest[0-9]*",))
     ])
-    
-    with tab1:
-        renderizar_caso_lucro_artificial()
-    
-    with tab2:
-        renderizar_checklist_red_flags()
-    
-    with tab3:
-        renderizar_questoes_analiticas()
+
+
+@fixture_compartilhada
+def get_caso_techvision():
+    """Histórico da TechVision Sistemas S.A. (R$ milhões) no formato das demonstrações."""
+    dados = {
+        "nome": "TechVision Sistemas S.A.",
+        "historico": {
+            2019: {"receita": 500, "lucro_bruto": 200, "ebit": 75, "lucro_liquido": 50, "fco": 60,
+                   "clientes": 80, "estoques": 45, "fornecedores": 40, "ativo_total": 400, "patrimonio_liquido": 200},
+            2020: {"receita": 600, "lucro_bruto": 240, "ebit": 96, "lucro_liquido": 65, "fco": 55,
+                   "clientes": 120, "estoques": 70, "fornecedores": 45, "ativo_total": 520, "patrimonio_liquido": 250},
+            2021: {"receita": 750, "lucro_bruto": 300, "ebit": 127, "lucro_liquido": 88, "fco": 40,
+                   "clientes": 180, "estoques": 110, "fornecedores": 50, "ativo_total": 700, "patrimonio_liquido": 320},
+            2022: {"receita": 920, "lucro_bruto": 368, "ebit": 165, "lucro_liquido": 115, "fco": 20,
+                   "clientes": 275, "estoques": 165, "fornecedores": 55, "ativo_total": 950, "patrimonio_liquido": 410},
+            2023: {"receita": 1100, "lucro_bruto": 440, "ebit": 209, "lucro_liquido": 147, "fco": -15,
+                   "clientes": 400, "estoques": 240, "fornecedores": 60, "ativo_total": 1280, "patrimonio_liquido": 530},
+        }
+    }
+    return dados
+
+
+def carregar_caso(dados):
+    """Demonstrações do caso (uma entidade × anos do histórico)."""
+    return carregar_demonstracoes({
+        (dados['nome'], ano): dados_ano for ano, dados_ano in dados['historico'].items()
+    })
+
+
+@instrumentar("calculo")
+def calcular_indicadores_caso(dados):
+    """Indicadores de todos os anos do caso num único passe vetorizado."""
+    return carregar_caso(dados).indicadores_por_periodo(dados['nome'])
 
 
 def renderizar_caso_lucro_artificial():
@@ -119,27 +249,8 @@ def renderizar_caso_lucro_artificial():
     lucros = [50, 65, 88, 115, 147]
     fcos = [60, 55, 40, 20, -15]
     
-    fig1 = go.Figure()
-    
-    fig1.add_trace(go.Bar(
-        name='Lucro Líquido',
-        x=anos,
-        y=lucros,
-        marker_color='#22c55e'
-    ))
-    
-    fig1.add_trace(go.Bar(
-        name='Fluxo de Caixa Operacional',
-        x=anos,
-        y=fcos,
-        marker_color='#ef4444'
-    ))
-    
-    fig1.update_layout(
-        title="🚨 RED FLAG #1: Lucro Cresce, Caixa Desaparece",
-        barmode='group',
-        height=350
-    )
+    fig1 = figura_em_cache("modulo13", "lucro_vs_fco", construir_grafico_lucro_vs_fco,
+                           anos, lucros, fcos)
     st.plotly_chart(fig1, use_container_width=True)
     
     st.error("""
@@ -156,35 +267,8 @@ def renderizar_caso_lucro_artificial():
     receitas = [500, 600, 750, 920, 1100]
     receber = [80, 120, 180, 275, 400]
     
-    # Calcular PMR
-    pmr = [r/rec*360 for r, rec in zip(receber, receitas)]
-    
-    fig2 = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    fig2.add_trace(
-        go.Scatter(name='Receita', x=anos, y=receitas, mode='lines+markers', 
-                  line=dict(color='#3b82f6', width=3)),
-        secondary_y=False
-    )
-    
-    fig2.add_trace(
-        go.Scatter(name='Contas a Receber', x=anos, y=receber, mode='lines+markers',
-                  line=dict(color='#ef4444', width=3)),
-        secondary_y=False
-    )
-    
-    fig2.add_trace(
-        go.Bar(name='PMR (dias)', x=anos, y=pmr, marker_color='#fbbf24', opacity=0.5),
-        secondary_y=True
-    )
-    
-    fig2.update_layout(
-        title="🚨 RED FLAG #2: Contas a Receber Cresce Mais Rápido que Receita",
-        height=400
-    )
-    fig2.update_yaxes(title_text="R$ milhões", secondary_y=False)
-    fig2.update_yaxes(title_text="PMR (dias)", secondary_y=True)
-    
+    fig2 = figura_em_cache("modulo13", "receita_vs_receber", construir_grafico_receita_vs_receber,
+                           anos, receitas, receber)
     st.plotly_chart(fig2, use_container_width=True)
     
     col1, col2 = st.columns(2)
@@ -208,30 +292,8 @@ def renderizar_caso_lucro_artificial():
     # Gráfico: Qualidade do Lucro
     st.markdown("##### 3️⃣ Índice de Qualidade do Lucro")
     
-    qualidade = [fco/ll if ll > 0 else 0 for fco, ll in zip(fcos, lucros)]
-    
-    fig3 = go.Figure()
-    
-    fig3.add_trace(go.Scatter(
-        x=anos,
-        y=qualidade,
-        mode='lines+markers+text',
-        text=[f'{q:.2f}' for q in qualidade],
-        textposition='top center',
-        line=dict(color='#ef4444', width=3),
-        marker=dict(size=12)
-    ))
-    
-    fig3.add_hline(y=1.0, line_dash="dash", line_color="green", 
-                  annotation_text="Qualidade Ideal (FCO = LL)")
-    fig3.add_hline(y=0.8, line_dash="dot", line_color="orange",
-                  annotation_text="Mínimo Aceitável")
-    
-    fig3.update_layout(
-        title="🚨 RED FLAG #3: Qualidade do Lucro em Queda Livre",
-        yaxis_title="FCO / Lucro Líquido",
-        height=350
-    )
+    fig3 = figura_em_cache("modulo13", "qualidade_lucro", construir_grafico_qualidade_lucro,
+                           anos, lucros, fcos)
     st.plotly_chart(fig3, use_container_width=True)
     
     st.error("""
@@ -341,6 +403,105 @@ def renderizar_caso_lucro_artificial():
         """, unsafe_allow_html=True)
 
 
+def construir_grafico_lucro_vs_fco(anos, lucros, fcos):
+    """Gráfico de barras Lucro Líquido vs FCO do caso TechVision."""
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        name='Lucro Líquido',
+        x=anos,
+        y=lucros,
+        marker_color='#22c55e'
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='Fluxo de Caixa Operacional',
+        x=anos,
+        y=fcos,
+        marker_color='#ef4444'
+    ))
+    
+    fig.update_layout(
+        title="🚨 RED FLAG #1: Lucro Cresce, Caixa Desaparece",
+        barmode='group',
+        height=350
+    )
+    return fig
+
+
+def construir_grafico_receita_vs_receber(anos, receitas, receber):
+    """Gráfico Receita vs Contas a Receber (com PMR) do caso TechVision."""
+    
+    # Calcular PMR
+    pmr = [r/rec*360 for r, rec in zip(receber, receitas)]
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    fig.add_trace(
+        go.Scatter(name='Receita', x=anos, y=receitas, mode='lines+markers', 
+                  line=dict(color='#3b82f6', width=3)),
+        secondary_y=False
+    )
+    
+    fig.add_trace(
+        go.Scatter(name='Contas a Receber', x=anos, y=receber, mode='lines+markers',
+                  line=dict(color='#ef4444', width=3)),
+        secondary_y=False
+    )
+    
+    fig.add_trace(
+        go.Bar(name='PMR (dias)', x=anos, y=pmr, marker_color='#fbbf24', opacity=0.5),
+        secondary_y=True
+    )
+    
+    fig.update_layout(
+        title="🚨 RED FLAG #2: Contas a Receber Cresce Mais Rápido que Receita",
+        height=400
+    )
+    fig.update_yaxes(title_text="R$ milhões", secondary_y=False)
+    fig.update_yaxes(title_text="PMR (dias)", secondary_y=True)
+    return fig
+
+
+def construir_grafico_qualidade_lucro(anos, lucros, fcos):
+    """Gráfico do índice FCO/LL do caso TechVision."""
+    
+    qualidade = [fco/ll if ll > 0 else 0 for fco, ll in zip(fcos, lucros)]
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=anos,
+        y=qualidade,
+        mode='lines+markers+text',
+        text=[f'{q:.2f}' for q in qualidade],
+        textposition='top center',
+        line=dict(color='#ef4444', width=3),
+        marker=dict(size=12)
+    ))
+    
+    fig.add_hline(y=1.0, line_dash="dash", line_color="green", 
+                  annotation_text="Qualidade Ideal (FCO = LL)")
+    fig.add_hline(y=0.8, line_dash="dot", line_color="orange",
+                  annotation_text="Mínimo Aceitável")
+    
+    fig.update_layout(
+        title="🚨 RED FLAG #3: Qualidade do Lucro em Queda Livre",
+        yaxis_title="FCO / Lucro Líquido",
+        height=350
+    )
+    return fig
+
+
+def regra_automatica(flag):
+    """Linha do cartão do checklist com a regra automática do flag, se houver."""
+    if "regra" not in flag:
+        return ""
+    regra = (flag['flag'], flag['gravidade'], *flag['regra'])
+    return f"<br><small>🤖 <strong>Regra automática:</strong> <code>{descrever_regra(regra)}</code></small>"
+
+
 def renderizar_checklist_red_flags():
     """Checklist de sinais de alerta financeiro."""
     
@@ -359,85 +520,7 @@ def renderizar_checklist_red_flags():
     # Categorias de Red Flags
     st.markdown("#### 📋 Red Flags por Categoria")
     
-    categorias = {
-        "🔴 Qualidade dos Lucros": {
-            "cor": "#fee2e2",
-            "flags": [
-                {"flag": "FCO significativamente menor que Lucro Líquido", "gravidade": "Alta", 
-                 "como_detectar": "FCO/LL < 0,8 por mais de 2 anos consecutivos"},
-                {"flag": "Lucro cresce mas caixa não acompanha", "gravidade": "Alta",
-                 "como_detectar": "Comparar crescimento de LL vs crescimento de FCO"},
-                {"flag": "Muitas receitas não-recorrentes ou extraordinárias", "gravidade": "Média",
-                 "como_detectar": "Analisar composição do resultado, notas explicativas"},
-                {"flag": "Mudanças frequentes de políticas contábeis", "gravidade": "Alta",
-                 "como_detectar": "Verificar notas explicativas ano a ano"},
-                {"flag": "Resultados sempre no limite das expectativas", "gravidade": "Média",
-                 "como_detectar": "Comparar com consenso de mercado, padrão suspeito"}
-            ]
-        },
-        "🟠 Capital de Giro": {
-            "cor": "#fef3c7",
-            "flags": [
-                {"flag": "Contas a Receber crescendo mais que Receita", "gravidade": "Alta",
-                 "como_detectar": "Calcular % crescimento de cada, comparar por 3+ anos"},
-                {"flag": "Estoques crescendo mais que CMV", "gravidade": "Alta",
-                 "como_detectar": "Verificar giro do estoque, comparar com setor"},
-                {"flag": "PMR aumentando consistentemente", "gravidade": "Média",
-                 "como_detectar": "Calcular PMR ano a ano, tendência de alta é ruim"},
-                {"flag": "PCLD não acompanha crescimento de recebíveis", "gravidade": "Alta",
-                 "como_detectar": "PCLD/Clientes deve se manter ou aumentar"},
-                {"flag": "Ciclo financeiro deteriorando", "gravidade": "Média",
-                 "como_detectar": "PME + PMR - PMP aumentando"}
-            ]
-        },
-        "🟡 Estrutura e Endividamento": {
-            "cor": "#fef9c3",
-            "flags": [
-                {"flag": "Cobertura de juros em queda consistente", "gravidade": "Alta",
-                 "como_detectar": "EBIT/Despesas Financeiras caindo por 2+ anos"},
-                {"flag": "Dívida/EBITDA acima de covenants", "gravidade": "Alta",
-                 "como_detectar": "Verificar nas notas explicativas os limites"},
-                {"flag": "Vencimentos concentrados no curto prazo", "gravidade": "Alta",
-                 "como_detectar": "Analisar perfil de vencimento da dívida"},
-                {"flag": "Refinanciamentos frequentes e cada vez mais caros", "gravidade": "Média",
-                 "como_detectar": "Comparar taxas de novas dívidas com anteriores"},
-                {"flag": "Patrimônio Líquido negativo ou próximo", "gravidade": "Crítica",
-                 "como_detectar": "Verificar BP - passivo a descoberto"}
-            ]
-        },
-        "🟢 Governança e Transparência": {
-            "cor": "#dcfce7",
-            "flags": [
-                {"flag": "Troca de auditor sem explicação clara", "gravidade": "Alta",
-                 "como_detectar": "Verificar histórico de auditores, ler parecer"},
-                {"flag": "Ressalvas ou ênfases no parecer do auditor", "gravidade": "Alta",
-                 "como_detectar": "Ler parecer de auditoria com atenção"},
-                {"flag": "Transações com partes relacionadas significativas", "gravidade": "Média",
-                 "como_detectar": "Nota explicativa de partes relacionadas"},
-                {"flag": "Atrasos na divulgação de resultados", "gravidade": "Média",
-                 "como_detectar": "Comparar datas com trimestres anteriores"},
-                {"flag": "Executivos vendendo ações da empresa", "gravidade": "Média",
-                 "como_detectar": "Verificar movimentações de insiders na CVM"}
-            ]
-        },
-        "🔵 Operacionais e Setoriais": {
-            "cor": "#dbeafe",
-            "flags": [
-                {"flag": "Margens muito acima dos concorrentes", "gravidade": "Média",
-                 "como_detectar": "Benchmarking setorial - outlier positivo é suspeito"},
-                {"flag": "Crescimento muito acima do mercado sem explicação", "gravidade": "Média",
-                 "como_detectar": "Comparar com crescimento do setor"},
-                {"flag": "Market share implausível", "gravidade": "Média",
-                 "como_detectar": "Cruzar receita reportada com tamanho do mercado"},
-                {"flag": "Capex muito baixo para o crescimento reportado", "gravidade": "Alta",
-                 "como_detectar": "Crescer sem investir é difícil na maioria dos setores"},
-                {"flag": "Funcionários ou lojas não crescem com receita", "gravidade": "Média",
-                 "como_detectar": "Receita/funcionário implausível"}
-            ]
-        }
-    }
-    
-    for categoria, dados in categorias.items():
+    for categoria, dados in CHECKLIST_RED_FLAGS.items():
         with st.expander(f"📌 {categoria}", expanded=False):
             for flag in dados['flags']:
                 st.markdown(f"""
@@ -445,6 +528,7 @@ def renderizar_checklist_red_flags():
                         <strong>🚩 {flag['flag']}</strong><br>
                         <small>🎯 <strong>Gravidade:</strong> {flag['gravidade']}</small><br>
                         <small>🔍 <strong>Como detectar:</strong> {flag['como_detectar']}</small>
+                        {regra_automatica(flag)}
                     </div>
                 """, unsafe_allow_html=True)
     
@@ -542,6 +626,115 @@ def renderizar_checklist_red_flags():
         """)
 
 
+def renderizar_varredura_red_flags():
+    """Regras automáticas do checklist aplicadas à TechVision e às companhias abertas."""
+    
+    st.markdown("### 🤖 Varredura Automática de Red Flags")
+    
+    st.markdown("""
+        <div style='background-color: #e0e7ff; padding: 20px; border-radius: 10px; 
+                    border-left: 5px solid #3b82f6; margin-bottom: 20px;'>
+            <strong>Do checklist ao filtro:</strong><br>
+            <em>Os red flags que podem ser medidos nas demonstrações viram regras: uma condição 
+            sobre contas e indicadores e o número de anos seguidos em que ela precisa se repetir. 
+            As mesmas regras varrem o caso da aula e, quando a base da CVM está configurada, 
+            todas as companhias abertas de uma só vez.</em>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    dados = get_caso_techvision()
+    matriz, universo = varrer_red_flags(
+        REGRAS_RED_FLAGS, Painel.de_demonstracoes(carregar_caso(dados)), dados['nome']
+    )
+    
+    st.markdown(f"#### 📉 {dados['nome']}")
+    st.dataframe(matriz.tabela_entidade(dados['nome']), use_container_width=True, hide_index=True)
+    st.caption("🚩 red flag disparado · condição atendida, mas ainda sem os anos seguidos exigidos pela regra")
+    
+    ultimo_ano = max(dados['historico'])
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(f"Red Flags em {ultimo_ano}",
+                  f"{len(matriz.flags_de(dados['nome'], ultimo_ano))}/{len(REGRAS_RED_FLAGS)}")
+    with col2:
+        st.metric("Pontuação de Risco", int(matriz.pontuacao()[0, matriz.anos.index(ultimo_ano)]),
+                  help="Soma das gravidades dos red flags disparados (Média = 1, Alta = 2, Crítica = 3)")
+    
+    with st.expander("📐 Regras avaliadas"):
+        st.dataframe(pd.DataFrame({
+            "Red Flag": [regra[0] for regra in REGRAS_RED_FLAGS],
+            "Gravidade": [regra[1] for regra in REGRAS_RED_FLAGS],
+            "Regra": [descrever_regra(regra) for regra in REGRAS_RED_FLAGS],
+        }), use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    st.markdown("#### 🏛️ Companhias Abertas")
+    if universo is None:
+        st.info(
+            "💡 Com os dados abertos da CVM ingeridos por `cvm_laboratorio.py` e a variável "
+            "`LAB_ARMAZEM_CVM` apontando para o armazém, as mesmas regras varrem todas as companhias abertas."
+        )
+        return
+    
+    anos = [ano for ano in universo.anos() if (universo.grade[:, ano - universo.ano_inicial] >= 0).any()]
+    ano = st.selectbox("Exercício", anos, index=len(anos) - 1, key="m13_red_flags_ano")
+    j = matriz.anos.index(ano)
+    # A entidade 0 é o caso; as demais são as empresas do universo, na ordem de `empresas`
+    alertas = matriz.alertas[:, 1:, j]
+    pontuacao = matriz.pontuacao()[1:, j]
+    com_dfp = int((universo.grade[:, ano - universo.ano_inicial] >= 0).sum())
+    
+    st.markdown(f"**{com_dfp:,}** companhias com DFP de {ano}; "
+                f"**{int((pontuacao > 0).sum()):,}** com ao menos um red flag.")
+    st.dataframe(pd.DataFrame({
+        "Red Flag": [regra[0] for regra in REGRAS_RED_FLAGS],
+        "Gravidade": [regra[1] for regra in REGRAS_RED_FLAGS],
+        "Empresas": alertas.sum(axis=1),
+        "% das Empresas": np.round(alertas.sum(axis=1) / max(com_dfp, 1) * 100, 1),
+    }), use_container_width=True, hide_index=True)
+    
+    st.markdown("##### 🔥 Maiores Pontuações de Risco")
+    ordem = np.argsort(-pontuacao, kind="stable")[:20]
+    ordem = ordem[pontuacao[ordem] > 0]
+    if not len(ordem):
+        st.success("Nenhuma companhia disparou red flags neste exercício.")
+        return
+    cnpjs = [universo.empresas[e] for e in ordem.tolist()]
+    st.dataframe(pd.DataFrame({
+        "Empresa": [universo.nomes.get(cnpj, cnpj) for cnpj in cnpjs],
+        "CNPJ": cnpjs,
+        "Setor": [universo.setor_de(cnpj) for cnpj in cnpjs],
+        "Pontuação": pontuacao[ordem].astype(int),
+        "Red Flags": [", ".join(matriz.flags_de(cnpj, ano)) for cnpj in cnpjs],
+    }), use_container_width=True, hide_index=True)
+
+
+def renderizar_casos_parecidos():
+    """Companhias abertas com o mesmo padrão da TechVision (lucro sem caixa)."""
+    
+    st.markdown("### 🔎 Existem TechVisions na Bolsa?")
+    
+    st.markdown("""
+        <div style='background-color: #fee2e2; padding: 20px; border-radius: 10px; 
+                    border-left: 5px solid #dc2626; margin-bottom: 20px;'>
+            <strong>Desafio:</strong><br>
+            <em>Lucro crescente, margens atraentes e caixa operacional minguando. Procure no universo 
+            de companhias abertas quem apresentou o mesmo padrão da TechVision em 2023 e investigue 
+            o que aconteceu com essas empresas depois.</em>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    dados = get_caso_techvision()
+    ind_2023 = calcular_indicadores_caso(dados)[2023]
+    
+    # Só indicadores relativos: os valores absolutos do caso (R$ mi) não se comparam com a CVM (R$ mil)
+    indicadores = ["fco_ll", "margem_liquida", "margem_ebit", "pmr", "roe", "giro_ativo"]
+    renderizar_triagem_cvm(
+        "m13_triagem", {nome: ind_2023[nome] for nome in indicadores},
+        "fco_ll < 0.5 and margem_liquida > 10 and pmr > 90", indicadores,
+    )
+
+
 def renderizar_questoes_analiticas():
     """Questões discursivas analíticas."""
     
@@ -10,6 +10,13 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 
+from cache_laboratorio import fixture_compartilhada
+from demonstracoes_laboratorio import carregar_demonstracoes
+from interface_laboratorio import (
+    renderizar_abas, renderizar_comparacao_cvm, renderizar_triagem_cvm, selecionar_referencia_setorial,
+)
+from perfil_laboratorio import instrumentar
+
 
 def run():
     st.markdown("<h1>Módulo 14 - Tomada de Decisão: Crédito e Investimento</h1>", unsafe_allow_html=True)
@@ -27,26 +34,26 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "Simulação: Analista de Crédito",
-        "Simulação: Analista de Investimento",
-        "Discussão em Grupo"
+    renderizar_abas("abas_modulo14", [
+        ("Simulação: Analista de Crédito", renderizar_simulacao_credito, (
+            "decisao_credito", "credito_*", "m14_referencia_*", "m14_par_cvm"
+        )),
+        ("Simulação: Analista de Investimento", renderizar_simulacao_investimento, (
+            "recomendacao_invest", "tese_investimento", "preco_alvo", "metodologia"
+        )),
+        ("Empresas Parecidas (CVM)", renderizar_empresas_parecidas, ("m14_triagem_*",)),
+        ("Discussão em Grupo", renderizar_discussao_grupo, (
+            "grupo_papel_debate", "argumentos_debate", "contra_argumentos"
+        ))
     ])
-    
-    with tab1:
-        renderizar_simulacao_credito()
-    
-    with tab2:
-        renderizar_simulacao_investimento()
-    
-    with tab3:
-        renderizar_discussao_grupo()
 
 
+@fixture_compartilhada
 def get_empresa_analise():
     dados = {
         "nome": "Indústria Brasileira de Máquinas S.A. (IBM-SA)",
         "setor": "Bens de Capital / Máquinas Industriais",
+        "setor_cvm": "Máquinas, Equipamentos, Veículos e Peças",
         "descricao": "Fabricante de máquinas e equipamentos para indústria de alimentos e bebidas",
         "historico": {
             2021: {
@@ -101,32 +108,13 @@ def get_empresa_analise():
     return dados
 
 
-def calcular_indicadores_completos(dados_ano):
-    d = dados_ano
-    ind = {
-        "margem_bruta": d['lucro_bruto'] / d['receita'] * 100,
-        "margem_ebitda": d['ebitda'] / d['receita'] * 100,
-        "margem_ebit": d['ebit'] / d['receita'] * 100,
-        "margem_liquida": d['lucro_liquido'] / d['receita'] * 100,
-        "roe": d['lucro_liquido'] / d['pl'] * 100,
-        "roa": d['lucro_liquido'] / d['ativo_total'] * 100,
-        "roic": (d['ebit'] * 0.66) / (d['pl'] + d['emprestimos_cp'] + d['emprestimos_lp']) * 100,
-        "liquidez_corrente": d['ativo_circulante'] / d['passivo_circulante'],
-        "liquidez_seca": (d['ativo_circulante'] - d['estoques']) / d['passivo_circulante'],
-        "endividamento": (d['passivo_circulante'] + d['passivo_nao_circ']) / d['ativo_total'] * 100,
-        "divida_liquida": d['emprestimos_cp'] + d['emprestimos_lp'] - d['caixa'],
-        "divida_ebitda": (d['emprestimos_cp'] + d['emprestimos_lp']) / d['ebitda'],
-        "divida_pl": (d['emprestimos_cp'] + d['emprestimos_lp']) / d['pl'],
-        "cobertura_juros": d['ebit'] / d['desp_financeiras'],
-        "giro_ativo": d['receita'] / d['ativo_total'],
-        "pmr": d['clientes'] / d['receita'] * 360,
-        "pme": d['estoques'] / d['cmv'] * 360,
-        "pmp": d['fornecedores'] / d['cmv'] * 360,
-        "fco_ll": d['fco'] / d['lucro_liquido'] if d['lucro_liquido'] > 0 else 0,
-        "multiplicador": d['ativo_total'] / d['pl']
-    }
-    ind['ciclo_financeiro'] = ind['pme'] + ind['pmr'] - ind['pmp']
-    return ind
+@instrumentar("calculo")
+def calcular_indicadores_completos(dados):
+    """Indicadores de todos os anos do histórico num único passe vetorizado."""
+    demonstracoes = carregar_demonstracoes({
+        (dados['nome'], ano): dados_ano for ano, dados_ano in dados['historico'].items()
+    })
+    return demonstracoes.indicadores_por_periodo(dados['nome'])
 
 
 def renderizar_simulacao_credito():
@@ -194,10 +182,11 @@ def renderizar_simulacao_credito():
     st.markdown("---")
     st.markdown("#### Indicadores-Chave para Análise de Crédito")
     
-    ind_2021 = calcular_indicadores_completos(dados['historico'][2021])
-    ind_2022 = calcular_indicadores_completos(dados['historico'][2022])
-    ind_2023 = calcular_indicadores_completos(dados['historico'][2023])
-    medias = dados['setor_medias']
+    ind = calcular_indicadores_completos(dados)
+    ind_2021, ind_2022, ind_2023 = ind[2021], ind[2022], ind[2023]
+    
+    # Média estática da aula ou percentis do setor no universo CVM
+    referencia = selecionar_referencia_setorial("m14_referencia", dados['setor_medias'], dados['setor_cvm'], 2023)
     
     ind_credito = {
         "Indicador": [
@@ -223,11 +212,31 @@ def renderizar_simulacao_credito():
             f"{ind_2023['divida_pl']:.2f}x", f"{ind_2023['endividamento']:.1f}%",
             f"{ind_2023['fco_ll']:.2f}", f"{ind_2023['margem_ebitda']:.1f}%"
         ],
-        "Setor": ["1.50", "1.00", "4.00x", "2.00x", "0.80x", "55%", "1.00", "17%"]
+        referencia.rotulo("Setor"): [
+            referencia.formatar("liquidez_corrente", "{:.2f}"), referencia.formatar("liquidez_seca", "{:.2f}", "1.00"),
+            referencia.formatar("cobertura_juros", "{:.2f}x"), referencia.formatar("divida_ebitda", "{:.2f}x"),
+            referencia.formatar("divida_pl", "{:.2f}x", "0.80x"), referencia.formatar("endividamento", "{:.0f}%", "55%"),
+            referencia.formatar("fco_ll", "{:.2f}", "1.00"), referencia.formatar("margem_ebitda", "{:.0f}%", "17%")
+        ]
     }
     
+    if referencia.com_percentis:
+        ind_credito["Faixa 2023"] = [
+            referencia.faixa(nome, ind_2023[nome])
+            for nome in ["liquidez_corrente", "liquidez_seca", "cobertura_juros", "divida_ebitda",
+                         "divida_pl", "endividamento", "fco_ll", "margem_ebitda"]
+        ]
+    
     st.dataframe(pd.DataFrame(ind_credito), use_container_width=True, hide_index=True)
     
+    # Par real do universo CVM (só aparece com LAB_ARMAZEM_CVM configurado)
+    renderizar_comparacao_cvm("m14_par_cvm", [
+        ("liquidez_corrente", "Liquidez Corrente", "{:.2f}"), ("liquidez_seca", "Liquidez Seca", "{:.2f}"),
+        ("cobertura_juros", "Cobertura de Juros", "{:.2f}x"), ("divida_ebitda", "Dívida/EBITDA", "{:.2f}x"),
+        ("divida_pl", "Dívida/PL", "{:.2f}x"), ("endividamento", "Endividamento (%)", "{:.1f}%"),
+        ("fco_ll", "FCO/Lucro Líquido", "{:.2f}"), ("margem_ebitda", "Margem EBITDA (%)", "{:.1f}%"),
+    ], titulo="#### Compare com uma Companhia Aberta (CVM)")
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -249,7 +258,11 @@ def renderizar_simulacao_credito():
             y=[ind_2021['divida_ebitda'], ind_2022['divida_ebitda'], ind_2023['divida_ebitda']],
             marker_color=['#22c55e', '#f97316', '#ef4444']
         ))
-        fig2.add_hline(y=2.0, line_dash="dash", line_color="green", annotation_text="Média do Setor")
+        # Sem mediana do setor no universo, a linha de referência é omitida
+        referencia_divida = referencia.valor("divida_ebitda", 2.0)
+        if referencia_divida is not None:
+            fig2.add_hline(y=referencia_divida, line_dash="dash", line_color="green",
+                           annotation_text="Mediana do Setor" if referencia.com_percentis else "Média do Setor")
         fig2.add_hline(y=3.0, line_dash="dot", line_color="red", annotation_text="Limite Covenant")
         fig2.update_layout(title="Dívida/EBITDA", height=300)
         st.plotly_chart(fig2, use_container_width=True)
@@ -444,6 +457,30 @@ def renderizar_simulacao_investimento():
         """, unsafe_allow_html=True)
 
 
+def renderizar_empresas_parecidas():
+    st.markdown("### Empresas Parecidas com a IBM-SA")
+    
+    st.markdown("""
+        <div style='background-color: #e0e7ff; padding: 20px; border-radius: 10px; 
+                    border-left: 5px solid #3b82f6; margin-bottom: 20px;'>
+            <strong>Antes do parecer:</strong><br>
+            <em>Que companhias abertas tiveram um perfil de crédito parecido com o da IBM-SA em 2023? 
+            Encontre-as no universo de demonstrações da CVM e veja o que aconteceu com elas nos anos seguintes.</em>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    dados = get_empresa_analise()
+    ind_2023 = calcular_indicadores_completos(dados)[2023]
+    
+    # Só indicadores relativos: os valores absolutos do caso (R$ mi) não se comparam com a CVM (R$ mil)
+    indicadores = ["divida_ebitda", "cobertura_juros", "fco_ll", "liquidez_corrente",
+                   "endividamento", "margem_ebitda", "roe"]
+    renderizar_triagem_cvm(
+        "m14_triagem", {nome: ind_2023[nome] for nome in indicadores},
+        "divida_ebitda > 2 and cobertura_juros < 3 and fco_ll < 0.8", indicadores,
+    )
+
+
 def renderizar_discussao_grupo():
     st.markdown("### Discussão em Grupo: Defesa da Decisão")
     
@@ -14,6 +14,11 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 
+from cache_laboratorio import fixture_compartilhada
+from demonstracoes_laboratorio import carregar_demonstracoes
+from interface_laboratorio import renderizar_abas, selecionar_referencia_setorial
+from perfil_laboratorio import instrumentar
+
 
 def run():
     st.markdown("<h1>Módulo 15 - Projeto Final: Análise Integrada</h1>", unsafe_allow_html=True)
@@ -31,27 +36,22 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "Estudo de Caso Completo",
-        "Relatório Final",
-        "Discussão e Feedback"
+    renderizar_abas("abas_modulo15", [
+        ("Estudo de Caso Completo", renderizar_estudo_caso_completo, ("m15_referencia_*",)),
+        ("Relatório Final", renderizar_relatorio_final, ("rel_*",)),
+        ("Discussão e Feedback", renderizar_discussao_feedback, (
+            "grupo_avaliado", "fb_*", "reflexao[0-9]", "nota_*"
+        ))
     ])
-    
-    with tab1:
-        renderizar_estudo_caso_completo()
-    
-    with tab2:
-        renderizar_relatorio_final()
-    
-    with tab3:
-        renderizar_discussao_feedback()
 
 
+@fixture_compartilhada
 def get_dados_caso_final():
     """Retorna dados completos para o caso final."""
     dados = {
         "nome": "Construtora Horizonte S.A.",
         "setor": "Construção Civil / Incorporação Imobiliária",
+        "setor_cvm": "Construção Civil, Mat. Constr. e Decoração",
         "descricao": "Incorporadora e construtora com atuação em empreendimentos residenciais de médio e alto padrão nas regiões Sul e Sudeste do Brasil.",
         "contexto": """A Construtora Horizonte passou por um ciclo de forte expansão entre 2019 e 2021, 
         lançando diversos empreendimentos. Com a alta dos juros em 2022-2023, o mercado imobiliário 
@@ -128,28 +128,13 @@ def get_dados_caso_final():
     return dados
 
 
-def calcular_indicadores(dados_ano, dados_ant=None):
-    d = dados_ano
-    ind = {
-        "margem_bruta": d['lucro_bruto'] / d['receita'] * 100 if d['receita'] > 0 else 0,
-        "margem_ebitda": d['ebitda'] / d['receita'] * 100 if d['receita'] > 0 else 0,
-        "margem_ebit": d['ebit'] / d['receita'] * 100 if d['receita'] > 0 else 0,
-        "margem_liquida": d['lucro_liquido'] / d['receita'] * 100 if d['receita'] > 0 else 0,
-        "roe": d['lucro_liquido'] / d['pl'] * 100 if d['pl'] > 0 else 0,
-        "roa": d['lucro_liquido'] / d['ativo_total'] * 100 if d['ativo_total'] > 0 else 0,
-        "liquidez_corrente": d['ativo_circulante'] / d['passivo_circulante'] if d['passivo_circulante'] > 0 else 0,
-        "liquidez_seca": (d['ativo_circulante'] - d['estoques']) / d['passivo_circulante'] if d['passivo_circulante'] > 0 else 0,
-        "endividamento": (d['passivo_circulante'] + d['passivo_nao_circ']) / d['ativo_total'] * 100,
-        "divida_bruta": d['emprestimos_cp'] + d['emprestimos_lp'],
-        "divida_liquida": d['emprestimos_cp'] + d['emprestimos_lp'] - d['caixa'],
-        "divida_ebitda": (d['emprestimos_cp'] + d['emprestimos_lp']) / d['ebitda'] if d['ebitda'] > 0 else 999,
-        "divida_pl": (d['emprestimos_cp'] + d['emprestimos_lp']) / d['pl'] if d['pl'] > 0 else 999,
-        "cobertura_juros": d['ebit'] / d['desp_financeiras'] if d['desp_financeiras'] > 0 else 0,
-        "giro_ativo": d['receita'] / d['ativo_total'] if d['ativo_total'] > 0 else 0,
-        "fco_ll": d['fco'] / d['lucro_liquido'] if d['lucro_liquido'] != 0 else 0,
-        "multiplicador": d['ativo_total'] / d['pl'] if d['pl'] > 0 else 0
-    }
-    return ind
+@instrumentar("calculo")
+def calcular_indicadores(dados):
+    """Indicadores de todos os anos do histórico num único passe vetorizado."""
+    demonstracoes = carregar_demonstracoes({
+        (dados['nome'], ano): dados_ano for ano, dados_ano in dados['historico'].items()
+    })
+    return demonstracoes.indicadores_por_periodo(dados['nome'])
 
 
 def renderizar_estudo_caso_completo():
@@ -275,11 +260,11 @@ def renderizar_estudo_caso_completo():
     # Indicadores calculados
     st.markdown("#### Indicadores Financeiros Calculados")
     
-    ind_2020 = calcular_indicadores(dados['historico'][2020])
-    ind_2021 = calcular_indicadores(dados['historico'][2021])
-    ind_2022 = calcular_indicadores(dados['historico'][2022])
-    ind_2023 = calcular_indicadores(dados['historico'][2023])
-    medias = dados['setor_medias']
+    ind = calcular_indicadores(dados)
+    ind_2020, ind_2021, ind_2022, ind_2023 = ind[2020], ind[2021], ind[2022], ind[2023]
+    
+    # Média estática da aula ou percentis do setor no universo CVM
+    referencia = selecionar_referencia_setorial("m15_referencia", dados['setor_medias'], dados['setor_cvm'], 2023)
     
     indicadores_tabela = {
         "Indicador": ["Margem Bruta (%)", "Margem EBITDA (%)", "Margem Líquida (%)",
@@ -306,10 +291,21 @@ def renderizar_estudo_caso_completo():
                 f"{ind_2023['divida_ebitda']:.1f}x" if ind_2023['divida_ebitda'] < 50 else ">50x", 
                 f"{ind_2023['divida_pl']:.2f}",
                 f"{ind_2023['cobertura_juros']:.1f}", "N/A"],
-        "Setor": [f"{medias['margem_bruta']}", f"15", f"{medias['margem_liquida']}",
-                 f"{medias['roe']}", f"{medias['roa']}", f"{medias['liquidez_corrente']}",
-                 f"{medias['divida_ebitda']}", f"{medias['divida_pl']}", "3.0", "1.0"]
+        referencia.rotulo("Setor"): [
+            referencia.formatar("margem_bruta", "{:.1f}"), referencia.formatar("margem_ebitda", "{:.1f}", "15"),
+            referencia.formatar("margem_liquida", "{:.1f}"), referencia.formatar("roe", "{:.1f}"),
+            referencia.formatar("roa", "{:.1f}"), referencia.formatar("liquidez_corrente", "{:.2f}"),
+            referencia.formatar("divida_ebitda", "{:.1f}"), referencia.formatar("divida_pl", "{:.2f}"),
+            referencia.formatar("cobertura_juros", "{:.1f}", "3.0"), referencia.formatar("fco_ll", "{:.2f}", "1.0")
+        ]
     }
+    
+    if referencia.com_percentis:
+        indicadores_tabela["Faixa 2023"] = [
+            referencia.faixa(nome, ind_2023[nome])
+            for nome in ["margem_bruta", "margem_ebitda", "margem_liquida", "roe", "roa", "liquidez_corrente",
+                         "divida_ebitda", "divida_pl", "cobertura_juros", "fco_ll"]
+        ]
     st.dataframe(pd.DataFrame(indicadores_tabela), use_container_width=True, hide_index=True)
     
     # Gráficos
@@ -345,7 +341,11 @@ def renderizar_estudo_caso_completo():
         fig3.add_trace(go.Scatter(x=anos, y=[ind_2020['divida_ebitda'], ind_2021['divida_ebitda'],
                                             ind_2022['divida_ebitda'], min(ind_2023['divida_ebitda'], 15)],
                                  name='Dívida/EBITDA', line=dict(color='#ef4444', width=3), mode='lines+markers'))
-        fig3.add_hline(y=2.5, line_dash="dash", line_color="green", annotation_text="Média Setor")
+        # Sem mediana do setor no universo, a linha de referência é omitida
+        referencia_divida = referencia.valor("divida_ebitda", 2.5)
+        if referencia_divida is not None:
+            fig3.add_hline(y=referencia_divida, line_dash="dash", line_color="green",
+                           annotation_text="Mediana Setor" if referencia.com_percentis else "Média Setor")
         fig3.add_hline(y=4.0, line_dash="dot", line_color="red", annotation_text="Limite Crítico")
         fig3.update_layout(title="Dívida/EBITDA", height=300)
         st.plotly_chart(fig3, use_container_width=True)
@@ -10,6 +10,8 @@ Conteúdo:
 
 import streamlit as st
 
+from interface_laboratorio import renderizar_abas
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -34,29 +36,13 @@ def run():
     # =========================================================================
     # NAVEGAÇÃO POR ABAS
     # =========================================================================
-    tab1, tab2, tab3 = st.tabs([
-        "💬 Discussão Orientada", 
-        "🔍 Exercício Diagnóstico", 
-        "📝 Mini-Quiz"
+    renderizar_abas("abas_modulo1", [
+        ("💬 Discussão Orientada", renderizar_discussao_orientada, (
+            "notas_investidor", "notas_banco", "notas_gestor"
+        )),
+        ("🔍 Exercício Diagnóstico", renderizar_exercicio_diagnostico, ("decisao_*",)),
+        ("📝 Mini-Quiz", renderizar_mini_quiz, ("quiz_q*",))
     ])
-    
-    # =========================================================================
-    # ABA 1: DISCUSSÃO ORIENTADA
-    # =========================================================================
-    with tab1:
-        renderizar_discussao_orientada()
-    
-    # =========================================================================
-    # ABA 2: EXERCÍCIO DIAGNÓSTICO
-    # =========================================================================
-    with tab2:
-        renderizar_exercicio_diagnostico()
-    
-    # =========================================================================
-    # ABA 3: MINI-QUIZ
-    # =========================================================================
-    with tab3:
-        renderizar_mini_quiz()
 
 
 def renderizar_discussao_orientada():
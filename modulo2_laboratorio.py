@@ -5,6 +5,8 @@ Laboratório de Análise de Demonstrações Financeiras
 
 import streamlit as st
 
+from interface_laboratorio import renderizar_abas
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -24,20 +26,17 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "🗺️ Exercício Guiado", 
-        "👥 Atividade em Dupla", 
-        "📝 Exercícios Estruturais"
+    renderizar_abas("abas_modulo2", [
+        ("🗺️ Exercício Guiado", renderizar_exercicio_guiado, (
+            "evento_guiado", "r_bp_*", "r_dre_*", "r_dfc_*"
+        )),
+        ("👥 Atividade em Dupla", renderizar_atividade_dupla, (
+            "cenario_dupla", "disc_*", "c_bp_*", "c_dre_*", "c_dfc_*", "c_dmpl_*"
+        )),
+        ("📝 Exercícios Estruturais", renderizar_exercicios_estruturais, (
+            "ex1_*", "ex2_passivo", "ex3_*", "ex4_*", "ex5"
+        ))
     ])
-    
-    with tab1:
-        renderizar_exercicio_guiado()
-    
-    with tab2:
-        renderizar_atividade_dupla()
-    
-    with tab3:
-        renderizar_exercicios_estruturais()
 
 
 def renderizar_exercicio_guiado():
@@ -4,14 +4,32 @@ Laboratório de Análise de Demonstrações Financeiras
 =======================================================
 Conteúdo:
 - Estudo de caso: impacto de diferentes métodos de depreciação no lucro
+- Registro de ativos: cronograma de depreciação de milhares de ativos (CSV)
+- Depreciação contábil vs. fiscal e IR/CS diferido de uma carteira de ativos
 - Exercício reflexivo: "Lucro pode ser verdadeiro e ainda assim enganoso?"
 - Questões discursivas para debate em sala
 """
 
+import time
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.subplots import make_subplots
+
+from cache_laboratorio import calculo_em_cache, fixture_compartilhada
+from depreciacao_laboratorio import (
+    CONVENCOES, METODOS, calcular_cronograma, consolidar_por_ano, ler_registro, registro_exemplo,
+    simular_tributos_diferidos,
+)
+from indicadores_laboratorio import ALIQUOTA_IR_CS
+from interface_laboratorio import edicao_em_lote, renderizar_abas
+
+# Limites da carteira editável: cada unidade vira uma linha do cálculo vetorizado
+MAX_QUANTIDADE_GRUPO = 10_000
+MAX_ATIVOS_CARTEIRA = 100_000
 
 
 def run():
@@ -32,43 +50,50 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Estudo de Caso: Depreciação",
-        "🤔 Exercício Reflexivo",
-        "💬 Questões para Debate"
+    renderizar_abas("abas_modulo3", [
+        ("📊 Estudo de Caso: Depreciação", renderizar_estudo_caso_depreciacao, (
+            "convencao_dep", "valor_ativo", "valor_residual", "vida_util", "prod_*",
+            "receita_anual", "outros_custos", "resp_dep_*", "metodo_contabil_maquina",
+            "vida_fiscal_maquina", "resultado_antes_depreciacao", "aliquota_ir_cs",
+            "horizonte_diferidos"
+        )),
+        ("🗂️ Registro de Ativos", renderizar_registro_ativos, (
+            "m3_registro_metodo", "m3_registro_convencao"
+        )),
+        ("🤔 Exercício Reflexivo", renderizar_exercicio_reflexivo, ("quiz_reflexivo", "reflexivo_*")),
+        ("💬 Questões para Debate", renderizar_questoes_debate, (
+            "questao_reflexao_final", "reflexao_final_texto", "favor_*", "contra_*", "conclusao_*"
+        ))
     ])
-    
-    with tab1:
-        renderizar_estudo_caso_depreciacao()
-    
-    with tab2:
-        renderizar_exercicio_reflexivo()
-    
-    with tab3:
-        renderizar_questoes_debate()
-
 
-def calcular_depreciacao_linear(valor_ativo, valor_residual, vida_util, ano):
-    """Calcula depreciação pelo método linear."""
-    depreciacao_anual = (valor_ativo - valor_residual) / vida_util
-    return depreciacao_anual
 
+@fixture_compartilhada
+def get_registro_exemplo():
+    """Registro sintético de 100.000 ativos para a simulação em escala."""
+    return registro_exemplo()
 
-def calcular_depreciacao_acelerada(valor_ativo, valor_residual, vida_util, ano):
-    """Calcula depreciação pelo método da soma dos dígitos (acelerada)."""
-    soma_digitos = sum(range(1, vida_util + 1))
-    fator = (vida_util - ano + 1) / soma_digitos
-    depreciacao_anual = (valor_ativo - valor_residual) * fator
-    return depreciacao_anual
 
-
-def calcular_depreciacao_unidades(valor_ativo, valor_residual, producao_total, producao_ano):
-    """Calcula depreciação pelo método de unidades produzidas."""
-    taxa = (valor_ativo - valor_residual) / producao_total
-    depreciacao_anual = taxa * producao_ano
-    return depreciacao_anual
+@fixture_compartilhada
+def get_carteira_ativos():
+    """Demais ativos da Indústria Alfa (valores unitários) para a simulação contábil vs. fiscal."""
+    carteira = [
+        {"Ativo": "Veículos da frota", "Quantidade": 40, "Custo Unitário (R$)": 80000,
+         "Residual Unitário (R$)": 16000, "Vida Contábil (anos)": 4, "Método Contábil": "Saldo Decrescente",
+         "Vida Fiscal (anos)": 5, "Ano de Aquisição": 1},
+        {"Ativo": "Computadores e servidores", "Quantidade": 150, "Custo Unitário (R$)": 6000,
+         "Residual Unitário (R$)": 0, "Vida Contábil (anos)": 3, "Método Contábil": "Linear",
+         "Vida Fiscal (anos)": 5, "Ano de Aquisição": 1},
+        {"Ativo": "Galpão industrial", "Quantidade": 1, "Custo Unitário (R$)": 2000000,
+         "Residual Unitário (R$)": 400000, "Vida Contábil (anos)": 40, "Método Contábil": "Linear",
+         "Vida Fiscal (anos)": 25, "Ano de Aquisição": 1},
+        {"Ativo": "Linha de envase", "Quantidade": 2, "Custo Unitário (R$)": 900000,
+         "Residual Unitário (R$)": 90000, "Vida Contábil (anos)": 8, "Método Contábil": "Acelerada (Soma dos Dígitos)",
+         "Vida Fiscal (anos)": 10, "Ano de Aquisição": 2},
+    ]
+    return carteira
 
 
+@st.fragment
 def renderizar_estudo_caso_depreciacao():
     """Estudo de caso sobre impacto dos métodos de depreciação no lucro."""
     
@@ -86,84 +111,89 @@ def renderizar_estudo_caso_depreciacao():
     
     st.markdown("#### ⚙️ Parâmetros do Ativo")
     
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        valor_ativo = st.number_input(
-            "Valor do Ativo (R$)",
-            min_value=100000,
-            max_value=2000000,
-            value=500000,
-            step=50000,
-            key="valor_ativo"
-        )
-    
-    with col2:
-        valor_residual = st.number_input(
-            "Valor Residual (R$)",
-            min_value=0,
-            max_value=int(valor_ativo * 0.3),
-            value=50000,
-            step=10000,
-            key="valor_residual"
-        )
-    
-    with col3:
-        vida_util = st.slider(
-            "Vida Útil (anos)",
-            min_value=3,
-            max_value=10,
-            value=5,
-            key="vida_util"
-        )
-    
-    # Produção para método de unidades
-    st.markdown("##### Produção Estimada (para método de unidades produzidas)")
-    
-    producao_total = vida_util * 10000  # Total estimado
-    producao_por_ano = []
-    
-    cols = st.columns(vida_util)
-    for i, col in enumerate(cols):
-        with col:
-            prod = st.number_input(
-                f"Ano {i+1}",
-                min_value=1000,
-                max_value=20000,
-                value=12000 - i * 1000 if i < 5 else 8000,
-                step=500,
-                key=f"prod_{i}"
+    with edicao_em_lote("form_depreciacao"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            valor_ativo = st.number_input(
+                "Valor do Ativo (R$)",
+                min_value=100000,
+                max_value=2000000,
+                value=500000,
+                step=50000,
+                key="valor_ativo"
             )
-            producao_por_ano.append(prod)
-    
-    producao_total = sum(producao_por_ano)
+        
+        with col2:
+            valor_residual = st.number_input(
+                "Valor Residual (R$)",
+                min_value=0,
+                max_value=int(valor_ativo * 0.3),
+                value=50000,
+                step=10000,
+                key="valor_residual"
+            )
+        
+        with col3:
+            vida_util = st.slider(
+                "Vida Útil (anos)",
+                min_value=3,
+                max_value=10,
+                value=5,
+                key="vida_util"
+            )
+        
+        convencao = st.radio(
+            "Convenção do Primeiro Ano",
+            list(CONVENCOES),
+            format_func=CONVENCOES.get,
+            horizontal=True,
+            key="convencao_dep",
+            help="Meio ano: a máquina entra em uso no meio do primeiro ano e termina de depreciar "
+                 "no meio do ano seguinte ao fim da vida útil (unidades produzidas seguem a produção)."
+        )
+        
+        # Produção para método de unidades
+        st.markdown("##### Produção Estimada (para método de unidades produzidas)")
+        
+        producao_total = vida_util * 10000  # Total estimado
+        producao_por_ano = []
+        
+        cols = st.columns(vida_util)
+        for i, col in enumerate(cols):
+            with col:
+                prod = st.number_input(
+                    f"Ano {i+1}",
+                    min_value=1000,
+                    max_value=20000,
+                    value=12000 - i * 1000 if i < 5 else 8000,
+                    step=500,
+                    key=f"prod_{i}"
+                )
+                producao_por_ano.append(prod)
     
     st.markdown("---")
     
-    # Cálculos
-    anos = list(range(1, vida_util + 1))
-    
-    # Método Linear
-    dep_linear = [calcular_depreciacao_linear(valor_ativo, valor_residual, vida_util, ano) for ano in anos]
-    
-    # Método Acelerado (Soma dos Dígitos)
-    dep_acelerada = [calcular_depreciacao_acelerada(valor_ativo, valor_residual, vida_util, ano) for ano in anos]
-    
-    # Método Unidades Produzidas
-    dep_unidades = [calcular_depreciacao_unidades(valor_ativo, valor_residual, producao_total, prod) for prod in producao_por_ano]
+    # Cálculos: os quatro métodos num único cronograma (uma linha por método)
+    depreciacao, valor_contabil = calcular_cronograma(
+        valor_ativo, valor_residual, vida_util,
+        ["linear", "soma_digitos", "saldo_decrescente", "unidades"],
+        producao=producao_por_ano, convencao=convencao
+    )
+    anos = list(range(1, depreciacao.shape[1] + 1))
+    dep_linear, dep_acelerada, dep_saldo, dep_unidades = depreciacao.tolist()
     
     # DataFrame comparativo
     df_depreciacao = pd.DataFrame({
         'Ano': anos,
         'Linear': dep_linear,
         'Acelerada': dep_acelerada,
+        'Saldo Decrescente': dep_saldo,
         'Unidades Produzidas': dep_unidades
     })
     
-    # Valores contábeis líquidos
-    vcl_linear = [valor_ativo - sum(dep_linear[:i+1]) for i in range(vida_util)]
-    vcl_acelerada = [valor_ativo - sum(dep_acelerada[:i+1]) for i in range(vida_util)]
-    vcl_unidades = [valor_ativo - sum(dep_unidades[:i+1]) for i in range(vida_util)]
+    # Valores contábeis líquidos (fim de cada ano)
+    vcl_linear, vcl_acelerada, vcl_saldo, vcl_unidades = valor_contabil.tolist()
     
     st.markdown("#### 📈 Comparativo dos Métodos de Depreciação")
     
@@ -175,17 +205,20 @@ def renderizar_estudo_caso_depreciacao():
         df_display = df_depreciacao.copy()
         df_display['Linear'] = df_display['Linear'].apply(lambda x: f"R$ {x:,.0f}")
         df_display['Acelerada'] = df_display['Acelerada'].apply(lambda x: f"R$ {x:,.0f}")
+        df_display['Saldo Decrescente'] = df_display['Saldo Decrescente'].apply(lambda x: f"R$ {x:,.0f}")
         df_display['Unidades Produzidas'] = df_display['Unidades Produzidas'].apply(lambda x: f"R$ {x:,.0f}")
         
         st.dataframe(df_display, use_container_width=True, hide_index=True)
         
         # Totais
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("Total Linear", f"R$ {sum(dep_linear):,.0f}")
         with col2:
             st.metric("Total Acelerada", f"R$ {sum(dep_acelerada):,.0f}")
         with col3:
+            st.metric("Total Saldo Decrescente", f"R$ {sum(dep_saldo):,.0f}")
+        with col4:
             st.metric("Total Unidades", f"R$ {sum(dep_unidades):,.0f}")
         
         st.info("💡 **Observe:** O total depreciado é igual em todos os métodos! A diferença está na **distribuição ao longo do tempo**.")
@@ -199,6 +232,7 @@ def renderizar_estudo_caso_depreciacao():
             fig1 = go.Figure()
             fig1.add_trace(go.Bar(name='Linear', x=anos, y=dep_linear, marker_color='#3b82f6'))
             fig1.add_trace(go.Bar(name='Acelerada', x=anos, y=dep_acelerada, marker_color='#ef4444'))
+            fig1.add_trace(go.Bar(name='Saldo Decrescente', x=anos, y=dep_saldo, marker_color='#a855f7'))
             fig1.add_trace(go.Bar(name='Unidades', x=anos, y=dep_unidades, marker_color='#22c55e'))
             
             fig1.update_layout(
@@ -216,6 +250,7 @@ def renderizar_estudo_caso_depreciacao():
             fig2 = go.Figure()
             fig2.add_trace(go.Scatter(name='Linear', x=anos, y=vcl_linear, mode='lines+markers', line=dict(color='#3b82f6', width=2)))
             fig2.add_trace(go.Scatter(name='Acelerada', x=anos, y=vcl_acelerada, mode='lines+markers', line=dict(color='#ef4444', width=2)))
+            fig2.add_trace(go.Scatter(name='Saldo Decrescente', x=anos, y=vcl_saldo, mode='lines+markers', line=dict(color='#a855f7', width=2)))
             fig2.add_trace(go.Scatter(name='Unidades', x=anos, y=vcl_unidades, mode='lines+markers', line=dict(color='#22c55e', width=2)))
             
             fig2.update_layout(
@@ -250,6 +285,7 @@ def renderizar_estudo_caso_depreciacao():
         # Calcular lucro por método
         lucro_linear = [receita_anual - outros_custos - dep for dep in dep_linear]
         lucro_acelerado = [receita_anual - outros_custos - dep for dep in dep_acelerada]
+        lucro_saldo = [receita_anual - outros_custos - dep for dep in dep_saldo]
         lucro_unidades = [receita_anual - outros_custos - dep for dep in dep_unidades]
         
         st.markdown("##### Lucro Operacional por Ano e Método")
@@ -258,6 +294,7 @@ def renderizar_estudo_caso_depreciacao():
             'Ano': anos,
             'Lucro (Linear)': [f"R$ {l:,.0f}" for l in lucro_linear],
             'Lucro (Acelerada)': [f"R$ {l:,.0f}" for l in lucro_acelerado],
+            'Lucro (Saldo Decrescente)': [f"R$ {l:,.0f}" for l in lucro_saldo],
             'Lucro (Unidades)': [f"R$ {l:,.0f}" for l in lucro_unidades]
         })
         
@@ -267,6 +304,7 @@ def renderizar_estudo_caso_depreciacao():
         fig3 = go.Figure()
         fig3.add_trace(go.Scatter(name='Linear', x=anos, y=lucro_linear, mode='lines+markers', fill='tozeroy', line=dict(color='#3b82f6')))
         fig3.add_trace(go.Scatter(name='Acelerada', x=anos, y=lucro_acelerado, mode='lines+markers', line=dict(color='#ef4444')))
+        fig3.add_trace(go.Scatter(name='Saldo Decrescente', x=anos, y=lucro_saldo, mode='lines+markers', line=dict(color='#a855f7')))
         fig3.add_trace(go.Scatter(name='Unidades', x=anos, y=lucro_unidades, mode='lines+markers', line=dict(color='#22c55e')))
         
         fig3.update_layout(
@@ -287,6 +325,8 @@ def renderizar_estudo_caso_depreciacao():
                 Isso representa uma variação de <strong>{(diferenca_ano1/lucro_linear[0])*100:.1f}%</strong> no lucro reportado!
             </div>
         """, unsafe_allow_html=True)
+        
+        renderizar_tributos_diferidos(valor_ativo, valor_residual, vida_util, producao_por_ano, convencao)
     
     st.markdown("---")
     
@@ -320,7 +360,7 @@ def renderizar_estudo_caso_depreciacao():
                 **Comentário:** A norma permite diferentes métodos porque cada um pode refletir melhor 
                 o padrão de consumo dos benefícios econômicos do ativo:
                 - **Linear:** quando o uso é constante ao longo do tempo
-                - **Acelerada:** quando o ativo é mais produtivo nos primeiros anos
+                - **Acelerada (soma dos dígitos ou saldo decrescente):** quando o ativo é mais produtivo nos primeiros anos
                 - **Unidades:** quando o desgaste depende diretamente da produção
                 
                 O princípio da **essência sobre a forma** orienta que a contabilidade deve refletir 
@@ -328,6 +368,299 @@ def renderizar_estudo_caso_depreciacao():
             """)
 
 
+def renderizar_tributos_diferidos(valor_ativo, valor_residual, vida_util, producao_por_ano, convencao):
+    """Depreciação contábil vs. fiscal da máquina do caso e dos demais ativos da empresa."""
+    
+    st.markdown("---")
+    st.markdown("##### 🧾 Depreciação Contábil vs. Fiscal: IR/CS Diferido")
+    
+    st.markdown("""
+        <div style='background-color: #e0e7ff; padding: 15px; border-radius: 10px; margin-bottom: 15px;'>
+            O fisco não segue a escolha contábil da empresa: a Receita Federal fixa taxas lineares por 
+            tipo de bem (ex.: 10% a.a. para máquinas, 20% para veículos e computadores, 4% para edificações), 
+            sem valor residual. A diferença entre a depreciação do balanço e a do fisco é <strong>temporária</strong>: 
+            gera IR/CS diferido, que devolve ao resultado a alíquota nominal sobre o lucro contábil.
+        </div>
+    """, unsafe_allow_html=True)
+    
+    rotulos = {METODOS[codigo]: codigo for codigo in ("linear", "soma_digitos", "saldo_decrescente")}
+    with edicao_em_lote("form_tributos_diferidos"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            metodo_maquina = st.selectbox(
+                "Método Contábil da Máquina",
+                list(METODOS),
+                format_func=METODOS.get,
+                key="metodo_contabil_maquina"
+            )
+            vida_fiscal_maquina = st.number_input(
+                "Vida Fiscal da Máquina (anos)", min_value=1, max_value=50, value=10, key="vida_fiscal_maquina"
+            )
+        with col2:
+            resultado_antes = st.number_input(
+                "Resultado Antes da Depreciação (R$/ano)",
+                min_value=0,
+                max_value=50000000,
+                value=2500000,
+                step=100000,
+                key="resultado_antes_depreciacao"
+            )
+            aliquota = st.number_input(
+                "Alíquota IR/CS (%)", min_value=0.0, max_value=50.0, value=ALIQUOTA_IR_CS * 100, step=1.0,
+                key="aliquota_ir_cs"
+            )
+        with col3:
+            horizonte = st.slider("Horizonte (anos)", min_value=5, max_value=40, value=15, key="horizonte_diferidos")
+        
+        st.markdown("**Demais ativos da empresa** (cada linha é um grupo de ativos iguais; edite ou inclua linhas)")
+        # O editor é somente leitura na Session State: a carteira editada fica em
+        # uma chave própria e volta como `data` quando o editor é recriado (ex.:
+        # ao retornar para a aba), sem reaplicar as edições sobre ela mesma.
+        if "carteira_ativos" not in st.session_state:
+            st.session_state["m3_carteira_base"] = st.session_state.get(
+                "m3_carteira_editada", pd.DataFrame([dict(ativo) for ativo in get_carteira_ativos()])
+            )
+        carteira = st.data_editor(
+            st.session_state["m3_carteira_base"],
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            key="carteira_ativos",
+            column_config={
+                "Quantidade": st.column_config.NumberColumn(min_value=0, max_value=MAX_QUANTIDADE_GRUPO, step=1),
+                "Custo Unitário (R$)": st.column_config.NumberColumn(min_value=0, format="%.0f"),
+                "Residual Unitário (R$)": st.column_config.NumberColumn(min_value=0, format="%.0f"),
+                "Vida Contábil (anos)": st.column_config.NumberColumn(min_value=1, max_value=60, step=1),
+                "Método Contábil": st.column_config.SelectboxColumn(options=list(rotulos)),
+                "Vida Fiscal (anos)": st.column_config.NumberColumn(min_value=1, max_value=60, step=1),
+                "Ano de Aquisição": st.column_config.NumberColumn(min_value=1, max_value=40, step=1),
+            }
+        )
+    st.session_state["m3_carteira_editada"] = carteira
+    
+    # Residual e ano de aquisição em branco valem 0 (sem residual) e 1 (ativo
+    # adquirido no primeiro ano); linhas ainda sem quantidade, custo, vidas ou método ficam fora e
+    # são listadas no aviso. O nome do ativo é só rótulo e pode ficar vazio.
+    carteira = carteira.fillna({"Residual Unitário (R$)": 0, "Ano de Aquisição": 1})
+    incompletas = carteira.drop(columns="Ativo").isna().any(axis=1).to_numpy()
+    if incompletas.any():
+        ignoradas = [
+            nome if isinstance(nome, str) and nome.strip() else f"linha {posicao + 1}"
+            for posicao, nome in enumerate(carteira["Ativo"]) if incompletas[posicao]
+        ]
+        st.warning(
+            f"Linhas incompletas ignoradas na simulação: {', '.join(ignoradas)}. "
+            "Preencha quantidade, custo, vidas e método para incluí-las."
+        )
+    carteira = carteira[~incompletas]
+    
+    # Cada ativo é uma linha do cálculo: a máquina do caso e os grupos repetidos pela quantidade
+    quantidades = carteira["Quantidade"].to_numpy(dtype=np.float64).clip(0, MAX_QUANTIDADE_GRUPO).astype(np.int64)
+    if quantidades.sum() > MAX_ATIVOS_CARTEIRA:
+        st.error(
+            f"Não foi possível simular a carteira: {quantidades.sum():,} ativos excedem o limite "
+            f"de {MAX_ATIVOS_CARTEIRA:,}. Reduza as quantidades."
+        )
+        return
+    grupo = np.repeat(np.arange(len(carteira)), quantidades)
+    def coluna(nome):
+        return np.concatenate([[0.0], carteira[nome].to_numpy(dtype=np.float64)[grupo]])
+    
+    custo, residual = coluna("Custo Unitário (R$)"), coluna("Residual Unitário (R$)")
+    vida_contabil, vida_fiscal, ano_aquisicao = coluna("Vida Contábil (anos)"), coluna("Vida Fiscal (anos)"), coluna("Ano de Aquisição")
+    custo[0], residual[0], vida_contabil[0], vida_fiscal[0], ano_aquisicao[0] = (
+        valor_ativo, valor_residual, vida_util, vida_fiscal_maquina, 1
+    )
+    metodo = np.concatenate([[metodo_maquina], carteira["Método Contábil"].map(rotulos).to_numpy(dtype=str)[grupo]])
+    producao = np.zeros((len(custo), len(producao_por_ano)))
+    producao[0] = producao_por_ano
+    
+    try:
+        resultado = calculo_em_cache(
+            "modulo3", "tributos_diferidos", simular_tributos_diferidos,
+            custo, residual, vida_contabil, metodo, vida_fiscal, float(resultado_antes),
+            ano_aquisicao.astype(np.int64), int(horizonte), aliquota / 100, convencao, producao
+        )
+    except ValueError as erro:
+        st.error(f"Não foi possível simular a carteira: {erro}")
+        return
+    
+    saldo = resultado["saldo_diferido"]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Ativos na Carteira", f"{len(custo):,}")
+    with col2:
+        st.metric("Maior Ativo Fiscal Diferido", f"R$ {max(saldo.max(), 0):,.0f}")
+    with col3:
+        st.metric("Maior Passivo Fiscal Diferido", f"R$ {max(-saldo.min(), 0):,.0f}")
+    
+    df_diferidos = pd.DataFrame({
+        'Ano': resultado["ano"],
+        'Dep. Contábil': resultado["dep_contabil"],
+        'Dep. Fiscal': resultado["dep_fiscal"],
+        'LAIR': resultado["lair"],
+        'Lucro Tributável': resultado["lucro_tributavel"],
+        'IR/CS Corrente': resultado["ir_corrente"],
+        'IR/CS Diferido': resultado["ir_diferido"],
+        'Saldo Diferido (+ Ativo / − Passivo)': saldo,
+        'Alíquota Corrente (%)': resultado["aliquota_corrente"],
+        'Alíquota Efetiva (%)': resultado["aliquota_efetiva"],
+    })
+    st.dataframe(
+        df_diferidos.style.format({
+            coluna: "{:.1f}" if coluna.endswith("(%)") else "R$ {:,.0f}"
+            for coluna in df_diferidos.columns if coluna != 'Ano'
+        }, na_rep="—"),
+        use_container_width=True, hide_index=True
+    )
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(name='Saldo Diferido', x=resultado["ano"], y=saldo,
+                         marker_color=np.where(saldo >= 0, '#22c55e', '#ef4444')))
+    fig.add_trace(go.Scatter(name='Alíquota Corrente', x=resultado["ano"], y=resultado["aliquota_corrente"],
+                             mode='lines+markers', line=dict(color='#f59e0b', width=2)), secondary_y=True)
+    fig.add_trace(go.Scatter(name='Alíquota Efetiva', x=resultado["ano"], y=resultado["aliquota_efetiva"],
+                             mode='lines+markers', line=dict(color='#3b82f6', width=2, dash='dot')), secondary_y=True)
+    fig.update_layout(xaxis_title='Ano', height=350, legend=dict(orientation="h", yanchor="bottom", y=1.02))
+    fig.update_yaxes(title_text="Saldo Diferido (R$)", secondary_y=False)
+    fig.update_yaxes(title_text="Alíquota (%)", secondary_y=True)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.info(
+        "💡 **Observe:** só com o IR/CS corrente, a alíquota sobre o lucro contábil oscila conforme o fisco "
+        "deprecia mais ou menos que o balanço. Com o diferido, a despesa volta à alíquota nominal. Terminadas "
+        "as vidas úteis, o saldo que sobra corresponde aos valores residuais, realizado na baixa dos ativos."
+    )
+
+
+def calcular_registro(custo, residual, vida_util, metodo, producao, convencao, ano_aquisicao):
+    """
+    Cronograma de um registro inteiro consolidado por ano e a composição
+    por método (só o que a aba exibe fica no cache, não a matriz ativos × anos).
+    """
+    depreciacao, _ = calcular_cronograma(custo, residual, vida_util, metodo, producao, convencao)
+    anos, despesa, valor_contabil = consolidar_por_ano(depreciacao, custo, ano_aquisicao)
+    
+    # Quanto do valor depreciável de cada método sai nos 3 primeiros anos de uso
+    codigos, posicao = np.unique(metodo, return_inverse=True)
+    composicao = {
+        "Método": [METODOS[codigo] for codigo in codigos.tolist()],
+        "Ativos": np.bincount(posicao),
+        "Custo (R$ mi)": np.round(np.bincount(posicao, weights=custo) / 1e6, 1),
+        "Depreciado nos 3 Primeiros Anos (%)": np.round(
+            np.bincount(posicao, weights=depreciacao[:, :3].sum(axis=1))
+            / np.bincount(posicao, weights=custo - residual) * 100, 1
+        ),
+    }
+    return anos, despesa, valor_contabil, composicao
+
+
+def renderizar_registro_ativos():
+    """Cronograma de depreciação de um registro inteiro de ativos (CSV ou exemplo)."""
+    
+    st.markdown("### 🗂️ Registro de Ativos: Depreciação em Escala")
+    
+    st.markdown("""
+        <div style='background-color: #e0e7ff; padding: 20px; border-radius: 10px; 
+                    border-left: 5px solid #3b82f6; margin-bottom: 20px;'>
+            <strong>Da máquina ao imobilizado inteiro:</strong><br>
+            <em>Na prática, a despesa de depreciação do resultado é a soma dos cronogramas de milhares 
+            de ativos, adquiridos em anos diferentes e depreciados por métodos diferentes. Envie o 
+            registro de ativos de uma empresa em CSV ou use o registro de exemplo com 100.000 ativos.</em>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # O upload não pode ser restaurado pela Session State: o registro lido fica
+    # em uma chave própria (id do upload, nome, registro, arquivo ainda no
+    # widget) e é reaproveitado enquanto o mesmo upload continua no widget (o
+    # CSV é lido uma vez por envio, não a cada rerun) e quando o widget volta
+    # vazio após uma troca de aba (a chave do widget some enquanto a aba está
+    # fechada).
+    recriado = "m3_registro_csv" not in st.session_state
+    arquivo = st.file_uploader("Registro de ativos (CSV)", type=["csv"], key="m3_registro_csv")
+    st.caption(
+        "Colunas: `custo` e `vida_util` (obrigatórias); `residual`, `metodo` (linear, soma_digitos, "
+        "saldo_decrescente ou unidades), `descricao`, `ano_aquisicao` e `producao_1`, `producao_2`, ... "
+        "(opcionais). Separador vírgula, ou ponto e vírgula com vírgula decimal."
+    )
+    importado = st.session_state.pop("m3_registro_importado", None)
+    if arquivo is not None:
+        if importado is not None and importado[0] == arquivo.file_id:
+            registro = importado[2]
+        else:
+            try:
+                registro = ler_registro(arquivo)
+            except ValueError as erro:
+                st.error(f"Não foi possível ler o registro: {erro}")
+                return
+        st.session_state["m3_registro_importado"] = (arquivo.file_id, arquivo.name, registro, True)
+    elif importado is not None and (recriado or not importado[3]):
+        id_upload, nome, registro, _ = importado
+        st.session_state["m3_registro_importado"] = (id_upload, nome, registro, False)
+        st.caption(f"Usando o registro enviado anteriormente ({nome}); envie outro arquivo para substituí-lo.")
+    else:
+        registro = get_registro_exemplo()
+        st.caption("Sem arquivo enviado: usando o registro de exemplo com 100.000 ativos.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        metodo = st.selectbox(
+            "Método de Depreciação",
+            ["registro"] + list(METODOS),
+            format_func=lambda codigo: "Conforme o registro" if codigo == "registro" else METODOS[codigo],
+            key="m3_registro_metodo"
+        )
+    with col2:
+        convencao = st.radio(
+            "Convenção do Primeiro Ano",
+            list(CONVENCOES),
+            format_func=CONVENCOES.get,
+            horizontal=True,
+            key="m3_registro_convencao"
+        )
+    
+    metodos = registro["metodo"] if metodo == "registro" else np.full(len(registro["custo"]), metodo)
+    try:
+        inicio = time.perf_counter()
+        anos, despesa, valor_contabil, composicao = calculo_em_cache(
+            "modulo3", "registro_ativos", calcular_registro,
+            registro["custo"], registro["residual"], registro["vida_util"], metodos,
+            registro["producao"], convencao, registro["ano_aquisicao"]
+        )
+        ms = (time.perf_counter() - inicio) * 1000
+    except ValueError as erro:
+        st.error(f"Não foi possível calcular o cronograma: {erro}")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Ativos", f"{len(registro['custo']):,}")
+    with col2:
+        st.metric("Custo Total", f"R$ {registro['custo'].sum() / 1e6:,.1f} mi")
+    with col3:
+        st.metric("Depreciação Total", f"R$ {despesa.sum() / 1e6:,.1f} mi")
+    with col4:
+        st.metric("Tempo de Cálculo", f"{ms:,.0f} ms")
+    
+    rotulo_ano = "Ano" if registro["ano_aquisicao"] is not None else "Ano de Uso"
+    st.markdown("##### Despesa de Depreciação e Valor Contábil do Imobilizado")
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(name='Despesa de Depreciação', x=anos, y=despesa, marker_color='#3b82f6'))
+    fig.add_trace(go.Scatter(name='Valor Contábil Líquido', x=anos, y=valor_contabil, mode='lines+markers',
+                             line=dict(color='#ef4444', width=2)), secondary_y=True)
+    fig.update_layout(
+        xaxis_title=rotulo_ano,
+        height=380,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02)
+    )
+    fig.update_yaxes(title_text="Despesa (R$)", secondary_y=False)
+    fig.update_yaxes(title_text="Valor Contábil (R$)", secondary_y=True)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("##### Composição do Registro por Método")
+    st.dataframe(pd.DataFrame(dict(composicao)), use_container_width=True, hide_index=True)
+
+
 def renderizar_exercicio_reflexivo():
     """Exercício reflexivo sobre lucro verdadeiro vs enganoso."""
     
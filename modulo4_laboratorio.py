@@ -13,6 +13,11 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 
+from cache_laboratorio import fixture_compartilhada
+from demonstracoes_laboratorio import carregar_demonstracoes
+from interface_laboratorio import renderizar_abas
+from perfil_laboratorio import instrumentar
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -32,22 +37,18 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "🔍 Análise Dirigida",
-        "⚖️ Forças e Fragilidades",
-        "📝 Exercício Individual"
+    renderizar_abas("abas_modulo4", [
+        ("🔍 Análise Dirigida", renderizar_analise_dirigida, ("analise_*",)),
+        ("⚖️ Forças e Fragilidades", renderizar_forcas_fragilidades, (
+            "forca_*", "fragilidade_*", "outras_forcas", "outras_fragilidades"
+        )),
+        ("📝 Exercício Individual", renderizar_exercicio_individual, (
+            "interp_*", "class_*", "dissertativa_m4"
+        ))
     ])
-    
-    with tab1:
-        renderizar_analise_dirigida()
-    
-    with tab2:
-        renderizar_forcas_fragilidades()
-    
-    with tab3:
-        renderizar_exercicio_individual()
 
 
+@fixture_compartilhada
 def get_balanco_empresa():
     """Retorna o balanço patrimonial da empresa exemplo."""
     
@@ -114,37 +115,18 @@ def get_balanco_empresa():
     return balanco
 
 
+@instrumentar("calculo")
 def calcular_totais(balanco):
-    """Calcula os totais do balanço."""
-    
-    # Ativo Circulante
-    ac = sum(balanco['ativo']['circulante'].values())
-    
-    # Ativo Não Circulante
-    anc_realizavel = sum(balanco['ativo']['nao_circulante']['Realizável LP'].values())
-    anc_investimentos = sum(balanco['ativo']['nao_circulante']['Investimentos'].values())
-    anc_imobilizado = sum(balanco['ativo']['nao_circulante']['Imobilizado'].values())
-    anc_intangivel = sum(balanco['ativo']['nao_circulante']['Intangível'].values())
-    anc = anc_realizavel + anc_investimentos + anc_imobilizado + anc_intangivel
-    
-    ativo_total = ac + anc
-    
-    # Passivo Circulante
-    pc = sum(balanco['passivo']['circulante'].values())
-    
-    # Passivo Não Circulante
-    pnc = sum(balanco['passivo']['nao_circulante'].values())
-    
-    # Patrimônio Líquido
-    pl = sum(balanco['passivo']['patrimonio_liquido'].values())
+    """Calcula os totais do balanço pelos subtotais do modelo colunar."""
     
-    passivo_total = pc + pnc + pl
+    demonstracoes = carregar_demonstracoes({(balanco['empresa'], balanco['data']): balanco})
+    t = demonstracoes.registro(balanco['empresa'], balanco['data'])
     
     return {
-        'ac': ac, 'anc': anc, 'ativo_total': ativo_total,
-        'pc': pc, 'pnc': pnc, 'pl': pl, 'passivo_total': passivo_total,
-        'anc_realizavel': anc_realizavel, 'anc_investimentos': anc_investimentos,
-        'anc_imobilizado': anc_imobilizado, 'anc_intangivel': anc_intangivel
+        'ac': t['1.01'], 'anc': t['1.02'], 'ativo_total': t['1'],
+        'pc': t['2.01'], 'pnc': t['2.02'], 'pl': t['2.03'], 'passivo_total': t['2'],
+        'anc_realizavel': t['1.02.01'], 'anc_investimentos': t['1.02.02'],
+        'anc_imobilizado': t['1.02.03'], 'anc_intangivel': t['1.02.04']
     }
 
 
@@ -14,6 +14,12 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
+from cache_laboratorio import fixture_compartilhada
+from demonstracoes_laboratorio import carregar_demonstracoes
+from indicadores_laboratorio import indicadores_de
+from interface_laboratorio import renderizar_abas
+from perfil_laboratorio import instrumentar
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -33,22 +39,18 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Cálculo de Margens",
-        "📉 Estudo de Caso",
-        "💬 Lucro vs. Desempenho"
+    renderizar_abas("abas_modulo5", [
+        ("📊 Cálculo de Margens", renderizar_calculo_margens, (
+            "rb", "ded", "cmv", "desp_op", "desp_fin", "rec_fin", "deprec", "ir", "ex_mg*"
+        )),
+        ("📉 Estudo de Caso", renderizar_estudo_caso, ("analise_caso_*",)),
+        ("💬 Lucro vs. Desempenho", renderizar_discussao_lucro_desempenho, (
+            "quiz_final_m5", "nopat", "capital", "wacc", "disc_*"
+        ))
     ])
-    
-    with tab1:
-        renderizar_calculo_margens()
-    
-    with tab2:
-        renderizar_estudo_caso()
-    
-    with tab3:
-        renderizar_discussao_lucro_desempenho()
 
 
+@fixture_compartilhada
 def get_dre_exemplo():
     """Retorna DRE exemplo para análise."""
     
@@ -112,14 +114,23 @@ def get_dre_exemplo():
     return dre
 
 
+@instrumentar("calculo")
 def calcular_margens(dados_ano, receita_liquida):
     """Calcula todas as margens a partir dos dados da DRE."""
     
+    ind = indicadores_de({
+        "receita": receita_liquida,
+        "lucro_bruto": dados_ano["Lucro Bruto"],
+        "ebit": dados_ano["Resultado Operacional (EBIT)"],
+        "ebitda": dados_ano["Resultado Operacional (EBIT)"] + 50000,  # Assumindo depreciação
+        "lucro_liquido": dados_ano["Lucro Líquido"]
+    })
+    
     return {
-        "Margem Bruta": (dados_ano["Lucro Bruto"] / receita_liquida) * 100,
-        "Margem Operacional (EBIT)": (dados_ano["Resultado Operacional (EBIT)"] / receita_liquida) * 100,
-        "Margem Líquida": (dados_ano["Lucro Líquido"] / receita_liquida) * 100,
-        "Margem EBITDA": ((dados_ano["Resultado Operacional (EBIT)"] + 50000) / receita_liquida) * 100  # Assumindo depreciação
+        "Margem Bruta": ind["margem_bruta"],
+        "Margem Operacional (EBIT)": ind["margem_ebit"],
+        "Margem Líquida": ind["margem_liquida"],
+        "Margem EBITDA": ind["margem_ebitda"]
     }
 
 
@@ -249,10 +260,14 @@ def renderizar_calculo_margens():
         st.markdown("##### 📈 Margens Calculadas")
         
         if receita_liquida > 0:
-            mg_bruta = (lucro_bruto / receita_liquida) * 100
-            mg_ebit = (ebit / receita_liquida) * 100
-            mg_ebitda = (ebitda / receita_liquida) * 100
-            mg_liquida = (lucro_liquido / receita_liquida) * 100
+            margens = indicadores_de({
+                "receita": receita_liquida, "lucro_bruto": lucro_bruto, "ebit": ebit,
+                "ebitda": ebitda, "lucro_liquido": lucro_liquido
+            })
+            mg_bruta = margens["margem_bruta"]
+            mg_ebit = margens["margem_ebit"]
+            mg_ebitda = margens["margem_ebitda"]
+            mg_liquida = margens["margem_liquida"]
             
             st.metric("Margem Bruta", f"{mg_bruta:.1f}%")
             st.metric("Margem EBIT", f"{mg_ebit:.1f}%")
@@ -358,14 +373,18 @@ def renderizar_estudo_caso():
     # Dados resumidos
     anos = [2021, 2022, 2023]
     
-    receitas = [dre['dados'][ano]['Receita Líquida'] for ano in anos]
-    lucros_brutos = [dre['dados'][ano]['Lucro Bruto'] for ano in anos]
-    ebits = [dre['dados'][ano]['Resultado Operacional (EBIT)'] for ano in anos]
-    lucros_liquidos = [dre['dados'][ano]['Lucro Líquido'] for ano in anos]
+    # DRE dos três anos no modelo colunar: contas e margens num único passe
+    demonstracoes = carregar_demonstracoes({(dre['empresa'], ano): dre['dados'][ano] for ano in anos})
+    ind = demonstracoes.indicadores()
+    
+    receitas = demonstracoes.conta("3.01")[0].tolist()
+    lucros_brutos = demonstracoes.conta("3.03")[0].tolist()
+    ebits = demonstracoes.conta("3.05")[0].tolist()
+    lucros_liquidos = demonstracoes.conta("3.11")[0].tolist()
     
-    margens_bruta = [(lb/rl)*100 for lb, rl in zip(lucros_brutos, receitas)]
-    margens_ebit = [(ebit/rl)*100 for ebit, rl in zip(ebits, receitas)]
-    margens_liquida = [(ll/rl)*100 for ll, rl in zip(lucros_liquidos, receitas)]
+    margens_bruta = ind['margem_bruta'][0].tolist()
+    margens_ebit = ind['margem_ebit'][0].tolist()
+    margens_liquida = ind['margem_liquida'][0].tolist()
     
     # Tabela comparativa
     st.markdown("#### 📋 Evolução da DRE (em R$ mil)")
@@ -5,14 +5,22 @@ Laboratório de Análise de Demonstrações Financeiras
 Conteúdo:
 - Exercício guiado: reconstrução do fluxo de caixa a partir da DRE e balanço
 - Caso prático: empresa lucrativa com caixa negativo
+- DFC reconstruída das companhias abertas (universo CVM, quando configurado)
 - Questionário aplicado (formativo)
 """
 
+import time
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 
+from cache_laboratorio import fixture_compartilhada
+from dfc_laboratorio import VERIFICACOES, PlanoDFC, dfc_de_dicionarios
+from interface_laboratorio import reconstruir_dfc_universo, renderizar_abas
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -32,22 +40,15 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "🔧 Reconstrução da DFC",
-        "📉 Caso: Lucro sem Caixa",
-        "📝 Questionário Formativo"
+    renderizar_abas("abas_modulo6", [
+        ("🔧 Reconstrução da DFC", renderizar_reconstrucao_dfc, ()),
+        ("📉 Caso: Lucro sem Caixa", renderizar_caso_lucro_sem_caixa, ("caso_q*",)),
+        ("🏛️ DFC das Companhias Abertas", renderizar_dfc_companhias_abertas, ("m6_dfc_cnpj", "m6_dfc_ano")),
+        ("📝 Questionário Formativo", renderizar_questionario, ("m6_q*",))
     ])
-    
-    with tab1:
-        renderizar_reconstrucao_dfc()
-    
-    with tab2:
-        renderizar_caso_lucro_sem_caixa()
-    
-    with tab3:
-        renderizar_questionario()
 
 
+@fixture_compartilhada
 def get_dados_empresa():
     """Retorna os dados da empresa exemplo para reconstrução da DFC."""
     
@@ -105,6 +106,29 @@ def get_dados_empresa():
             "Dividendos Pagos": 29300,
             "Aquisição Imobilizado": 150000,
             "Aumento Capital": 50000
+        },
+        # Classificação das contas para o método indireto (dfc_laboratorio.PlanoDFC)
+        "plano_dfc": {
+            "contas": {
+                "Caixa": ("ativo", "caixa"),
+                "Clientes": ("ativo", "operacional"),
+                "Estoques": ("ativo", "operacional"),
+                "Despesas Antecipadas": ("ativo", "operacional"),
+                "Imobilizado Bruto": ("ativo", "investimento"),
+                "Depreciação Acumulada": ("ativo", "investimento"),
+                "Total Ativo": ("ativo", "total"),
+                "Fornecedores": ("passivo", "operacional"),
+                "Salários a Pagar": ("passivo", "operacional"),
+                "Impostos a Pagar": ("passivo", "operacional"),
+                "Empréstimos CP": ("passivo", "financiamento"),
+                "Empréstimos LP": ("passivo", "financiamento"),
+                "Capital Social": ("passivo", "financiamento"),
+                "Reservas de Lucros": ("passivo", "resultado"),
+                "Total Passivo + PL": ("passivo", "total")
+            },
+            "lucro_liquido": "Lucro Líquido",
+            "depreciacao": "Depreciação",
+            "contrapartida": "Depreciação Acumulada"
         }
     }
     return dados
@@ -172,84 +196,77 @@ def renderizar_reconstrucao_dfc():
         </div>
     """, unsafe_allow_html=True)
     
-    # Calculando variações
-    var = {}
-    for conta in dados['balanco']['2022'].keys():
-        var[conta] = dados['balanco']['2023'][conta] - dados['balanco']['2022'][conta]
+    # Motor da DFC: efeito de caixa de cada conta a partir do plano da empresa
+    plano = PlanoDFC(**dados['plano_dfc'])
+    try:
+        dfc = dfc_de_dicionarios(plano, dados['balanco']['2022'], dados['balanco']['2023'], dados['dre_2023'])
+    except ValueError as erro:
+        st.error(f"Não foi possível reconstruir a DFC: {erro}")
+        return
+    efeitos = dict(zip(plano.contas, dfc.efeitos[0].tolist()))
+    
+    def contas_do_fluxo(atividade, ativo):
+        """Contas da atividade (ativos ou passivos/PL) com efeito no caixa, exceto a contrapartida."""
+        return [
+            conta for j, conta in enumerate(plano.contas)
+            if plano.atividades[j] == atividade and plano.ativo[j] == ativo
+            and j != plano.contrapartida and efeitos[conta] != 0
+        ]
     
     # FLUXO OPERACIONAL
     st.markdown("##### 1️⃣ Fluxo de Caixa Operacional")
     
     with st.expander("Passo 1: Partir do Lucro Líquido", expanded=True):
-        lucro_liquido = dados['dre_2023']['Lucro Líquido']
+        lucro_liquido = dfc.lucro_liquido[0]
         st.metric("Lucro Líquido", f"R$ {lucro_liquido:,.0f}")
         st.info("Este é o ponto de partida do método indireto.")
     
     with st.expander("Passo 2: Adicionar Despesas Não-Caixa"):
-        depreciacao = abs(dados['dre_2023']['Depreciação'])
+        depreciacao = dfc.depreciacao[0]
         st.metric("(+) Depreciação", f"R$ {depreciacao:,.0f}")
         st.info("Depreciação reduz o lucro mas não sai do caixa. Devemos adicionar de volta.")
     
     with st.expander("Passo 3: Ajustar Variações de Ativos Operacionais"):
         st.markdown("**Regra:** ↑ Ativo = Uso de caixa (subtrai) | ↓ Ativo = Fonte de caixa (soma)")
         
-        var_clientes = var['Clientes']
-        var_estoques = var['Estoques']
-        var_desp_antec = var['Despesas Antecipadas']
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            sinal = "-" if var_clientes > 0 else "+"
-            st.metric("Δ Clientes", f"{sinal} R$ {abs(var_clientes):,.0f}")
-        with col2:
-            sinal = "-" if var_estoques > 0 else "+"
-            st.metric("Δ Estoques", f"{sinal} R$ {abs(var_estoques):,.0f}")
-        with col3:
-            sinal = "-" if var_desp_antec > 0 else "+"
-            st.metric("Δ Desp. Antecipadas", f"{sinal} R$ {abs(var_desp_antec):,.0f}")
+        ativos_operacionais = contas_do_fluxo("operacional", True)
+        for coluna, conta in zip(st.columns(max(len(ativos_operacionais), 1)), ativos_operacionais):
+            with coluna:
+                sinal = "+" if efeitos[conta] > 0 else "-"
+                st.metric(f"Δ {conta}", f"{sinal} R$ {abs(efeitos[conta]):,.0f}")
         
-        st.warning(f"""
-            **Interpretação:**
-            - Clientes aumentou R$ {var_clientes:,.0f} → vendeu a prazo, não recebeu em caixa
-            - Estoques aumentou R$ {var_estoques:,.0f} → comprou mais do que vendeu
-            - Desp. Antecipadas aumentou R$ {var_desp_antec:,.0f} → pagou adiantado
-        """)
+        st.warning("**Interpretação:**\n" + "\n".join(
+            f"- {conta} {'aumentou' if efeitos[conta] < 0 else 'diminuiu'} R$ {abs(efeitos[conta]):,.0f} → "
+            f"{'consumiu' if efeitos[conta] < 0 else 'liberou'} caixa"
+            for conta in ativos_operacionais
+        ))
     
     with st.expander("Passo 4: Ajustar Variações de Passivos Operacionais"):
         st.markdown("**Regra:** ↑ Passivo = Fonte de caixa (soma) | ↓ Passivo = Uso de caixa (subtrai)")
         
-        var_fornec = var['Fornecedores']
-        var_salarios = var['Salários a Pagar']
-        var_impostos = var['Impostos a Pagar']
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            sinal = "+" if var_fornec > 0 else "-"
-            st.metric("Δ Fornecedores", f"{sinal} R$ {abs(var_fornec):,.0f}")
-        with col2:
-            sinal = "+" if var_salarios > 0 else "-"
-            st.metric("Δ Salários a Pagar", f"{sinal} R$ {abs(var_salarios):,.0f}")
-        with col3:
-            sinal = "+" if var_impostos > 0 else "-"
-            st.metric("Δ Impostos a Pagar", f"{sinal} R$ {abs(var_impostos):,.0f}")
+        passivos_operacionais = contas_do_fluxo("operacional", False)
+        for coluna, conta in zip(st.columns(max(len(passivos_operacionais), 1)), passivos_operacionais):
+            with coluna:
+                sinal = "+" if efeitos[conta] > 0 else "-"
+                st.metric(f"Δ {conta}", f"{sinal} R$ {abs(efeitos[conta]):,.0f}")
         
-        st.success(f"""
-            **Interpretação:**
-            - Fornecedores aumentou R$ {var_fornec:,.0f} → comprou a prazo, não pagou
-            - Salários aumentou R$ {var_salarios:,.0f} → deve mais salários
-            - Impostos aumentou R$ {var_impostos:,.0f} → deve mais impostos
-        """)
+        st.success("**Interpretação:**\n" + "\n".join(
+            f"- {conta} {'aumentou' if efeitos[conta] > 0 else 'diminuiu'} R$ {abs(efeitos[conta]):,.0f} → "
+            f"{'financiou as operações (pagamento postergado)' if efeitos[conta] > 0 else 'consumiu caixa'}"
+            for conta in passivos_operacionais
+        ))
     
     # Cálculo do Fluxo Operacional
-    fluxo_operacional = (lucro_liquido + depreciacao 
-                        - var_clientes - var_estoques - var_desp_antec
-                        + var_fornec + var_salarios + var_impostos)
+    fluxo_operacional = dfc.fco[0]
+    parcelas = " ".join(
+        f"{'+' if efeitos[conta] >= 0 else '-'} {abs(efeitos[conta]):,.0f}"
+        for conta in ativos_operacionais + passivos_operacionais
+    )
     
     st.markdown(f"""
         <div style='background-color: #dbeafe; padding: 15px; border-radius: 10px; margin-top: 15px;'>
             <strong>📊 Fluxo de Caixa Operacional:</strong><br>
-            {lucro_liquido:,.0f} + {depreciacao:,.0f} - {var_clientes:,.0f} - {var_estoques:,.0f} - {var_desp_antec:,.0f} 
-            + {var_fornec:,.0f} + {var_salarios:,.0f} + {var_impostos:,.0f} = <strong>R$ {fluxo_operacional:,.0f}</strong>
+            {lucro_liquido:,.0f} + {depreciacao:,.0f} {parcelas} = <strong>R$ {fluxo_operacional:,.0f}</strong>
         </div>
     """, unsafe_allow_html=True)
     
@@ -259,12 +276,14 @@ def renderizar_reconstrucao_dfc():
     st.markdown("##### 2️⃣ Fluxo de Caixa de Investimento")
     
     with st.expander("Atividades de Investimento"):
-        aquisicao_imob = dados['info_adicional']['Aquisição Imobilizado']
-        
-        st.metric("(-) Aquisição de Imobilizado", f"R$ {aquisicao_imob:,.0f}")
-        st.info("Compra de ativos fixos representa saída de caixa para investimento.")
+        for atividade, descricao, valor in dfc.linhas():
+            if atividade == "investimento":
+                st.metric(descricao, f"R$ {valor:,.0f}")
+        st.info("Compra de ativos fixos representa saída de caixa para investimento. "
+                "A depreciação já somada no FCO é abatida da depreciação acumulada, "
+                "então a variação do imobilizado bruto mostra as aquisições.")
         
-        fluxo_investimento = -aquisicao_imob
+        fluxo_investimento = dfc.fci[0]
         
         st.markdown(f"""
             <div style='background-color: #fce7f3; padding: 15px; border-radius: 10px;'>
@@ -278,20 +297,15 @@ def renderizar_reconstrucao_dfc():
     st.markdown("##### 3️⃣ Fluxo de Caixa de Financiamento")
     
     with st.expander("Atividades de Financiamento"):
-        var_emprest_cp = var['Empréstimos CP']
-        var_emprest_lp = var['Empréstimos LP']
-        aumento_capital = dados['info_adicional']['Aumento Capital']
-        dividendos = dados['info_adicional']['Dividendos Pagos']
-        
+        linhas_financiamento = [(d, v) for a, d, v in dfc.linhas() if a == "financiamento"]
         col1, col2 = st.columns(2)
-        with col1:
-            st.metric("(+) Novos Empréstimos CP", f"R$ {var_emprest_cp:,.0f}")
-            st.metric("(+) Novos Empréstimos LP", f"R$ {var_emprest_lp:,.0f}")
-        with col2:
-            st.metric("(+) Aumento de Capital", f"R$ {aumento_capital:,.0f}")
-            st.metric("(-) Dividendos Pagos", f"R$ {dividendos:,.0f}")
+        for k, (descricao, valor) in enumerate(linhas_financiamento):
+            with (col1 if k < (len(linhas_financiamento) + 1) // 2 else col2):
+                st.metric(descricao, f"R$ {valor:,.0f}")
+        st.info("Os dividendos saem do lucro do período menos o aumento das Reservas de Lucros "
+                f"(R$ {dfc.lucro_liquido[0]:,.0f} - R$ {dfc.lucro_liquido[0] - dfc.distribuicao[0]:,.0f}).")
         
-        fluxo_financiamento = var_emprest_cp + var_emprest_lp + aumento_capital - dividendos
+        fluxo_financiamento = dfc.fcf[0]
         
         st.markdown(f"""
             <div style='background-color: #dcfce7; padding: 15px; border-radius: 10px;'>
@@ -304,8 +318,8 @@ def renderizar_reconstrucao_dfc():
     # RESUMO FINAL
     st.markdown("#### 📋 DFC Reconstruída - Resumo")
     
-    variacao_caixa = fluxo_operacional + fluxo_investimento + fluxo_financiamento
-    caixa_inicial = dados['balanco']['2022']['Caixa']
+    variacao_caixa = dfc.variacao_caixa[0]
+    caixa_inicial = dfc.caixa_inicial[0]
     caixa_final = caixa_inicial + variacao_caixa
     
     col1, col2 = st.columns([2, 1])
@@ -346,11 +360,29 @@ def renderizar_reconstrucao_dfc():
         st.plotly_chart(fig, use_container_width=True)
     
     # Verificação
-    caixa_real = dados['balanco']['2023']['Caixa']
+    caixa_real = dfc.caixa_final[0]
     if abs(caixa_final - caixa_real) < 1:
         st.success(f"✅ Verificação: Caixa Final calculado (R$ {caixa_final:,.0f}) = Caixa no Balanço (R$ {caixa_real:,.0f})")
     else:
         st.error(f"❌ Diferença encontrada: Calculado R$ {caixa_final:,.0f} vs Balanço R$ {caixa_real:,.0f}")
+    
+    with st.expander("📄 DFC completa e verificações de conciliação"):
+        demonstracao = dfc.demonstracao()
+        demonstracao["Valor"] = [
+            "" if np.isnan(valor) else f"R$ {valor:,.0f}" for valor in demonstracao["Valor"]
+        ]
+        st.dataframe(demonstracao, use_container_width=True, hide_index=True)
+        st.dataframe(dfc.tabela_verificacoes(), use_container_width=True, hide_index=True)
+        
+        derivados = {
+            "Dividendos Pagos": dfc.distribuicao[0],
+            "Aquisição Imobilizado": -efeitos['Imobilizado Bruto'],
+            "Aumento Capital": efeitos['Capital Social'],
+        }
+        st.caption("Informações adicionais × valores deduzidos das variações do balanço: " + " · ".join(
+            f"{info} {'✅' if abs(derivados[info] - valor) < 1 else '❌'}"
+            for info, valor in dados['info_adicional'].items()
+        ))
 
 
 def renderizar_caso_lucro_sem_caixa():
@@ -586,6 +618,102 @@ def renderizar_caso_lucro_sem_caixa():
         """, unsafe_allow_html=True)
 
 
+def renderizar_dfc_companhias_abertas():
+    """DFC reconstruída pelo método indireto para as companhias abertas do universo CVM."""
+    
+    st.markdown("### 🏛️ DFC das Companhias Abertas")
+    
+    st.markdown("""
+        <div style='background-color: #e0e7ff; padding: 20px; border-radius: 10px; 
+                    border-left: 5px solid #4f46e5; margin-bottom: 20px;'>
+            <strong>Objetivo:</strong><br>
+            <em>Aplicar o mesmo método indireto do exercício guiado às DFPs de todas as companhias 
+            abertas, de uma só vez, e comparar o FCO reconstruído com o FCO que cada empresa divulgou.</em>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    inicio = time.perf_counter()
+    resultado, universo = reconstruir_dfc_universo()
+    ms = (time.perf_counter() - inicio) * 1000
+    if universo is None:
+        st.info(
+            "💡 Com os dados abertos da CVM ingeridos por `cvm_laboratorio.py` e a variável "
+            "`LAB_ARMAZEM_CVM` apontando para o armazém, a DFC é reconstruída para todas as companhias abertas."
+        )
+        return
+    
+    dfc, empresas, anos, fco_divulgado = resultado
+    if not len(dfc):
+        st.warning("O universo não tem DFPs de anos consecutivos para reconstruir a DFC.")
+        return
+    
+    divulgado = ~np.isnan(fco_divulgado)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        desvio = np.abs(dfc.fco - fco_divulgado) / np.maximum(np.abs(fco_divulgado), 1.0)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Pares Empresa-Ano", f"{len(dfc):,}")
+    with col2:
+        st.metric("Conciliados", f"{dfc.conciliados().mean():.1%}",
+                  help="Pares em que todas as verificações de conciliação passam")
+    with col3:
+        st.metric("Desvio Mediano do FCO", f"{np.median(desvio[divulgado]):.1%}" if divulgado.any() else "—",
+                  help="|FCO reconstruído - FCO divulgado| / |FCO divulgado|")
+    st.caption(f"{len(dfc):,} DFCs reconstruídas num único passe vetorizado ({ms:.0f} ms; "
+               "o resultado fica em memória até a próxima ingestão). Valores em R$ mil.")
+    
+    with st.expander("✅ Verificações de conciliação"):
+        st.dataframe(pd.DataFrame({
+            "Verificação": list(VERIFICACOES),
+            "Pares Aprovados": [f"{taxa:.1%}" for taxa in dfc.aprovados().mean(axis=0)],
+        }), use_container_width=True, hide_index=True)
+        st.caption("O balanço padronizado só separa as contas abertas pela CVM; a diferença entre "
+                   "o FCO reconstruído e o divulgado vem das reclassificações que só as notas explicam.")
+    
+    if divulgado.any():
+        amostra = np.flatnonzero(divulgado)
+        amostra = amostra[np.linspace(0, len(amostra) - 1, min(len(amostra), 3000)).astype(np.int64)]
+        fig = px.scatter(
+            x=fco_divulgado[amostra], y=dfc.fco[amostra], opacity=0.5,
+            labels={"x": "FCO divulgado (R$ mil)", "y": "FCO reconstruído (R$ mil)"},
+            title="FCO Reconstruído × Divulgado",
+        )
+        limite = float(np.percentile(np.abs(fco_divulgado[amostra]), 99))
+        fig.add_trace(go.Scatter(x=[-limite, limite], y=[-limite, limite], mode="lines",
+                                 line=dict(dash="dash", color="#64748b"), name="y = x"))
+        fig.update_layout(height=400, showlegend=False)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("---")
+    st.markdown("#### 🔎 DFC de uma Companhia")
+    
+    nomes = universo.nomes
+    cnpjs = sorted(universo.empresas[np.unique(empresas)].tolist(), key=lambda cnpj: nomes.get(cnpj, cnpj))
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        cnpj = st.selectbox("Companhia aberta", cnpjs,
+                            format_func=lambda cnpj: f"{nomes.get(cnpj, cnpj)} ({cnpj})", key="m6_dfc_cnpj")
+    # Os pares vêm ordenados por empresa (pares_do_universo): busca binária pela posição do CNPJ
+    e = universo.posicao(cnpj)
+    pares = np.arange(*np.searchsorted(empresas, [e, e + 1]))
+    with col2:
+        ano = st.selectbox("Exercício", anos[pares].tolist(), index=len(pares) - 1, key="m6_dfc_ano")
+    i = int(pares[anos[pares].tolist().index(ano)])
+    
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        demonstracao = dfc.demonstracao(i)
+        demonstracao["Valor"] = [
+            "" if np.isnan(valor) else f"{valor:,.0f}" for valor in demonstracao["Valor"]
+        ]
+        st.dataframe(demonstracao, use_container_width=True, hide_index=True)
+    with col2:
+        st.metric("FCO Reconstruído", f"R$ {dfc.fco[i]:,.0f} mil")
+        st.metric("FCO Divulgado", "—" if np.isnan(fco_divulgado[i]) else f"R$ {fco_divulgado[i]:,.0f} mil")
+        st.dataframe(dfc.tabela_verificacoes(i), use_container_width=True, hide_index=True)
+
+
 def renderizar_questionario():
     """Questionário aplicado (formativo)."""
     
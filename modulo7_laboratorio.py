@@ -6,14 +6,66 @@ Conteúdo:
 - Aplicação prática em dados reais (planilha)
 - Comparação de dois períodos consecutivos
 - Interpretação escrita dos principais achados
+- AV e AH de um plano de contas extenso (2.000 contas, 20 trimestres)
+- AH em valores nominais ou reais (deflacionados pelo IPCA ou pelo IGP-M)
 """
 
+import time
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
+from analise_hv_laboratorio import ArvoreContas, analisar, divergencias_subtotais, plano_exemplo
+from cache_laboratorio import calculo_em_cache, fixture_compartilhada
+from deflacao_laboratorio import INDICES, data_do_periodo, deflacionar, descrever, inflacao_acumulada
+from demonstracoes_laboratorio import TOLERANCIA, carregar_demonstracoes
+from interface_laboratorio import edicao_em_lote, renderizar_abas
+from perfil_laboratorio import instrumentar
+
+# Estrutura da DRE como árvore de contas: cada subtotal é a soma das linhas
+# que o compõem (custos e despesas já negativos). A pós-ordem da árvore é a
+# ordem de exibição da DRE.
+ESTRUTURA_DRE = {
+    "Lucro Líquido": {
+        "LAIR": {
+            "EBIT": {
+                "Lucro Bruto": {
+                    "Receita Líquida": {"Receita Bruta": None, "(-) Deduções": None},
+                    "(-) CMV": None,
+                },
+                "(-) Despesas com Vendas": None,
+                "(-) Despesas Administrativas": None,
+                "(-) Outras Despesas Operacionais": None,
+            },
+            "(-) Despesas Financeiras": None,
+            "(+) Receitas Financeiras": None,
+        },
+        "(-) IR/CS": None,
+    }
+}
+
+# Rótulos de exibição dos grupos do balanço (caminho na árvore → rótulo)
+ROTULOS_BALANCO = {
+    ("ATIVO",): "ATIVO TOTAL",
+    ("ATIVO", "Circulante"): "ATIVO CIRCULANTE",
+    ("ATIVO", "Não Circulante"): "ATIVO NÃO CIRCULANTE",
+    ("PASSIVO",): "PASSIVO + PL TOTAL",
+    ("PASSIVO", "Circulante"): "PASSIVO CIRCULANTE",
+    ("PASSIVO", "Não Circulante"): "PASSIVO NÃO CIRCULANTE",
+    ("PASSIVO", "Patrimônio Líquido"): "PATRIMÔNIO LÍQUIDO",
+}
+
+# Opções de valores da análise (rótulo → índice de preços; None = nominais)
+OPCOES_VALORES = {
+    "Nominais": None,
+    "Reais (IPCA)": "ipca",
+    "Reais (IGP-M)": "igpm",
+}
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -33,22 +85,17 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📈 Análise Prática",
-        "🔄 Comparativo de Períodos",
-        "✍️ Interpretação dos Achados"
+    renderizar_abas("abas_modulo7", [
+        ("📈 Análise Prática", renderizar_analise_pratica, ("m7_valores", "demo_pratica", "m7_base_av")),
+        ("🔄 Comparativo de Períodos", renderizar_comparativo_periodos, ()),
+        ("✍️ Interpretação dos Achados", renderizar_interpretacao_achados, ("interp_*",)),
+        ("🧮 Plano de Contas Extenso", renderizar_plano_extenso, (
+            "m7_plano_defasagem", "m7_plano_base", "m7_plano_valores", "m7_plano_subtotal"
+        ))
     ])
-    
-    with tab1:
-        renderizar_analise_pratica()
-    
-    with tab2:
-        renderizar_comparativo_periodos()
-    
-    with tab3:
-        renderizar_interpretacao_achados()
 
 
+@fixture_compartilhada
 def get_dados_empresa_real():
     """Retorna dados simulando uma empresa real para análise."""
     
@@ -169,24 +216,94 @@ def get_dados_empresa_real():
     return dados
 
 
-def calcular_totais_balanco(balanco_ano):
-    """Calcula totais do balanço para um ano."""
+@fixture_compartilhada
+def get_demonstracoes_empresa_real():
+    """Balanço e DRE da empresa real no modelo colunar (um período por ano)."""
     
-    ac = sum(balanco_ano['ATIVO']['Circulante'].values())
-    anc = sum(balanco_ano['ATIVO']['Não Circulante'].values())
-    ativo_total = ac + anc
+    dados = get_dados_empresa_real()
+    return carregar_demonstracoes({
+        (dados['empresa'], ano): {"balanco": dados['balanco'][ano], "dre": dados['dre'][ano]}
+        for ano in dados['balanco']
+    })
+
+
+def analisar_empresa_real(indice=None):
+    """
+    AV e AH do balanço e da DRE da empresa real, em todos os anos da base.
+    
+    Com `indice`, os valores são deflacionados para a moeda do último ano:
+    saldos do balanço desde o encerramento de cada ano e contas da DRE
+    desde o meio de cada exercício.
+    """
+    
+    dados = get_dados_empresa_real()
+    anos = sorted(dados['balanco'])
+    
+    balanco = ArvoreContas.de_estrutura(dados['balanco'][anos[0]])
+    folhas_balanco = balanco.folhas_de_registros([dados['balanco'][ano] for ano in anos])
+    
+    # A DRE da base intercala os subtotais: as folhas alimentam o motor e os
+    # subtotais informados servem para conferir a consolidação
+    dre = ArvoreContas.de_estrutura(ESTRUTURA_DRE)
+    informados_dre = dre.valores_por_rotulo([dados['dre'][ano] for ano in anos])
+    
+    if indice is not None:
+        folhas_balanco = deflacionar(folhas_balanco, anos, indice)
+        informados_dre = deflacionar(informados_dre, anos, indice, fluxo=True)
+    analise_dre = analisar(dre, informados_dre, anos)
+    
+    return {
+        "balanco": analisar(balanco, folhas_balanco, anos),
+        "dre": analise_dre,
+        "divergencias_dre": divergencias_subtotais(dre, analise_dre.valores, informados_dre),
+    }
+
+
+@fixture_compartilhada
+def get_analise_empresa_real():
+    """AV e AH do balanço e da DRE da empresa real, em valores nominais."""
+    return analisar_empresa_real()
+
+
+def analise_empresa_real(indice):
+    """Análise nominal (fixture) ou em valores reais, calculada uma vez por índice."""
+    if indice is None:
+        return get_analise_empresa_real()
+    return calculo_em_cache("modulo7", "analise_empresa_real", analisar_empresa_real, indice)
+
+
+@instrumentar("calculo")
+def calcular_totais_balanco(ano):
+    """Totais do balanço de um ano, lidos dos subtotais consolidados pelo motor de AV/AH."""
     
-    pc = sum(balanco_ano['PASSIVO']['Circulante'].values())
-    pnc = sum(balanco_ano['PASSIVO']['Não Circulante'].values())
-    pl = sum(balanco_ano['PASSIVO']['Patrimônio Líquido'].values())
-    passivo_total = pc + pnc + pl
+    analise = get_analise_empresa_real()['balanco']
     
     return {
-        'AC': ac, 'ANC': anc, 'Ativo Total': ativo_total,
-        'PC': pc, 'PNC': pnc, 'PL': pl, 'Passivo Total': passivo_total
+        'AC': analise.valor(("ATIVO", "Circulante"), ano),
+        'ANC': analise.valor(("ATIVO", "Não Circulante"), ano),
+        'Ativo Total': analise.valor(("ATIVO",), ano),
+        'PC': analise.valor(("PASSIVO", "Circulante"), ano),
+        'PNC': analise.valor(("PASSIVO", "Não Circulante"), ano),
+        'PL': analise.valor(("PASSIVO", "Patrimônio Líquido"), ano),
+        'Passivo Total': analise.valor(("PASSIVO",), ano)
     }
 
 
+def formatar_tabela_hv(tabela):
+    """Formata a tabela numérica do motor de AV/AH para exibição (R$ e %; "—" sem base)."""
+    
+    exibicao = tabela.copy()
+    for coluna in exibicao.columns[1:]:
+        if coluna.startswith("AV"):
+            formato = "{:.1f}%"
+        elif coluna.startswith(("AH", "CAGR")):
+            formato = "{:+.1f}%"
+        else:
+            formato = "R$ {:,.0f}"
+        exibicao[coluna] = ["—" if np.isnan(v) else formato.format(v) for v in exibicao[coluna]]
+    return exibicao
+
+
 def renderizar_analise_pratica():
     """Aplicação prática em dados reais."""
     
@@ -207,6 +324,30 @@ def renderizar_analise_pratica():
     
     st.markdown(f"**Empresa:** {dados['empresa']} | **Setor:** {dados['setor']}")
     
+    valores = st.radio(
+        "Valores:",
+        list(OPCOES_VALORES),
+        horizontal=True,
+        key="m7_valores",
+        help="Valores reais: todos os anos convertidos para a moeda do último ano pelo índice de preços escolhido"
+    )
+    indice = OPCOES_VALORES[valores]
+    if indice is not None:
+        anos = sorted(dados['balanco'])
+        destino = data_do_periodo(anos[-1])
+        try:
+            analise_empresa_real(indice)
+            inflacao = inflacao_acumulada(indice, data_do_periodo(anos[0]), destino)
+        except ValueError as erro:
+            st.error(f"Não foi possível deflacionar os valores: {erro}")
+            indice = None
+        else:
+            st.caption(
+                f"Valores em {descrever(indice, destino)}; {INDICES[indice]} acumulado de "
+                f"{anos[0]} a {anos[-1]}: {inflacao:.2f}%. A AV não muda (todas as contas de um ano "
+                "recebem o mesmo fator) e a AH passa a medir o crescimento real, acima da inflação."
+            )
+    
     # Seleção de demonstração
     demo_selecionada = st.radio(
         "Selecione a demonstração para análise:",
@@ -218,177 +359,43 @@ def renderizar_analise_pratica():
     st.markdown("---")
     
     if demo_selecionada == "Balanço Patrimonial":
-        renderizar_analise_balanco(dados)
+        renderizar_analise_balanco(dados, indice)
     else:
-        renderizar_analise_dre(dados)
+        renderizar_analise_dre(dados, indice)
 
 
-def renderizar_analise_balanco(dados):
-    """Renderiza análise H e V do Balanço."""
+def renderizar_analise_balanco(dados, indice=None):
+    """Renderiza análise H e V do Balanço (valores reais pelo `indice`, se informado)."""
     
     st.markdown("#### 📊 Análise do Balanço Patrimonial")
     
-    # Preparar dados
-    totais_2022 = calcular_totais_balanco(dados['balanco'][2022])
-    totais_2023 = calcular_totais_balanco(dados['balanco'][2023])
-    
-    # ATIVO
-    st.markdown("##### ATIVO")
-    
-    linhas_ativo = []
-    
-    # Circulante
-    linhas_ativo.append({
-        "Conta": "**ATIVO CIRCULANTE**",
-        "2022": totais_2022['AC'],
-        "AV 2022": (totais_2022['AC'] / totais_2022['Ativo Total']) * 100,
-        "2023": totais_2023['AC'],
-        "AV 2023": (totais_2023['AC'] / totais_2023['Ativo Total']) * 100,
-        "AH %": ((totais_2023['AC'] / totais_2022['AC']) - 1) * 100
-    })
-    
-    for conta, valor_2022 in dados['balanco'][2022]['ATIVO']['Circulante'].items():
-        valor_2023 = dados['balanco'][2023]['ATIVO']['Circulante'][conta]
-        linhas_ativo.append({
-            "Conta": f"  {conta}",
-            "2022": valor_2022,
-            "AV 2022": (valor_2022 / totais_2022['Ativo Total']) * 100,
-            "2023": valor_2023,
-            "AV 2023": (valor_2023 / totais_2023['Ativo Total']) * 100,
-            "AH %": ((valor_2023 / valor_2022) - 1) * 100 if valor_2022 != 0 else 0
-        })
-    
-    # Não Circulante
-    linhas_ativo.append({
-        "Conta": "**ATIVO NÃO CIRCULANTE**",
-        "2022": totais_2022['ANC'],
-        "AV 2022": (totais_2022['ANC'] / totais_2022['Ativo Total']) * 100,
-        "2023": totais_2023['ANC'],
-        "AV 2023": (totais_2023['ANC'] / totais_2023['Ativo Total']) * 100,
-        "AH %": ((totais_2023['ANC'] / totais_2022['ANC']) - 1) * 100
-    })
-    
-    for conta, valor_2022 in dados['balanco'][2022]['ATIVO']['Não Circulante'].items():
-        valor_2023 = dados['balanco'][2023]['ATIVO']['Não Circulante'][conta]
-        linhas_ativo.append({
-            "Conta": f"  {conta}",
-            "2022": valor_2022,
-            "AV 2022": (valor_2022 / totais_2022['Ativo Total']) * 100,
-            "2023": valor_2023,
-            "AV 2023": (valor_2023 / totais_2023['Ativo Total']) * 100,
-            "AH %": ((valor_2023 / valor_2022) - 1) * 100 if valor_2022 != 0 else 0
-        })
-    
-    # Total
-    linhas_ativo.append({
-        "Conta": "**ATIVO TOTAL**",
-        "2022": totais_2022['Ativo Total'],
-        "AV 2022": 100.0,
-        "2023": totais_2023['Ativo Total'],
-        "AV 2023": 100.0,
-        "AH %": ((totais_2023['Ativo Total'] / totais_2022['Ativo Total']) - 1) * 100
-    })
-    
-    df_ativo = pd.DataFrame(linhas_ativo)
-    
-    # Formatar para exibição
-    df_ativo_display = df_ativo.copy()
-    df_ativo_display['2022'] = df_ativo_display['2022'].apply(lambda x: f"R$ {x:,.0f}")
-    df_ativo_display['2023'] = df_ativo_display['2023'].apply(lambda x: f"R$ {x:,.0f}")
-    df_ativo_display['AV 2022'] = df_ativo_display['AV 2022'].apply(lambda x: f"{x:.1f}%")
-    df_ativo_display['AV 2023'] = df_ativo_display['AV 2023'].apply(lambda x: f"{x:.1f}%")
-    df_ativo_display['AH %'] = df_ativo_display['AH %'].apply(lambda x: f"{x:+.1f}%")
-    
-    st.dataframe(df_ativo_display, use_container_width=True, hide_index=True)
-    
-    # PASSIVO + PL
-    st.markdown("##### PASSIVO + PATRIMÔNIO LÍQUIDO")
-    
-    linhas_passivo = []
-    
-    # Circulante
-    linhas_passivo.append({
-        "Conta": "**PASSIVO CIRCULANTE**",
-        "2022": totais_2022['PC'],
-        "AV 2022": (totais_2022['PC'] / totais_2022['Passivo Total']) * 100,
-        "2023": totais_2023['PC'],
-        "AV 2023": (totais_2023['PC'] / totais_2023['Passivo Total']) * 100,
-        "AH %": ((totais_2023['PC'] / totais_2022['PC']) - 1) * 100
-    })
-    
-    for conta, valor_2022 in dados['balanco'][2022]['PASSIVO']['Circulante'].items():
-        valor_2023 = dados['balanco'][2023]['PASSIVO']['Circulante'][conta]
-        linhas_passivo.append({
-            "Conta": f"  {conta}",
-            "2022": valor_2022,
-            "AV 2022": (valor_2022 / totais_2022['Passivo Total']) * 100,
-            "2023": valor_2023,
-            "AV 2023": (valor_2023 / totais_2023['Passivo Total']) * 100,
-            "AH %": ((valor_2023 / valor_2022) - 1) * 100 if valor_2022 != 0 else 0
-        })
-    
-    # Não Circulante
-    linhas_passivo.append({
-        "Conta": "**PASSIVO NÃO CIRCULANTE**",
-        "2022": totais_2022['PNC'],
-        "AV 2022": (totais_2022['PNC'] / totais_2022['Passivo Total']) * 100,
-        "2023": totais_2023['PNC'],
-        "AV 2023": (totais_2023['PNC'] / totais_2023['Passivo Total']) * 100,
-        "AH %": ((totais_2023['PNC'] / totais_2022['PNC']) - 1) * 100
-    })
-    
-    for conta, valor_2022 in dados['balanco'][2022]['PASSIVO']['Não Circulante'].items():
-        valor_2023 = dados['balanco'][2023]['PASSIVO']['Não Circulante'][conta]
-        linhas_passivo.append({
-            "Conta": f"  {conta}",
-            "2022": valor_2022,
-            "AV 2022": (valor_2022 / totais_2022['Passivo Total']) * 100,
-            "2023": valor_2023,
-            "AV 2023": (valor_2023 / totais_2023['Passivo Total']) * 100,
-            "AH %": ((valor_2023 / valor_2022) - 1) * 100 if valor_2022 != 0 else 0
-        })
-    
-    # PL
-    linhas_passivo.append({
-        "Conta": "**PATRIMÔNIO LÍQUIDO**",
-        "2022": totais_2022['PL'],
-        "AV 2022": (totais_2022['PL'] / totais_2022['Passivo Total']) * 100,
-        "2023": totais_2023['PL'],
-        "AV 2023": (totais_2023['PL'] / totais_2023['Passivo Total']) * 100,
-        "AH %": ((totais_2023['PL'] / totais_2022['PL']) - 1) * 100
-    })
-    
-    for conta, valor_2022 in dados['balanco'][2022]['PASSIVO']['Patrimônio Líquido'].items():
-        valor_2023 = dados['balanco'][2023]['PASSIVO']['Patrimônio Líquido'][conta]
-        linhas_passivo.append({
-            "Conta": f"  {conta}",
-            "2022": valor_2022,
-            "AV 2022": (valor_2022 / totais_2022['Passivo Total']) * 100,
-            "2023": valor_2023,
-            "AV 2023": (valor_2023 / totais_2023['Passivo Total']) * 100,
-            "AH %": ((valor_2023 / valor_2022) - 1) * 100 if valor_2022 != 0 else 0
-        })
-    
-    # Total
-    linhas_passivo.append({
-        "Conta": "**PASSIVO + PL TOTAL**",
-        "2022": totais_2022['Passivo Total'],
-        "AV 2022": 100.0,
-        "2023": totais_2023['Passivo Total'],
-        "AV 2023": 100.0,
-        "AH %": ((totais_2023['Passivo Total'] / totais_2022['Passivo Total']) - 1) * 100
-    })
-    
-    df_passivo = pd.DataFrame(linhas_passivo)
+    analise = analise_empresa_real(indice)['balanco']
+    arvore = analise.arvore
+    totais_2022 = calcular_totais_balanco(2022)
+    totais_2023 = calcular_totais_balanco(2023)
     
-    df_passivo_display = df_passivo.copy()
-    df_passivo_display['2022'] = df_passivo_display['2022'].apply(lambda x: f"R$ {x:,.0f}")
-    df_passivo_display['2023'] = df_passivo_display['2023'].apply(lambda x: f"R$ {x:,.0f}")
-    df_passivo_display['AV 2022'] = df_passivo_display['AV 2022'].apply(lambda x: f"{x:.1f}%")
-    df_passivo_display['AV 2023'] = df_passivo_display['AV 2023'].apply(lambda x: f"{x:.1f}%")
-    df_passivo_display['AH %'] = df_passivo_display['AH %'].apply(lambda x: f"{x:+.1f}%")
+    base_av = st.radio(
+        "Base da análise vertical:",
+        ["Total (Ativo / Passivo + PL)", "Subtotal do grupo"],
+        horizontal=True,
+        key="m7_base_av",
+        help="Subtotal do grupo: participação de cada conta no Circulante, Não Circulante ou PL a que pertence"
+    )
+    vertical = "total" if base_av.startswith("Total") else "subtotal"
     
-    st.dataframe(df_passivo_display, use_container_width=True, hide_index=True)
+    for raiz, titulo in ((("ATIVO",), "ATIVO"), (("PASSIVO",), "PASSIVO + PATRIMÔNIO LÍQUIDO")):
+        st.markdown(f"##### {titulo}")
+        
+        # Grupos e contas na ordem da árvore, com o total da raiz por último
+        r = arvore.posicao(raiz)
+        linhas = [i for i in arvore.preordem.tolist() if arvore.raiz[i] == r and i != r] + [r]
+        rotulos = [
+            f"**{ROTULOS_BALANCO.get(arvore.contas[i], arvore.rotulos[i])}**" if not arvore.folha[i]
+            else f"  {arvore.rotulos[i]}"
+            for i in linhas
+        ]
+        tabela = analise.tabela(linhas, vertical, rotulos)
+        st.dataframe(formatar_tabela_hv(tabela), use_container_width=True, hide_index=True)
     
     # Gráficos
     st.markdown("#### 📊 Visualização da Estrutura")
@@ -440,56 +447,36 @@ def renderizar_analise_balanco(dados):
         st.plotly_chart(fig2, use_container_width=True)
 
 
-def renderizar_analise_dre(dados):
-    """Renderiza análise H e V da DRE."""
+def renderizar_analise_dre(dados, indice=None):
+    """Renderiza análise H e V da DRE (valores reais pelo `indice`, se informado)."""
     
     st.markdown("#### 📊 Análise da DRE")
     
-    # Preparar dados
-    rl_2022 = dados['dre'][2022]['Receita Líquida']
-    rl_2023 = dados['dre'][2023]['Receita Líquida']
+    analise = analise_empresa_real(indice)['dre']
+    arvore = analise.arvore
+    caminhos = {conta[-1]: conta for conta in arvore.contas}
     
-    linhas_dre = []
+    # AV sobre a Receita Líquida; a pós-ordem põe cada subtotal logo abaixo das suas linhas
+    linhas = arvore.posordem
+    tabela = analise.tabela(linhas, caminhos['Receita Líquida'], [arvore.rotulos[i] for i in linhas])
+    st.dataframe(formatar_tabela_hv(tabela), use_container_width=True, hide_index=True)
     
-    for conta in dados['dre'][2022].keys():
-        valor_2022 = dados['dre'][2022][conta]
-        valor_2023 = dados['dre'][2023][conta]
-        
-        linhas_dre.append({
-            "Conta": conta,
-            "2022": valor_2022,
-            "AV 2022": (valor_2022 / rl_2022) * 100,
-            "2023": valor_2023,
-            "AV 2023": (valor_2023 / rl_2023) * 100,
-            "AH %": ((valor_2023 / valor_2022) - 1) * 100 if valor_2022 != 0 else 0
-        })
-    
-    df_dre = pd.DataFrame(linhas_dre)
-    
-    # Formatar para exibição
-    df_dre_display = df_dre.copy()
-    df_dre_display['2022'] = df_dre_display['2022'].apply(lambda x: f"R$ {x:,.0f}")
-    df_dre_display['2023'] = df_dre_display['2023'].apply(lambda x: f"R$ {x:,.0f}")
-    df_dre_display['AV 2022'] = df_dre_display['AV 2022'].apply(lambda x: f"{x:.1f}%")
-    df_dre_display['AV 2023'] = df_dre_display['AV 2023'].apply(lambda x: f"{x:.1f}%")
-    df_dre_display['AH %'] = df_dre_display['AH %'].apply(lambda x: f"{x:+.1f}%")
-    
-    st.dataframe(df_dre_display, use_container_width=True, hide_index=True)
+    divergencias = analise_empresa_real(indice)['divergencias_dre']
+    divergentes = [arvore.rotulos[i] for i in np.flatnonzero((np.abs(divergencias) > TOLERANCIA).any(axis=1))]
+    if divergentes:
+        st.warning(f"Subtotais informados diferentes da soma das contas: {', '.join(divergentes)}")
+    else:
+        st.caption("✅ Os subtotais informados na DRE conferem com a soma das contas que os compõem.")
     
     # Gráfico de Margens
     st.markdown("#### 📈 Evolução das Margens")
     
-    margens_2022 = {
-        'Margem Bruta': (dados['dre'][2022]['Lucro Bruto'] / rl_2022) * 100,
-        'Margem EBIT': (dados['dre'][2022]['EBIT'] / rl_2022) * 100,
-        'Margem Líquida': (dados['dre'][2022]['Lucro Líquido'] / rl_2022) * 100
-    }
-    
-    margens_2023 = {
-        'Margem Bruta': (dados['dre'][2023]['Lucro Bruto'] / rl_2023) * 100,
-        'Margem EBIT': (dados['dre'][2023]['EBIT'] / rl_2023) * 100,
-        'Margem Líquida': (dados['dre'][2023]['Lucro Líquido'] / rl_2023) * 100
-    }
+    av_receita = analise.av(caminhos['Receita Líquida'])
+    margens = {'Margem Bruta': 'Lucro Bruto', 'Margem EBIT': 'EBIT', 'Margem Líquida': 'Lucro Líquido'}
+    margens_2022, margens_2023 = (
+        {margem: av_receita[arvore.posicao(caminhos[conta]), j] for margem, conta in margens.items()}
+        for j in (analise.periodos.index(2022), analise.periodos.index(2023))
+    )
     
     col1, col2 = st.columns(2)
     
@@ -543,8 +530,16 @@ def renderizar_comparativo_periodos():
     """, unsafe_allow_html=True)
     
     dados = get_dados_empresa_real()
-    totais_2022 = calcular_totais_balanco(dados['balanco'][2022])
-    totais_2023 = calcular_totais_balanco(dados['balanco'][2023])
+    totais_2022 = calcular_totais_balanco(2022)
+    totais_2023 = calcular_totais_balanco(2023)
+    
+    rl_2022 = dados['dre'][2022]['Receita Líquida']
+    rl_2023 = dados['dre'][2023]['Receita Líquida']
+    ll_2022 = dados['dre'][2022]['Lucro Líquido']
+    ll_2023 = dados['dre'][2023]['Lucro Líquido']
+    
+    # Indicadores dos dois exercícios num único cálculo vetorizado
+    ind = {nome: valores[0] for nome, valores in get_demonstracoes_empresa_real().indicadores().items()}
     
     # Dashboard de Indicadores
     st.markdown("#### 📊 Dashboard Comparativo")
@@ -552,11 +547,8 @@ def renderizar_comparativo_periodos():
     # Indicadores de Liquidez
     st.markdown("##### 💧 Liquidez")
     
-    lc_2022 = totais_2022['AC'] / totais_2022['PC']
-    lc_2023 = totais_2023['AC'] / totais_2023['PC']
-    
-    ls_2022 = (totais_2022['AC'] - dados['balanco'][2022]['ATIVO']['Circulante']['Estoques']) / totais_2022['PC']
-    ls_2023 = (totais_2023['AC'] - dados['balanco'][2023]['ATIVO']['Circulante']['Estoques']) / totais_2023['PC']
+    lc_2022, lc_2023 = ind['liquidez_corrente']
+    ls_2022, ls_2023 = ind['liquidez_seca']
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -576,11 +568,8 @@ def renderizar_comparativo_periodos():
     # Indicadores de Endividamento
     st.markdown("##### 📊 Endividamento")
     
-    endiv_2022 = ((totais_2022['PC'] + totais_2022['PNC']) / totais_2022['Ativo Total']) * 100
-    endiv_2023 = ((totais_2023['PC'] + totais_2023['PNC']) / totais_2023['Ativo Total']) * 100
-    
-    comp_2022 = (totais_2022['PC'] / (totais_2022['PC'] + totais_2022['PNC'])) * 100
-    comp_2023 = (totais_2023['PC'] / (totais_2023['PC'] + totais_2023['PNC'])) * 100
+    endiv_2022, endiv_2023 = ind['endividamento']
+    comp_2022, comp_2023 = ind['composicao_endividamento']
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -600,19 +589,9 @@ def renderizar_comparativo_periodos():
     # Indicadores de Rentabilidade
     st.markdown("##### 💰 Rentabilidade")
     
-    rl_2022 = dados['dre'][2022]['Receita Líquida']
-    rl_2023 = dados['dre'][2023]['Receita Líquida']
-    ll_2022 = dados['dre'][2022]['Lucro Líquido']
-    ll_2023 = dados['dre'][2023]['Lucro Líquido']
-    
-    ml_2022 = (ll_2022 / rl_2022) * 100
-    ml_2023 = (ll_2023 / rl_2023) * 100
-    
-    roe_2022 = (ll_2022 / totais_2022['PL']) * 100
-    roe_2023 = (ll_2023 / totais_2023['PL']) * 100
-    
-    roa_2022 = (ll_2022 / totais_2022['Ativo Total']) * 100
-    roa_2023 = (ll_2023 / totais_2023['Ativo Total']) * 100
+    ml_2022, ml_2023 = ind['margem_liquida']
+    roe_2022, roe_2023 = ind['roe']
+    roa_2022, roa_2023 = ind['roa']
     
     col1, col2, col3 = st.columns(3)
     
@@ -1003,5 +982,119 @@ def renderizar_interpretacao_achados():
     """, unsafe_allow_html=True)
 
 
+@fixture_compartilhada
+def get_plano_extenso():
+    """Plano de contas sintético do tamanho de uma companhia aberta: 2.000 contas, 20 trimestres."""
+    return plano_exemplo(n_contas=2000, n_periodos=20)
+
+
+def analisar_plano_extenso(defasagem, periodo_base, indice=None):
+    """AV e AH do plano extenso (calculado uma vez por combinação de parâmetros)."""
+    arvore, folhas, periodos = get_plano_extenso()
+    if indice is not None:
+        folhas = deflacionar(folhas, periodos, indice)
+    return analisar(arvore, folhas, periodos, defasagem=defasagem, periodos_por_ano=4, periodo_base=periodo_base)
+
+
+def renderizar_plano_extenso():
+    """AV e AH de um plano de contas extenso, com navegação pelos subtotais."""
+    
+    st.markdown("### 🧮 AV e AH em um Plano de Contas Extenso")
+    
+    st.markdown("""
+        <div style='background-color: #e0e7ff; padding: 20px; border-radius: 10px; 
+                    border-left: 5px solid #4f46e5; margin-bottom: 20px;'>
+            <strong>Objetivo:</strong><br>
+            <em>Aplicar a análise horizontal e vertical a um plano de contas do tamanho real — milhares 
+            de contas em vários níveis e cinco anos de trimestres — e navegar pelos subtotais para 
+            encontrar as contas que explicam cada variação.</em>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    arvore, _, periodos = get_plano_extenso()
+    
+    with edicao_em_lote("form_plano_extenso"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            comparacao = st.radio(
+                "Análise horizontal contra:",
+                ["Trimestre anterior", "Mesmo trimestre do ano anterior"],
+                index=1,
+                key="m7_plano_defasagem",
+                help="Comparar com o mesmo trimestre do ano anterior elimina a sazonalidade"
+            )
+        with col2:
+            base = st.selectbox("Período-base do número-índice", periodos, index=0, key="m7_plano_base")
+        with col3:
+            valores = st.selectbox("Valores", list(OPCOES_VALORES), index=0, key="m7_plano_valores")
+    defasagem = 1 if comparacao == "Trimestre anterior" else 4
+    indice = OPCOES_VALORES[valores]
+    
+    inicio = time.perf_counter()
+    try:
+        analise = calculo_em_cache(
+            "modulo7", "plano_extenso", analisar_plano_extenso, defasagem, periodos.index(base), indice
+        )
+    except ValueError as erro:
+        st.error(f"Não foi possível deflacionar o plano de contas: {erro}")
+        return
+    ms = (time.perf_counter() - inicio) * 1000
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Contas", f"{len(arvore):,}")
+    with col2:
+        st.metric("Subtotais", f"{int((~arvore.folha).sum()):,}")
+    with col3:
+        st.metric("Níveis", arvore.profundidade)
+    with col4:
+        st.metric("Trimestres", len(periodos))
+    st.caption(f"Consolidação, AV e AH de todas as contas em todos os trimestres: {ms:.0f} ms "
+               "(combinações de parâmetros já vistas vêm do cache).")
+    if indice is not None:
+        st.caption(f"Saldos de cada trimestre em {descrever(indice, data_do_periodo(periodos[-1]))}: "
+                   "número-índice, AH e CAGR medem a variação real.")
+    
+    st.markdown("---")
+    st.markdown("#### 🔎 Navegação pelos Subtotais")
+    
+    subtotais = [i for i in arvore.preordem.tolist() if not arvore.folha[i]]
+    i = st.selectbox(
+        "Subtotal", subtotais,
+        format_func=lambda i: "· " * int(arvore.nivel[i]) + arvore.rotulos[i],
+        key="m7_plano_subtotal"
+    )
+    ultimo = len(periodos) - 1
+    linhas = [i] + arvore.filhos(i).tolist()
+    
+    st.dataframe(formatar_tabela_hv(pd.DataFrame({
+        "Conta": [arvore.rotulos[j] + ("" if arvore.folha[j] else " ▸") for j in linhas],
+        f"{periodos[ultimo]}": analise.valores[linhas, ultimo],
+        "AV Subtotal": analise.av_subtotal[linhas, ultimo],
+        "AV Total": analise.av_total[linhas, ultimo],
+        f"AH {periodos[ultimo]}": analise.ah[linhas, ultimo],
+        "CAGR a.a.": analise.cagr[linhas],
+    })), use_container_width=True, hide_index=True)
+    st.caption("▸ subtotal (escolha-o acima para abrir). AV Subtotal: participação no subtotal imediatamente acima; "
+               "AV Total: participação no total da raiz; CAGR: crescimento composto anual entre o primeiro e o último trimestre.")
+    
+    # Número-índice das maiores contas do subtotal
+    filhos = arvore.filhos(i)
+    maiores = filhos[np.argsort(-np.abs(analise.valores[filhos, ultimo]))][:8]
+    fig = go.Figure()
+    for j in [i] + maiores.tolist():
+        fig.add_trace(go.Scatter(
+            x=periodos, y=analise.indice[j], mode='lines', name=arvore.rotulos[j],
+            line=dict(width=4 if j == i else 2)
+        ))
+    fig.update_layout(
+        title=f"Número-Índice ({base} = 100)",
+        height=400,
+        xaxis_title="Trimestre",
+        yaxis_title="Índice"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
 if __name__ == "__main__":
     run()
\ No newline at end of file
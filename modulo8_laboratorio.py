@@ -14,6 +14,9 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
+from cache_laboratorio import figura_em_cache
+from interface_laboratorio import edicao_em_lote, renderizar_abas
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -33,20 +36,11 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Índices de Liquidez",
-        "📉 Caso: Crise de Caixa",
-        "🔄 Ciclo Financeiro"
+    renderizar_abas("abas_modulo8", [
+        ("📊 Índices de Liquidez", renderizar_indices_liquidez, ("liq_*",)),
+        ("📉 Caso: Crise de Caixa", renderizar_caso_crise_caixa, ("crise_q*",)),
+        ("🔄 Ciclo Financeiro", renderizar_ciclo_financeiro, ("red_pme", "red_pmr", "aum_pmp", "cf_*"))
     ])
-    
-    with tab1:
-        renderizar_indices_liquidez()
-    
-    with tab2:
-        renderizar_caso_crise_caixa()
-    
-    with tab3:
-        renderizar_ciclo_financeiro()
 
 
 def renderizar_indices_liquidez():
@@ -297,48 +291,12 @@ def renderizar_caso_crise_caixa():
     
     with col1:
         # Gráfico de evolução
-        anos = [2021, 2022, 2023]
-        
-        fig1 = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        fig1.add_trace(
-            go.Bar(name='Receita', x=anos, y=[2500, 3500, 4500], marker_color='#3b82f6'),
-            secondary_y=False
-        )
-        
-        fig1.add_trace(
-            go.Scatter(name='Liquidez Corrente', x=anos, y=[1.37, 1.20, 0.89], 
-                      mode='lines+markers', line=dict(color='#ef4444', width=3)),
-            secondary_y=True
-        )
-        
-        fig1.add_hline(y=1.0, line_dash="dash", line_color="gray", secondary_y=True)
-        
-        fig1.update_layout(title="Receita vs Liquidez", height=350)
-        fig1.update_yaxes(title_text="Receita (R$ mil)", secondary_y=False)
-        fig1.update_yaxes(title_text="Liquidez Corrente", secondary_y=True)
-        
+        fig1 = figura_em_cache("modulo8", "receita_vs_liquidez", construir_grafico_receita_vs_liquidez)
         st.plotly_chart(fig1, use_container_width=True)
     
     with col2:
         # Composição do AC vs PC
-        fig2 = go.Figure()
-        
-        fig2.add_trace(go.Bar(
-            name='Ativo Circulante',
-            x=anos,
-            y=[850, 1380, 1920],
-            marker_color='#22c55e'
-        ))
-        
-        fig2.add_trace(go.Bar(
-            name='Passivo Circulante',
-            x=anos,
-            y=[620, 1150, 2150],
-            marker_color='#ef4444'
-        ))
-        
-        fig2.update_layout(title="AC vs PC", barmode='group', height=350)
+        fig2 = figura_em_cache("modulo8", "ac_vs_pc", construir_grafico_ac_vs_pc)
         st.plotly_chart(fig2, use_container_width=True)
     
     st.markdown("---")
@@ -405,29 +363,8 @@ def renderizar_caso_crise_caixa():
         """, unsafe_allow_html=True)
         
         # Gráfico do Efeito Tesoura
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=[2021, 2022, 2023],
-            y=[ncg_2021, ncg_2022, ncg_2023],
-            name='NCG',
-            line=dict(color='#ef4444', width=3),
-            mode='lines+markers'
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=[2021, 2022, 2023],
-            y=[95-180, 65-480, 25-1250],  # CDG = Caixa - Empréstimos CP
-            name='CDG (simplificado)',
-            line=dict(color='#3b82f6', width=3),
-            mode='lines+markers'
-        ))
-        
-        fig.update_layout(
-            title="Efeito Tesoura: NCG crescendo, CDG caindo",
-            height=300,
-            yaxis_title="R$ mil"
-        )
+        fig = figura_em_cache("modulo8", "efeito_tesoura", construir_grafico_efeito_tesoura,
+                              [ncg_2021, ncg_2022, ncg_2023])
         st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
@@ -492,6 +429,87 @@ def renderizar_caso_crise_caixa():
         """, unsafe_allow_html=True)
 
 
+def construir_grafico_receita_vs_liquidez():
+    """Gráfico Receita vs Liquidez Corrente do caso TechGrow."""
+    
+    anos = [2021, 2022, 2023]
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    fig.add_trace(
+        go.Bar(name='Receita', x=anos, y=[2500, 3500, 4500], marker_color='#3b82f6'),
+        secondary_y=False
+    )
+    
+    fig.add_trace(
+        go.Scatter(name='Liquidez Corrente', x=anos, y=[1.37, 1.20, 0.89], 
+                  mode='lines+markers', line=dict(color='#ef4444', width=3)),
+        secondary_y=True
+    )
+    
+    fig.add_hline(y=1.0, line_dash="dash", line_color="gray", secondary_y=True)
+    
+    fig.update_layout(title="Receita vs Liquidez", height=350)
+    fig.update_yaxes(title_text="Receita (R$ mil)", secondary_y=False)
+    fig.update_yaxes(title_text="Liquidez Corrente", secondary_y=True)
+    return fig
+
+
+def construir_grafico_ac_vs_pc():
+    """Gráfico AC vs PC do caso TechGrow."""
+    
+    anos = [2021, 2022, 2023]
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        name='Ativo Circulante',
+        x=anos,
+        y=[850, 1380, 1920],
+        marker_color='#22c55e'
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='Passivo Circulante',
+        x=anos,
+        y=[620, 1150, 2150],
+        marker_color='#ef4444'
+    ))
+    
+    fig.update_layout(title="AC vs PC", barmode='group', height=350)
+    return fig
+
+
+def construir_grafico_efeito_tesoura(ncgs):
+    """Gráfico do Efeito Tesoura (NCG vs CDG) do caso TechGrow."""
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=[2021, 2022, 2023],
+        y=ncgs,
+        name='NCG',
+        line=dict(color='#ef4444', width=3),
+        mode='lines+markers'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=[2021, 2022, 2023],
+        y=[95-180, 65-480, 25-1250],  # CDG = Caixa - Empréstimos CP
+        name='CDG (simplificado)',
+        line=dict(color='#3b82f6', width=3),
+        mode='lines+markers'
+    ))
+    
+    fig.update_layout(
+        title="Efeito Tesoura: NCG crescendo, CDG caindo",
+        height=300,
+        yaxis_title="R$ mil"
+    )
+    return fig
+
+
+@st.fragment
 def renderizar_ciclo_financeiro():
     """Exercício aplicado de ciclo financeiro."""
     
@@ -528,19 +546,20 @@ def renderizar_ciclo_financeiro():
     # Simulador
     st.markdown("#### 🧮 Simulador de Ciclo Financeiro")
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("**Dados do Balanço (saldos médios)**")
-        estoques = st.number_input("Estoques (R$)", min_value=0, value=500000, step=50000, key="cf_est")
-        clientes = st.number_input("Contas a Receber (R$)", min_value=0, value=600000, step=50000, key="cf_cli")
-        fornecedores = st.number_input("Fornecedores (R$)", min_value=0, value=350000, step=50000, key="cf_forn")
-    
-    with col2:
-        st.markdown("**Dados da DRE (anuais)**")
-        receita = st.number_input("Receita Líquida (R$)", min_value=0, value=4800000, step=100000, key="cf_rec")
-        cmv = st.number_input("CMV (R$)", min_value=0, value=3200000, step=100000, key="cf_cmv")
-        compras = st.number_input("Compras (R$)", min_value=0, value=3400000, step=100000, key="cf_comp")
+    with edicao_em_lote("form_ciclo_financeiro"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("**Dados do Balanço (saldos médios)**")
+            estoques = st.number_input("Estoques (R$)", min_value=0, value=500000, step=50000, key="cf_est")
+            clientes = st.number_input("Contas a Receber (R$)", min_value=0, value=600000, step=50000, key="cf_cli")
+            fornecedores = st.number_input("Fornecedores (R$)", min_value=0, value=350000, step=50000, key="cf_forn")
+        
+        with col2:
+            st.markdown("**Dados da DRE (anuais)**")
+            receita = st.number_input("Receita Líquida (R$)", min_value=0, value=4800000, step=100000, key="cf_rec")
+            cmv = st.number_input("CMV (R$)", min_value=0, value=3200000, step=100000, key="cf_cmv")
+            compras = st.number_input("Compras (R$)", min_value=0, value=3400000, step=100000, key="cf_comp")
     
     # Cálculos
     pme = (estoques / cmv * 360) if cmv > 0 else 0
@@ -15,6 +15,10 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 
+from cache_laboratorio import figura_em_cache
+from interface_laboratorio import edicao_em_lote, renderizar_abas
+from perfil_laboratorio import instrumentar
+
 
 def run():
     """Função principal do módulo - chamada pelo hub central."""
@@ -34,20 +38,13 @@ def run():
         </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Cálculo de Alavancagem",
-        "📉 Caso: Lucrativa e Endividada",
-        "💬 Debate: Quando Dívida é Positiva?"
+    renderizar_abas("abas_modulo9", [
+        ("📊 Cálculo de Alavancagem", renderizar_calculo_alavancagem, (
+            "ativo_total", "roa_sim", "div_a", "juros_a", "div_b", "juros_b"
+        )),
+        ("📉 Caso: Lucrativa e Endividada", renderizar_caso_endividamento, ("caso9_q*",)),
+        ("💬 Debate: Quando Dívida é Positiva?", renderizar_debate_divida, ("quiz_m9", "favor_*", "contra_*"))
     ])
-    
-    with tab1:
-        renderizar_calculo_alavancagem()
-    
-    with tab2:
-        renderizar_caso_endividamento()
-    
-    with tab3:
-        renderizar_debate_divida()
 
 
 def renderizar_calculo_alavancagem():
@@ -114,21 +111,22 @@ def renderizar_calculo_alavancagem():
     
     st.markdown("**Compare duas empresas com mesmo Ativo Total mas estruturas de capital diferentes:**")
     
-    ativo_total = st.number_input("Ativo Total (igual para ambas)", min_value=100000, value=1000000, step=100000, key="ativo_total")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("##### 🏢 Empresa A (Conservadora)")
-        pct_divida_a = st.slider("% de Dívida", 0, 100, 30, key="div_a")
-        taxa_juros_a = st.slider("Taxa de Juros (%)", 0.0, 30.0, 12.0, key="juros_a")
-    
-    with col2:
-        st.markdown("##### 🏭 Empresa B (Alavancada)")
-        pct_divida_b = st.slider("% de Dívida", 0, 100, 70, key="div_b")
-        taxa_juros_b = st.slider("Taxa de Juros (%)", 0.0, 30.0, 15.0, key="juros_b")
-    
-    roa = st.slider("ROA (Retorno sobre Ativo) - igual para ambas (%)", 0.0, 30.0, 15.0, key="roa_sim")
+    with edicao_em_lote("form_alavancagem"):
+        ativo_total = st.number_input("Ativo Total (igual para ambas)", min_value=100000, value=1000000, step=100000, key="ativo_total")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("##### 🏢 Empresa A (Conservadora)")
+            pct_divida_a = st.slider("% de Dívida", 0, 100, 30, key="div_a")
+            taxa_juros_a = st.slider("Taxa de Juros (%)", 0.0, 30.0, 12.0, key="juros_a")
+        
+        with col2:
+            st.markdown("##### 🏭 Empresa B (Alavancada)")
+            pct_divida_b = st.slider("% de Dívida", 0, 100, 70, key="div_b")
+            taxa_juros_b = st.slider("Taxa de Juros (%)", 0.0, 30.0, 15.0, key="juros_b")
+        
+        roa = st.slider("ROA (Retorno sobre Ativo) - igual para ambas (%)", 0.0, 30.0, 15.0, key="roa_sim")
     
     # Cálculos Empresa A
     divida_a = ativo_total * (pct_divida_a / 100)
@@ -206,16 +204,9 @@ def renderizar_calculo_alavancagem():
         st.plotly_chart(fig1, use_container_width=True)
     
     with col2:
-        # Estrutura de capital
-        fig2 = make_subplots(rows=1, cols=2, specs=[[{'type':'pie'}, {'type':'pie'}]],
-                           subplot_titles=['Empresa A', 'Empresa B'])
-        
-        fig2.add_trace(go.Pie(labels=['Dívida', 'PL'], values=[divida_a, pl_a],
-                             marker_colors=['#ef4444', '#22c55e'], hole=0.4), row=1, col=1)
-        fig2.add_trace(go.Pie(labels=['Dívida', 'PL'], values=[divida_b, pl_b],
-                             marker_colors=['#ef4444', '#22c55e'], hole=0.4), row=1, col=2)
-        
-        fig2.update_layout(title="Estrutura de Capital", height=300)
+        # Estrutura de capital (depende dos sliders: cache LRU por combinação)
+        fig2 = figura_em_cache("modulo9", "estrutura_capital", construir_grafico_estrutura_capital,
+                               divida_a, pl_a, divida_b, pl_b)
         st.plotly_chart(fig2, use_container_width=True)
     
     # Interpretação
@@ -303,6 +294,21 @@ def renderizar_calculo_alavancagem():
     """)
 
 
+def construir_grafico_estrutura_capital(divida_a, pl_a, divida_b, pl_b):
+    """Gráficos de rosca da estrutura de capital das empresas A e B."""
+    
+    fig = make_subplots(rows=1, cols=2, specs=[[{'type':'pie'}, {'type':'pie'}]],
+                       subplot_titles=['Empresa A', 'Empresa B'])
+    
+    fig.add_trace(go.Pie(labels=['Dívida', 'PL'], values=[divida_a, pl_a],
+                         marker_colors=['#ef4444', '#22c55e'], hole=0.4), row=1, col=1)
+    fig.add_trace(go.Pie(labels=['Dívida', 'PL'], values=[divida_b, pl_b],
+                         marker_colors=['#ef4444', '#22c55e'], hole=0.4), row=1, col=2)
+    
+    fig.update_layout(title="Estrutura de Capital", height=300)
+    return fig
+
+
 def renderizar_caso_endividamento():
     """Caso: empresa altamente lucrativa, porém muito endividada."""
     
@@ -576,6 +582,53 @@ def renderizar_caso_endividamento():
         """, unsafe_allow_html=True)
 
 
+@instrumentar("calculo")
+def calcular_curva_tradeoff():
+    """Calcula a curva da teoria do trade-off e o nível ótimo de dívida."""
+    
+    dividas = np.linspace(0, 100, 100)
+    beneficio_fiscal = 0.1 * dividas  # Benefício crescente
+    custo_distress = 0.0001 * (dividas ** 2.5)  # Custo crescente exponencial
+    valor_empresa = 100 + beneficio_fiscal - custo_distress
+    
+    # Ponto ótimo
+    idx_max = np.argmax(valor_empresa)
+    divida_otima = dividas[idx_max]
+    
+    return dividas, beneficio_fiscal, valor_empresa, divida_otima
+
+
+def construir_grafico_tradeoff():
+    """Gráfico da teoria do trade-off: benefício fiscal vs custo de distress."""
+    
+    dividas, beneficio_fiscal, valor_empresa, divida_otima = calcular_curva_tradeoff()
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=dividas, y=100 + beneficio_fiscal,
+        name='Com Benefício Fiscal',
+        line=dict(color='#22c55e', width=2, dash='dash')
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=dividas, y=valor_empresa,
+        name='Valor Líquido (com custos de distress)',
+        line=dict(color='#3b82f6', width=3)
+    ))
+    
+    fig.add_vline(x=divida_otima, line_dash="dash", line_color="gray",
+                 annotation_text=f"Dívida Ótima: {divida_otima:.0f}%")
+    
+    fig.update_layout(
+        title="Trade-off: Benefício Fiscal vs Custo de Distress",
+        xaxis_title="Nível de Endividamento (%)",
+        yaxis_title="Valor da Empresa",
+        height=400
+    )
+    return fig
+
+
 def renderizar_debate_divida():
     """Debate orientado: quando a dívida é positiva?"""
     
@@ -634,39 +687,9 @@ def renderizar_debate_divida():
     """)
     
     # Gráfico do Trade-off
-    dividas = np.linspace(0, 100, 100)
-    beneficio_fiscal = 0.1 * dividas  # Benefício crescente
-    custo_distress = 0.0001 * (dividas ** 2.5)  # Custo crescente exponencial
-    valor_empresa = 100 + beneficio_fiscal - custo_distress
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=dividas, y=100 + beneficio_fiscal,
-        name='Com Benefício Fiscal',
-        line=dict(color='#22c55e', width=2, dash='dash')
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=dividas, y=valor_empresa,
-        name='Valor Líquido (com custos de distress)',
-        line=dict(color='#3b82f6', width=3)
-    ))
-    
-    # Ponto ótimo
-    idx_max = np.argmax(valor_empresa)
-    divida_otima = dividas[idx_max]
-    
-    fig.add_vline(x=divida_otima, line_dash="dash", line_color="gray",
-                 annotation_text=f"Dívida Ótima: {divida_otima:.0f}%")
-    
-    fig.update_layout(
-        title="Trade-off: Benefício Fiscal vs Custo de Distress",
-        xaxis_title="Nível de Endividamento (%)",
-        yaxis_title="Valor da Empresa",
-        height=400
-    )
+    _, _, _, divida_otima = calcular_curva_tradeoff()
     
+    fig = figura_em_cache("modulo9", "tradeoff", construir_grafico_tradeoff)
     st.plotly_chart(fig, use_container_width=True)
     
     st.info(f"""
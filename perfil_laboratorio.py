@@ -0,0 +1,293 @@
+"""
+Perfil de Desempenho do Laboratório
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Instrumentação interna de tempo de renderização:
+- Medição do `run()` de cada módulo e de cada renderizador de aba
+- Percentis móveis (p50/p95/p99) por função, mantidos em memória
+- Exportação das estatísticas em JSON
+- Captura de um rerun completo como trace-event JSON (Chrome/Perfetto)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Quantidade de medições mais recentes mantidas por função
+TAMANHO_JANELA = 500
+
+# Elementos `st.*` cuja emissão aparece como span na captura de trace
+ELEMENTOS_ST = (
+    "markdown", "write", "dataframe", "table", "plotly_chart", "metric",
+    "latex", "info", "success", "warning", "error",
+)
+
+_amostras = {}
+_lock = threading.Lock()
+
+# Cada sessão do Streamlit executa o script em sua própria thread, então a
+# captura de trace ativa (se houver) é guardada por thread, junto com o id
+# da sessão que a iniciou.
+_captura = threading.local()
+
+# Ganchos instalados em bibliotecas: (dono, atributo, original, envolvido,
+# se o atributo era do próprio dono ou herdado).
+# Só existem enquanto houver ao menos uma captura ativa no processo.
+_ganchos = []
+_capturas_ativas = 0
+
+
+def registrar_tempo(nome, segundos):
+    """Registra a duração (em segundos) de uma execução da função `nome`."""
+    with _lock:
+        if nome not in _amostras:
+            _amostras[nome] = deque(maxlen=TAMANHO_JANELA)
+        _amostras[nome].append(segundos)
+
+
+@contextmanager
+def medir(nome, categoria="render"):
+    """
+    Mede o tempo do bloco `with` e registra sob `nome`, mesmo se houver exceção.
+    
+    Se houver uma captura de trace ativa na thread atual, o bloco também
+    vira um span (evento "X") da categoria informada.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        registrar_tempo(nome, fim - inicio)
+        registrar_span(nome, categoria, inicio, fim)
+
+
+def instrumentar(categoria):
+    """Decorador que aplica `medir` a todas as chamadas da função decorada."""
+    def decorador(funcao):
+        nome = f"{funcao.__module__}.{funcao.__name__}"
+        
+        @functools.wraps(funcao)
+        def funcao_instrumentada(*args, **kwargs):
+            with medir(nome, categoria):
+                return funcao(*args, **kwargs)
+        
+        return funcao_instrumentada
+    
+    return decorador
+
+
+def estatisticas():
+    """
+    Retorna as estatísticas da janela móvel de cada função instrumentada.
+    
+    O resultado é um dicionário `nome -> {chamadas, media_ms, p50_ms,
+    p95_ms, p99_ms, max_ms}`, ordenado do maior p95 para o menor.
+    """
+    with _lock:
+        copias = {nome: list(valores) for nome, valores in _amostras.items()}
+    
+    resultado = {}
+    for nome, valores in copias.items():
+        ms = np.asarray(valores) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        resultado[nome] = {
+            "chamadas": len(ms),
+            "media_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(ms.max()), 2),
+        }
+    return dict(sorted(resultado.items(), key=lambda item: -item[1]["p95_ms"]))
+
+
+def exportar_json():
+    """Serializa as estatísticas atuais em JSON (para download ou coleta externa)."""
+    return json.dumps(
+        {"janela": TAMANHO_JANELA, "funcoes": estatisticas()},
+        ensure_ascii=False,
+        indent=2,
+    )
+
+
+def limpar():
+    """Descarta todas as medições acumuladas."""
+    with _lock:
+        _amostras.clear()
+
+
+# =============================================================================
+# CAPTURA DE TRACE (Chrome trace-event / Perfetto)
+# =============================================================================
+
+def sessao_atual():
+    """Id da sessão do Streamlit em execução na thread atual (None fora de uma sessão)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def captura_ativa():
+    """Indica se a thread atual está capturando um trace para a sessão em execução."""
+    return (
+        getattr(_captura, "eventos", None) is not None
+        and _captura.sessao == sessao_atual()
+    )
+
+
+def registrar_span(nome, categoria, inicio, fim):
+    """Adiciona um span completo à captura da thread atual (no-op sem captura)."""
+    if not captura_ativa():
+        return
+    _captura.eventos.append({
+        "name": nome,
+        "cat": categoria,
+        "ph": "X",
+        "ts": round((inicio - _captura.origem) * 1e6, 3),
+        "dur": round((fim - inicio) * 1e6, 3),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    })
+
+
+def iniciar_captura():
+    """
+    Começa a capturar, na thread e na sessão atuais, todos os spans até
+    `finalizar_captura`. Os ganchos em bibliotecas são instalados pela
+    primeira captura ativa do processo.
+    """
+    global _capturas_ativas
+    
+    if getattr(_captura, "eventos", None) is None:
+        with _lock:
+            _capturas_ativas += 1
+            if _capturas_ativas == 1:
+                instalar_ganchos_bibliotecas()
+    _captura.sessao = sessao_atual()
+    _captura.origem = time.perf_counter()
+    _captura.eventos = []
+
+
+def finalizar_captura(rotulo="rerun"):
+    """
+    Encerra a captura da thread atual e retorna o trace-event JSON.
+    
+    O arquivo pode ser aberto diretamente em chrome://tracing ou em
+    https://ui.perfetto.dev. Um span raiz com `rotulo` cobre o rerun inteiro.
+    """
+    global _capturas_ativas
+    
+    eventos = getattr(_captura, "eventos", None)
+    fim = time.perf_counter()
+    origem = getattr(_captura, "origem", fim)
+    _captura.eventos = None
+    if eventos is not None:
+        with _lock:
+            _capturas_ativas -= 1
+            if _capturas_ativas == 0:
+                remover_ganchos_bibliotecas()
+    eventos = eventos or []
+    
+    raiz = {
+        "name": rotulo,
+        "cat": "rerun",
+        "ph": "X",
+        "ts": 0,
+        "dur": round((fim - origem) * 1e6, 3),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    return json.dumps(
+        {"traceEvents": [raiz] + eventos, "displayTimeUnit": "ms"},
+        ensure_ascii=False,
+    )
+
+
+@contextmanager
+def captura(rotulo="rerun", ativa=True):
+    """
+    Captura de trace do bloco `with` (no-op com `ativa` falso).
+
+    Devolve um dicionário que recebe o trace-event JSON em "trace" só se o
+    bloco terminar normalmente. Interrompido por qualquer exceção, inclusive
+    StopException/RerunException do Streamlit (que não são Exception), a
+    captura é descartada; em todos os casos ela é encerrada e os ganchos em
+    bibliotecas são removidos quando não houver outra captura ativa.
+    """
+    resultado = {}
+    if not ativa:
+        yield resultado
+        return
+    iniciar_captura()
+    try:
+        yield resultado
+    except BaseException:
+        finalizar_captura(rotulo)
+        raise
+    resultado["trace"] = finalizar_captura(rotulo)
+
+
+def envolver_metodo(dono, atributo, nome, categoria):
+    """Substitui `dono.atributo` por uma versão que gera span durante capturas da sessão."""
+    original = getattr(dono, atributo)
+    proprio = atributo in vars(dono)
+    
+    @functools.wraps(original)
+    def envolvido(*args, **kwargs):
+        if not captura_ativa():
+            return original(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            registrar_span(nome, categoria, inicio, time.perf_counter())
+    
+    setattr(dono, atributo, envolvido)
+    _ganchos.append((dono, atributo, original, envolvido, proprio))
+
+
+def instalar_ganchos_bibliotecas():
+    """
+    Instala os ganchos de trace em bibliotecas (chamada sob `_lock`).
+    
+    Cobre construção de DataFrames, construção de figuras Plotly e emissão
+    dos elementos `st.*` de ELEMENTOS_ST. Os ganchos só existem enquanto há
+    capturas ativas e só geram spans na thread e na sessão que capturam; as
+    demais sessões apenas repassam a chamada.
+    """
+    if _ganchos:
+        return
+    
+    import pandas as pd
+    import streamlit as st
+    from plotly.basedatatypes import BaseFigure
+    from streamlit.delta_generator import DeltaGenerator
+    
+    envolver_metodo(pd.DataFrame, "__init__", "pd.DataFrame", "dataframe")
+    envolver_metodo(BaseFigure, "__init__", "Figure.__init__", "plotly")
+    envolver_metodo(BaseFigure, "add_trace", "Figure.add_trace", "plotly")
+    envolver_metodo(BaseFigure, "update_layout", "Figure.update_layout", "plotly")
+    
+    for elemento in ELEMENTOS_ST:
+        envolver_metodo(DeltaGenerator, elemento, f"st.{elemento}", "st")
+        envolver_metodo(st, elemento, f"st.{elemento}", "st")
+
+
+def remover_ganchos_bibliotecas():
+    """Restaura os métodos originais das bibliotecas (chamada sob `_lock`)."""
+    while _ganchos:
+        dono, atributo, original, envolvido, proprio = _ganchos.pop()
+        if vars(dono).get(atributo) is not envolvido:
+            continue
+        if proprio:
+            setattr(dono, atributo, original)
+        else:
+            delattr(dono, atributo)
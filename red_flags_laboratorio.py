@@ -0,0 +1,219 @@
+"""
+Motor de Red Flags
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Regras de alerta declarativas avaliadas de forma vetorizada sobre painéis
+empresa × ano:
+- Cada regra é (flag, gravidade, condição, anos): a condição é um predicado
+  em texto no formato da triagem (triagem_laboratorio), que pode comparar
+  anos consecutivos com diferenca(x) e variacao(x); `anos` é quantos anos
+  seguidos a condição precisa valer para o alerta disparar
+- Os predicados são compilados uma única vez e avaliados como máscaras
+  NumPy sobre o painel inteiro; a persistência ("por 3 anos seguidos") sai
+  de um acumulado ao longo do eixo dos anos, sem laço por empresa
+- O mesmo passe cobre um caso de aula e milhares de companhias abertas do
+  universo da CVM, empilhados num único painel
+
+Conta ou indicador ausente (NaN) nunca satisfaz uma condição, então um ano
+sem dados interrompe a sequência de anos consecutivos.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cvm_laboratorio import INDICADORES_UNIVERSO
+from demonstracoes_laboratorio import COLUNAS_INDICADORES, SINAIS_INDICADORES
+from indicadores_laboratorio import CONTAS, INDICE_CONTA
+from perfil_laboratorio import instrumentar
+from triagem_laboratorio import compilar_predicado, nomes_do_predicado
+
+# Peso de cada gravidade na pontuação de uma empresa-ano
+PESOS_GRAVIDADE = {"Média": 1, "Alta": 2, "Crítica": 3}
+
+# Nomes aceitos nas condições: contas do motor e indicadores
+NOMES_PAINEL = frozenset(CONTAS) | frozenset(INDICADORES_UNIVERSO)
+
+
+# =============================================================================
+# 1. PAINEL EMPRESA × ANO
+# =============================================================================
+class Painel:
+    """
+    Contas e indicadores de várias entidades em vários anos.
+
+    `obter(nome)` devolve um array entidades × anos; cada coluna é montada
+    na primeira consulta e reaproveitada pelas demais regras. `presente`
+    (entidades × anos) marca os anos em que cada entidade tem demonstrações.
+    """
+
+    def __init__(self, entidades, anos, obter, presente=None):
+        self.entidades = list(entidades)
+        self.anos = list(anos)
+        self._obter = obter
+        self._colunas = {}
+        if presente is None:
+            presente = np.ones((len(self.entidades), len(self.anos)), dtype=bool)
+        self.presente = presente
+
+    def __len__(self):
+        return len(self.entidades)
+
+    def coluna(self, nome):
+        """Conta do motor ou indicador (entidades × anos)."""
+        if nome not in self._colunas:
+            if nome not in NOMES_PAINEL:
+                raise KeyError(nome)
+            self._colunas[nome] = np.asarray(self._obter(nome), dtype=np.float64)
+        return self._colunas[nome]
+
+    @classmethod
+    def de_demonstracoes(cls, demonstracoes):
+        """Painel de um `Demonstracoes` (entidades × períodos anuais)."""
+        tabela = demonstracoes.tabela_indicadores()
+        indicadores = demonstracoes.indicadores()
+
+        def obter(nome):
+            if nome in INDICE_CONTA:
+                return tabela[..., INDICE_CONTA[nome]]
+            return indicadores[nome]
+        return cls(demonstracoes.entidades, demonstracoes.periodos, obter)
+
+    @classmethod
+    def do_universo(cls, universo):
+        """
+        Painel denso de todas as empresas do universo CVM, nos anos da grade.
+
+        Cada coluna é reunida das linhas mapeadas em memória pela `grade`;
+        anos sem DFP ficam NaN.
+        """
+        grade = np.asarray(universo.grade)
+        ausente = grade < 0
+        linhas = np.where(ausente, 0, grade)
+
+        def obter(nome):
+            if nome in INDICE_CONTA:
+                i = INDICE_CONTA[nome]
+                valores = universo.valores[:, COLUNAS_INDICADORES[i]] * SINAIS_INDICADORES[i]
+            else:
+                valores = universo.coluna(nome)
+            coluna = np.asarray(valores, dtype=np.float64)[linhas] if len(universo) else np.full(grade.shape, np.nan)
+            coluna[ausente] = np.nan
+            return coluna
+        return cls(universo.empresas.tolist(), universo.anos(), obter, presente=~ausente)
+
+    @classmethod
+    def empilhar(cls, paineis):
+        """Um painel com as entidades de todos, alinhadas na união dos anos."""
+        anos = sorted({ano for painel in paineis for ano in painel.anos})
+        posicoes = [np.searchsorted(anos, painel.anos) for painel in paineis]
+
+        def obter(nome):
+            coluna = np.full((sum(len(painel) for painel in paineis), len(anos)), np.nan)
+            inicio = 0
+            for painel, posicao in zip(paineis, posicoes):
+                coluna[inicio:inicio + len(painel), posicao] = painel.coluna(nome)
+                inicio += len(painel)
+            return coluna
+
+        presente = np.zeros((sum(len(painel) for painel in paineis), len(anos)), dtype=bool)
+        inicio = 0
+        for painel, posicao in zip(paineis, posicoes):
+            presente[inicio:inicio + len(painel), posicao] = painel.presente
+            inicio += len(painel)
+        return cls([e for painel in paineis for e in painel.entidades], anos, obter, presente)
+
+
+# =============================================================================
+# 2. COMPILAÇÃO E AVALIAÇÃO DAS REGRAS
+# =============================================================================
+def compilar_regras(regras):
+    """
+    Valida e compila as regras (flag, gravidade, condição, anos).
+
+    Retorna a lista de funções painel → máscara, na ordem das regras.
+    Condição com nome desconhecido, gravidade fora de PESOS_GRAVIDADE ou
+    persistência menor que 1 ano levantam ValueError.
+    """
+    funcoes = []
+    for flag, gravidade, condicao, anos in regras:
+        funcao = compilar_predicado(condicao)
+        desconhecidos = [nome for nome in nomes_do_predicado(condicao) if nome not in NOMES_PAINEL]
+        if desconhecidos:
+            raise ValueError(f"{flag}: conta ou indicador desconhecido: {', '.join(desconhecidos)}")
+        if gravidade not in PESOS_GRAVIDADE:
+            raise ValueError(f"{flag}: gravidade inválida: {gravidade!r}")
+        if anos < 1:
+            raise ValueError(f"{flag}: a condição precisa valer por ao menos 1 ano")
+        funcoes.append(funcao)
+    return funcoes
+
+
+def anos_consecutivos(condicao):
+    """Quantos anos seguidos, até cada ano (inclusive), a condição vale (último eixo)."""
+    posicao = np.arange(condicao.shape[-1])
+    ultima_falha = np.maximum.accumulate(np.where(condicao, -1, posicao), axis=-1)
+    return posicao - ultima_falha
+
+
+class MatrizRedFlags:
+    """
+    Resultado das regras sobre um painel.
+
+    `condicoes` e `alertas` são arrays booleanos regras × entidades × anos:
+    a condição de cada regra no ano e o alerta, que só dispara quando a
+    condição vale pelos `anos` consecutivos exigidos pela regra.
+    """
+
+    def __init__(self, regras, painel, condicoes, alertas):
+        self.regras = tuple(regras)
+        self.entidades = painel.entidades
+        self.anos = painel.anos
+        self.presente = painel.presente
+        self.condicoes = condicoes
+        self.alertas = alertas
+        self.pesos = np.array([PESOS_GRAVIDADE[regra[1]] for regra in self.regras])
+        self._posicao = {entidade: e for e, entidade in enumerate(self.entidades)}
+
+    def pontuacao(self):
+        """Soma dos pesos das gravidades dos alertas de cada entidade-ano."""
+        return np.tensordot(self.pesos, self.alertas, axes=1)
+
+    def tabela_entidade(self, entidade):
+        """
+        DataFrame regra × ano com os alertas de uma entidade (🚩 = disparou),
+        só nos anos em que ela tem demonstrações.
+        """
+        e = self._posicao[entidade]
+        anos = self.presente[e]
+        tabela = pd.DataFrame(
+            np.where(self.alertas[:, e][:, anos], "🚩", np.where(self.condicoes[:, e][:, anos], "·", "")),
+            columns=[str(ano) for ano, tem in zip(self.anos, anos) if tem],
+        )
+        tabela.insert(0, "Gravidade", [regra[1] for regra in self.regras])
+        tabela.insert(0, "Red Flag", [regra[0] for regra in self.regras])
+        return tabela
+
+    def flags_de(self, entidade, ano):
+        """Red flags disparados de uma entidade num ano."""
+        e, j = self._posicao[entidade], self.anos.index(ano)
+        return [regra[0] for regra, alerta in zip(self.regras, self.alertas[:, e, j]) if alerta]
+
+
+@instrumentar("calculo")
+def avaliar_regras(painel, regras):
+    """Avalia todas as regras sobre o painel num único passe vetorizado."""
+    funcoes = compilar_regras(regras)
+    forma = (len(painel), len(painel.anos))
+    condicoes = np.zeros((len(regras),) + forma, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for r, funcao in enumerate(funcoes):
+            condicoes[r] = np.broadcast_to(np.asarray(funcao(painel), dtype=bool), forma)
+    persistencia = np.array([regra[3] for regra in regras]).reshape(-1, 1, 1)
+    alertas = anos_consecutivos(condicoes) >= persistencia
+    return MatrizRedFlags(regras, painel, condicoes, alertas)
+
+
+def descrever_regra(regra):
+    """Texto da regra para exibição, ex.: "fco_ll < 0.8 por 3 anos seguidos"."""
+    _, _, condicao, anos = regra
+    return condicao if anos == 1 else f"{condicao} por {anos} anos seguidos"
@@ -0,0 +1,111 @@
+"""
+Testes da ingestão dos dados abertos da CVM (cvm_laboratorio) sobre a
+amostra sintética de amostra_cvm_laboratorio, sem acesso à rede.
+
+    python -m pytest -q test_cvm_laboratorio.py
+"""
+
+import numpy as np
+import pytest
+
+import amostra_cvm_laboratorio as amostra
+from cvm_laboratorio import ingerir_diretorio
+from demonstracoes_laboratorio import INDICE
+
+
+@pytest.fixture
+def diretorios(tmp_path):
+    origem, destino = tmp_path / "origem", tmp_path / "armazem"
+    amostra.gerar_amostra(origem)
+    return str(origem), str(destino)
+
+
+def situacoes(resumo):
+    return {info["arquivo"]: info["situacao"] for info in resumo}
+
+
+def test_primeira_ingestao_mapeia_as_contas(diretorios):
+    origem, destino = diretorios
+    # Três arquivos com dois trabalhadores: a leitura passa pelo ProcessPoolExecutor
+    armazem, resumo, vazao = ingerir_diretorio(origem, destino, trabalhadores=2)
+
+    assert set(situacoes(resumo).values()) == {"novo"}
+    assert vazao["formularios"] == 10
+    universo = armazem.universo()
+
+    # Consolidada em R$ mil, individual em reais (convertida para R$ mil)
+    for cnpj in (amostra.ALFA, amostra.BETA):
+        for ano in amostra.ANOS:
+            registro = universo.registro(cnpj, ano)
+            for codigo in ("1", "2.03", "3.01", "3.05", "3.11", "6.01"):
+                assert registro[codigo] == pytest.approx(amostra.valor_esperado(cnpj, ano, codigo))
+            # D&A vem dos ajustes da DFC indireta
+            assert registro["M.01"] == pytest.approx(amostra.valor_esperado(cnpj, ano, "6.01.01.02"))
+
+    # Bancos ficam fora; o setor é o do registro ativo do cadastro
+    assert amostra.GAMA not in universo
+    assert universo.setor_de(amostra.ALFA) == amostra.EMPRESAS[amostra.ALFA]["setor"]
+
+
+def test_vale_a_ultima_versao(diretorios):
+    origem, destino = diretorios
+    armazem, _, _ = ingerir_diretorio(origem, destino, trabalhadores=1)
+
+    manifesto = armazem.ler_manifesto()
+    estado = manifesto["formularios"][f"{amostra.DELTA}|2023-12-31"]
+    assert estado["versoes"] == [1, 2] and estado["vigente"] == 2
+    registro = armazem.universo().registro(amostra.DELTA, 2023)
+    assert registro["3.01"] == pytest.approx(amostra.valor_esperado(amostra.DELTA, 2023, "3.01", versao=2))
+
+
+def test_itr_usa_o_acumulado_no_ano(diretorios):
+    origem, destino = diretorios
+    armazem, _, _ = ingerir_diretorio(origem, destino, trabalhadores=1)
+
+    itr = armazem.ler("ITR")
+    linha = np.flatnonzero((itr["cnpj"] == amostra.ALFA) & (itr["data"] == np.datetime64("2023-06-30")))[0]
+    receita = itr["valores"][linha, INDICE["3.01"]]
+    assert receita == pytest.approx(amostra.valor_esperado(amostra.ALFA, 2023, "3.01", meses=6))
+
+
+def test_reingestao_sem_mudancas_usa_o_manifesto(diretorios):
+    origem, destino = diretorios
+    ingerir_diretorio(origem, destino, trabalhadores=1)
+    armazem, resumo, vazao = ingerir_diretorio(origem, destino, trabalhadores=2)
+
+    assert set(situacoes(resumo).values()) == {"inalterado"}
+    assert vazao["formularios"] == 0
+    assert len(armazem.ler("DFP")["cnpj"]) == 6
+
+
+def test_amostra_e_reprodutivel(tmp_path):
+    # Bytes iguais entre gerações: regravar a amostra não muda o checksum dos arquivos intocados
+    def conteudos(destino):
+        caminhos = amostra.gerar_amostra(destino)
+        return [open(caminho, "rb").read() for caminho in caminhos]
+
+    assert conteudos(tmp_path / "a") == conteudos(tmp_path / "b")
+
+
+def test_reapresentacao_e_incremental(diretorios):
+    origem, destino = diretorios
+    ingerir_diretorio(origem, destino, trabalhadores=1)
+    amostra.gerar_amostra(origem, reapresentar=True)
+    armazem, resumo, vazao = ingerir_diretorio(origem, destino, trabalhadores=2)
+
+    # Só o DFP 2023 mudou; dele só a nova versão da DELTA é processada
+    assert situacoes(resumo) == {
+        "dfp_cia_aberta_2022.zip": "inalterado",
+        "dfp_cia_aberta_2023.zip": "atualizado",
+        "itr_cia_aberta_2023.zip": "inalterado",
+    }
+    atualizado = next(info for info in resumo if info["situacao"] == "atualizado")
+    assert atualizado["formularios"] == 1 and atualizado["reapresentados"] == 1
+    assert armazem.ler_manifesto()["formularios"][f"{amostra.DELTA}|2023-12-31"]["vigente"] == 3
+
+    universo = armazem.universo()
+    registro = universo.registro(amostra.DELTA, 2023)
+    assert registro["3.01"] == pytest.approx(amostra.valor_esperado(amostra.DELTA, 2023, "3.01", versao=3))
+    assert universo.registro(amostra.ALFA, 2023)["3.01"] == pytest.approx(
+        amostra.valor_esperado(amostra.ALFA, 2023, "3.01")
+    )
@@ -0,0 +1,289 @@
+"""
+Triagem do Universo de Empresas
+Laboratório de Análise de Demonstrações Financeiras
+=======================================================
+Filtros e buscas vetorizados sobre todas as empresas-ano do universo da
+CVM (cvm_laboratorio.UniversoEmpresas):
+- Predicados em texto com os nomes dos indicadores do motor, ex.:
+  "divida_ebitda > 3 and cobertura_juros < 2 and fco_ll < 0.8", compilados
+  uma única vez e avaliados como máscaras booleanas NumPy sobre as colunas
+  mapeadas em memória, sem laço por empresa
+- Resultados ordenados por um indicador
+- Busca de empresas-ano semelhantes a um caso de aula: distância dos
+  indicadores padronizada pelo intervalo interquartil do índice setorial
+
+O mesmo compilador atende às regras de red flags (red_flags_laboratorio),
+que avaliam os predicados sobre painéis empresa × ano e podem usar as
+funções temporais diferenca(x) e variacao(x) — estas não valem na triagem,
+em que cada linha é uma empresa-ano isolada.
+
+Indicador ausente (NaN) nunca satisfaz uma comparação.
+"""
+
+import ast
+import functools
+
+import numpy as np
+import pandas as pd
+
+from cvm_laboratorio import TODOS_SETORES
+from indicadores_laboratorio import dividir
+
+COMPARACOES = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Lt: np.less, ast.LtE: np.less_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+ARITMETICAS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def diferenca(valores):
+    """Diferença em relação ao ano anterior, ao longo do último eixo (NaN no primeiro ano)."""
+    valores = np.asarray(valores, dtype=np.float64)
+    resultado = np.full(valores.shape, np.nan)
+    resultado[..., 1:] = valores[..., 1:] - valores[..., :-1]
+    return resultado
+
+
+def variacao(valores):
+    """Variação relativa ao ano anterior; NaN no primeiro ano ou com base não positiva."""
+    valores = np.asarray(valores, dtype=np.float64)
+    resultado = np.full(valores.shape, np.nan)
+    resultado[..., 1:] = dividir(valores[..., 1:], valores[..., :-1]) - 1
+    return resultado
+
+
+# Funções temporais aceitas nos predicados (só sobre painéis empresa × ano)
+FUNCOES = {"diferenca": diferenca, "variacao": variacao}
+
+# Colunas do universo aceitas nos predicados além dos indicadores
+COLUNAS_EXTRAS = ("ano", "setor")
+
+# Mínimo de indicadores em comum para que uma empresa-ano seja comparável ao caso
+MINIMO_INDICADORES = 3
+
+# Intervalo interquartil relativo abaixo do qual um indicador não discrimina
+# as empresas do ano (ex.: prazo idêntico para todas) e fica fora da distância
+DISPERSAO_MINIMA = 1e-6
+
+
+# =============================================================================
+# 1. COMPILAÇÃO DOS PREDICADOS
+# =============================================================================
+@functools.lru_cache(maxsize=256)
+def compilar_predicado(expressao):
+    """
+    Compila um predicado em texto numa função fonte → máscara booleana; a
+    fonte é qualquer objeto com `coluna(nome)` (o universo ou um painel).
+
+    Aceita comparações (inclusive encadeadas, ex.: "1 < liquidez_corrente < 2"),
+    and/or/not, parênteses, + - * /, números e as funções de FUNCOES com um
+    argumento. Os nomes são indicadores do motor ou as colunas "ano" e
+    "setor"; setor é comparado com o nome do setor entre aspas
+    (setor == "Energia Elétrica"). Qualquer outra construção é rejeitada
+    com ValueError, então o texto nunca é executado como código Python.
+    O predicado e os operandos de and/or/not precisam ser condições: um
+    valor solto ("roe") seria verdadeiro também quando ausente (NaN).
+    """
+    try:
+        arvore = ast.parse(expressao.strip(), mode="eval")
+    except SyntaxError as erro:
+        raise ValueError(f"Predicado inválido: {erro.msg}") from None
+    return _compilar_condicao(arvore.body)
+
+
+def _compilar_condicao(no):
+    """Condição (comparação, and/or ou not); valores soltos são rejeitados."""
+    if isinstance(no, (ast.Compare, ast.BoolOp)) or (isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.Not)):
+        return _compilar(no)
+    raise ValueError(f"Esperada uma comparação (ex.: roe > 0.1), não um valor: {ast.unparse(no)}")
+
+
+def _compilar(no):
+    """Converte um nó da árvore numa função universo → array."""
+    if isinstance(no, ast.BoolOp):
+        partes = [_compilar_condicao(valor) for valor in no.values]
+        combinar = np.logical_and if isinstance(no.op, ast.And) else np.logical_or
+        return lambda universo: functools.reduce(combinar, (parte(universo) for parte in partes))
+
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.Not):
+        operando = _compilar_condicao(no.operand)
+        return lambda universo: np.logical_not(operando(universo))
+
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.USub):
+        operando = _compilar(no.operand)
+        return lambda universo: np.negative(operando(universo))
+
+    if isinstance(no, ast.Compare):
+        termos = [no.left, *no.comparators]
+        for op in no.ops:
+            if type(op) not in COMPARACOES:
+                raise ValueError(f"Comparação não suportada: {type(op).__name__}")
+        funcoes = [_compilar_termo(termo, termos) for termo in termos]
+        ops = [COMPARACOES[type(op)] for op in no.ops]
+
+        def comparar(universo):
+            valores = [funcao(universo) for funcao in funcoes]
+            return functools.reduce(np.logical_and, (
+                op(valores[i], valores[i + 1]) for i, op in enumerate(ops)
+            ))
+        return comparar
+
+    if isinstance(no, ast.BinOp) and type(no.op) in ARITMETICAS:
+        esquerda, direita = _compilar(no.left), _compilar(no.right)
+        op = ARITMETICAS[type(no.op)]
+
+        def calcular(universo):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return op(esquerda(universo), direita(universo))
+        return calcular
+
+    if (isinstance(no, ast.Call) and isinstance(no.func, ast.Name) and no.func.id in FUNCOES
+            and len(no.args) == 1 and not no.keywords):
+        argumento = _compilar(no.args[0])
+        funcao = FUNCOES[no.func.id]
+        return lambda universo: funcao(argumento(universo))
+
+    if isinstance(no, ast.Name):
+        nome = no.id
+        return lambda universo: universo.coluna(nome)
+
+    if isinstance(no, ast.Constant) and isinstance(no.value, (int, float)) and not isinstance(no.value, bool):
+        valor = float(no.value)
+        return lambda universo: valor
+
+    raise ValueError(f"Construção não suportada no predicado: {ast.unparse(no)}")
+
+
+def _compilar_termo(termo, termos):
+    """Termo de uma comparação; nomes de setor entre aspas viram a posição no índice."""
+    if isinstance(termo, ast.Constant) and isinstance(termo.value, str):
+        if not any(isinstance(outro, ast.Name) and outro.id == "setor" for outro in termos):
+            raise ValueError(f"Texto só pode ser comparado com setor: {termo.value!r}")
+        setor = termo.value
+        return lambda universo: universo.codigo_setor(setor)
+    return _compilar(termo)
+
+
+def nomes_do_predicado(expressao):
+    """Colunas usadas por um predicado já compilado (para validar antes de avaliar)."""
+    arvore = ast.parse(expressao.strip(), mode="eval")
+    funcoes = {id(no.func) for no in ast.walk(arvore) if isinstance(no, ast.Call)}
+    return sorted({no.id for no in ast.walk(arvore) if isinstance(no, ast.Name) and id(no) not in funcoes})
+
+
+def setores_do_predicado(expressao):
+    """Nomes de setor (textos entre aspas) usados por um predicado já compilado."""
+    arvore = ast.parse(expressao.strip(), mode="eval")
+    return sorted({no.value for no in ast.walk(arvore) if isinstance(no, ast.Constant) and isinstance(no.value, str)})
+
+
+def funcoes_do_predicado(expressao):
+    """Funções temporais usadas por um predicado já compilado."""
+    arvore = ast.parse(expressao.strip(), mode="eval")
+    return sorted({no.func.id for no in ast.walk(arvore) if isinstance(no, ast.Call)})
+
+
+# =============================================================================
+# 2. TRIAGEM E BUSCA DE SEMELHANTES
+# =============================================================================
+def avaliar(universo, expressao):
+    """Máscara booleana (uma posição por empresa-ano) do predicado."""
+    funcao = compilar_predicado(expressao)
+    if funcoes_do_predicado(expressao):
+        raise ValueError(
+            f"{', '.join(funcoes_do_predicado(expressao))}() compara anos consecutivos e só vale "
+            "nas regras de red flags; a triagem avalia cada empresa-ano isoladamente"
+        )
+    validos = set(universo.meta["indicadores"]) | set(COLUNAS_EXTRAS)
+    desconhecidos = [nome for nome in nomes_do_predicado(expressao) if nome not in validos]
+    if desconhecidos:
+        raise ValueError(f"Indicador(es) desconhecido(s): {', '.join(desconhecidos)}")
+    setores = [
+        setor for setor in setores_do_predicado(expressao)
+        if setor == TODOS_SETORES or universo.codigo_setor(setor) < 0
+    ]
+    if setores:
+        raise ValueError(f"Setor(es) desconhecido(s): {', '.join(map(repr, setores))}")
+    with np.errstate(invalid="ignore"):
+        mascara = funcao(universo)
+    return np.broadcast_to(np.asarray(mascara, dtype=bool), (len(universo),))
+
+
+def triar(universo, expressao, ordenar_por=None, decrescente=False, limite=100):
+    """
+    Empresas-ano que satisfazem o predicado, ordenadas por `ordenar_por`
+    (indicador; NaN por último) ou, sem ele, do ano mais recente ao mais
+    antigo. Retorna (linhas do universo, até `limite`; total de resultados).
+    """
+    linhas = np.flatnonzero(avaliar(universo, expressao))
+    if ordenar_por:
+        chave = np.asarray(universo.coluna(ordenar_por)[linhas])
+        ordem = np.argsort(-chave if decrescente else chave, kind="stable")
+    else:
+        ordem = np.argsort(-np.asarray(universo.ano[linhas]), kind="stable")
+    return linhas[ordem[:limite]], len(linhas)
+
+
+def semelhantes(universo, caso, limite=20, anos=None, por_empresa=True):
+    """
+    Empresas-ano com indicadores mais próximos dos de um caso.
+
+    `caso` é {indicador: valor}; valores ausentes (None/NaN) são ignorados.
+    Cada diferença é dividida pelo intervalo interquartil do indicador no
+    ano da linha (índice setorial, "Todas as empresas") e a distância é a
+    raiz da média dos quadrados nos indicadores disponíveis — empresas-ano
+    com menos de MINIMO_INDICADORES em comum ficam de fora. Com
+    `por_empresa`, cada empresa aparece uma vez (seu ano mais próximo).
+    Retorna (linhas do universo, distâncias), da mais próxima à mais distante.
+    """
+    nomes = [
+        nome for nome, valor in caso.items()
+        if nome in universo.meta["indicadores"] and valor is not None and np.isfinite(valor)
+    ]
+    if len(nomes) < MINIMO_INDICADORES or not len(universo):
+        return np.array([], dtype=np.int64), np.array([])
+
+    ano = np.asarray(universo.ano, dtype=np.int64) - universo.ano_inicial
+    todos = universo.codigo_setor(TODOS_SETORES)
+    soma = np.zeros(len(universo))
+    contagem = np.zeros(len(universo), dtype=np.int64)
+    for nome in nomes:
+        i = universo.meta["indicadores"].index(nome)
+        quartis = universo.percentis[todos, :, i]
+        escala = quartis[:, 3] - quartis[:, 1]
+        escala = np.where(escala > DISPERSAO_MINIMA * (np.abs(quartis[:, 2]) + 1), escala, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (np.asarray(universo.coluna(nome)) - caso[nome]) / escala[ano]
+        valido = np.isfinite(z)
+        soma += np.where(valido, z * z, 0.0)
+        contagem += valido
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distancia = np.where(contagem >= MINIMO_INDICADORES, np.sqrt(soma / contagem), np.inf)
+    if anos is not None:
+        distancia[~np.isin(universo.ano, list(anos))] = np.inf
+
+    ordem = np.argsort(distancia, kind="stable")
+    ordem = ordem[np.isfinite(distancia[ordem])]
+    if por_empresa:
+        _, primeiras = np.unique(universo.empresa_linha()[ordem], return_index=True)
+        ordem = ordem[np.sort(primeiras)]
+    ordem = ordem[:limite]
+    return ordem, distancia[ordem]
+
+
+def tabela_resultados(universo, linhas, indicadores, distancias=None):
+    """DataFrame de exibição das linhas: empresa, CNPJ, setor, ano e indicadores."""
+    empresas = universo.empresas[universo.empresa_linha()[linhas]].tolist()
+    tabela = {
+        "Empresa": [universo.nomes.get(cnpj, cnpj) for cnpj in empresas],
+        "CNPJ": empresas,
+        "Setor": [universo.setores[s] for s in universo.coluna("setor")[linhas].tolist()],
+        "Ano": universo.ano[linhas].tolist(),
+    }
+    if distancias is not None:
+        tabela["Distância"] = np.round(distancias, 2)
+    for nome in indicadores:
+        tabela[nome] = np.round(np.asarray(universo.coluna(nome)[linhas]), 2)
+    return pd.DataFrame(tabela)